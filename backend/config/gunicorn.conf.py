@@ -0,0 +1,62 @@
+"""
+Gunicorn configuration: the app is loaded and warmed up in the master
+(core.infrastructure.warmup) before the workers are forked, so every worker
+starts with the code imported and the database cache primed.
+
+    gunicorn -c config/gunicorn.conf.py config.wsgi:application
+"""
+import os
+import time
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master once the app is loaded, before the first fork"""
+    from django.conf import settings
+
+    if not settings.WARMUP_ENABLED:
+        return
+    from core.infrastructure.warmup import warm_up
+
+    try:
+        report = warm_up()
+    except Exception:
+        server.log.exception('Precalentamiento fallido, los workers arrancan en frío')
+        return
+    preload_ms = sum(step['ms'] for step in report['preload'])
+    server.log.info('Precalentamiento: %.0f ms (carga %.0f ms)', report['total_ms'], preload_ms)
+    for result in report['primers']:
+        server.log.info(
+            'Primer %s: %d peticiones, %d errores, primera %.1f ms, total %.0f ms',
+            result['primer'], result['peticiones'], result['errores'], result['primera_ms'] or 0, result['ms']
+        )
+
+
+def post_fork(server, worker):
+    from core.infrastructure import sql_stats
+
+    # El worker hereda la tabla del master; se reinicia para no contarla dos veces
+    sql_stats.collector.reset()
+    worker.forked_at = time.perf_counter()
+    worker.first_request = True
+
+
+def post_worker_init(worker):
+    worker.log.info('Worker %s listo en %.1f ms', worker.pid, (time.perf_counter() - worker.forked_at) * 1000)
+
+
+def pre_request(worker, req):
+    worker.request_started = time.perf_counter()
+
+
+def post_request(worker, req, environ, resp):
+    if worker.first_request:
+        worker.first_request = False
+        worker.log.info(
+            'Primera petición del worker %s (%s %s): %.1f ms',
+            worker.pid, req.method, req.path, (time.perf_counter() - worker.request_started) * 1000
+        )
@@ -53,6 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.infrastructure.profiling.RequestProfilingMiddleware',
+    'core.infrastructure.sql_stats.SqlViewMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -89,6 +91,26 @@ DATABASES = {
     }
 }
 
+# Sharding por cliente: DB_SHARDS=shard0,shard1 agrega una base por alias
+# (DB_<ALIAS>_NAME/HOST/PORT/USER/PASSWORD, por defecto los de default).
+# El orden define el slot de cada shard: solo se agregan al final.
+SHARDS = [alias.strip() for alias in config('DB_SHARDS', default='').split(',') if alias.strip()]
+for _alias in SHARDS:
+    if _alias not in DATABASES:
+        _prefix = f"DB_{_alias.upper()}_"
+        DATABASES[_alias] = dict(
+            DATABASES['default'],
+            NAME=config(f"{_prefix}NAME", default=f"{DATABASES['default']['NAME']}_{_alias}"),
+            HOST=config(f"{_prefix}HOST", default=DATABASES['default']['HOST']),
+            PORT=config(f"{_prefix}PORT", default=DATABASES['default']['PORT']),
+            USER=config(f"{_prefix}USER", default=DATABASES['default']['USER']),
+            PASSWORD=config(f"{_prefix}PASSWORD", default=DATABASES['default']['PASSWORD']),
+        )
+SHARD_BUCKETS = config('SHARD_BUCKETS', default=1024, cast=int)
+SHARD_SLOTS = config('SHARD_SLOTS', default=64, cast=int)
+SHARD_MAP_TTL = config('SHARD_MAP_TTL', default=5, cast=int)
+SHARD_SCATTER_THREADS = config('SHARD_SCATTER_THREADS', default=8, cast=int)
+DATABASE_ROUTERS = ['core.infrastructure.sharding.ShardRouter']
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -177,6 +199,92 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+# Cola de trabajos en segundo plano (comando run_jobs)
+JOBS_OUTPUT_DIR = config('JOBS_OUTPUT_DIR', default=os.path.join(BASE_DIR, 'var', 'jobs'))
+JOBS_WORKER_PROCESSES = config('JOBS_WORKER_PROCESSES', default=2, cast=int)
+# Segundos de arriendo de un trabajo en proceso: el worker lo renueva mientras
+# lo ejecuta y, si deja de hacerlo, el trabajo vuelve a la cola
+JOBS_LEASE_SECONDS = config('JOBS_LEASE_SECONDS', default=600, cast=int)
+
+# Horas que se conservan los eventos del outbox ya enviados a todos los
+# consumidores (comando prune_outbox y trabajo podar_outbox)
+OUTBOX_RETENTION_HOURS = config('OUTBOX_RETENTION_HOURS', default=24, cast=float)
+
+# Reportes Excel/PDF generados en el servidor (caché por contenido)
+REPORTS_DIR = config('REPORTS_DIR', default=os.path.join(BASE_DIR, 'var', 'reports'))
+REPORTS_PROCESSES = config('REPORTS_PROCESSES', default=4, cast=int)
+# Poda de la caché al generar un reporte (y con prune_reports): se borran los
+# que no se usan hace N horas y después los menos usados hasta caber en el tope
+REPORTS_MAX_AGE_HOURS = config('REPORTS_MAX_AGE_HOURS', default=168, cast=float)
+REPORTS_MAX_BYTES = config('REPORTS_MAX_BYTES', default=2 * 1024 * 1024 * 1024, cast=int)
+
+# Importación masiva de créditos desde CSV (comando import_credits)
+IMPORTS_DIR = config('IMPORTS_DIR', default=os.path.join(BASE_DIR, 'var', 'imports'))
+IMPORTS_PROCESSES = config('IMPORTS_PROCESSES', default=4, cast=int)
+
+# Simulador de ofertas (cachés LRU por proceso)
+SIMULATOR_RATE_CACHE_SIZE = config('SIMULATOR_RATE_CACHE_SIZE', default=256, cast=int)
+SIMULATOR_RESPONSE_CACHE_SIZE = config('SIMULATOR_RESPONSE_CACHE_SIZE', default=1024, cast=int)
+# Bytes de JSON en caché por proceso; una respuesta más grande no se guarda
+SIMULATOR_RESPONSE_CACHE_BYTES = config('SIMULATOR_RESPONSE_CACHE_BYTES', default=32 * 1024 * 1024, cast=int)
+SIMULATOR_MAX_OFFERS = config('SIMULATOR_MAX_OFFERS', default=20000, cast=int)
+
+# Backfills en línea (comando run_backfill): lotes por clave primaria con pausa entre lotes
+BACKFILL_BATCH_SIZE = config('BACKFILL_BATCH_SIZE', default=5000, cast=int)
+BACKFILL_BATCH_SECONDS = config('BACKFILL_BATCH_SECONDS', default=0.5, cast=float)
+BACKFILL_PAUSE_SECONDS = config('BACKFILL_PAUSE_SECONDS', default=0.1, cast=float)
+BACKFILL_LOCK_TIMEOUT = config('BACKFILL_LOCK_TIMEOUT', default='2s')
+
+# Archivo de créditos cerrados (comando archive_credits)
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=180, cast=int)
+ARCHIVE_BATCH_SIZE = config('ARCHIVE_BATCH_SIZE', default=200, cast=int)
+
+# Perfiles de peticiones (cabecera X-Profile o ?_profile=1 para staff, o muestreo)
+PROFILING_DIR = config('PROFILING_DIR', default=os.path.join(BASE_DIR, 'var', 'profiles'))
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')
+PROFILING_MAX_PROFILES = config('PROFILING_MAX_PROFILES', default=500, cast=int)
+PROFILING_TOP_FUNCTIONS = config('PROFILING_TOP_FUNCTIONS', default=40, cast=int)
+
+# Estadísticas por fingerprint de SQL (comando sql_top) y log de consultas lentas
+SQL_STATS_ENABLED = config('SQL_STATS_ENABLED', default=True, cast=bool)
+SQL_STATS_DIR = config('SQL_STATS_DIR', default=os.path.join(BASE_DIR, 'var', 'sql_stats'))
+SQL_STATS_MAX_FINGERPRINTS = config('SQL_STATS_MAX_FINGERPRINTS', default=1000, cast=int)
+SQL_STATS_FLUSH_SECONDS = config('SQL_STATS_FLUSH_SECONDS', default=10, cast=int)
+SQL_STATS_MAX_AGE_HOURS = config('SQL_STATS_MAX_AGE_HOURS', default=168, cast=int)
+SQL_SLOW_QUERY_MS = config('SQL_SLOW_QUERY_MS', default=500, cast=float)
+SQL_SLOW_LOG_FILE = config('SQL_SLOW_LOG_FILE', default='')
+
+# Precalentamiento de workers (config/gunicorn.conf.py y comando warm_up)
+WARMUP_ENABLED = config('WARMUP_ENABLED', default=True, cast=bool)
+WARMUP_PRIMERS = [
+    name.strip() for name in config('WARMUP_PRIMERS', default='endpoints,ruta_hoy,recaudo').split(',') if name.strip()
+]
+WARMUP_ROUTE_CLIENTS = config('WARMUP_ROUTE_CLIENTS', default=50, cast=int)
+WARMUP_URLS = [
+    '/api/clientes/',
+    '/api/creditos/',
+    '/api/cronograma/',
+    '/api/pagos/',
+]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.sql.slow': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+if SQL_SLOW_LOG_FILE:
+    LOGGING['handlers']['sql_slow_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': SQL_SLOW_LOG_FILE,
+    }
+    LOGGING['loggers']['core.sql.slow']['handlers'].append('sql_slow_file')
+
 # Configuración de archivos estáticos
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
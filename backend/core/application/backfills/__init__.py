@@ -0,0 +1,80 @@
+"""
+Online backfills: data migrations of large tables that run in the background.
+
+A backfill is a Backfill subclass registered with @backfill(name) (see
+definitions.py). BackfillService applies its UPDATE in primary key batches,
+each in its own short transaction that also advances the checkpoint, and
+then adds the constraints that rely on the filled column as NOT VALID and
+validates them in separate steps, so writers are only blocked for the brief
+catalog changes and never for the table scans.
+
+A schema change that needs one ships in three steps: a migration adds the
+column as nullable (no rewrite), the application starts writing it for new
+rows, and the backfill fills the existing rows and tightens the column,
+either from the run_backfill command / ejecutar_backfill job or from a
+non-atomic migration with run_backfill_operation(name).
+"""
+from django.db import migrations
+
+BACKFILLS = {}
+
+
+class Backfill:
+    """One online data migration of a table.
+
+    update is an UPDATE of `table` limited to the primary key range
+    pk > %(desde)s AND pk <= %(hasta)s that skips rows already filled, so a
+    batch can run twice. not_null lists the columns set NOT NULL afterwards
+    and foreign_keys the (column, referenced table, referenced column) to
+    enforce. sharded backfills run on every shard, the rest on default.
+
+    The constraints are only applied to the database: the model field and
+    the migration state must already declare them (null=False, the
+    ForeignKey), usually through a SeparateDatabaseAndState migration with
+    no database operations, or the next makemigrations emits an AlterField
+    that drops them again.
+    """
+
+    name = None
+    description = ''
+    table = None
+    pk = None
+    update = None
+    not_null = ()
+    foreign_keys = ()
+    sharded = True
+
+
+def backfill(name):
+    """Register a Backfill subclass under `name`"""
+    def register(cls):
+        cls.name = name
+        BACKFILLS[name] = cls()
+        return cls
+    return register
+
+
+def get_backfill(name):
+    try:
+        return BACKFILLS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backfill: {name}. Available: {', '.join(sorted(BACKFILLS))}")
+
+
+def run_backfill_operation(name, validate=True):
+    """Migration operation that runs backfill `name` on the database being migrated.
+
+    The migration must set atomic = False so every batch commits on its own;
+    if it is interrupted, migrating again resumes from the checkpoint.
+    """
+    def forwards(apps, schema_editor):
+        from ..services.backfill_service import BackfillService
+
+        if schema_editor.connection.in_atomic_block:
+            raise ValueError(f"Backfill {name} must run in a migration with atomic = False")
+        BackfillService().run(name, aliases=[schema_editor.connection.alias], validate=validate)
+
+    return migrations.RunPython(forwards, migrations.RunPython.noop, atomic=False)
+
+
+from . import definitions  # noqa: E402,F401  registra los backfills incluidos
@@ -0,0 +1,26 @@
+"""Built-in backfills"""
+from . import Backfill, backfill
+from ...domain.entities import Credit, Payment, PaymentSchedule
+
+
+@backfill('pago_credito')
+class PaymentCredit(Backfill):
+    """Payment.credito from the credit of the paid installment (the data step of migration 0003).
+
+    0003 already leaves the field NOT NULL in the migration state and the
+    model matches it; the backfill restores the database side.
+    """
+
+    description = 'Pago.credito desde el crédito de la cuota; luego NOT NULL y FK a créditos'
+    table = Payment._meta.db_table
+    pk = 'pago_id'
+    update = f"""
+        UPDATE "{Payment._meta.db_table}" p
+        SET credito_id = s.credito_id
+        FROM "{PaymentSchedule._meta.db_table}" s
+        WHERE s.schedule_id = p.schedule_id
+          AND p.credito_id IS NULL
+          AND p.pago_id > %(desde)s AND p.pago_id <= %(hasta)s
+    """
+    not_null = ('credito_id',)
+    foreign_keys = (('credito_id', Credit._meta.db_table, 'credito_id'),)
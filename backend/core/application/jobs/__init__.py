@@ -0,0 +1,38 @@
+"""
+Tasks that can be queued as background jobs.
+
+A task is a function registered with @task(name) that receives the running
+JobContext plus the job params as keyword arguments, reports progress with
+job.progress() and returns a JSON-serializable result.
+"""
+import inspect
+
+TASKS = {}
+
+
+def task(name):
+    """Register a function as a job task under `name`"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise ValueError(f"Unknown job type: {name}. Available: {', '.join(sorted(TASKS))}")
+
+
+def check_params(name, params):
+    """Raise ValueError unless the params fit the keyword arguments of task `name`"""
+    if not isinstance(params, dict):
+        raise ValueError(f"Params of {name} must be an object")
+    try:
+        inspect.signature(get_task(name)).bind(None, **params)
+    except TypeError as e:
+        raise ValueError(f"Invalid params for {name}: {e}")
+
+
+from . import tasks  # noqa: E402,F401  registra las tareas incluidas
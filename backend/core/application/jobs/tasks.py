@@ -0,0 +1,252 @@
+"""Built-in background tasks"""
+import csv
+import heapq
+import os
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+from . import task
+from ...domain.entities import Payment, PaymentSchedule
+from ...infrastructure import sharding
+from ..services.credit_ledger_service import CreditLedgerService
+from ..services.collection_rollup_service import CollectionRollupService
+from ..services.credit_import_service import CreditImportService
+from ..services.reconciliation_service import ReconciliationService
+from ..services.portfolio_snapshot_service import PortfolioSnapshotService
+from ..services.payoff_quote_service import PayoffQuoteService
+from ..services.client_feature_service import ClientFeatureService
+from ..services.backfill_service import BackfillService
+from ..services.archive_service import ArchiveService
+from ..services.outbox_relay_service import OutboxRelayService
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+@task('recalcular_estados_cuotas')
+def recalcular_estados_cuotas(job, lote=5000):
+    """Recompute installment states from their payments, by id range on every shard"""
+    today = timezone.now().date()
+    updated = 0
+    for alias in sharding.shards():
+        schedules = PaymentSchedule.objects.on_shard(alias)
+        bounds = schedules.select_related(None).prefetch_related(None).aggregate(
+            desde=Min('schedule_id'), hasta=Max('schedule_id')
+        )
+        if bounds['desde'] is None:
+            continue
+        total = bounds['hasta'] - bounds['desde'] + 1
+        for start in range(bounds['desde'], bounds['hasta'] + 1, lote):
+            updated += schedules.recalculate_states(start, start + lote - 1, today)
+            job.progress(
+                (start - bounds['desde'] + lote) / total * 100,
+                f"{alias}: {updated} cuotas actualizadas"
+            )
+    return {'cuotas_actualizadas': updated}
+
+
+@task('actualizar_ledger')
+def actualizar_ledger(job, fecha=None):
+    """Accrue installments due and snapshot ledger balances"""
+    ledger = CreditLedgerService()
+    fecha = _parse_date(fecha)
+    causadas = ledger.accrue_installments(fecha)
+    job.progress(50, f"{causadas} cuotas causadas")
+    return {'cuotas_causadas': causadas, 'snapshots': ledger.take_snapshots(fecha)}
+
+
+@task('snapshot_cartera')
+def snapshot_cartera(job, fecha=None, retener_meses=None):
+    """Snapshot the open installments and drop partitions past retention"""
+    snapshots = PortfolioSnapshotService()
+    result = snapshots.take(_parse_date(fecha))
+    result['fecha'] = result['fecha'].isoformat()
+    if retener_meses:
+        job.progress(80, f"{result['filas']} filas escritas")
+        result['particiones_borradas'] = snapshots.purge(int(retener_meses))
+    return result
+
+
+@task('recalcular_recaudo')
+def recalcular_recaudo(job, desde, hasta=None):
+    """Rebuild the daily collection rollups of a date range"""
+    desde = _parse_date(desde)
+    hasta = _parse_date(hasta) or desde
+    return {'acumulados': CollectionRollupService().rebuild(desde, hasta)}
+
+
+@task('exportar_pagos')
+def exportar_pagos(job, cliente_id=None, desde=None, hasta=None, medio=None):
+    """Write payments to a CSV file in JOBS_OUTPUT_DIR"""
+    aliases = [sharding.shard_for_client(cliente_id)] if cliente_id else sharding.shards()
+    columns = ['pago_id', 'credito_id', 'schedule_id', 'fecha_pago', 'monto', 'medio']
+
+    def pagos(alias):
+        rows = Payment.objects.on_shard(alias).select_related(None).order_by('pago_id')
+        if cliente_id:
+            rows = rows.filter(schedule__credito__cliente_id=cliente_id)
+        if desde:
+            rows = rows.filter(fecha_pago__date__gte=_parse_date(desde))
+        if hasta:
+            rows = rows.filter(fecha_pago__date__lte=_parse_date(hasta))
+        if medio:
+            rows = rows.filter(medio=medio)
+        return rows
+
+    total = sum(pagos(alias).count() for alias in aliases)
+    # Cada shard se lee en orden de pago_id y se intercala
+    rows = heapq.merge(
+        *(pagos(alias).values_list(*columns).iterator(chunk_size=5000) for alias in aliases),
+        key=lambda row: row[0]
+    )
+    path = job.output_path(f"pagos_{job.job_id}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for written, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if written % 5000 == 0:
+                job.progress(written / total * 100, f"{written} de {total} pagos")
+    return {'archivo': os.path.basename(path), 'filas': total}
+
+
+@task('intereses_mora')
+def intereses_mora(job, tasa=0.02):
+    """Price overdue interest of every overdue installment into a CSV file"""
+    tasa = Decimal(str(tasa))
+    today = timezone.now().date()
+    cuotas = heapq.merge(*(
+        PaymentSchedule.objects.on_shard(alias).overdue().select_related(None).prefetch_related(None).values_list(
+            'schedule_id', 'credito_id', 'fecha_vencimiento', 'pending_balance'
+        ).order_by('schedule_id').iterator(chunk_size=5000)
+        for alias in sharding.shards()
+    ), key=lambda row: row[0])
+
+    total_interes = Decimal('0.00')
+    count = 0
+    path = job.output_path(f"intereses_mora_{job.job_id}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(['schedule_id', 'credito_id', 'dias_mora', 'saldo_pendiente', 'interes_mora'])
+        for schedule_id, credito_id, vencimiento, saldo in cuotas:
+            dias = (today - vencimiento).days
+            interes = (saldo * (tasa / Decimal('365')) * dias).quantize(Decimal('0.01'))
+            writer.writerow([schedule_id, credito_id, dias, saldo, interes])
+            total_interes += interes
+            count += 1
+            if count % 5000 == 0:
+                job.progress(None, f"{count} cuotas valoradas")
+    return {
+        'archivo': os.path.basename(path),
+        'cuotas': count,
+        'interes_total': float(total_interes),
+    }
+
+
+@task('calcular_features_clientes')
+def calcular_features_clientes(job, fecha=None, cliente_ids=None):
+    """Recompute the per-client repayment features (every client by default)"""
+    escritos = ClientFeatureService().refresh(
+        cliente_ids, _parse_date(fecha),
+        progress=lambda alias, written: job.progress(None, f"{alias}: {written} clientes")
+    )
+    return {'clientes': escritos}
+
+
+@task('ejecutar_backfill')
+def ejecutar_backfill(job, nombre, lote=None, pausa=None, max_minutos=None, validar=True):
+    """Run or resume an online backfill; a retried job continues from the checkpoint"""
+    return BackfillService().run(
+        nombre,
+        batch_size=lote,
+        pause=pausa,
+        max_seconds=max_minutos * 60 if max_minutos else None,
+        validate=validar,
+        progress=lambda alias, checkpoint, size: job.progress(
+            None, f"{alias}: {checkpoint.estado}, {checkpoint.filas} filas, id {checkpoint.ultimo_id}"
+        )
+    )
+
+
+@task('archivar_creditos')
+def archivar_creditos(job, lote=None, dias=None, max_minutos=None):
+    """Move settled credits to the archive tables; a retried job continues with the remaining ones"""
+    return ArchiveService().archive(
+        batch_size=lote,
+        older_than_days=dias,
+        max_seconds=max_minutos * 60 if max_minutos else None,
+        progress=lambda alias, total: job.progress(
+            None, f"{alias}: {total['creditos']} créditos archivados en {total['lotes']} lotes"
+        )
+    )
+
+
+@task('cotizar_pago_total')
+def cotizar_pago_total(job, fecha=None, tasa_mora=0.02, producto=None, ciudad=None):
+    """Payoff quotes of every open credit (optionally by producto/ciudad) into a CSV file"""
+    cotizaciones = PayoffQuoteService().quote_batch(
+        _parse_date(fecha), Decimal(str(tasa_mora)), producto=producto, ciudad=ciudad
+    )
+    job.progress(80, f"{len(cotizaciones)} créditos cotizados")
+
+    columns = [
+        'credito_id', 'cliente_id', 'estado', 'tea', 'cuotas_vencidas', 'saldo_vencido', 'interes_mora',
+        'cuotas_por_vencer', 'saldo_por_vencer', 'descuento_intereses', 'valor_presente_por_vencer', 'total_pago'
+    ]
+    path = job.output_path(f"pago_total_{job.job_id}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for cotizacion in cotizaciones:
+            writer.writerow([cotizacion[column] for column in columns])
+    return {
+        'archivo': os.path.basename(path),
+        'creditos': len(cotizaciones),
+        'total_pago': float(sum(cotizacion['total_pago'] for cotizacion in cotizaciones)),
+    }
+
+
+@task('generar_reporte')
+def generar_reporte(job, tipo, formato, clave, filtros=None):
+    """Render an Excel/PDF report in parallel into the report cache"""
+    # ReportService encola trabajos: se importa aquí para no cerrar un ciclo con JobService
+    from ..services.report_service import ReportService
+    path = ReportService().generate(tipo, formato, filtros or {}, clave, progress=job.progress)
+    return {'clave': clave, 'archivo': os.path.basename(path)}
+
+
+@task('importar_creditos')
+def importar_creditos(job, archivo):
+    """Bulk import an uploaded credits CSV from IMPORTS_DIR"""
+    path = os.path.join(settings.IMPORTS_DIR, os.path.basename(archivo))
+    errores = job.output_path(f"importacion_errores_{job.job_id}.csv")
+    resultado = CreditImportService().import_file(path, errors_path=errores, progress=job.progress)
+    os.remove(path)
+    # El archivo del trabajo es el de filas rechazadas, descargable desde /jobs/{id}/descargar/
+    errores = resultado.pop('errores')
+    resultado['archivo'] = os.path.basename(errores) if errores else None
+    return resultado
+
+
+@task('conciliar_pagos')
+def conciliar_pagos(job, archivo, medio=None):
+    """Reconcile an uploaded settlement file from IMPORTS_DIR"""
+    path = os.path.join(settings.IMPORTS_DIR, os.path.basename(archivo))
+    reporte = job.output_path(f"conciliacion_excepciones_{job.job_id}.csv")
+    resultado = ReconciliationService().reconcile_file(path, medio, exceptions_path=reporte, progress=job.progress)
+    os.remove(path)
+    reporte = resultado.pop('reporte')
+    resultado['archivo'] = os.path.basename(reporte) if reporte else None
+    return resultado
+
+
+@task('podar_outbox')
+def podar_outbox(job, retener_horas=None):
+    """Delete outbox events every consumer already relayed, past retention"""
+    if retener_horas is None:
+        retener_horas = settings.OUTBOX_RETENTION_HOURS
+    borrados = OutboxRelayService().prune(float(retener_horas))
+    return {'eventos_borrados': sum(borrados.values()), 'por_shard': borrados}
@@ -0,0 +1,146 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from ...domain.entities import Credit, Payment, PaymentSchedule
+from ...infrastructure import sharding
+from ...infrastructure.db import skip_triggers
+
+
+class ArchiveService:
+    """Moves settled credits out of the hot tables into the archive tables.
+
+    A credit is settled when it is cancelado or castigado, every installment
+    is pagada and its last payment (or its disbursement) is older than
+    ARCHIVE_AFTER_DAYS. Batches run on every shard in parallel: each one
+    takes up to batch_size settled credits (SKIP LOCKED, so it never waits
+    on a payment in progress) and moves them with their installments and
+    payments to the archive tables of the same shard (migration 0016) in a
+    single statement, so the hot tables and their indexes only hold credits
+    that can still change.
+
+    Rows are moved with the triggers skipped (skip_triggers), so the credit
+    totals, ledger, collection rollups, client features and the sync feed
+    keep the moved rows as they were. Reads by id go
+    through to the archive (ShardedManager.get_or_archived), and the
+    features and rollup rebuilds read the *_todos views over both.
+    """
+
+    def candidates(self, older_than_days=None):
+        """Settled credits ready to archive on each shard"""
+        sql, params = self._settled_sql(older_than_days, limit=None)
+        return dict(zip(sharding.shards(), sharding.scatter(lambda alias: self._count(alias, sql, params))))
+
+    def archived(self):
+        """Credits in the archive of each shard"""
+        sql = f'SELECT credito_id FROM "{Credit.objects.archive_table}"'
+        return dict(zip(sharding.shards(), sharding.scatter(lambda alias: self._count(alias, sql, {}))))
+
+    def archive(self, batch_size=None, older_than_days=None, max_seconds=None, progress=None):
+        """Archive settled credits in batches until none is left (or max_seconds); rows moved per shard"""
+        batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        if batch_size < 1:
+            raise ValueError("Batch size must be positive")
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        sql, params = self._settled_sql(older_than_days, limit=batch_size)
+        aliases = sharding.shards()
+        results = sharding.scatter(lambda alias: self._archive_shard(alias, sql, params, deadline, progress))
+        return dict(zip(aliases, results))
+
+    def restore(self, credit_id):
+        """Move an archived credit back to the hot tables (e.g. to register a reversal); rows moved"""
+        alias = sharding.shard_for_id(credit_id, write=True)
+        moved = self._move(
+            alias,
+            f'SELECT credito_id FROM "{Credit.objects.archive_table}" WHERE credito_id = %(credito)s FOR UPDATE',
+            {'credito': credit_id},
+            to_archive=False
+        )
+        if not moved['creditos']:
+            raise Credit.DoesNotExist(f"Credit {credit_id} is not archived")
+        return moved
+
+    def _settled_sql(self, older_than_days, limit):
+        days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        if days < 0:
+            raise ValueError("Days cannot be negative")
+        sql = f"""
+            SELECT c.credito_id FROM "{Credit._meta.db_table}" c
+            WHERE c.estado = ANY(%(estados)s)
+              AND COALESCE(c.fecha_ultimo_pago, c.fecha_desembolso) < %(corte)s
+              AND NOT EXISTS (
+                  SELECT 1 FROM "{PaymentSchedule._meta.db_table}" s
+                  WHERE s.credito_id = c.credito_id AND s.estado <> 'pagada'
+              )
+        """
+        if limit:
+            sql += " ORDER BY c.credito_id LIMIT %(lote)s FOR UPDATE OF c SKIP LOCKED"
+        return sql, {
+            'estados': list(Credit.SETTLED_STATES),
+            'corte': timezone.now() - timedelta(days=days),
+            'lote': limit,
+        }
+
+    def _count(self, alias, sql, params):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM ({sql}) c", params)
+            return cursor.fetchone()[0]
+
+    def _archive_shard(self, alias, sql, params, deadline, progress):
+        total = {'creditos': 0, 'cuotas': 0, 'pagos': 0, 'lotes': 0}
+        while True:
+            moved = self._move(alias, sql, params, to_archive=True)
+            if not moved['creditos']:
+                return total
+            for key, count in moved.items():
+                total[key] += count
+            total['lotes'] += 1
+            if progress:
+                progress(alias, total)
+            if deadline and time.monotonic() >= deadline:
+                return total
+
+    def _tables(self, model, to_archive):
+        """(source table, target table, column list) of a model, hot to archive or back"""
+        columns = ', '.join(f'"{field.column}"' for field in model._meta.concrete_fields)
+        hot, archive = model._meta.db_table, model.objects.archive_table
+        return (hot, archive, columns) if to_archive else (archive, hot, columns)
+
+    def _move(self, alias, select_sql, params, to_archive):
+        """Move the credits selected by `select_sql` with their installments and payments in one statement"""
+        credit_src, credit_dst, credit_cols = self._tables(Credit, to_archive)
+        schedule_src, schedule_dst, schedule_cols = self._tables(PaymentSchedule, to_archive)
+        payment_src, payment_dst, payment_cols = self._tables(Payment, to_archive)
+        sql = f"""
+            WITH seleccion AS ({select_sql}),
+            creditos AS (
+                DELETE FROM "{credit_src}" c USING seleccion
+                WHERE c.credito_id = seleccion.credito_id RETURNING c.*
+            ),
+            cuotas AS (
+                DELETE FROM "{schedule_src}" s USING seleccion
+                WHERE s.credito_id = seleccion.credito_id RETURNING s.*
+            ),
+            pagos AS (
+                DELETE FROM "{payment_src}" p USING cuotas
+                WHERE p.schedule_id = cuotas.schedule_id RETURNING p.*
+            ),
+            creditos_movidos AS (
+                INSERT INTO "{credit_dst}" ({credit_cols}) SELECT {credit_cols} FROM creditos RETURNING 1
+            ),
+            cuotas_movidas AS (
+                INSERT INTO "{schedule_dst}" ({schedule_cols}) SELECT {schedule_cols} FROM cuotas RETURNING 1
+            ),
+            pagos_movidos AS (
+                INSERT INTO "{payment_dst}" ({payment_cols}) SELECT {payment_cols} FROM pagos RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM creditos_movidos), (SELECT COUNT(*) FROM cuotas_movidas),
+                   (SELECT COUNT(*) FROM pagos_movidos)
+        """
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            # Sin triggers: acumulados, ledger, recaudo, features y sync no cambian al mover
+            skip_triggers(cursor)
+            cursor.execute(sql, params)
+            creditos, cuotas, pagos = cursor.fetchone()
+        return {'creditos': creditos, 'cuotas': cuotas, 'pagos': pagos}
@@ -0,0 +1,233 @@
+import time
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, OperationalError, connections, transaction
+from django.utils import timezone
+from ...domain.entities import BackfillCheckpoint
+from ...infrastructure import sharding
+from ..backfills import BACKFILLS, get_backfill
+
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+class BackfillService:
+    """Runs the registered backfills online, shard by shard in parallel.
+
+    Rows are updated in primary key batches: each batch picks its upper key
+    with an index scan, runs the backfill's UPDATE on that range and
+    advances the checkpoint in the same transaction, with lock_timeout so it
+    gives up instead of queueing writers behind it. The batch size starts
+    small and adapts to keep batches near BACKFILL_BATCH_SECONDS (never
+    above the requested size), a pause between batches leaves room to the
+    application and replicas, and batches that time out on a lock are
+    retried smaller.
+    New rows past the starting key are picked up until the table is done.
+
+    Once filled, foreign keys are added NOT VALID and then validated, and
+    NOT NULL columns get a NOT VALID check constraint that is validated and
+    lets SET NOT NULL skip the table scan; each of these statements runs in
+    its own short transaction.
+    """
+
+    MIN_BATCH = 100
+    START_BATCH = 1000
+    LOCK_RETRIES = 5
+
+    def available(self):
+        """(name, description) of every registered backfill"""
+        return [(name, BACKFILLS[name].description) for name in sorted(BACKFILLS)]
+
+    def status(self, name=None):
+        """Checkpoints of every database, optionally of one backfill"""
+        aliases = sorted(set(sharding.shards()) | {DEFAULT_DB_ALIAS})
+        partials = sharding.scatter(
+            lambda alias: [
+                dict(row, base=alias) for row in BackfillCheckpoint.objects.using(alias).filter(
+                    **({'nombre': name} if name else {})
+                ).order_by('nombre').values()
+            ],
+            aliases=aliases
+        )
+        return [row for rows in partials for row in rows]
+
+    def reset(self, name, aliases=None):
+        """Forget the checkpoints of a backfill so the next run starts over; returns checkpoints deleted"""
+        backfill = get_backfill(name)
+        return sum(sharding.scatter(
+            lambda alias: BackfillCheckpoint.objects.using(alias).filter(nombre=backfill.name).delete()[0],
+            aliases=self._aliases(backfill, aliases)
+        ))
+
+    def run(self, name, aliases=None, batch_size=None, pause=None, max_seconds=None, validate=True,
+            progress=None):
+        """Run (or resume) a backfill; returns the checkpoint of each database.
+
+        With max_seconds it stops after the batch that reaches the limit and
+        the next run resumes there; with validate=False the constraints are
+        left for a later run.
+        """
+        backfill = get_backfill(name)
+        batch_size = batch_size or settings.BACKFILL_BATCH_SIZE
+        pause = settings.BACKFILL_PAUSE_SECONDS if pause is None else pause
+        if batch_size < self.MIN_BATCH:
+            raise ValueError(f"Batch size must be at least {self.MIN_BATCH}")
+        if pause < 0:
+            raise ValueError("Pause cannot be negative")
+        deadline = time.monotonic() + max_seconds if max_seconds else None
+        aliases = self._aliases(backfill, aliases)
+        results = sharding.scatter(
+            lambda alias: self._run(alias, backfill, batch_size, pause, deadline, validate, progress),
+            aliases=aliases
+        )
+        return dict(zip(aliases, results))
+
+    def _aliases(self, backfill, aliases):
+        available = sharding.shards() if backfill.sharded else [DEFAULT_DB_ALIAS]
+        for alias in aliases or []:
+            if alias not in available:
+                raise ValueError(f"Unknown database for {backfill.name}: {alias}. Available: {', '.join(available)}")
+        return list(aliases or available)
+
+    def _run(self, alias, backfill, batch_size, pause, deadline, validate, progress):
+        checkpoint, _ = BackfillCheckpoint.objects.using(alias).get_or_create(nombre=backfill.name)
+        if checkpoint.estado in (BackfillCheckpoint.PENDING, BackfillCheckpoint.RUNNING):
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f'SELECT MAX("{backfill.pk}") FROM "{backfill.table}"')
+                checkpoint.hasta_id = cursor.fetchone()[0]
+            checkpoint.estado = BackfillCheckpoint.RUNNING
+            checkpoint.started_at = checkpoint.started_at or timezone.now()
+            checkpoint.save(using=alias)
+            checkpoint = self._fill(alias, backfill, batch_size, pause, deadline, progress)
+        if checkpoint.estado == BackfillCheckpoint.FILLED and validate:
+            self._constrain(alias, backfill, progress)
+            checkpoint.estado = BackfillCheckpoint.COMPLETED
+            checkpoint.finished_at = timezone.now()
+            checkpoint.save(using=alias)
+            if progress:
+                progress(alias, checkpoint, None)
+        return {
+            'estado': checkpoint.estado,
+            'ultimo_id': checkpoint.ultimo_id,
+            'filas': checkpoint.filas,
+            'lotes': checkpoint.lotes,
+        }
+
+    def _fill(self, alias, backfill, batch_size, pause, deadline, progress):
+        # Arranca con lotes chicos y crece mientras los lotes tarden menos que el objetivo
+        size = min(batch_size, self.START_BATCH)
+        retries = 0
+        while True:
+            started = time.monotonic()
+            try:
+                checkpoint = self._batch(alias, backfill, size)
+            except OperationalError as e:
+                if getattr(e.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE or retries >= self.LOCK_RETRIES:
+                    raise
+                retries += 1
+                size = max(size // 2, self.MIN_BATCH)
+                time.sleep(pause + retries)
+                continue
+            retries = 0
+            if progress:
+                progress(alias, checkpoint, size)
+            if checkpoint.estado == BackfillCheckpoint.FILLED:
+                return checkpoint
+            if deadline and time.monotonic() >= deadline:
+                return checkpoint
+            elapsed = time.monotonic() - started
+            if elapsed > settings.BACKFILL_BATCH_SECONDS:
+                size = max(int(size * settings.BACKFILL_BATCH_SECONDS / elapsed), self.MIN_BATCH)
+            elif elapsed < settings.BACKFILL_BATCH_SECONDS / 2:
+                size = min(size * 2, batch_size)
+            time.sleep(pause)
+
+    def _batch(self, alias, backfill, size):
+        """Update the next `size` keys after the checkpoint and advance it, in one transaction"""
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", [settings.BACKFILL_LOCK_TIMEOUT])
+            # La fila del checkpoint serializa a dos ejecuciones del mismo backfill
+            checkpoint = BackfillCheckpoint.objects.using(alias).select_for_update().get(nombre=backfill.name)
+            desde = checkpoint.ultimo_id if checkpoint.ultimo_id is not None else -1
+            cursor.execute(
+                f'SELECT MAX("{backfill.pk}") FROM ('
+                f'SELECT "{backfill.pk}" FROM "{backfill.table}" WHERE "{backfill.pk}" > %s '
+                f'ORDER BY "{backfill.pk}" LIMIT %s) lote',
+                [desde, size]
+            )
+            hasta = cursor.fetchone()[0]
+            if hasta is None:
+                checkpoint.estado = BackfillCheckpoint.FILLED
+            else:
+                cursor.execute(backfill.update, {'desde': desde, 'hasta': hasta})
+                checkpoint.filas += cursor.rowcount
+                checkpoint.lotes += 1
+                checkpoint.ultimo_id = hasta
+            checkpoint.save(using=alias)
+            return checkpoint
+
+    def _constrain(self, alias, backfill, progress):
+        table = backfill.table
+        for column, ref_table, ref_column in backfill.foreign_keys:
+            constraint = self._constraint(alias, table, 'f', column)
+            if constraint is None:
+                constraint = (f"{table}_{column}_fk", False)
+                self._ddl(alias, (
+                    f'ALTER TABLE "{table}" ADD CONSTRAINT "{constraint[0]}" FOREIGN KEY ("{column}") '
+                    f'REFERENCES "{ref_table}" ("{ref_column}") DEFERRABLE INITIALLY DEFERRED NOT VALID'
+                ))
+            if not constraint[1]:
+                self._validate(alias, table, constraint[0])
+
+        for column in backfill.not_null:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    "SELECT attnotnull FROM pg_attribute WHERE attrelid = %s::regclass AND attname = %s",
+                    [f'"{table}"', column]
+                )
+                if cursor.fetchone()[0]:
+                    continue
+            check = f"{table}_{column}_not_null"
+            if self._constraint(alias, table, 'c', name=check) is None:
+                self._ddl(alias, f'ALTER TABLE "{table}" ADD CONSTRAINT "{check}" CHECK ("{column}" IS NOT NULL) NOT VALID')
+            self._validate(alias, table, check)
+            # Con el CHECK validado, SET NOT NULL no recorre la tabla (PostgreSQL 12+)
+            self._ddl(alias, f'ALTER TABLE "{table}" ALTER COLUMN "{column}" SET NOT NULL')
+            self._ddl(alias, f'ALTER TABLE "{table}" DROP CONSTRAINT "{check}"')
+
+    def _constraint(self, alias, table, kind, column=None, name=None):
+        """(name, validated) of a single-column constraint of `kind` on `column`, or of the one called `name`"""
+        sql = (
+            "SELECT c.conname, c.convalidated FROM pg_constraint c "
+            "WHERE c.conrelid = %s::regclass AND c.contype = %s"
+        )
+        params = [f'"{table}"', kind]
+        if column:
+            sql += (
+                " AND c.conkey = ARRAY[(SELECT attnum FROM pg_attribute"
+                " WHERE attrelid = c.conrelid AND attname = %s)]"
+            )
+            params.append(column)
+        if name:
+            sql += " AND c.conname = %s"
+            params.append(name)
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+
+    def _validate(self, alias, table, constraint):
+        try:
+            self._ddl(alias, f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{constraint}"')
+        except IntegrityError as e:
+            raise ValueError(f"{alias}: rows of {table} still violate {constraint}: {e}")
+
+    def _ddl(self, alias, sql):
+        """Run one DDL statement in its own transaction, retrying when its lock is not granted in time"""
+        for attempt in range(self.LOCK_RETRIES + 1):
+            try:
+                with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = %s", [settings.BACKFILL_LOCK_TIMEOUT])
+                    cursor.execute(sql)
+                return
+            except OperationalError as e:
+                if getattr(e.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == self.LOCK_RETRIES:
+                    raise
+                time.sleep(attempt + 1)
@@ -0,0 +1,115 @@
+import heapq
+from django.db import connections, transaction
+from django.utils import timezone
+from ...domain.entities import Client, ClientFeatures
+from ...infrastructure import sharding
+
+
+class ClientFeatureService:
+    """Per-client repayment features (core.client_features) for risk and collections.
+
+    refresh recomputes clients in chunks of ids, one set-based statement
+    (core_client_features_refresh) per chunk and shard, each chunk in its own
+    transaction so the row locks that keep concurrent payments consistent
+    are held briefly. Between batch runs the trigger on core.pagos refreshes
+    the clients whose payments change; the batch moves the days overdue of
+    unpaid installments forward to the new fecha_corte.
+
+    read pages through the whole book by cliente_id, merging the shards, so
+    scoring reads one row per client instead of its payment history.
+    """
+
+    DEFAULT_CHUNK = 5000
+    DEFAULT_LIMIT = 1000
+    MAX_LIMIT = 10000
+    FIELDS = [
+        'cliente_id', 'fecha_corte', 'creditos', 'creditos_vigentes', 'cuotas_exigibles', 'cuotas_a_tiempo',
+        'tasa_a_tiempo', 'cuotas_con_pago', 'cuotas_pago_parcial', 'ratio_pago_parcial', 'dias_mora_max',
+        'dias_mora_promedio', 'dias_mora_actual', 'num_pagos', 'monto_pagado', 'fecha_ultimo_pago',
+        'mix_medios', 'updated_at',
+    ]
+
+    def refresh(self, client_ids=None, fecha=None, chunk_size=DEFAULT_CHUNK, progress=None):
+        """Recompute the features of the given clients (every client by default); returns rows written"""
+        fecha = fecha or timezone.now().date()
+        if client_ids is not None:
+            by_shard = {}
+            for client_id in sorted({int(client_id) for client_id in client_ids}):
+                by_shard.setdefault(sharding.shard_for_client(client_id), []).append(client_id)
+            if not by_shard:
+                return 0
+            return sum(sharding.scatter(
+                lambda alias: self._refresh_ids(alias, by_shard[alias], fecha, chunk_size, progress),
+                aliases=list(by_shard)
+            ))
+        return sum(sharding.scatter(lambda alias: self._refresh_shard(alias, fecha, chunk_size, progress)))
+
+    def _refresh_shard(self, alias, fecha, chunk_size, progress):
+        ids = Client.objects.on_shard(alias).order_by('cliente_id').values_list('cliente_id', flat=True)
+        return self._refresh_ids(alias, list(ids), fecha, chunk_size, progress)
+
+    def _refresh_ids(self, alias, client_ids, fecha, chunk_size, progress):
+        written = 0
+        chunk = []
+        for client_id in client_ids:
+            chunk.append(client_id)
+            if len(chunk) == chunk_size:
+                written += self._refresh_chunk(alias, chunk, fecha)
+                chunk = []
+                if progress:
+                    progress(alias, written)
+        if chunk:
+            written += self._refresh_chunk(alias, chunk, fecha)
+            if progress:
+                progress(alias, written)
+        return written
+
+    def _refresh_chunk(self, alias, client_ids, fecha):
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute("SELECT core_client_features_refresh(%s::bigint[], %s)", [list(client_ids), fecha])
+            return cursor.fetchone()[0]
+
+    def read(self, after=None, limit=DEFAULT_LIMIT, client_ids=None):
+        """One page of features by cliente_id after the `after` cursor, or the features of `client_ids`"""
+        try:
+            limit = max(1, min(int(limit), self.MAX_LIMIT))
+            after = int(after) if after else 0
+        except (TypeError, ValueError):
+            raise ValueError("limit and cursor must be numbers")
+        if client_ids is not None:
+            try:
+                client_ids = sorted({int(client_id) for client_id in client_ids})
+            except (TypeError, ValueError):
+                raise ValueError("cliente_ids must be numbers")
+            if len(client_ids) > self.MAX_LIMIT:
+                raise ValueError(f"At most {self.MAX_LIMIT} clients per request")
+            by_shard = {}
+            for client_id in client_ids:
+                by_shard.setdefault(sharding.shard_for_client(client_id), []).append(client_id)
+            partials = sharding.scatter(
+                lambda alias: list(ClientFeatures.objects.on_shard(alias).filter(
+                    cliente_id__in=by_shard[alias]
+                ).order_by('cliente_id').values(*self.FIELDS)),
+                aliases=list(by_shard)
+            ) if by_shard else []
+            rows = list(heapq.merge(*partials, key=lambda row: row['cliente_id']))
+            has_more = False
+        else:
+            partials = ClientFeatures.objects.scatter(
+                lambda features: list(features.filter(cliente_id__gt=after).order_by('cliente_id').values(
+                    *self.FIELDS
+                )[:limit + 1])
+            )
+            rows = list(heapq.merge(*partials, key=lambda row: row['cliente_id']))[:limit + 1]
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+        now = timezone.now()
+        for row in rows:
+            ultimo = row['fecha_ultimo_pago']
+            row['dias_desde_ultimo_pago'] = (now - ultimo).days if ultimo else None
+        return {
+            'cursor': str(rows[-1]['cliente_id']) if has_more else None,
+            'has_more': has_more,
+            'clientes': rows,
+        }
@@ -0,0 +1,200 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from django.db import connections, transaction
+from django.utils import timezone
+from ...infrastructure import sharding
+from ...infrastructure.db import get_snapshot_xmin
+from .route_manifest_service import RouteManifestService
+
+
+class CollectionsWorklistService:
+    """Delinquent clients of one or more cities, ranked for collection.
+
+    Clients are ordered by overdue amount (highest first), oldest overdue
+    installment, next due date and client id, and paged with a keyset cursor
+    over that same key. The key of every delinquent client is kept in
+    core.collection_worklist on its shard, so a page reads its own rows from
+    the index of that order instead of aggregating every delinquent client.
+
+    The rows are rebuilt on the first page of each day (overdue depends on
+    the date) and, before every page, re-aggregated for the clients whose
+    client, credit, installment or payment rows changed since the last
+    refresh, found by their sync stamps up to the oldest transaction in
+    flight, as /api/sync/ does. Each shard returns its own first rows after
+    the cursor and the page is the best of them.
+    """
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 500
+    OPEN_STATES = RouteManifestService.OPEN_STATES
+    # Fecha usada como "sin próximo vencimiento" para que la clave no tenga NULLs
+    NO_DUE_DATE = date.max
+
+    AGGREGATE_SQL = """
+        INSERT INTO "core.collection_worklist"
+            (cliente_id, ciudad_clave, monto_vencido, cuotas_vencidas, creditos_en_mora,
+             vencida_desde, proximo_vencimiento)
+        SELECT
+            c.cliente_id, COALESCE(core_ciudad_clave(c.ciudad), ''),
+            SUM(s.valor_cuota - COALESCE(p.monto, 0)) FILTER (WHERE s.fecha_vencimiento < %(hoy)s),
+            COUNT(*) FILTER (WHERE s.fecha_vencimiento < %(hoy)s),
+            COUNT(DISTINCT s.credito_id) FILTER (WHERE s.fecha_vencimiento < %(hoy)s),
+            MIN(s.fecha_vencimiento) FILTER (WHERE s.fecha_vencimiento < %(hoy)s),
+            COALESCE(
+                MIN(s.fecha_vencimiento) FILTER (WHERE s.fecha_vencimiento >= %(hoy)s),
+                %(sin_vencimiento)s
+            )
+        FROM "core.clientes" c
+        JOIN "core.creditos" cr
+            ON cr.cliente_id = c.cliente_id AND cr.estado = 'vigente'
+        JOIN "core.payment_schedule" s
+            ON s.credito_id = cr.credito_id AND s.estado = ANY(%(estados)s)
+        LEFT JOIN LATERAL (
+            SELECT SUM(pg.monto) AS monto FROM "core.pagos" pg
+            WHERE pg.schedule_id = s.schedule_id
+        ) p ON true
+        WHERE s.valor_cuota - COALESCE(p.monto, 0) > 0 {client_filter}
+        GROUP BY c.cliente_id
+        HAVING COUNT(*) FILTER (WHERE s.fecha_vencimiento < %(hoy)s) > 0
+    """
+
+    # Cada tabla por su índice de sync (change_xid, change_seq)
+    CHANGED_SQL = """
+        SELECT ARRAY(
+            SELECT cliente_id FROM "core.clientes" t WHERE {after}
+            UNION SELECT cliente_id FROM "core.creditos" t WHERE {after}
+            UNION SELECT cr.cliente_id FROM "core.payment_schedule" t
+                JOIN "core.creditos" cr ON cr.credito_id = t.credito_id WHERE {after}
+            UNION SELECT cr.cliente_id FROM "core.pagos" t
+                JOIN "core.creditos" cr ON cr.credito_id = t.credito_id WHERE {after}
+        )
+    """.format(after='(t.change_xid, t.change_seq) > (%(xid)s, %(seq)s) AND t.change_xid < %(horizonte)s')
+
+    def get_worklist(self, cities=None, cursor: str = None, limit: int = DEFAULT_LIMIT):
+        """Get one page of the worklist after `cursor` (None means the first page)"""
+        cities = [c.strip() for c in (cities or []) if c and c.strip()]
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        after = self.parse_cursor(cursor)
+        today = timezone.now().date()
+
+        params = {'limite': limit + 1}
+        city_filter = ''
+        if cities:
+            # Sin distinguir mayúsculas ni tildes, como la clave guardada
+            city_filter = 'AND w.ciudad_clave IN (SELECT core_ciudad_clave(ciudad) FROM unnest(%(ciudades)s) ciudad)'
+            params['ciudades'] = cities
+        keyset_filter = ''
+        if after:
+            keyset_filter = (
+                'AND (-w.monto_vencido, w.vencida_desde, w.proximo_vencimiento, w.cliente_id) > '
+                '(%(k_monto)s, %(k_desde)s, %(k_proximo)s, %(k_cliente)s)'
+            )
+            params.update(after)
+
+        sql = f"""
+            SELECT
+                w.cliente_id, c.nombre, c.tipo_doc, c.num_doc, c.ciudad,
+                w.monto_vencido, w.cuotas_vencidas, w.creditos_en_mora,
+                w.vencida_desde, w.proximo_vencimiento
+            FROM "core.collection_worklist" w
+            JOIN "core.clientes" c ON c.cliente_id = w.cliente_id
+            WHERE true {city_filter} {keyset_filter}
+            ORDER BY -w.monto_vencido, w.vencida_desde, w.proximo_vencimiento, w.cliente_id
+            LIMIT %(limite)s
+        """
+
+        def read(alias):
+            self.refresh(alias, today)
+            return self._fetch(alias, sql, params)
+
+        partials = sharding.scatter(read)
+        rows = sorted(
+            (row for rows in partials for row in rows),
+            key=lambda row: (-row['monto_vencido'], row['vencida_desde'], row['proximo_vencimiento'], row['cliente_id'])
+        )[:limit + 1]
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        for row in rows:
+            row['dias_mora'] = (today - row['vencida_desde']).days
+        return {
+            'ciudades': cities,
+            'fecha_corte': today,
+            'cursor': self.format_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more,
+            'clientes': [self._public_row(row) for row in rows],
+        }
+
+    def refresh(self, alias, today=None):
+        """Bring the worklist rows of shard `alias` up to today and its latest changes; returns clients re-aggregated"""
+        today = today or timezone.now().date()
+        params = {'hoy': today, 'estados': self.OPEN_STATES, 'sin_vencimiento': self.NO_DUE_DATE}
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            # Una sola actualización a la vez por shard; las demás páginas esperan y leen el resultado
+            cursor.execute(
+                'SELECT fecha_corte, last_xid, last_seq FROM "core.collection_worklist_estado" '
+                'WHERE estado_id = 1 FOR UPDATE'
+            )
+            fecha_corte, xid, seq = cursor.fetchone()
+            horizon = get_snapshot_xmin(alias)
+            refreshed = 0
+            if fecha_corte != today:
+                cursor.execute('DELETE FROM "core.collection_worklist"')
+                cursor.execute(self.AGGREGATE_SQL.format(client_filter=''), params)
+                refreshed = cursor.rowcount
+            else:
+                cursor.execute(self.CHANGED_SQL, {'xid': xid, 'seq': seq, 'horizonte': horizon})
+                params['clientes'] = cursor.fetchone()[0]
+                if params['clientes']:
+                    cursor.execute(
+                        'DELETE FROM "core.collection_worklist" WHERE cliente_id = ANY(%(clientes)s)', params
+                    )
+                    cursor.execute(
+                        self.AGGREGATE_SQL.format(client_filter='AND c.cliente_id = ANY(%(clientes)s)'), params
+                    )
+                    refreshed = len(params['clientes'])
+            # Todo lo escrito por transacciones anteriores al horizonte ya se leyó
+            cursor.execute(
+                'UPDATE "core.collection_worklist_estado" SET fecha_corte = %s, last_xid = %s, last_seq = 0, '
+                'updated_at = now() WHERE estado_id = 1',
+                [today, max(xid, horizon)]
+            )
+            return refreshed
+
+    def _fetch(self, alias, sql, params):
+        with connections[alias].cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            columns = [col[0] for col in db_cursor.description]
+            return [dict(zip(columns, row)) for row in db_cursor.fetchall()]
+
+    def parse_cursor(self, cursor: str):
+        if not cursor:
+            return None
+        try:
+            monto, desde, proximo, cliente = json.loads(
+                base64.urlsafe_b64decode(cursor.encode('ascii'))
+            )
+            return {
+                'k_monto': -Decimal(monto),
+                'k_desde': date.fromisoformat(desde),
+                'k_proximo': date.fromisoformat(proximo),
+                'k_cliente': int(cliente),
+            }
+        except (ValueError, TypeError, ArithmeticError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def format_cursor(self, row):
+        key = [
+            str(row['monto_vencido']),
+            row['vencida_desde'].isoformat(),
+            row['proximo_vencimiento'].isoformat(),
+            row['cliente_id'],
+        ]
+        return base64.urlsafe_b64encode(json.dumps(key).encode('ascii')).decode('ascii')
+
+    def _public_row(self, row):
+        if row['proximo_vencimiento'] == self.NO_DUE_DATE:
+            row['proximo_vencimiento'] = None
+        return row
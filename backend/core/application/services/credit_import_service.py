@@ -0,0 +1,93 @@
+import csv
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from ...infrastructure.imports.credit_csv import COLUMNS, read_header, split_ranges
+from ...infrastructure.imports.pool import import_credit_range, setup_worker
+
+
+class CreditImportService:
+    """Bulk load of clients, credits and schedules from large CSV files.
+
+    The file is split into byte ranges processed by a spawn-based process
+    pool; every process validates its rows with the model constraints and
+    loads them in batches through COPY into a staging table. Rows loaded by
+    an earlier run of the file are counted as repetidos and skipped, so an
+    interrupted import can simply be run again.
+    """
+
+    COLUMNS = COLUMNS
+    BATCH_ROWS = 5000
+    # Rangos de ~64 MB: suficientes partes para repartir y reportar avance
+    RANGE_BYTES = 64 * 1024 * 1024
+
+    def import_file(self, path: str, processes: int = None, batch_rows: int = None,
+                    errors_path: str = None, progress=None):
+        """Import a credits CSV; returns the totals and the path of the rejected rows file"""
+        header, start = read_header(path)
+        processes = processes or settings.IMPORTS_PROCESSES
+        batch_rows = batch_rows or self.BATCH_ROWS
+        if batch_rows < 1:
+            raise ValueError("batch_rows must be positive")
+
+        size = os.path.getsize(path)
+        parts = max(processes, (size - start) // self.RANGE_BYTES + 1)
+        ranges = split_ranges(path, start, parts)
+
+        totals = {'filas': 0, 'clientes_nuevos': 0, 'creditos': 0, 'cuotas': 0, 'repetidos': 0}
+        rejected = []
+
+        def collect(result, done):
+            counts, errors = result
+            for key, value in counts.items():
+                totals[key] += value
+            rejected.extend(errors)
+            if progress:
+                progress(done / len(ranges) * 100, f"{totals['creditos']} créditos importados")
+
+        if processes <= 1 or len(ranges) == 1:
+            for done, (range_start, range_end) in enumerate(ranges, 1):
+                collect(import_credit_range(path, header, range_start, range_end, batch_rows), done)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(processes, len(ranges)),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_worker
+            ) as pool:
+                futures = [
+                    pool.submit(import_credit_range, path, header, range_start, range_end, batch_rows)
+                    for range_start, range_end in ranges
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    collect(future.result(), done)
+
+        totals['rechazadas'] = len(rejected)
+        totals['errores'] = self._write_errors(path, sorted(rejected), errors_path) if rejected else None
+        return totals
+
+    def store_upload(self, upload):
+        """Write an uploaded file to IMPORTS_DIR in chunks and check its header"""
+        os.makedirs(settings.IMPORTS_DIR, exist_ok=True)
+        path = os.path.join(settings.IMPORTS_DIR, f"creditos_{uuid.uuid4().hex}.csv")
+        with open(path, 'wb') as output:
+            for chunk in upload.chunks():
+                output.write(chunk)
+        try:
+            read_header(path)
+        except (ValueError, UnicodeDecodeError, StopIteration) as e:
+            os.remove(path)
+            raise ValueError(f"Invalid credits CSV: {e}")
+        return path
+
+    def _write_errors(self, path, rejected, errors_path):
+        """Rejected rows with their byte offset in the source file and the reason"""
+        errors_path = errors_path or f"{path}.errores.csv"
+        with open(path, 'rb') as source, open(errors_path, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            writer.writerow(['posicion', 'error', 'fila'])
+            for offset, error in rejected:
+                source.seek(offset)
+                writer.writerow([offset, error, source.readline().decode('utf-8', 'replace').rstrip('\r\n')])
+        return errors_path
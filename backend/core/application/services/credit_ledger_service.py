@@ -0,0 +1,156 @@
+from datetime import date
+from decimal import Decimal
+from django.db import connections, transaction
+from django.utils import timezone
+from ...domain.entities import CreditLedgerEntry, CreditLedgerSnapshot
+from ...infrastructure import sharding
+
+
+class CreditLedgerService:
+    """Balances of credits read from the append-only ledger.
+
+    The current balance is the last entry of the credit; a historical one is
+    the nearest snapshot plus the few entries appended after it. Each shard
+    keeps the ledger of its credits: accruals and snapshots run on every
+    shard and return the sum.
+    """
+
+    BALANCE_FIELDS = CreditLedgerEntry.objects.BALANCE_FIELDS
+
+    def get_balance(self, credit_id: int, fecha: date = None):
+        """Balances of a credit, as of `fecha` when given"""
+        if fecha is None or fecha >= timezone.now().date():
+            entry = CreditLedgerEntry.objects.latest(credit_id)
+            return self._balance(credit_id, entry)
+
+        snapshot = CreditLedgerSnapshot.objects.using(sharding.shard_for_id(credit_id)).filter(
+            credito_id=credit_id, fecha__lte=fecha
+        ).order_by('-fecha').first()
+        effects = CreditLedgerEntry.objects.effects_until(credit_id, fecha, snapshot)
+        balance = {'credito_id': credit_id, 'fecha': fecha}
+        for name in self.BALANCE_FIELDS:
+            base = getattr(snapshot, name) if snapshot else Decimal('0.00')
+            balance[name] = base + effects[name]
+        return balance
+
+    def get_balances(self, credit_ids):
+        """Current balances of several credits, keyed by credit id"""
+        entries = {
+            entry.credito_id: entry
+            for entry in CreditLedgerEntry.objects.latest_by_credit(credit_ids)
+        }
+        return {
+            credit_id: self._balance(credit_id, entries.get(credit_id))
+            for credit_id in credit_ids
+        }
+
+    def record_adjustment(self, credit_id: int, monto: Decimal, fecha: date = None, descripcion: str = ''):
+        """Append an adjustment to the outstanding and due balances"""
+        fecha = fecha or timezone.now().date()
+        alias = sharding.shard_for_id(credit_id, write=True)
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                "SELECT core_ledger_append(%s, 'ajuste', %s, %s, NULL, NULL, %s)",
+                [credit_id, monto, fecha, descripcion]
+            )
+            entry_id = cursor.fetchone()[0]
+        return CreditLedgerEntry.objects.using(alias).get(entry_id=entry_id)
+
+    def accrue_installments(self, fecha: date = None):
+        """Append installments due up to `fecha` not yet in the ledger; returns how many"""
+        fecha = fecha or timezone.now().date()
+        return sum(sharding.scatter(lambda alias: self._accrue_shard(alias, fecha)))
+
+    def _accrue_shard(self, alias, fecha):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT count(core_ledger_append(
+                    s.credito_id, 'cuota_causada', s.valor_cuota, s.fecha_vencimiento,
+                    s.schedule_id, NULL, 'Cuota ' || s.num_cuota
+                ))
+                FROM (
+                    SELECT s.credito_id, s.valor_cuota, s.fecha_vencimiento, s.schedule_id, s.num_cuota
+                    FROM "core.payment_schedule" s
+                    WHERE s.fecha_vencimiento <= %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM "core.credit_ledger" l
+                          WHERE l.tipo = 'cuota_causada' AND l.schedule_id = s.schedule_id
+                      )
+                    ORDER BY s.credito_id, s.fecha_vencimiento, s.num_cuota
+                ) s
+                """,
+                [fecha]
+            )
+            return cursor.fetchone()[0]
+
+    def take_snapshots(self, fecha: date = None):
+        """Snapshot balances at the end of `fecha` for credits with new entries.
+
+        Each snapshot is the previous one plus the entries it did not include,
+        so only credits that moved get a row.
+        """
+        fecha = fecha or timezone.now().date()
+        return sum(sharding.scatter(lambda alias: self._snapshot_shard(alias, fecha)))
+
+    def _snapshot_shard(self, alias, fecha):
+        effects = ',\n'.join(
+            f"SUM({self._effect_sql(position)}) AS {name}"
+            for position, name in enumerate(self.BALANCE_FIELDS)
+        )
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH tope AS (
+                    SELECT COALESCE(MAX(entry_id), 0) AS entry_id FROM "core.credit_ledger"
+                ),
+                previo AS (
+                    SELECT DISTINCT ON (credito_id)
+                        credito_id, fecha, saldo, saldo_exigible, total_pagado, last_entry_id
+                    FROM "core.credit_ledger_snapshots"
+                    WHERE fecha < %(fecha)s
+                    ORDER BY credito_id, fecha DESC
+                ),
+                delta AS (
+                    SELECT l.credito_id, {effects}
+                    FROM "core.credit_ledger" l
+                    LEFT JOIN previo p ON p.credito_id = l.credito_id
+                    WHERE l.fecha <= %(fecha)s
+                      AND l.entry_id <= (SELECT entry_id FROM tope)
+                      AND (p.credito_id IS NULL OR l.entry_id > p.last_entry_id OR l.fecha > p.fecha)
+                    GROUP BY l.credito_id
+                )
+                INSERT INTO "core.credit_ledger_snapshots" (
+                    credito_id, fecha, saldo, saldo_exigible, total_pagado, last_entry_id, created_at
+                )
+                SELECT
+                    d.credito_id, %(fecha)s,
+                    COALESCE(p.saldo, 0) + d.saldo,
+                    COALESCE(p.saldo_exigible, 0) + d.saldo_exigible,
+                    COALESCE(p.total_pagado, 0) + d.total_pagado,
+                    (SELECT entry_id FROM tope), now()
+                FROM delta d
+                LEFT JOIN previo p ON p.credito_id = d.credito_id
+                ON CONFLICT (credito_id, fecha) DO UPDATE SET
+                    saldo = EXCLUDED.saldo,
+                    saldo_exigible = EXCLUDED.saldo_exigible,
+                    total_pagado = EXCLUDED.total_pagado,
+                    last_entry_id = EXCLUDED.last_entry_id
+                """,
+                {'fecha': fecha}
+            )
+            return cursor.rowcount
+
+    def _effect_sql(self, position):
+        whens = ' '.join(
+            f"WHEN '{tipo}' THEN l.monto * {factors[position]}"
+            for tipo, factors in CreditLedgerEntry.BALANCE_EFFECTS.items()
+            if factors[position]
+        )
+        return f"CASE l.tipo {whens} ELSE 0 END"
+
+    def _balance(self, credit_id, entry):
+        balance = {'credito_id': credit_id, 'fecha': timezone.now().date()}
+        for name in self.BALANCE_FIELDS:
+            balance[name] = getattr(entry, name) if entry else Decimal('0.00')
+        return balance
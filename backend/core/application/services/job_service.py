@@ -0,0 +1,152 @@
+import os
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from ...domain.entities import Job
+from ..jobs import check_params, get_task
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job was cancelled while running"""
+
+
+class JobContext:
+    """Handle given to a running task to report progress and write files"""
+
+    def __init__(self, job):
+        self.job = job
+        self.job_id = job.job_id
+
+    def progress(self, porcentaje=None, mensaje=None):
+        """Record progress, heartbeat and extend the lease; raises JobCancelled if this run no longer owns the job"""
+        now = timezone.now()
+        changes = {'heartbeat_at': now, 'lease_until': now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)}
+        if porcentaje is not None:
+            changes['progreso'] = round(min(max(porcentaje, 0), 100), 2)
+        if mensaje is not None:
+            changes['mensaje'] = mensaje[:200]
+        updated = JobService.owned(self.job).update(**changes)
+        if not updated:
+            raise JobCancelled(f"Job {self.job_id} is no longer running")
+
+    def output_path(self, filename):
+        os.makedirs(settings.JOBS_OUTPUT_DIR, exist_ok=True)
+        return os.path.join(settings.JOBS_OUTPUT_DIR, filename)
+
+
+class JobService:
+    """Queue of background jobs stored in core.jobs"""
+
+    RETRY_BASE_SECONDS = 30
+    QUEUE_ORDER = ['-prioridad', 'run_after', 'job_id']
+    # Repetirlas da el mismo error: el trabajo falla sin reintentos
+    PERMANENT_ERRORS = (TypeError,)
+
+    def enqueue(self, tipo: str, params=None, prioridad: int = 0, max_intentos: int = 3, run_after=None):
+        """Queue a job for a registered task; ValueError if the params do not fit the task"""
+        check_params(tipo, params or {})
+        return Job.objects.create(
+            tipo=tipo,
+            params=params or {},
+            prioridad=prioridad,
+            max_intentos=max(1, max_intentos),
+            run_after=run_after or timezone.now()
+        )
+
+    def claim(self, worker: str):
+        """Take the next due job, skipping rows other workers have locked"""
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(estado='pendiente', run_after__lte=timezone.now())
+                .order_by(*self.QUEUE_ORDER)
+                .first()
+            )
+            if job is None:
+                return None
+            now = timezone.now()
+            job.estado = 'en_proceso'
+            job.intentos += 1
+            job.worker = worker
+            job.started_at = now
+            job.heartbeat_at = now
+            job.lease_until = now + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+            job.save(update_fields=['estado', 'intentos', 'worker', 'started_at', 'heartbeat_at', 'lease_until'])
+            return job
+
+    @staticmethod
+    def owned(job):
+        """The job row while it is still running under this attempt (a requeued job has a new one)"""
+        return Job.objects.filter(job_id=job.job_id, estado='en_proceso', intentos=job.intentos)
+
+    def run(self, job_id: int):
+        """Execute a claimed job in this process and record its outcome"""
+        job = Job.objects.get(job_id=job_id)
+        try:
+            result = get_task(job.tipo)(JobContext(job), **job.params)
+        except JobCancelled:
+            return 'cancelado'
+        except self.PERMANENT_ERRORS as e:
+            return self._fail(job, e, retry=False)
+        except Exception as e:
+            return self._fail(job, e)
+
+        self.owned(job).update(
+            estado='completado',
+            progreso=100,
+            resultado=result,
+            error='',
+            finished_at=timezone.now()
+        )
+        return 'completado'
+
+    def cancel(self, job_id: int):
+        """Cancel a pending or running job; running tasks stop at their next progress call"""
+        updated = Job.objects.filter(
+            job_id=job_id, estado__in=['pendiente', 'en_proceso']
+        ).update(estado='cancelado', finished_at=timezone.now())
+        if not updated:
+            raise ValueError(f"Job {job_id} is not pending or running")
+
+    def renew(self, worker: str, job_ids):
+        """Extend the lease of the jobs this worker is still running; returns how many"""
+        return Job.objects.filter(job_id__in=list(job_ids), estado='en_proceso', worker=worker).update(
+            lease_until=timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+        )
+
+    def release(self, job, error):
+        """Give back a claimed job whose worker process died; it fails once out of attempts"""
+        return self._fail(job, error)
+
+    def requeue_stale(self):
+        """Give back running jobs whose lease expired (their worker stopped renewing it); returns how many"""
+        stale = Job.objects.filter(estado='en_proceso', lease_until__lt=timezone.now())
+        failed = stale.filter(intentos__gte=F('max_intentos')).update(
+            estado='fallido',
+            error='Worker stopped responding',
+            finished_at=timezone.now()
+        )
+        requeued = stale.update(estado='pendiente', run_after=timezone.now(), worker='')
+        return failed + requeued
+
+    def _fail(self, job, error, retry=True):
+        # Reintento con espera exponencial mientras queden intentos
+        error_text = ''.join(traceback.format_exception(error))[-4000:]
+        if retry and job.intentos < job.max_intentos:
+            delay = self.RETRY_BASE_SECONDS * 2 ** (job.intentos - 1)
+            self.owned(job).update(
+                estado='pendiente',
+                run_after=timezone.now() + timedelta(seconds=delay),
+                error=error_text,
+                worker=''
+            )
+            return 'reintento'
+        self.owned(job).update(
+            estado='fallido',
+            error=error_text,
+            finished_at=timezone.now()
+        )
+        return 'fallido'
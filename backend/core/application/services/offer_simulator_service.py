@@ -0,0 +1,162 @@
+import json
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+import numpy as np
+from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+from ...domain.entities import Credit
+
+
+class LRUCache:
+    """Thread-safe mapping bounded to `size` keys, evicting the least recently used.
+
+    With max_bytes, values are bytes and the cache is also bounded by their
+    total length; a value longer than max_bytes is not cached.
+    """
+
+    def __init__(self, size, max_bytes=None):
+        self.size = size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None and self.max_bytes is not None:
+                self.bytes -= len(previous)
+            self.entries[key] = value
+            if self.max_bytes is not None:
+                self.bytes += len(value)
+            while len(self.entries) > self.size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                if self.max_bytes is not None:
+                    self.bytes -= len(evicted)
+
+
+def _bounds(field_name):
+    """(min, max) of a Credit field from its validators; None where unbounded"""
+    low = high = None
+    for validator in Credit._meta.get_field(field_name).validators:
+        if isinstance(validator, MinValueValidator):
+            low = validator.limit_value
+        elif isinstance(validator, MaxValueValidator):
+            high = validator.limit_value
+    return low, high
+
+
+class OfferSimulatorService:
+    """Installment value and total cost grids for credit offers.
+
+    Installments are level (French amortization) over monthly periods, at
+    the monthly rate equivalent to the tea. For a grid of inversiones x teas
+    x plazos one NumPy broadcast computes every installment: the annuity
+    factors of a tea for every term (1..max cuotas) are one cached row, and
+    the grid is the outer product of the amounts with the selected factors.
+
+    Two per-process LRU caches keep it cheap on the sales floor: the factor
+    rows by tea, and the serialized response by normalized parameters, the
+    latter bounded by the bytes it holds (SIMULATOR_RESPONSE_CACHE_BYTES) so
+    a few large grids cannot fill the worker's memory. Limits follow
+    Credit's validators.
+    """
+
+    PERIODS_PER_YEAR = 12
+    DEFAULT_PLAZOS = (6, 9, 12, 18, 24, 36)
+    DEFAULT_TEAS = (Decimal('0.28'),)
+
+    def __init__(self):
+        self.rate_cache = LRUCache(settings.SIMULATOR_RATE_CACHE_SIZE)
+        self.response_cache = LRUCache(
+            settings.SIMULATOR_RESPONSE_CACHE_SIZE, max_bytes=settings.SIMULATOR_RESPONSE_CACHE_BYTES
+        )
+        self.min_inversion, self.max_inversion = _bounds('inversion')
+        self.min_cuotas, self.max_cuotas = _bounds('cuotas_totales')
+        self.min_tea, self.max_tea = _bounds('tea')
+
+    def simulate(self, producto, inversiones, plazos=None, teas=None):
+        """Grid as a dict; valor_cuota, total_pagado and costo_financiero are indexed [inversion][tea][plazo]"""
+        return self._simulate(*self._normalize(producto, inversiones, plazos, teas))
+
+    def simulate_json(self, producto, inversiones, plazos=None, teas=None):
+        """Grid serialized as JSON bytes, served from the response cache when the parameters repeat"""
+        key = self._normalize(producto, inversiones, plazos, teas)
+        content = self.response_cache.get(key)
+        if content is None:
+            content = json.dumps(self._simulate(*key), separators=(',', ':')).encode()
+            self.response_cache.put(key, content)
+        return content
+
+    def _normalize(self, producto, inversiones, plazos, teas):
+        """Validated (producto, inversiones, plazos, teas), each sorted and without repeats"""
+        if producto not in dict(Credit.PRODUCT_CHOICES):
+            raise ValueError(f"Invalid product: {producto}. Use one of {', '.join(dict(Credit.PRODUCT_CHOICES))}")
+        inversiones = self._decimals(inversiones, 'inversion', self.min_inversion, self.max_inversion)
+        teas = self._decimals(teas or self.DEFAULT_TEAS, 'tea', self.min_tea, self.max_tea)
+        try:
+            plazos = [Decimal(str(plazo)) for plazo in plazos or self.DEFAULT_PLAZOS]
+        except InvalidOperation:
+            raise ValueError("cuotas must be whole numbers")
+        # 12.7 no se trunca a 12
+        if any(not plazo.is_finite() or plazo != plazo.to_integral_value() for plazo in plazos):
+            raise ValueError("cuotas must be whole numbers")
+        plazos = tuple(sorted({int(plazo) for plazo in plazos}))
+        if plazos[0] < self.min_cuotas or plazos[-1] > self.max_cuotas:
+            raise ValueError(f"cuotas must be between {self.min_cuotas} and {self.max_cuotas}")
+        offers = len(inversiones) * len(teas) * len(plazos)
+        if offers > settings.SIMULATOR_MAX_OFFERS:
+            raise ValueError(f"Too many offers ({offers}); at most {settings.SIMULATOR_MAX_OFFERS} per simulation")
+        return producto, inversiones, plazos, teas
+
+    def _decimals(self, values, name, low, high):
+        try:
+            values = tuple(sorted({Decimal(str(value)).normalize() for value in values}))
+        except (TypeError, InvalidOperation):
+            raise ValueError(f"{name} must be numbers")
+        if not values:
+            raise ValueError(f"{name} is required")
+        if low is not None and values[0] < low:
+            raise ValueError(f"{name} must be at least {low}")
+        if high is not None and values[-1] > high:
+            raise ValueError(f"{name} must be at most {high}")
+        return values
+
+    def _factors(self, tea):
+        """Annuity factor (installment per peso financed) of every term from 1 to max cuotas at `tea`"""
+        row = self.rate_cache.get(tea)
+        if row is None:
+            rate = (1 + float(tea)) ** (1 / self.PERIODS_PER_YEAR) - 1
+            terms = np.arange(1, self.max_cuotas + 1)
+            row = rate / (1 - (1 + rate) ** -terms)
+            row.setflags(write=False)
+            self.rate_cache.put(tea, row)
+        return row
+
+    def _simulate(self, producto, inversiones, plazos, teas):
+        amounts = np.array(inversiones, dtype=float)
+        terms = np.array(plazos)
+        factors = np.vstack([self._factors(tea) for tea in teas])[:, terms - 1]
+        # (inversiones, teas, plazos), redondeado a decenas como los cronogramas
+        installments = np.round(amounts[:, None, None] * factors[None, :, :], -1)
+        totals = installments * terms
+        return {
+            'producto': producto,
+            'inversiones': amounts.tolist(),
+            'teas': [float(tea) for tea in teas],
+            'plazos': list(plazos),
+            'tasas_mensuales': [round((1 + float(tea)) ** (1 / self.PERIODS_PER_YEAR) - 1, 8) for tea in teas],
+            'valor_cuota': installments.tolist(),
+            'total_pagado': totals.tolist(),
+            'costo_financiero': (totals - amounts[:, None, None]).tolist(),
+        }
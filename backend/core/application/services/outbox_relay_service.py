@@ -0,0 +1,118 @@
+import time
+from datetime import timedelta
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from ...domain.entities import OutboxEvent, OutboxCheckpoint
+from ...infrastructure import sharding
+from ...infrastructure.db import get_snapshot_xmin
+
+
+class OutboxRelayService:
+    """Ships outbox events to a sink in batches, tracking a per-sink checkpoint.
+
+    Every shard has its own outbox and checkpoint; a batch takes the next
+    events of each shard in turn. With sharding enabled event ids are only
+    unique within a shard, so events carry the shard they come from.
+    """
+
+    DEFAULT_BATCH_SIZE = 5000
+    PRUNE_BATCH_SIZE = 10000
+    EVENT_FIELDS = ['event_id', 'tipo', 'agregado', 'agregado_id', 'payload', 'created_at', 'change_xid']
+
+    def relay_batch(self, sink, consumer: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Send the next batch of every shard; returns metrics of the batch (0 events when caught up)"""
+        started = time.monotonic()
+        sent, last_event_id = 0, None
+        for alias in sharding.shards():
+            events, event_id = self._relay_shard(alias, sink, consumer, batch_size)
+            if events:
+                sent, last_event_id = sent + events, event_id
+        if not sent:
+            return {'events': 0, 'seconds': time.monotonic() - started}
+        return {
+            'events': sent,
+            'seconds': time.monotonic() - started,
+            'last_event_id': last_event_id,
+        }
+
+    def pending_count(self, consumer: str):
+        """Events not yet relayed to the consumer"""
+        return sum(self._after(alias, self._checkpoint(alias, consumer)).count() for alias in sharding.shards())
+
+    def prune(self, retention_hours: float, batch_size: int = PRUNE_BATCH_SIZE):
+        """Delete events every consumer already relayed and older than the retention; returns deleted per shard.
+
+        Events after the slowest checkpoint are kept, so a consumer that lags
+        behind loses nothing. A shard without checkpoints keeps everything.
+        """
+        if retention_hours < 0:
+            raise ValueError("retention_hours must be zero or positive")
+        older_than = timezone.now() - timedelta(hours=retention_hours)
+        return dict(zip(
+            sharding.shards(),
+            sharding.scatter(lambda alias: self._prune_shard(alias, older_than, batch_size))
+        ))
+
+    def _prune_shard(self, alias, older_than, batch_size):
+        slowest = OutboxCheckpoint.objects.using(alias).order_by('last_xid', 'last_event_id').first()
+        if slowest is None:
+            return 0
+        deleted = 0
+        # Lotes cortos por el índice de relay: no bloquean los triggers que escriben eventos
+        while True:
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute(
+                    """
+                    DELETE FROM "core.outbox_events" WHERE event_id IN (
+                        SELECT event_id FROM "core.outbox_events"
+                        WHERE (change_xid, event_id) <= (%s, %s) AND created_at < %s
+                        ORDER BY change_xid, event_id
+                        LIMIT %s
+                    )
+                    """,
+                    [slowest.last_xid, slowest.last_event_id, older_than, batch_size]
+                )
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    return deleted
+
+    def _relay_shard(self, alias, sink, consumer, batch_size):
+        """Send the next batch of one shard; (events sent, last event_id)"""
+        events = self._next_events(alias, self._checkpoint(alias, consumer), batch_size)
+        if not events:
+            return 0, None
+
+        last_xid, last_event_id = events[-1]['change_xid'], events[-1]['event_id']
+        for event in events:
+            del event['change_xid']
+            if sharding.enabled():
+                event['shard'] = alias
+        sink.send(events)
+
+        # Solo se avanza tras una entrega exitosa: si falla, el lote se reenvía
+        OutboxCheckpoint.objects.using(alias).filter(sink=consumer).update(
+            last_xid=last_xid,
+            last_event_id=last_event_id,
+            relayed_total=F('relayed_total') + len(events)
+        )
+        return len(events), last_event_id
+
+    def _checkpoint(self, alias, consumer):
+        checkpoint, _ = OutboxCheckpoint.objects.using(alias).get_or_create(sink=consumer)
+        return checkpoint
+
+    def _next_events(self, alias, checkpoint, batch_size):
+        # Eventos de transacciones aún abiertas se dejan para un lote posterior
+        return list(
+            self._after(alias, checkpoint)
+            .filter(change_xid__lt=get_snapshot_xmin(alias))
+            .order_by('change_xid', 'event_id')
+            .values(*self.EVENT_FIELDS)[:batch_size]
+        )
+
+    def _after(self, alias, checkpoint):
+        return OutboxEvent.objects.using(alias).filter(
+            Q(change_xid__gt=checkpoint.last_xid) |
+            Q(change_xid=checkpoint.last_xid, event_id__gt=checkpoint.last_event_id)
+        )
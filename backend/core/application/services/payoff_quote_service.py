@@ -0,0 +1,172 @@
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from django.db import connections
+from ...domain.entities import Client, Credit, Payment, PaymentSchedule
+from ...infrastructure import sharding
+
+CENT = Decimal('0.01')
+
+
+@lru_cache(maxsize=65536)
+def discount_factor(tea: Decimal, days: int) -> Decimal:
+    """Present value of 1 due in `days` days at the annual effective rate `tea`"""
+    return (Decimal(1) + tea) ** (Decimal(-days) / Decimal(365))
+
+
+class PayoffQuoteService:
+    """Amount needed to cancel a credit in full at a date.
+
+    Installments due up to the quote date are owed in full plus overdue
+    interest (same simple daily rate as PaymentScheduleManager.overdue_interest);
+    installments not yet due are discounted to the quote date at the credit's
+    tea, which waives the interest they include for the time not yet run.
+    Only interest the schedule actually charges can be waived: the discount
+    is capped at what the installments add over the inversion, so a credit
+    whose installments are plain principal (inversion / cuotas) pays its
+    future balance in full and no quote falls below the principal owed.
+
+    The balances come from one aggregated query per shard: one row per credit
+    with the overdue totals and the days and balances of its future
+    installments. Discount factors only depend on (tea, days) and are cached
+    across quotes, so a batch over thousands of credits with a handful of
+    rates computes each factor once.
+    """
+
+    MAX_BATCH = 5000
+    OPEN_STATES = ('pendiente', 'parcial', 'vencida')
+
+    def quote(self, credit_id, fecha: date = None, overdue_rate=Decimal('0.02')):
+        """Payoff quote of one credit; Credit.DoesNotExist if there is no such credit"""
+        fecha, overdue_rate = self._validate(fecha, overdue_rate)
+        try:
+            credit_id = int(credit_id)
+        except (TypeError, ValueError):
+            raise Credit.DoesNotExist(f"Credit {credit_id} not found")
+        alias = sharding.shard_for_id(credit_id)
+        rows = self._fetch(alias, fecha, {'ids': [credit_id]})
+        if not rows:
+            estado = Credit.objects.on_shard(alias).filter(pk=credit_id).values_list('estado', flat=True).first()
+            if estado is None and Credit.objects.archived_by_id(credit_id) is not None:
+                raise ValueError(f"Credit {credit_id} is archived and has nothing to pay off")
+            if estado is None:
+                raise Credit.DoesNotExist(f"Credit {credit_id} not found")
+            raise ValueError(f"Credit {credit_id} has nothing to pay off (estado {estado})")
+        return self._price(rows[0], fecha, overdue_rate)
+
+    def quote_batch(self, fecha: date = None, overdue_rate=Decimal('0.02'), credit_ids=None,
+                    producto=None, ciudad=None, limit=None):
+        """Payoff quotes of the given credits, or of every open credit matching the filters.
+
+        Credits that are cancelled or have nothing left to pay are skipped.
+        """
+        fecha, overdue_rate = self._validate(fecha, overdue_rate)
+        filters = {'producto': producto, 'ciudad': ciudad, 'limit': limit}
+        if credit_ids is not None:
+            try:
+                credit_ids = sorted({int(credit_id) for credit_id in credit_ids})
+            except (TypeError, ValueError):
+                raise ValueError("creditos must be a list of credit ids")
+            if len(credit_ids) > self.MAX_BATCH:
+                raise ValueError(f"At most {self.MAX_BATCH} credits per batch")
+            by_shard = {}
+            for credit_id in credit_ids:
+                by_shard.setdefault(sharding.shard_for_id(credit_id), []).append(credit_id)
+            partials = sharding.scatter(
+                lambda alias: self._fetch(alias, fecha, dict(filters, ids=by_shard[alias])),
+                aliases=list(by_shard)
+            )
+        else:
+            partials = sharding.scatter(lambda alias: self._fetch(alias, fecha, filters))
+        rows = sorted((row for rows in partials for row in rows), key=lambda row: row[0])
+        return [self._price(row, fecha, overdue_rate) for row in rows[:limit]]
+
+    def _validate(self, fecha, overdue_rate):
+        today = date.today()
+        fecha = fecha or today
+        if fecha < today:
+            raise ValueError("Quote date cannot be in the past: balances are current")
+        try:
+            overdue_rate = Decimal(str(overdue_rate))
+        except ArithmeticError:
+            raise ValueError(f"Invalid overdue rate: {overdue_rate}")
+        if not Decimal('0') <= overdue_rate <= Decimal('1'):
+            raise ValueError("Overdue rate must be between 0 and 1")
+        return fecha, overdue_rate
+
+    def _fetch(self, alias, fecha, filters):
+        where, params = ["cr.estado IN ('vigente', 'castigado')", "cr.saldo_pendiente > 0"], {'fecha': fecha}
+        if filters.get('ids') is not None:
+            where.append("cr.credito_id = ANY(%(ids)s)")
+            params['ids'] = filters['ids']
+        if filters.get('producto'):
+            where.append("cr.producto = %(producto)s")
+            params['producto'] = filters['producto']
+        if filters.get('ciudad'):
+            where.append(f'cr.cliente_id IN (SELECT cliente_id FROM "{Client._meta.db_table}" WHERE ciudad = %(ciudad)s)')
+            params['ciudad'] = filters['ciudad']
+        limit = ''
+        if filters.get('limit'):
+            limit = 'LIMIT %(limit)s'
+            params['limit'] = filters['limit']
+        sql = f"""
+            WITH creditos AS (
+                SELECT cr.credito_id, cr.cliente_id, cr.tea, cr.estado,
+                       GREATEST((
+                           SELECT SUM(t.valor_cuota) FROM "{PaymentSchedule._meta.db_table}" t
+                           WHERE t.credito_id = cr.credito_id
+                       ) - cr.inversion, 0) AS intereses
+                FROM "{Credit._meta.db_table}" cr
+                WHERE {' AND '.join(where)}
+                ORDER BY cr.credito_id
+                {limit}
+            ),
+            cuotas AS (
+                SELECT s.credito_id, s.fecha_vencimiento - %(fecha)s::date AS dias,
+                       s.valor_cuota - COALESCE(p.monto, 0) AS saldo
+                FROM "{PaymentSchedule._meta.db_table}" s
+                JOIN creditos c ON c.credito_id = s.credito_id
+                LEFT JOIN LATERAL (
+                    SELECT SUM(monto) AS monto FROM "{Payment._meta.db_table}" WHERE schedule_id = s.schedule_id
+                ) p ON true
+                WHERE s.estado IN ({', '.join(f"'{estado}'" for estado in self.OPEN_STATES)})
+            )
+            SELECT c.credito_id, c.cliente_id, c.tea, c.estado, c.intereses,
+                   COUNT(*) FILTER (WHERE q.dias <= 0),
+                   COALESCE(SUM(q.saldo) FILTER (WHERE q.dias <= 0), 0),
+                   COALESCE(SUM(q.saldo * -q.dias) FILTER (WHERE q.dias < 0), 0),
+                   COALESCE(ARRAY_AGG(q.dias ORDER BY q.dias) FILTER (WHERE q.dias > 0), '{{}}'),
+                   COALESCE(ARRAY_AGG(q.saldo ORDER BY q.dias) FILTER (WHERE q.dias > 0), '{{}}')
+            FROM creditos c
+            JOIN cuotas q ON q.credito_id = c.credito_id
+            WHERE q.saldo > 0
+            GROUP BY c.credito_id, c.cliente_id, c.tea, c.estado, c.intereses
+        """
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _price(self, row, fecha, overdue_rate):
+        credito_id, cliente_id, tea, estado, intereses, vencidas, saldo_vencido, saldo_dias, dias, saldos = row
+        interes_mora = (saldo_dias * overdue_rate / Decimal('365')).quantize(CENT)
+        saldo_por_vencer = sum(saldos, Decimal('0.00'))
+        valor_presente = sum(
+            (saldo * discount_factor(tea, days) for days, saldo in zip(dias, saldos)), Decimal('0')
+        ).quantize(CENT)
+        # Lo que no es interés del cronograma es capital y se paga completo
+        valor_presente = max(valor_presente, saldo_por_vencer - intereses)
+        return {
+            'credito_id': credito_id,
+            'cliente_id': cliente_id,
+            'estado': estado,
+            'fecha': fecha,
+            'tea': tea,
+            'cuotas_vencidas': vencidas,
+            'saldo_vencido': saldo_vencido,
+            'interes_mora': interes_mora,
+            'cuotas_por_vencer': len(saldos),
+            'saldo_por_vencer': saldo_por_vencer,
+            'descuento_intereses': saldo_por_vencer - valor_presente,
+            'valor_presente_por_vencer': valor_presente,
+            'total_pago': saldo_vencido + interes_mora + valor_presente,
+        }
@@ -0,0 +1,80 @@
+import heapq
+from decimal import Decimal
+from django.db.models import Count, Sum
+from ...domain.entities import Client, Credit, Payment, PaymentSchedule
+from ...infrastructure import sharding
+
+
+class PortfolioService:
+    """Portfolio-wide queries gathered from every shard.
+
+    Each shard answers the query for its own clients in parallel and the
+    partial results are merged here: sums are added and ordered listings are
+    merged with a k-way merge, each shard returning at most `limit` rows.
+    """
+
+    def summary(self):
+        """Clients, credits and installments by estado and payments, over all shards"""
+        partials = sharding.scatter(self._shard_summary)
+        total = {
+            'shards': len(partials),
+            'clientes': 0,
+            'creditos': {},
+            'cuotas': {},
+            'pagos': {'cantidad': 0, 'monto': Decimal('0')},
+        }
+        for partial in partials:
+            total['clientes'] += partial['clientes']
+            for section, amount_field in (('creditos', 'inversion'), ('cuotas', 'valor')):
+                for estado, values in partial[section].items():
+                    merged = total[section].setdefault(estado, {'cantidad': 0, amount_field: Decimal('0')})
+                    merged['cantidad'] += values['cantidad']
+                    merged[amount_field] += values[amount_field]
+            total['pagos']['cantidad'] += partial['pagos']['cantidad']
+            total['pagos']['monto'] += partial['pagos']['monto']
+        return total
+
+    def _shard_summary(self, alias):
+        creditos = Credit.objects.on_shard(alias).select_related(None).values('estado').annotate(
+            cantidad=Count('credito_id'), inversion=Sum('inversion')
+        ).order_by()
+        cuotas = PaymentSchedule.objects.on_shard(alias).select_related(None).prefetch_related(None).values(
+            'estado'
+        ).annotate(cantidad=Count('schedule_id'), valor=Sum('valor_cuota')).order_by()
+        pagos = Payment.objects.on_shard(alias).aggregate(cantidad=Count('pago_id'), monto=Sum('monto'))
+        return {
+            'clientes': Client.objects.on_shard(alias).count(),
+            'creditos': {
+                row['estado']: {'cantidad': row['cantidad'], 'inversion': row['inversion'] or Decimal('0')}
+                for row in creditos
+            },
+            'cuotas': {
+                row['estado']: {'cantidad': row['cantidad'], 'valor': row['valor'] or Decimal('0')}
+                for row in cuotas
+            },
+            'pagos': {'cantidad': pagos['cantidad'], 'monto': pagos['monto'] or Decimal('0')},
+        }
+
+    def overdue_installments(self, client_id=None, limit=None):
+        """Overdue installments by due date; a client's come from its shard only"""
+        if client_id:
+            schedules = PaymentSchedule.objects.on_shard(sharding.shard_for_client(client_id))
+            return list(schedules.overdue().filter(credito__cliente_id=client_id).order_by(
+                'fecha_vencimiento', 'schedule_id'
+            )[:limit])
+
+        def build(schedules):
+            return list(schedules.overdue().order_by('fecha_vencimiento', 'schedule_id')[:limit])
+
+        merged = heapq.merge(
+            *PaymentSchedule.objects.scatter(build),
+            key=lambda schedule: (schedule.fecha_vencimiento, schedule.schedule_id)
+        )
+        return list(merged)[:limit]
+
+    def clients_with_overdue(self):
+        """Clients with at least one overdue installment, by cliente_id"""
+        return list(heapq.merge(
+            *Client.objects.scatter(lambda clients: list(clients.with_overdue().order_by('cliente_id'))),
+            key=lambda client: client.cliente_id
+        ))
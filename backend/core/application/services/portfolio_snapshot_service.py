@@ -0,0 +1,328 @@
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connections, transaction
+from ...domain.entities import PortfolioSnapshotRun
+from ...infrastructure import sharding
+
+
+class PortfolioSnapshotService:
+    """Daily installment snapshots and the delinquency analytics read from them.
+
+    core.installment_snapshots is partitioned by month. The first snapshot of
+    a month writes every open installment (keyframe); later ones only write
+    installments whose state, balance or due date changed, plus a closing
+    row (estado CERRADA) for installments that stopped being open. The state
+    at a date is the latest row of each installment in that month's
+    partition up to the date, so no query reads more than one month.
+
+    Days overdue are not stored: they follow from fecha_vencimiento and the
+    date asked for, so an overdue installment does not change every day.
+    Every shard snapshots its own installments; readers merge the shards.
+    """
+
+    TABLE = 'core.installment_snapshots'
+    # Estado de la cuota en el snapshot (smallint)
+    CERRADA = 0
+    ESTADOS = {'pendiente': 1, 'parcial': 2, 'vencida': 3}
+    CASTIGADA = 4
+    # Tramos de mora del crédito por días de atraso de su cuota más antigua: (tramo, hasta)
+    TRAMOS = [('al_dia', 0), ('1-30', 30), ('31-60', 60), ('61-90', 90), ('90+', None)]
+    CASTIGADO = 'castigado'
+    NUEVO = 'nuevo'
+    CANCELADO = 'cancelado'
+    INTERVALS = ['dia', 'semana', 'mes']
+    MAX_POINTS = 400
+
+    def take(self, fecha: date = None):
+        """Snapshot the open installments of every shard at `fecha` (today by default)"""
+        fecha = fecha or date.today()
+        runs = sharding.scatter(lambda alias: self._take(alias, fecha))
+        return {
+            'fecha': fecha,
+            'keyframe': any(run.keyframe for run in runs),
+            'filas': sum(run.filas for run in runs),
+            'cuotas_abiertas': sum(run.cuotas_abiertas for run in runs),
+        }
+
+    def _take(self, alias, fecha):
+        runs = PortfolioSnapshotRun.objects.using(alias)
+        inicio = fecha.replace(day=1)
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            # Una corrida a la vez por shard
+            cursor.execute(f'LOCK TABLE "{PortfolioSnapshotRun._meta.db_table}" IN SHARE ROW EXCLUSIVE MODE')
+            ultima = runs.filter(fecha__gt=fecha).order_by('-fecha').first()
+            if ultima:
+                raise ValueError(f"A later snapshot already exists ({ultima.fecha}); snapshots only move forward")
+            self._ensure_partition(cursor, inicio)
+            # Repetir el día reemplaza su snapshot
+            cursor.execute(f'DELETE FROM "{self.TABLE}" WHERE fecha = %s', [fecha])
+            runs.filter(fecha=fecha).delete()
+            keyframe = not runs.filter(fecha__gte=inicio, fecha__lt=fecha).exists()
+            cursor.execute(self._snapshot_sql(), {'fecha': fecha, 'inicio': inicio})
+            abiertas, filas = cursor.fetchone()
+            return runs.create(fecha=fecha, keyframe=keyframe, filas=filas, cuotas_abiertas=abiertas)
+
+    def _snapshot_sql(self):
+        estados = ' '.join(f"WHEN '{estado}' THEN {code}" for estado, code in self.ESTADOS.items())
+        return f"""
+            WITH actual AS (
+                SELECT s.schedule_id, s.credito_id,
+                       ROUND((s.valor_cuota - COALESCE(p.monto, 0)) * 100)::bigint AS saldo_centavos,
+                       s.fecha_vencimiento,
+                       (CASE WHEN cr.estado = 'castigado' THEN {self.CASTIGADA}
+                             ELSE CASE s.estado {estados} END END)::smallint AS estado
+                FROM "core.payment_schedule" s
+                JOIN "core.creditos" cr ON cr.credito_id = s.credito_id AND cr.estado IN ('vigente', 'castigado')
+                LEFT JOIN (
+                    SELECT schedule_id, SUM(monto) AS monto FROM "core.pagos" GROUP BY schedule_id
+                ) p ON p.schedule_id = s.schedule_id
+                WHERE s.estado IN ({', '.join(f"'{estado}'" for estado in self.ESTADOS)})
+            ),
+            previo AS (
+                SELECT DISTINCT ON (schedule_id) schedule_id, credito_id, saldo_centavos, fecha_vencimiento, estado
+                FROM "{self.TABLE}"
+                WHERE fecha >= %(inicio)s AND fecha < %(fecha)s
+                ORDER BY schedule_id, fecha DESC
+            ),
+            cambios AS (
+                SELECT a.* FROM actual a
+                LEFT JOIN previo p ON p.schedule_id = a.schedule_id
+                WHERE (a.credito_id, a.saldo_centavos, a.fecha_vencimiento, a.estado)
+                      IS DISTINCT FROM (p.credito_id, p.saldo_centavos, p.fecha_vencimiento, p.estado)
+                UNION ALL
+                SELECT p.schedule_id, p.credito_id, 0, p.fecha_vencimiento, {self.CERRADA}::smallint FROM previo p
+                WHERE p.estado <> {self.CERRADA}
+                  AND NOT EXISTS (SELECT 1 FROM actual a WHERE a.schedule_id = p.schedule_id)
+            ),
+            escritas AS (
+                INSERT INTO "{self.TABLE}" (schedule_id, credito_id, saldo_centavos, fecha, fecha_vencimiento, estado)
+                SELECT schedule_id, credito_id, saldo_centavos, %(fecha)s, fecha_vencimiento, estado FROM cambios
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM actual), (SELECT COUNT(*) FROM escritas)
+        """
+
+    def _ensure_partition(self, cursor, inicio):
+        fin = (inicio + timedelta(days=32)).replace(day=1)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.TABLE}_{inicio:%Y_%m}" PARTITION OF "{self.TABLE}" '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [inicio, fin]
+        )
+
+    def purge(self, keep_months: int):
+        """Drop the monthly partitions (and runs) older than the last `keep_months` months"""
+        if keep_months < 1:
+            raise ValueError("At least one month must be kept")
+        limite = date.today().replace(day=1)
+        for _ in range(keep_months - 1):
+            limite = (limite - timedelta(days=1)).replace(day=1)
+        return sum(sharding.scatter(lambda alias: self._purge(alias, limite)))
+
+    def _purge(self, alias, limite):
+        sufijo = re.compile(r'_(\d{4})_(\d{2})$')
+        borradas = 0
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [f'"{self.TABLE}"']
+            )
+            for nombre, in cursor.fetchall():
+                match = sufijo.search(nombre)
+                if match and date(int(match.group(1)), int(match.group(2)), 1) < limite:
+                    cursor.execute(f'DROP TABLE "{nombre}"')
+                    borradas += 1
+            PortfolioSnapshotRun.objects.using(alias).filter(fecha__lt=limite).delete()
+        return borradas
+
+    def runs(self):
+        """Snapshot dates with the rows written and open installments over all shards"""
+        totals = {}
+        for runs in sharding.scatter(lambda alias: list(PortfolioSnapshotRun.objects.using(alias))):
+            for run in runs:
+                total = totals.setdefault(run.fecha, {
+                    'fecha': run.fecha, 'keyframe': False, 'filas': 0, 'cuotas_abiertas': 0
+                })
+                total['keyframe'] = total['keyframe'] or run.keyframe
+                total['filas'] += run.filas
+                total['cuotas_abiertas'] += run.cuotas_abiertas
+        return [totals[fecha] for fecha in sorted(totals)]
+
+    def _dates(self):
+        return sorted({run['fecha'] for run in self.runs()})
+
+    def _tramos_sql(self, sufijo=''):
+        """Credits open at %(fecha<sufijo>)s with their delinquency bucket, balance and open installments"""
+        fecha, inicio = f"%(fecha{sufijo})s", f"%(inicio{sufijo})s"
+        tramos = ' '.join(f"WHEN c.dias <= {hasta} THEN '{tramo}'" for tramo, hasta in self.TRAMOS if hasta is not None)
+        return f"""
+            SELECT c.credito_id, c.saldo_centavos, c.cuotas,
+                   CASE WHEN c.castigado THEN '{self.CASTIGADO}' {tramos} ELSE '{self.TRAMOS[-1][0]}' END AS tramo
+            FROM (
+                SELECT u.credito_id,
+                       bool_or(u.estado = {self.CASTIGADA}) AS castigado,
+                       MAX(CASE WHEN u.saldo_centavos > 0 AND u.fecha_vencimiento < {fecha}
+                                THEN {fecha}::date - u.fecha_vencimiento ELSE 0 END) AS dias,
+                       SUM(u.saldo_centavos) AS saldo_centavos,
+                       COUNT(*) AS cuotas
+                FROM (
+                    SELECT DISTINCT ON (schedule_id) credito_id, estado, saldo_centavos, fecha_vencimiento
+                    FROM "{self.TABLE}"
+                    WHERE fecha BETWEEN {inicio} AND {fecha}
+                    ORDER BY schedule_id, fecha DESC
+                ) u
+                WHERE u.estado <> {self.CERRADA}
+                GROUP BY u.credito_id
+            ) c
+        """
+
+    def _tramo_names(self):
+        return [tramo for tramo, _ in self.TRAMOS] + [self.CASTIGADO]
+
+    def _pesos(self, centavos):
+        return (Decimal(centavos or 0) / 100).quantize(Decimal('0.01'))
+
+    def roll_rate(self, mes: date, meses: int = 1):
+        """Bucket transition matrices of credits between consecutive month ends.
+
+        Each month compares the last snapshot up to the end of the previous
+        month with the last snapshot up to the end of `mes` (or today).
+        Rows are the origin bucket (nuevo for credits opened in between);
+        columns the destination (cancelado for credits no longer open).
+        """
+        if not 1 <= meses <= 24:
+            raise ValueError("meses must be between 1 and 24")
+        dates = self._dates()
+        matrices = []
+        inicio_mes = mes.replace(day=1)
+        for _ in range(meses):
+            fin_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            desde = max((d for d in dates if d < inicio_mes), default=None)
+            hasta = max((d for d in dates if inicio_mes <= d <= fin_mes), default=None)
+            matrices.append(self._matrix(inicio_mes, desde, hasta))
+            inicio_mes = (inicio_mes - timedelta(days=1)).replace(day=1)
+        return list(reversed(matrices))
+
+    def _matrix(self, mes, desde, hasta):
+        origenes = [self.NUEVO] + self._tramo_names()
+        destinos = self._tramo_names() + [self.CANCELADO]
+        result = {'mes': mes.strftime('%Y-%m'), 'desde': desde, 'hasta': hasta, 'origenes': origenes, 'destinos': destinos}
+        if desde is None or hasta is None:
+            result['filas'] = []
+            result['mensaje'] = 'Sin snapshots para el mes o el cierre del mes anterior'
+            return result
+
+        params = {'fecha0': desde, 'inicio0': desde.replace(day=1), 'fecha1': hasta, 'inicio1': hasta.replace(day=1)}
+        sql = f"""
+            WITH a AS ({self._tramos_sql('0')}), b AS ({self._tramos_sql('1')})
+            SELECT COALESCE(a.tramo, '{self.NUEVO}'), COALESCE(b.tramo, '{self.CANCELADO}'),
+                   COUNT(*), COALESCE(SUM(a.saldo_centavos), 0), COALESCE(SUM(b.saldo_centavos), 0)
+            FROM a FULL OUTER JOIN b ON b.credito_id = a.credito_id
+            GROUP BY 1, 2
+        """
+        celdas = {}
+        for rows in sharding.scatter(lambda alias: self._fetch(alias, sql, params)):
+            for origen, destino, creditos, saldo_origen, saldo_destino in rows:
+                celda = celdas.setdefault((origen, destino), [0, 0, 0])
+                celda[0] += creditos
+                celda[1] += saldo_origen
+                celda[2] += saldo_destino
+
+        filas = []
+        for origen in origenes:
+            total = sum(celdas.get((origen, destino), [0])[0] for destino in destinos)
+            hacia = []
+            for destino in destinos:
+                creditos, saldo_origen, saldo_destino = celdas.get((origen, destino), [0, 0, 0])
+                hacia.append({
+                    'tramo': destino,
+                    'creditos': creditos,
+                    'porcentaje': round(creditos / total * 100, 2) if total else 0,
+                    'saldo_origen': self._pesos(saldo_origen),
+                    'saldo_destino': self._pesos(saldo_destino),
+                })
+            filas.append({
+                'tramo': origen,
+                'creditos': total,
+                'saldo': self._pesos(sum(celdas.get((origen, destino), [0, 0])[1] for destino in destinos)),
+                'hacia': hacia,
+            })
+        result['filas'] = filas
+        return result
+
+    def _fetch(self, alias, sql, params):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def trend(self, desde: date, hasta: date, intervalo: str = 'dia'):
+        """Credits, open installments and balance per delinquency bucket at each snapshot of the range.
+
+        With semana or mes the last snapshot of each week or month is used.
+        indice_mora and par_30 are the shares of the balance (write-offs
+        excluded) in credits more than 0 and 30 days overdue.
+        """
+        if intervalo not in self.INTERVALS:
+            raise ValueError(f"Invalid interval: {intervalo}. Use one of {', '.join(self.INTERVALS)}")
+        periodos = {}
+        for fecha in self._dates():
+            if desde <= fecha <= hasta:
+                if intervalo == 'dia':
+                    clave = fecha
+                elif intervalo == 'semana':
+                    clave = fecha.isocalendar()[:2]
+                else:
+                    clave = (fecha.year, fecha.month)
+                periodos[clave] = max(periodos.get(clave, fecha), fecha)
+        fechas = sorted(periodos.values())
+        if len(fechas) > self.MAX_POINTS:
+            raise ValueError(f"Too many points ({len(fechas)}); use a shorter range or a longer interval")
+
+        sql = f"""
+            SELECT t.tramo, COUNT(*), SUM(t.cuotas)::bigint, SUM(t.saldo_centavos)
+            FROM ({self._tramos_sql()}) t
+            GROUP BY t.tramo
+        """
+
+        def shard_points(alias):
+            return [
+                self._fetch(alias, sql, {'fecha': fecha, 'inicio': fecha.replace(day=1)})
+                for fecha in fechas
+            ]
+
+        por_shard = sharding.scatter(shard_points)
+        serie = []
+        for position, fecha in enumerate(fechas):
+            tramos = {tramo: {'creditos': 0, 'cuotas': 0, 'saldo_centavos': 0} for tramo in self._tramo_names()}
+            for points in por_shard:
+                for tramo, creditos, cuotas, saldo in points[position]:
+                    tramos[tramo]['creditos'] += creditos
+                    tramos[tramo]['cuotas'] += cuotas
+                    tramos[tramo]['saldo_centavos'] += saldo
+            serie.append(self._point(fecha, tramos))
+        return {'desde': desde, 'hasta': hasta, 'intervalo': intervalo, 'tramos': self._tramo_names(), 'serie': serie}
+
+    def _point(self, fecha, tramos):
+        vigente = sum(values['saldo_centavos'] for tramo, values in tramos.items() if tramo != self.CASTIGADO)
+        en_mora = sum(
+            values['saldo_centavos'] for tramo, values in tramos.items()
+            if tramo not in (self.CASTIGADO, self.TRAMOS[0][0])
+        )
+        par_30 = sum(tramos[tramo]['saldo_centavos'] for tramo, hasta in self.TRAMOS if hasta is None or hasta > 30)
+        return {
+            'fecha': fecha,
+            'creditos': sum(values['creditos'] for values in tramos.values()),
+            'saldo': self._pesos(sum(values['saldo_centavos'] for values in tramos.values())),
+            'indice_mora': round(en_mora / vigente * 100, 2) if vigente else 0,
+            'par_30': round(par_30 / vigente * 100, 2) if vigente else 0,
+            'tramos': {
+                tramo: {
+                    'creditos': values['creditos'],
+                    'cuotas': values['cuotas'],
+                    'saldo': self._pesos(values['saldo_centavos']),
+                }
+                for tramo, values in tramos.items()
+            },
+        }
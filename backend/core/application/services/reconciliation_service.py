@@ -0,0 +1,206 @@
+import csv
+import os
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.db import connections, transaction
+from psycopg2.extras import execute_values
+from ...infrastructure import sharding
+from ...infrastructure.imports.reconciliation import (
+    ReconciliationIndex, UnmatchedRow, parse_amount, parse_payment_datetime
+)
+
+REQUIRED_COLUMNS = ['referencia', 'tipo_doc', 'num_doc', 'monto', 'fecha_pago']
+
+
+class ReconciliationService:
+    """Apply link, transfer and card settlement files to open installments.
+
+    Rows are streamed from the file and matched against an in-memory index
+    (see ReconciliationIndex); matched payments are inserted in batches and
+    everything else is written to an exceptions report.
+    """
+
+    MEDIOS = ['link', 'transfer', 'card']
+    BATCH_ROWS = 5000
+    EXCEPTION_COLUMNS = [
+        'linea', 'referencia', 'motivo', 'detalle',
+        'tipo_doc', 'num_doc', 'credito_id', 'monto', 'fecha_pago', 'medio'
+    ]
+
+    def reconcile_file(self, path: str, medio: str = None, batch_rows: int = None,
+                       exceptions_path: str = None, progress=None):
+        """Reconcile a settlement CSV; returns the totals and the exceptions report path"""
+        if medio is not None and medio not in self.MEDIOS:
+            raise ValueError(f"Invalid payment method: {medio}. Use one of {', '.join(self.MEDIOS)}")
+        batch_rows = batch_rows or self.BATCH_ROWS
+        exceptions_path = exceptions_path or f"{path}.excepciones.csv"
+
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            reader = csv.DictReader(source)
+            columns = [name.strip().lower() for name in reader.fieldnames or []]
+            missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+            if medio is None and 'medio' not in columns:
+                missing.append('medio')
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+            reader.fieldnames = columns
+
+            index = ReconciliationIndex(self.MEDIOS)
+            if progress:
+                progress(None, f"{len(index)} cuotas abiertas en el índice")
+
+            totals = {'filas': 0, 'conciliados': 0, 'monto_conciliado': 0, 'excepciones': 0}
+            motivos = {}
+            with open(exceptions_path, 'w', newline='', encoding='utf-8') as output:
+                exceptions = csv.writer(output)
+                exceptions.writerow(self.EXCEPTION_COLUMNS)
+
+                def reject(line, row, motivo, detalle):
+                    totals['excepciones'] += 1
+                    motivos[motivo] = motivos.get(motivo, 0) + 1
+                    exceptions.writerow(
+                        [line, row.get('referencia'), motivo, detalle]
+                        + [row.get(name) for name in self.EXCEPTION_COLUMNS[4:]]
+                    )
+
+                batch = []
+                for row in reader:
+                    totals['filas'] += 1
+                    try:
+                        batch.append((reader.line_num, row, self._match(index, row, medio)))
+                    except UnmatchedRow as e:
+                        reject(reader.line_num, row, e.motivo, e.detalle)
+                    if len(batch) >= batch_rows:
+                        self._insert(batch, totals, reject)
+                        batch = []
+                        if progress:
+                            progress(None, f"{totals['filas']} filas, {totals['conciliados']} pagos conciliados")
+                if batch:
+                    self._insert(batch, totals, reject)
+
+        if not totals['excepciones']:
+            os.remove(exceptions_path)
+        totals['monto_conciliado'] = float(totals['monto_conciliado'])
+        totals['motivos'] = motivos
+        totals['reporte'] = exceptions_path if totals['excepciones'] else None
+        return totals
+
+    def _insert_shard(self, alias, payments):
+        """Insert the payments of one shard.
+
+        Returns the (medio, referencia) of the inserted payments and the
+        current balance of the rows left out because their installment no
+        longer owes exactly their amount.
+        """
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            # El índice leyó los saldos al empezar: un pago registrado después
+            # (POST /api/pagos/) cambia el saldo. Con las cuotas bloqueadas, cada
+            # fila entra solo si aún cubre el saldo exacto de su cuota.
+            cursor.execute(
+                """
+                SELECT s.schedule_id, s.valor_cuota - COALESCE(
+                    (SELECT SUM(p.monto) FROM "core.pagos" p WHERE p.schedule_id = s.schedule_id), 0
+                )
+                FROM "core.payment_schedule" s
+                WHERE s.schedule_id = ANY(%s)
+                ORDER BY s.schedule_id
+                FOR UPDATE OF s
+                """,
+                [[payment[0] for payment in payments]]
+            )
+            balances = dict(cursor.fetchall())
+            changed = {
+                (payment[4], payment[5]): balances.get(payment[0])
+                for payment in payments if balances.get(payment[0]) != payment[3]
+            }
+            payments = [payment for payment in payments if (payment[4], payment[5]) not in changed]
+            if not payments:
+                return set(), changed
+            inserted = self._insert_payments(cursor, payments)
+            # Cada pago cubre el saldo exacto de su cuota
+            paid = [payment[0] for payment in payments if (payment[4], payment[5]) in inserted]
+            cursor.execute(
+                """
+                UPDATE "core.payment_schedule" SET estado = 'pagada'
+                WHERE schedule_id = ANY(%s) AND estado <> 'pagada'
+                """,
+                [paid]
+            )
+        return inserted, changed
+
+    def _insert_payments(self, cursor, payments):
+        if sharding.enabled():
+            # Id de la secuencia del shard en el bucket de la cuota
+            columns = 'pago_id, '
+            template = f"(nextval('{sharding.ID_SEQUENCE}') * {settings.SHARD_BUCKETS} + %s, "
+            rows = [(sharding.bucket_of(payment[0]),) + payment for payment in payments]
+        else:
+            columns, template, rows = '', '(', payments
+        inserted = execute_values(
+            cursor.cursor,
+            f"""
+            INSERT INTO "core.pagos" ({columns}schedule_id, credito_id, fecha_pago, monto, medio, referencia, updated_at)
+            VALUES %s
+            ON CONFLICT (medio, referencia) WHERE referencia IS NOT NULL DO NOTHING
+            RETURNING medio, referencia
+            """,
+            rows,
+            template=f"{template}%s, %s, %s, %s, %s, %s, now())",
+            page_size=len(rows),
+            fetch=True
+        )
+        return set(inserted)
+
+    def store_upload(self, upload):
+        """Write an uploaded settlement file to IMPORTS_DIR in chunks"""
+        os.makedirs(settings.IMPORTS_DIR, exist_ok=True)
+        path = os.path.join(settings.IMPORTS_DIR, f"conciliacion_{uuid.uuid4().hex}.csv")
+        with open(path, 'wb') as output:
+            for chunk in upload.chunks():
+                output.write(chunk)
+        return path
+
+    def _match(self, index, row, medio):
+        row_medio = (row.get('medio') or '').strip() or medio
+        if row_medio not in self.MEDIOS:
+            raise UnmatchedRow('invalida', f"medio no conciliable: {row_medio!r}")
+        referencia = (row.get('referencia') or '').strip()
+        if not referencia:
+            raise UnmatchedRow('invalida', 'referencia requerida')
+        credito_id = (row.get('credito_id') or '').strip()
+        if credito_id and not credito_id.isdigit():
+            raise UnmatchedRow('invalida', f"credito_id inválido: {credito_id!r}")
+
+        monto = parse_amount(row.get('monto'))
+        fecha_pago = parse_payment_datetime(row.get('fecha_pago'))
+        schedule_id, credito_id = index.match(
+            row_medio, referencia,
+            (row.get('tipo_doc') or '').strip().upper(),
+            (row.get('num_doc') or '').strip(),
+            monto,
+            int(credito_id) if credito_id else None
+        )
+        return (schedule_id, credito_id, fecha_pago, monto, row_medio, referencia)
+
+    def _insert(self, batch, totals, reject):
+        """Insert one batch of matched payments and mark their installments as paid"""
+        groups = defaultdict(list)
+        for item in batch:
+            groups[sharding.shard_for_id(item[2][0], write=True)].append(item)
+        inserted, changed = set(), {}
+        for alias, group in groups.items():
+            shard_inserted, shard_changed = self._insert_shard(alias, [payment for _, _, payment in group])
+            inserted.update(shard_inserted)
+            changed.update(shard_changed)
+
+        for line, row, payment in batch:
+            key = (payment[4], payment[5])
+            if key in inserted:
+                totals['conciliados'] += 1
+                totals['monto_conciliado'] += payment[3]
+            elif key in changed:
+                reject(line, row, 'saldo_cambiado', f"la cuota {payment[0]} ahora debe {changed[key]}")
+            else:
+                # Registrada por otra carga entre la lectura del índice y este lote
+                reject(line, row, 'duplicado', f"referencia {payment[5]} ya registrada")
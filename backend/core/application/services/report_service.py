@@ -0,0 +1,207 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from ...domain.entities import Job, SyncTombstone
+from ...infrastructure import sharding
+from ...infrastructure.db import get_snapshot_xmin
+from ...infrastructure.reports.definitions import get_report
+from ...infrastructure.reports.pool import render_part, setup_worker
+from ...infrastructure.reports.renderers import WRITERS
+from .job_service import JobService
+
+
+class ReportService:
+    """Excel/PDF reports rendered in a process pool and cached on disk.
+
+    A report is cached under the hash of its type, format, filters and the
+    change-tracking position of the tables it reads, so a repeated request
+    for unchanged data is served from disk without rendering anything.
+    Every hit refreshes the file's mtime and files are evicted least recently
+    used first, past REPORTS_MAX_AGE_HOURS or beyond REPORTS_MAX_BYTES.
+    """
+
+    FORMATS = list(WRITERS)
+    UNITS_PER_PART = {'credito': 2000, 'cliente': 200}
+
+    def cache_key(self, tipo: str, formato: str, filtros=None):
+        report = get_report(tipo)
+        if formato not in self.FORMATS:
+            raise ValueError(f"Invalid format: {formato}. Use one of {', '.join(self.FORMATS)}")
+        payload = {
+            'reporte': tipo,
+            'formato': formato,
+            'filtros': {k: str(v) for k, v in (filtros or {}).items() if v not in (None, '')},
+            'version': self._data_version(report.models),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def find(self, clave: str):
+        """Cached file of a key, or None"""
+        if not clave.isalnum():
+            return None
+        for path in glob.glob(os.path.join(self._cache_dir(clave), f"{clave}.*")):
+            if path.endswith('.tmp'):
+                continue
+            try:
+                # La fecha de modificación marca el último uso para la poda
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path
+        return None
+
+    def request_report(self, tipo: str, formato: str, filtros=None, prioridad: int = 0):
+        """Return the cached report if unchanged, otherwise queue (or reuse) a job for it"""
+        filtros = {k: v for k, v in (filtros or {}).items() if v not in (None, '')}
+        clave = self.cache_key(tipo, formato, filtros)
+        if self.find(clave):
+            return {'estado': 'listo', 'clave': clave, 'job': None}
+
+        job = Job.objects.filter(
+            tipo='generar_reporte', estado__in=['pendiente', 'en_proceso'], params__clave=clave
+        ).first()
+        if job is None:
+            job = JobService().enqueue(
+                'generar_reporte',
+                {'tipo': tipo, 'formato': formato, 'filtros': filtros, 'clave': clave},
+                prioridad=prioridad
+            )
+        return {'estado': 'en_cola', 'clave': clave, 'job': job}
+
+    def generate(self, tipo: str, formato: str, filtros, clave: str, progress=None, processes: int = None):
+        """Render the report by unit ranges in parallel and store it under `clave`"""
+        cached = self.find(clave)
+        if cached:
+            return cached
+
+        report = get_report(tipo)
+        ids = report.unit_ids(filtros)
+        size = self.UNITS_PER_PART[report.unit]
+        chunks = [ids[start:start + size] for start in range(0, len(ids), size)] or [[]]
+        processes = processes or settings.REPORTS_PROCESSES
+
+        os.makedirs(settings.REPORTS_DIR, exist_ok=True)
+        workdir = tempfile.mkdtemp(prefix=f"{clave[:12]}_", dir=settings.REPORTS_DIR)
+        try:
+            parts = []
+            if len(chunks) == 1 or processes <= 1:
+                for part, chunk in enumerate(chunks):
+                    parts.extend(render_part(tipo, formato, filtros, chunk, workdir, part))
+                    self._report_progress(progress, part + 1, len(chunks))
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=min(processes, len(chunks)),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=setup_worker
+                ) as pool:
+                    futures = [
+                        pool.submit(render_part, tipo, formato, filtros, chunk, workdir, part)
+                        for part, chunk in enumerate(chunks)
+                    ]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        parts.extend(future.result())
+                        self._report_progress(progress, done, len(chunks))
+            final = self._store(sorted(parts), clave, tipo, formato)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        self.prune()
+        return final
+
+    def prune(self, max_age_hours: float = None, max_bytes: int = None):
+        """Evict cached reports unused for max_age_hours, then the least recently used beyond max_bytes"""
+        max_age_hours = settings.REPORTS_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+        max_bytes = settings.REPORTS_MAX_BYTES if max_bytes is None else max_bytes
+        if max_age_hours < 0 or max_bytes < 0:
+            raise ValueError("max_age_hours and max_bytes must be zero or positive")
+        if not os.path.isdir(settings.REPORTS_DIR):
+            return {'archivos': 0, 'bytes': 0}
+        now = time.time()
+        oldest = now - max_age_hours * 3600
+        # Restos de renders (directorio de trabajo, .tmp) solo cuando su trabajo ya perdió el arriendo
+        abandoned = min(oldest, now - settings.JOBS_LEASE_SECONDS)
+        removed, freed, kept = 0, 0, []
+        for entry in os.scandir(settings.REPORTS_DIR):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if len(entry.name) != 2:
+                if entry.stat().st_mtime < abandoned:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            for report in os.scandir(entry.path):
+                try:
+                    stat = report.stat()
+                except FileNotFoundError:
+                    continue
+                if report.name.endswith('.tmp'):
+                    if stat.st_mtime < abandoned:
+                        removed, freed = removed + self._remove(report.path), freed + stat.st_size
+                elif stat.st_mtime < oldest:
+                    removed, freed = removed + self._remove(report.path), freed + stat.st_size
+                else:
+                    kept.append((stat.st_mtime, stat.st_size, report.path))
+        total = sum(size for _, size, _ in kept)
+        # El más reciente (el reporte recién generado) se queda aunque solo él pase el tope
+        for _, size, path in sorted(kept)[:-1]:
+            if total <= max_bytes:
+                break
+            removed, freed, total = removed + self._remove(path), freed + size, total - size
+        return {'archivos': removed, 'bytes': freed}
+
+    def _store(self, parts, clave, tipo, formato):
+        os.makedirs(self._cache_dir(clave), exist_ok=True)
+        extension = formato if len(parts) == 1 else 'zip'
+        final = os.path.join(self._cache_dir(clave), f"{clave}.{extension}")
+        temporary = f"{final}.tmp"
+        if len(parts) == 1:
+            shutil.move(parts[0], temporary)
+        else:
+            # xlsx y pdf ya vienen comprimidos: el zip solo los agrupa
+            with zipfile.ZipFile(temporary, 'w', zipfile.ZIP_STORED) as bundle:
+                for path in parts:
+                    bundle.write(path, f"{tipo}/{os.path.basename(path)}")
+        os.replace(temporary, final)
+        return final
+
+    def _data_version(self, models):
+        # Última fila confirmada por tabla (cursor de sincronización) y último borrado, por shard
+        return sharding.scatter(lambda alias: self._shard_version(alias, models))
+
+    def _shard_version(self, alias, models):
+        horizon = get_snapshot_xmin(alias)
+        version = []
+        for model in models:
+            version.append(
+                model._base_manager.db_manager(alias).filter(change_xid__lt=horizon)
+                .order_by('-change_xid', '-change_seq')
+                .values_list('change_xid', 'change_seq')
+                .first()
+            )
+        version.append(
+            SyncTombstone.objects.using(alias).filter(change_xid__lt=horizon)
+            .order_by('-change_xid', '-change_seq')
+            .values_list('change_xid', 'change_seq')
+            .first()
+        )
+        return version
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return 1
+
+    def _cache_dir(self, clave):
+        return os.path.join(settings.REPORTS_DIR, clave[:2])
+
+    def _report_progress(self, progress, done, total):
+        if progress:
+            progress(done / total * 100, f"{done} de {total} partes")
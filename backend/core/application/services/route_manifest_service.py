@@ -0,0 +1,154 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Q
+from django.utils import timezone
+from ...domain.entities import Client, Credit, PaymentSchedule
+from ...infrastructure import sharding
+
+
+class RouteManifestService:
+    """Builds a rider's offline route bundle in a fixed number of queries per shard"""
+
+    MAX_CLIENTS = 500
+    OPEN_STATES = ['pendiente', 'parcial', 'vencida']
+    # Installments are sent as rows; the column order is declared once per bundle
+    INSTALLMENT_COLUMNS = [
+        'schedule_id', 'num_cuota', 'fecha_vencimiento', 'valor_cuota',
+        'monto_pagado', 'saldo_pendiente', 'estado', 'dias_mora'
+    ]
+
+    def build_manifest(self, doc_type: str = 'CC', doc_numbers=None, client_ids=None):
+        """Get identity, active credits, open installments and status for each client"""
+        doc_numbers = [str(d) for d in self._as_list(doc_numbers, 'num_docs') if d]
+        client_ids = [int(c) for c in self._as_list(client_ids, 'cliente_ids')]
+        if not doc_numbers and not client_ids:
+            raise ValueError("At least one document number or client ID is required")
+        if len(doc_numbers) + len(client_ids) > self.MAX_CLIENTS:
+            raise ValueError(f"A route can have at most {self.MAX_CLIENTS} clients")
+
+        # Each client is read on its shard, with its credits and installments
+        docs_by_shard = defaultdict(list)
+        for doc_number in doc_numbers:
+            docs_by_shard[sharding.shard_for_document(doc_type, doc_number)].append(doc_number)
+        ids_by_shard = defaultdict(list)
+        for client_id in client_ids:
+            ids_by_shard[sharding.shard_for_id(client_id)].append(client_id)
+        parts = sharding.scatter(
+            lambda alias: self._load(alias, doc_type, docs_by_shard[alias], ids_by_shard[alias]),
+            aliases=sorted(set(docs_by_shard) | set(ids_by_shard))
+        )
+        clients = sorted((client for part in parts for client in part[0]), key=lambda client: client.cliente_id)
+        ids = [c.cliente_id for c in clients]
+        credits_by_client = defaultdict(list)
+        installments_by_credit = defaultdict(list)
+        for _, part_credits, part_installments in parts:
+            credits_by_client.update(part_credits)
+            installments_by_credit.update(part_installments)
+
+        today = timezone.now().date()
+        found_docs = {c.num_doc for c in clients}
+        found_ids = set(ids)
+        return {
+            'generado': timezone.now(),
+            'columnas_cuota': self.INSTALLMENT_COLUMNS,
+            'clientes': [
+                self._client_entry(client, credits_by_client[client.cliente_id], installments_by_credit, today)
+                for client in clients
+            ],
+            'no_encontrados': {
+                'num_docs': [d for d in doc_numbers if d not in found_docs],
+                'cliente_ids': [c for c in client_ids if c not in found_ids],
+            }
+        }
+
+    def _as_list(self, values, name):
+        """A list as is; a single document or id as a list of one (a string is not iterated char by char)"""
+        if values is None:
+            return []
+        if isinstance(values, (str, int)):
+            return [values]
+        if not isinstance(values, (list, tuple)):
+            raise ValueError(f"{name} must be a list")
+        return values
+
+    def _load(self, alias, doc_type, doc_numbers, client_ids):
+        """Clients of one shard with their active credits and open installments, in three queries"""
+        # Query 1: clients
+        clients = list(
+            Client.objects.on_shard(alias).filter(
+                self._client_filter(doc_type, doc_numbers, client_ids)
+            ).order_by('cliente_id')
+        )
+        ids = [c.cliente_id for c in clients]
+
+        # Query 2: active credits
+        credits_by_client = defaultdict(list)
+        credits = Credit.objects.on_shard(alias).select_related(None).filter(
+            cliente_id__in=ids, estado='vigente'
+        ).order_by('credito_id')
+        for credit in credits:
+            credits_by_client[credit.cliente_id].append(credit)
+
+        # Query 3: open installments with paid amount aggregated in SQL
+        installments_by_credit = defaultdict(list)
+        schedules = PaymentSchedule.objects.on_shard(alias).with_balance().select_related(
+            None
+        ).prefetch_related(None).filter(
+            credito__cliente_id__in=ids,
+            credito__estado='vigente',
+            estado__in=self.OPEN_STATES
+        ).order_by('credito_id', 'num_cuota')
+        for schedule in schedules:
+            installments_by_credit[schedule.credito_id].append(schedule)
+        return clients, credits_by_client, installments_by_credit
+
+    def _client_filter(self, doc_type, doc_numbers, client_ids):
+        condition = Q(pk__in=[])
+        if doc_numbers:
+            condition |= Q(tipo_doc=doc_type, num_doc__in=doc_numbers)
+        if client_ids:
+            condition |= Q(cliente_id__in=client_ids)
+        return condition
+
+    def _client_entry(self, client, credits, installments_by_credit, today):
+        entry_credits = []
+        max_days_overdue = 0
+        pending_total = Decimal('0.00')
+        next_due = None
+
+        for credit in credits:
+            rows = []
+            for schedule in installments_by_credit[credit.credito_id]:
+                pending = schedule.pending_balance
+                days_overdue = (
+                    (today - schedule.fecha_vencimiento).days
+                    if schedule.fecha_vencimiento < today and pending > 0 else 0
+                )
+                max_days_overdue = max(max_days_overdue, days_overdue)
+                pending_total += pending
+                if schedule.fecha_vencimiento >= today and (next_due is None or schedule.fecha_vencimiento < next_due):
+                    next_due = schedule.fecha_vencimiento
+                rows.append([
+                    schedule.schedule_id, schedule.num_cuota, schedule.fecha_vencimiento,
+                    float(schedule.valor_cuota), float(schedule.amount_paid), float(pending),
+                    schedule.estado, days_overdue
+                ])
+            entry_credits.append({
+                'credito_id': credit.credito_id,
+                'producto': credit.producto,
+                'cuotas_totales': credit.cuotas_totales,
+                'cuotas': rows
+            })
+
+        return {
+            'cliente_id': client.cliente_id,
+            'tipo_doc': client.tipo_doc,
+            'num_doc': client.num_doc,
+            'nombre': client.nombre,
+            'ciudad': client.ciudad,
+            'estado_general': 'en_mora' if max_days_overdue > 0 else 'al_dia',
+            'dias_mora': max_days_overdue,
+            'saldo_pendiente': float(pending_total),
+            'proximo_vencimiento': next_due,
+            'creditos': entry_credits
+        }
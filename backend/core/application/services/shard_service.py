@@ -0,0 +1,409 @@
+import tempfile
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.functions import Mod
+from psycopg2.extras import execute_values
+from ...domain.entities import (
+    Client, ClientFeatures, Credit, CreditLedgerEntry, CreditLedgerSnapshot, Payment, PaymentSchedule,
+    ShardBucket
+)
+from ...infrastructure import sharding
+from ...infrastructure.db import skip_triggers
+
+
+class ShardService:
+    """Shard setup and rebalancing of client buckets between shards.
+
+    A bucket is moved in four steps: it is marked 'moviendo' (writes to it
+    are rejected) and every process is given SHARD_MAP_TTL to notice; its
+    rows are copied to the target with COPY in one transaction; the
+    directory is switched to the target; and after another TTL, so that no
+    process still reads the source, the source rows are deleted.
+
+    Rows are copied and deleted with the triggers skipped (skip_triggers):
+    the moved credits do not get new ledger entries, and the collection
+    rollups and outbox events stay on the source, where the portfolio-wide
+    sums still count them once. Ledger snapshots are not
+    copied; update_credit_ledger rebuilds them on the target. Copied rows
+    get a new sync stamp of the target, whose transaction ids are unrelated
+    to the source's.
+
+    distribute_default moves the data of a database that predates sharding
+    from the default database into the shards, with new ids.
+    """
+
+    COPY_BUFFER_BYTES = 64 * 1024 * 1024
+    DISTRIBUTE_BATCH_CLIENTS = 1000
+    # Columnas de ids shardeados que distribute_default traduce
+    ID_COLUMNS = ('cliente_id', 'credito_id', 'schedule_id', 'pago_id')
+
+    def init_shards(self, migrate=True, progress=None):
+        """Migrate every shard, set up its id sequence and fill the bucket directory"""
+        if not sharding.enabled():
+            raise ValueError("Sharding is disabled: set DB_SHARDS")
+        slots = {}
+        for alias in [DEFAULT_DB_ALIAS] + [alias for alias in settings.SHARDS if alias != DEFAULT_DB_ALIAS]:
+            if migrate:
+                call_command('migrate', database=alias, verbosity=0)
+            if alias in settings.SHARDS:
+                slots[alias] = sharding.setup_shard(alias)
+            if progress:
+                progress(alias, slots.get(alias))
+        ShardBucket.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            [
+                ShardBucket(bucket=bucket, shard=sharding.default_shard(bucket))
+                for bucket in range(settings.SHARD_BUCKETS)
+            ],
+            ignore_conflicts=True
+        )
+        sharding.shard_map.refresh()
+        return slots
+
+    def distribution(self):
+        """Buckets per shard"""
+        counts = {alias: 0 for alias in sharding.shards()}
+        for shard in sharding.shard_map.assignment().values():
+            counts[shard] = counts.get(shard, 0) + 1
+        return counts
+
+    def plan_balance(self, max_buckets=None):
+        """(bucket, source, target) moves that leave every shard with the same number of buckets"""
+        sharding.shard_map.refresh()
+        assignment = sharding.shard_map.assignment()
+        owned = {alias: [] for alias in settings.SHARDS}
+        for bucket, shard in assignment.items():
+            owned.setdefault(shard, []).append(bucket)
+        # Cuota de cada shard: floor o ceil del promedio; los más cargados se quedan con el ceil
+        base, extra = divmod(settings.SHARD_BUCKETS, len(settings.SHARDS))
+        order = sorted(settings.SHARDS, key=lambda alias: len(owned[alias]), reverse=True)
+        quota = {alias: base + (1 if position < extra else 0) for position, alias in enumerate(order)}
+        # Shards fuera de SHARDS (retirados) entregan todos sus buckets
+        surplus = []
+        for alias, buckets in owned.items():
+            excess = len(buckets) - quota.get(alias, 0)
+            surplus += [(bucket, alias) for bucket in sorted(buckets, reverse=True)[:max(excess, 0)]]
+        moves = []
+        for target in settings.SHARDS:
+            missing = quota[target] - len(owned[target])
+            while missing > 0 and surplus:
+                bucket, source = surplus.pop(0)
+                moves.append((bucket, source, target))
+                missing -= 1
+        return moves[:max_buckets] if max_buckets else moves
+
+    def clients_in_bucket(self, bucket):
+        shard = sharding.shard_map.shard(bucket)
+        return Client.objects.on_shard(shard).annotate(
+            bucket=Mod('cliente_id', settings.SHARD_BUCKETS)
+        ).filter(bucket=bucket).count()
+
+    def move_bucket(self, bucket, target, wait=None, progress=None):
+        """Move every row of a bucket to `target`; returns rows copied per table"""
+        if target not in settings.SHARDS:
+            raise ValueError(f"Unknown shard: {target}. Available: {', '.join(settings.SHARDS)}")
+        if not 0 <= bucket < settings.SHARD_BUCKETS:
+            raise ValueError(f"Invalid bucket: {bucket}")
+        wait = settings.SHARD_MAP_TTL + 1 if wait is None else wait
+        sharding.shard_map.refresh()
+        source = sharding.shard_map.shard(bucket)
+        if source == target:
+            return {}
+
+        ShardBucket.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+            bucket=bucket, defaults={'shard': source, 'estado': ShardBucket.MOVING}
+        )
+        time.sleep(wait)
+        try:
+            copied = self._copy(bucket, source, target, progress)
+        except Exception:
+            ShardBucket.objects.using(DEFAULT_DB_ALIAS).filter(bucket=bucket).update(estado=ShardBucket.ACTIVE)
+            raise
+        ShardBucket.objects.using(DEFAULT_DB_ALIAS).filter(bucket=bucket).update(
+            shard=target, estado=ShardBucket.ACTIVE
+        )
+        sharding.shard_map.refresh()
+        time.sleep(wait)
+        with transaction.atomic(using=source), connections[source].cursor() as cursor:
+            skip_triggers(cursor)
+            self._delete(cursor, self._bucket_filter(bucket))
+        return copied
+
+    def distribute_default(self, batch_size=None, progress=None):
+        """Move the clients still on the default database, with everything they own, to their shards.
+
+        For a database that held the data before sharding was enabled: its
+        ids are plain serials that route nowhere, so every client is given a
+        new id in its document's bucket, drawn from the target shard, and its
+        credits, installments, payments, archived rows, ledger and features
+        follow with ids in the same bucket. Clients are moved in batches;
+        each batch is committed on the shards and then deleted from default,
+        and a batch interrupted between both is copied again on the next run.
+        Run it with the application stopped. Returns clients moved per shard.
+        """
+        if not sharding.enabled():
+            raise ValueError("Sharding is disabled: set DB_SHARDS")
+        if DEFAULT_DB_ALIAS in settings.SHARDS:
+            raise ValueError("The default database is a shard: its rows cannot be redistributed")
+        if ShardBucket.objects.using(DEFAULT_DB_ALIAS).count() < settings.SHARD_BUCKETS:
+            raise ValueError("The bucket directory is not filled: run init_shards first")
+        batch_size = batch_size or self.DISTRIBUTE_BATCH_CLIENTS
+        sharding.shard_map.refresh()
+
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                f'SELECT min(fecha_pago)::date, max(fecha_pago)::date FROM "{Payment._meta.db_table}_todos"'
+            )
+            desde, hasta = cursor.fetchone()
+        moved = defaultdict(int)
+        while True:
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.execute(
+                    f'SELECT cliente_id, tipo_doc, num_doc, created_at FROM "{Client._meta.db_table}" '
+                    f'ORDER BY cliente_id LIMIT %s',
+                    [batch_size]
+                )
+                clients = cursor.fetchall()
+            if not clients:
+                break
+            for alias, count in self._distribute_batch(clients).items():
+                moved[alias] += count
+            if progress:
+                progress(dict(moved))
+
+        # El recaudo de los clientes movidos se recalcula en sus shards
+        if desde is not None:
+            from .collection_rollup_service import CollectionRollupService
+            CollectionRollupService().rebuild(desde, hasta)
+        return dict(moved)
+
+    def _distribute_batch(self, clients):
+        """Copy a batch of default clients to their shards with new ids, then delete them from default"""
+        targets = {}
+        for cliente_id, tipo_doc, num_doc, _ in clients:
+            bucket = sharding.bucket_for_document(tipo_doc, num_doc)
+            targets[cliente_id] = (sharding.shard_map.writable_shard(bucket), bucket)
+        client_filter = f"cliente_id IN ({', '.join(str(cliente_id) for cliente_id in targets)})"
+        _, credit_filter, schedule_filter = self._filters(client_filter)
+        _, archived_credit_filter, archived_schedule_filter = self._filters(client_filter, archive=True)
+
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), connections[DEFAULT_DB_ALIAS].cursor() as read:
+            # Cada hijo va al shard y bucket de su padre
+            credits = self._children(read, Credit, 'credito_id', 'cliente_id', client_filter)
+            schedules = self._children(read, PaymentSchedule, 'schedule_id', 'credito_id', credit_filter,
+                                       archived_credit_filter)
+            payments = self._children(read, Payment, 'pago_id', 'schedule_id', schedule_filter,
+                                      archived_schedule_filter)
+            maps = {'cliente_id': self._new_ids(targets)}
+            maps['credito_id'] = self._new_ids({old: maps['cliente_id'][parent][1:] for old, parent in credits})
+            maps['schedule_id'] = self._new_ids({old: maps['credito_id'][parent][1:] for old, parent in schedules})
+            maps['pago_id'] = self._new_ids({old: maps['schedule_id'][parent][1:] for old, parent in payments})
+            for column, mapping in maps.items():
+                read.execute(
+                    f"CREATE TEMP TABLE shard_map_{column} (old bigint PRIMARY KEY, new bigint NOT NULL, "
+                    f"shard varchar(100) NOT NULL) ON COMMIT DROP"
+                )
+                if mapping:
+                    execute_values(
+                        read.cursor, f"INSERT INTO shard_map_{column} (old, new, shard) VALUES %s",
+                        [(old, new, alias) for old, (new, alias, _) in mapping.items()], page_size=10000
+                    )
+
+            moved = defaultdict(int)
+            for alias in sorted({alias for alias, _ in targets.values()}):
+                with transaction.atomic(using=alias), connections[alias].cursor() as write:
+                    skip_triggers(write)
+                    leftovers = self._leftovers(write, alias, clients)
+                    if leftovers:
+                        self._delete(write, f"cliente_id IN ({', '.join(str(row) for row in leftovers)})")
+                    for table, columns, key in self._distributed_tables():
+                        self._stream(read, write, self._rekeyed_select(table, columns, key, alias), table,
+                                     ', '.join(f'"{column}"' for column in columns))
+                    new_clients = [new for new, shard, _ in maps['cliente_id'].values() if shard == alias]
+                    self._restamp(write, self._filters(
+                        f"cliente_id IN ({', '.join(str(new) for new in new_clients)})"
+                    ))
+                    moved[alias] = len(new_clients)
+
+            skip_triggers(read)
+            self._delete(read, client_filter)
+        return moved
+
+    def _leftovers(self, cursor, alias, clients):
+        """Ids on `alias` of batch clients copied by a run interrupted before deleting them from default.
+
+        A copy keeps created_at; a client with the same document and another
+        created_at was registered on the shard and conflicts with default.
+        """
+        created = {(tipo_doc, num_doc): created_at for _, tipo_doc, num_doc, created_at in clients}
+        cursor.execute(
+            f'SELECT cliente_id, tipo_doc, num_doc, created_at FROM "{Client._meta.db_table}" '
+            f'WHERE (tipo_doc, num_doc) IN %s',
+            [tuple(created)]
+        )
+        leftovers = []
+        for cliente_id, tipo_doc, num_doc, created_at in cursor.fetchall():
+            if created[(tipo_doc, num_doc)] != created_at:
+                raise ValueError(f"Client {tipo_doc} {num_doc} exists both in default and in shard {alias}")
+            leftovers.append(cliente_id)
+        return leftovers
+
+    def _children(self, cursor, model, key, parent, where, archived_where=None):
+        """(id, parent id) of the hot and archived rows of a model under some parents"""
+        cursor.execute(
+            f'SELECT "{key}", "{parent}" FROM "{model._meta.db_table}" WHERE {where} '
+            f'UNION ALL SELECT "{key}", "{parent}" FROM "{model.objects.archive_table}" '
+            f'WHERE {archived_where or where}'
+        )
+        return cursor.fetchall()
+
+    def _new_ids(self, targets):
+        """{old id: (new id, shard, bucket)} for {old id: (shard, bucket)}"""
+        groups = defaultdict(list)
+        for old, target in targets.items():
+            groups[target].append(old)
+        mapping = {}
+        for (alias, bucket), olds in groups.items():
+            for old, new in zip(olds, sharding.allocate_ids(alias, bucket, len(olds))):
+                mapping[old] = (new, alias, bucket)
+        return mapping
+
+    def _distributed_tables(self):
+        """(table, columns, id column) of the rows a client owns, parents first"""
+        ledger_columns = [
+            field.column for field in CreditLedgerEntry._meta.concrete_fields if not field.primary_key
+        ]
+        return [
+            (Client._meta.db_table, self._columns(Client), 'cliente_id'),
+            (ClientFeatures._meta.db_table, self._columns(ClientFeatures), 'cliente_id'),
+            (Credit._meta.db_table, self._columns(Credit), 'credito_id'),
+            (PaymentSchedule._meta.db_table, self._columns(PaymentSchedule), 'schedule_id'),
+            (Payment._meta.db_table, self._columns(Payment), 'pago_id'),
+            (Credit.objects.archive_table, self._columns(Credit) + ['archivado_at'], 'credito_id'),
+            (PaymentSchedule.objects.archive_table, self._columns(PaymentSchedule) + ['archivado_at'], 'schedule_id'),
+            (Payment.objects.archive_table, self._columns(Payment) + ['archivado_at'], 'pago_id'),
+            (CreditLedgerEntry._meta.db_table, ledger_columns, 'credito_id'),
+        ]
+
+    def _rekeyed_select(self, table, columns, key, alias):
+        """SELECT of the batch rows of `table` going to `alias`, with every id column translated"""
+        values, joins = [], []
+        for column in columns:
+            if column not in self.ID_COLUMNS:
+                values.append(f't."{column}"')
+                continue
+            values.append(f'm_{column}.new')
+            if column == key:
+                joins.append(
+                    f"JOIN shard_map_{column} m_{column} ON m_{column}.old = t.\"{column}\" "
+                    f"AND m_{column}.shard = '{alias}'"
+                )
+            else:
+                joins.append(f"LEFT JOIN shard_map_{column} m_{column} ON m_{column}.old = t.\"{column}\"")
+        order = ' ORDER BY t.entry_id' if table == CreditLedgerEntry._meta.db_table else ''
+        return f'SELECT {", ".join(values)} FROM "{table}" t {" ".join(joins)}{order}'
+
+    def _bucket_filter(self, bucket):
+        return f"cliente_id % {settings.SHARD_BUCKETS} = {bucket}"
+
+    def _filters(self, client_filter, archive=False):
+        """WHERE of some clients and their credits and installments, on the hot or the archive tables"""
+        credit_table = Credit.objects.archive_table if archive else Credit._meta.db_table
+        schedule_table = PaymentSchedule.objects.archive_table if archive else PaymentSchedule._meta.db_table
+        credit_filter = f'credito_id IN (SELECT credito_id FROM "{credit_table}" WHERE {client_filter})'
+        schedule_filter = f'schedule_id IN (SELECT schedule_id FROM "{schedule_table}" WHERE {credit_filter})'
+        return client_filter, credit_filter, schedule_filter
+
+    def _ledger_filter(self, client_filter):
+        """Ledger rows of the clients' credits, archived ones included (archiving keeps their ledger)"""
+        _, credit_filter, _ = self._filters(client_filter)
+        _, archived_filter, _ = self._filters(client_filter, archive=True)
+        return f"({credit_filter} OR {archived_filter})"
+
+    def _tables(self, bucket):
+        """(table, columns, WHERE) of each moved table, parents first"""
+        client_filter, credit_filter, schedule_filter = self._filters(self._bucket_filter(bucket))
+        _, archived_credit_filter, archived_schedule_filter = self._filters(
+            self._bucket_filter(bucket), archive=True
+        )
+        ledger_columns = [
+            field.column for field in CreditLedgerEntry._meta.concrete_fields if not field.primary_key
+        ]
+        return [
+            (Client._meta.db_table, self._columns(Client), client_filter),
+            (ClientFeatures._meta.db_table, self._columns(ClientFeatures), client_filter),
+            (Credit._meta.db_table, self._columns(Credit), client_filter),
+            (PaymentSchedule._meta.db_table, self._columns(PaymentSchedule), credit_filter),
+            (Payment._meta.db_table, self._columns(Payment), schedule_filter),
+            # Créditos archivados (archive_credits): mismas columnas más archivado_at
+            (Credit.objects.archive_table, self._columns(Credit) + ['archivado_at'], client_filter),
+            (PaymentSchedule.objects.archive_table, self._columns(PaymentSchedule) + ['archivado_at'],
+             archived_credit_filter),
+            (Payment.objects.archive_table, self._columns(Payment) + ['archivado_at'], archived_schedule_filter),
+            # entry_id es local a cada base: el destino asigna uno nuevo respetando el orden
+            (CreditLedgerEntry._meta.db_table, ledger_columns,
+             f"{self._ledger_filter(self._bucket_filter(bucket))} ORDER BY entry_id"),
+        ]
+
+    def _columns(self, model):
+        return [field.column for field in model._meta.concrete_fields]
+
+    def _copy(self, bucket, source, target, progress):
+        copied = {}
+        with transaction.atomic(using=target), connections[target].cursor() as write:
+            skip_triggers(write)
+            # Restos de un intento anterior: el directorio todavía apunta al origen
+            self._delete(write, self._bucket_filter(bucket))
+            with connections[source].cursor() as read:
+                for table, columns, where in self._tables(bucket):
+                    column_list = ', '.join(f'"{column}"' for column in columns)
+                    copied[table] = self._stream(
+                        read, write, f'SELECT {column_list} FROM "{table}" WHERE {where}', table, column_list
+                    )
+                    if progress:
+                        progress(bucket, f"{table}: {copied[table]} filas")
+            self._restamp(write, self._filters(self._bucket_filter(bucket)))
+        return copied
+
+    def _stream(self, read, write, select, table, column_list):
+        """COPY the rows of a SELECT on `read` into `table` on `write`; rows copied"""
+        with tempfile.SpooledTemporaryFile(max_size=self.COPY_BUFFER_BYTES) as buffer:
+            read.cursor.copy_expert(f'COPY ({select}) TO STDOUT', buffer)
+            buffer.seek(0)
+            write.cursor.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN', buffer)
+        return write.cursor.rowcount
+
+    def _restamp(self, cursor, filters):
+        """New sync stamp of the target for copied rows (the triggers are off), so /api/sync/ sends them"""
+        client_filter, credit_filter, schedule_filter = filters
+        for model, where in (
+            (Client, client_filter),
+            (Credit, client_filter),
+            (PaymentSchedule, credit_filter),
+            (Payment, schedule_filter),
+        ):
+            cursor.execute(
+                f'UPDATE "{model._meta.db_table}" SET change_xid = pg_current_xact_id()::text::bigint, '
+                f"change_seq = nextval('core_sync_change_seq') WHERE {where}"
+            )
+
+    def _delete(self, cursor, client_filter):
+        client_filter, credit_filter, schedule_filter = self._filters(client_filter)
+        _, archived_credit_filter, archived_schedule_filter = self._filters(client_filter, archive=True)
+        ledger_filter = self._ledger_filter(client_filter)
+        # Hijos primero; sin triggers, y las FK se comprueban al confirmar
+        for table, where in (
+            (Payment.objects.archive_table, archived_schedule_filter),
+            (PaymentSchedule.objects.archive_table, archived_credit_filter),
+            (Payment._meta.db_table, schedule_filter),
+            (CreditLedgerEntry._meta.db_table, ledger_filter),
+            (CreditLedgerSnapshot._meta.db_table, ledger_filter),
+            (PaymentSchedule._meta.db_table, credit_filter),
+            (Credit.objects.archive_table, client_filter),
+            (Credit._meta.db_table, client_filter),
+            (ClientFeatures._meta.db_table, client_filter),
+            (Client._meta.db_table, client_filter),
+        ):
+            cursor.execute(f'DELETE FROM "{table}" WHERE {where}')
@@ -1,4 +1,5 @@
 from ...domain.entities import Client, PaymentSchedule
+from ...infrastructure import sharding
 from decimal import Decimal
 
 
@@ -8,19 +9,19 @@ class SimpleClientService:
     def get_client_by_document(self, doc_type: str = 'CC', doc_number: str = None):
         """Get client by document number"""
         try:
-            return Client.objects.get(tipo_doc=doc_type, num_doc=doc_number)
+            return Client.objects.for_document(doc_type, doc_number).get()
         except Client.DoesNotExist:
             return None
     
     def get_client_dashboard(self, client_id: int):
         """Get client dashboard data"""
         try:
-            client = Client.objects.get(cliente_id=client_id)
-        except Client.DoesNotExist:
+            client = Client.objects.by_id(client_id).get()
+        except (Client.DoesNotExist, ValueError):
             raise ValueError(f"Client with ID {client_id} not found")
         
-        # Get all payment schedules for this client
-        schedules = PaymentSchedule.objects.by_client(client_id)
+        # Get all payment schedules for this client (on its shard)
+        schedules = PaymentSchedule.objects.on_shard(sharding.shard_for_client(client_id)).by_client(client_id)
         
         # Calculate summary
         summary = self._calculate_client_summary(schedules)
@@ -37,11 +38,13 @@ class SimpleClientService:
     
     def _calculate_client_summary(self, schedules):
         """Calculate client financial summary"""
-        total_schedules = schedules.count()
-        paid_schedules = schedules.filter(estado='pagada').count()
-        overdue_schedules = schedules.filter(estado='vencida').count()
-        pending_schedules = schedules.filter(estado='pendiente').count()
-        partial_schedules = schedules.filter(estado='parcial').count()
+        # Una sola lectura del cronograma (con sus pagos precargados) para conteos y montos
+        estados = [s.estado for s in schedules]
+        total_schedules = len(estados)
+        paid_schedules = estados.count('pagada')
+        overdue_schedules = estados.count('vencida')
+        pending_schedules = estados.count('pendiente')
+        partial_schedules = estados.count('parcial')
         
         total_amount = sum(s.valor_cuota for s in schedules)
         paid_amount = sum(s.monto_pagado for s in schedules)
@@ -1,5 +1,4 @@
 from ...domain.entities import Credit, PaymentSchedule
-from decimal import Decimal
 
 
 class SimpleCreditService:
@@ -7,20 +6,23 @@ class SimpleCreditService:
     
     def get_credits_by_client(self, client_id: int):
         """Get all credits for a client"""
-        return Credit.objects.by_client(client_id)
+        return Credit.objects.for_client(client_id)
     
     def get_credit_financial_resume(self, credit_id: int):
         """Get credit financial resume"""
         try:
-            credit = Credit.objects.get(credito_id=credit_id)
-        except Credit.DoesNotExist:
+            credit = Credit.objects.get_or_archived(credit_id)
+        except (Credit.DoesNotExist, ValueError):
             raise ValueError(f"Credit with ID {credit_id} not found")
         
-        # Get all payment schedules for this credit
-        schedules = PaymentSchedule.objects.filter(credito=credit)
+        # Get all payment schedules for this credit (on its shard, or in its archive)
+        if getattr(credit, 'archivado_at', None):
+            schedules = PaymentSchedule.objects.archived(credit._state.db, 'credito_id', [credit.pk])
+        else:
+            schedules = PaymentSchedule.objects.on_shard(credit._state.db).filter(credito=credit)
         
         # Calculate summary
-        summary = self._calculate_credit_summary(schedules)
+        summary = self._calculate_credit_summary(credit, schedules)
         
         return {
             'credito': credit,
@@ -28,26 +30,21 @@ class SimpleCreditService:
             'resumen': summary
         }
     
-    def _calculate_credit_summary(self, schedules):
-        """Calculate credit financial summary"""
-        total_schedules = schedules.count()
-        paid_schedules = schedules.filter(estado='pagada').count()
-        overdue_schedules = schedules.filter(estado='vencida').count()
-        pending_schedules = schedules.filter(estado='pendiente').count()
-        partial_schedules = schedules.filter(estado='parcial').count()
-        
-        total_amount = sum(s.valor_cuota for s in schedules)
-        paid_amount = sum(s.monto_pagado for s in schedules)
-        pending_amount = total_amount - paid_amount
+    def _calculate_credit_summary(self, credit, schedules):
+        """Calculate credit financial summary from the totals maintained on the credit"""
+        # Las parciales se cuentan sobre el cronograma que el llamador ya serializa
+        partial_schedules = sum(1 for schedule in schedules if schedule.estado == 'parcial')
+        total_amount = credit.valor_programado
+        paid_amount = credit.total_pagado
         
         return {
-            'total_schedules': total_schedules,
-            'paid_schedules': paid_schedules,
-            'overdue_schedules': overdue_schedules,
-            'pending_schedules': pending_schedules,
+            'total_schedules': credit.cuotas_programadas,
+            'paid_schedules': credit.cuotas_pagadas,
+            'overdue_schedules': credit.cuotas_vencidas,
+            'pending_schedules': credit.cuotas_pendientes - partial_schedules,
             'partial_schedules': partial_schedules,
             'total_amount': float(total_amount),
             'paid_amount': float(paid_amount),
-            'pending_amount': float(pending_amount),
+            'pending_amount': float(credit.saldo_pendiente),
             'payment_percentage': (float(paid_amount) / float(total_amount) * 100) if total_amount > 0 else 0
         }
@@ -1,5 +1,9 @@
 from ...domain.entities import Payment, PaymentSchedule
-from decimal import Decimal
+from ...infrastructure import sharding
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
 
 
 class SimplePaymentService:
@@ -43,4 +47,65 @@ class SimplePaymentService:
     
     def calculate_overdue_interest(self, schedule_id: int, overdue_rate: Decimal = Decimal('0.02')):
         """Calculate overdue interest for a payment schedule"""
-        return PaymentSchedule.objects.calculate_overdue_interest(schedule_id, overdue_rate)
+        try:
+            shard = sharding.shard_for_id(schedule_id)
+        except (TypeError, ValueError):
+            return None
+        return PaymentSchedule.objects.on_shard(shard).calculate_overdue_interest(schedule_id, overdue_rate)
+
+    def overdue_interest(self, schedule, overdue_rate=Decimal('0.02')):
+        """Overdue interest of an installment already loaded (annotated or with its payments prefetched)"""
+        return PaymentSchedule.objects.overdue_interest(schedule, Decimal(str(overdue_rate)))
+    
+    def create_payment(self, schedule_id, monto, medio: str = 'app'):
+        """Register a payment on an installment and update the installment state.
+
+        A payment above the installment's pending balance is rejected: the
+        surplus would leave monto_pagado over valor_cuota and the credit's
+        saldo_pendiente negative. The caller pays the next installment with
+        the rest, or the whole credit with a payoff quote.
+        """
+        try:
+            monto = Decimal(str(monto)).quantize(Decimal('0.01'))
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"Invalid amount: {monto}")
+        if monto <= 0:
+            raise ValueError("Amount must be positive")
+        if medio not in dict(Payment.PAYMENT_METHOD_CHOICES):
+            raise ValueError(f"Invalid payment method: {medio}")
+
+        if schedule_id is None:
+            raise ValueError("Installment is required")
+        try:
+            shard = sharding.shard_for_id(schedule_id, write=True)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid installment: {schedule_id}")
+        with transaction.atomic(using=shard):
+            schedules = PaymentSchedule.objects.on_shard(shard)
+            schedule = schedules.select_related(None).prefetch_related(None).select_for_update().filter(
+                schedule_id=schedule_id
+            ).first()
+            if schedule is None:
+                raise ValueError(f"Installment {schedule_id} not found")
+            paid = schedule.pagos.aggregate(total=Sum('monto'))['total'] or Decimal('0.00')
+            if paid + monto > schedule.valor_cuota:
+                raise ValueError(f"Payment exceeds pending balance of {schedule.valor_cuota - paid}")
+
+            payment = Payment.objects.create(
+                schedule=schedule,
+                credito_id=schedule.credito_id,
+                fecha_pago=timezone.now(),
+                monto=monto,
+                medio=medio
+            )
+            # Misma regla que PaymentScheduleManager.recalculate_states
+            if paid + monto >= schedule.valor_cuota:
+                estado = 'pagada'
+            elif schedule.fecha_vencimiento < timezone.now().date():
+                estado = 'vencida'
+            else:
+                estado = 'parcial'
+            if schedule.estado != estado:
+                schedule.estado = estado
+                schedule.save(update_fields=['estado', 'updated_at'])
+        return payment
@@ -0,0 +1,124 @@
+import heapq
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from ...domain.entities import Client, Credit, PaymentSchedule, Payment, SyncTombstone
+from ...infrastructure import sharding
+from ...infrastructure.db import get_snapshot_xmin
+
+
+class SyncService:
+    """Delta sync: rows created, updated or deleted after a cursor.
+
+    A cursor is "<xid>-<seq>". Only rows written by transactions older than
+    the oldest transaction still in flight are returned, so a row committed
+    late can never land behind a cursor a client has already received.
+
+    Transaction ids are local to each database, so with sharding the cursor
+    holds one position per shard: "<shard>:<xid>-<seq>,<shard>:<xid>-<seq>".
+    A page fills up with the changes of the shards in order.
+    """
+
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 5000
+    ENTITIES = {
+        'clientes': Client,
+        'creditos': Credit,
+        'cronograma': PaymentSchedule,
+        'pagos': Payment,
+    }
+
+    def get_changes(self, since: str = None, limit: int = DEFAULT_LIMIT):
+        """Get one page of changes after `since` (None means from the beginning)"""
+        cursors = self.parse_cursor(since)
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        aliases = sharding.shards()
+        shard_pages = sharding.scatter(
+            lambda alias: self._read_shard(alias, cursors.get(alias, (0, 0)), limit), aliases=aliases
+        )
+
+        page = []
+        has_more = False
+        next_cursors = {}
+        for alias, (merged, shard_more, horizon) in zip(aliases, shard_pages):
+            cursor = cursors.get(alias, (0, 0))
+            delivered = merged[:limit - len(page)]
+            page.extend(delivered)
+            if shard_more or len(delivered) < len(merged):
+                has_more = True
+                next_cursors[alias] = delivered[-1][0] if delivered else cursor
+            else:
+                # Todo lo anterior al horizonte del shard ya fue entregado
+                next_cursors[alias] = max(cursor, (horizon, 0))
+
+        cambios = {entidad: [] for entidad in self.ENTITIES}
+        eliminados = {entidad: [] for entidad in self.ENTITIES}
+        for _, entidad, row, deleted in page:
+            if deleted:
+                eliminados[entidad].append(row)
+            else:
+                cambios[entidad].append(row)
+
+        return {
+            'cursor': self.format_cursor(next_cursors),
+            'has_more': has_more,
+            'cambios': cambios,
+            'eliminados': eliminados,
+        }
+
+    def parse_cursor(self, since):
+        """Position per shard alias"""
+        if not since or since == '0':
+            return {}
+        try:
+            if not sharding.enabled():
+                xid, seq = since.split('-')
+                return {DEFAULT_DB_ALIAS: (int(xid), int(seq))}
+            cursors = {}
+            for part in since.split(','):
+                alias, position = part.split(':')
+                xid, seq = position.split('-')
+                cursors[alias] = (int(xid), int(seq))
+            return cursors
+        except ValueError:
+            raise ValueError(f"Invalid sync cursor: {since}")
+
+    def format_cursor(self, cursors):
+        if not sharding.enabled():
+            xid, seq = cursors[DEFAULT_DB_ALIAS]
+            return f"{xid}-{seq}"
+        return ','.join(f"{alias}:{xid}-{seq}" for alias, (xid, seq) in cursors.items())
+
+    def _read_shard(self, alias, cursor, limit):
+        """Changes of a shard after its cursor in (xid, seq) order, whether it has more, and its horizon"""
+        horizon = get_snapshot_xmin(alias)
+        # Cada fuente ya viene ordenada por (xid, seq): se mezclan y se corta la página
+        sources = [
+            self._read_entity(alias, entidad, model, cursor, horizon, limit)
+            for entidad, model in self.ENTITIES.items()
+        ]
+        sources.append(self._read_tombstones(alias, cursor, horizon, limit))
+        merged = list(heapq.merge(*sources, key=lambda change: change[0]))
+        has_more = len(merged) > limit or any(len(source) == limit for source in sources)
+        return merged[:limit], has_more, horizon
+
+    def _after(self, queryset, cursor, horizon):
+        xid, seq = cursor
+        return queryset.filter(
+            Q(change_xid__gt=xid) | Q(change_xid=xid, change_seq__gt=seq),
+            change_xid__lt=horizon
+        ).order_by('change_xid', 'change_seq')
+
+    def _read_entity(self, alias, entidad, model, cursor, horizon, limit):
+        fields = [f.attname for f in model._meta.concrete_fields if f.name != 'change_xid']
+        rows = self._after(model._base_manager.db_manager(alias).all(), cursor, horizon).values(*fields, 'change_xid')[:limit]
+        changes = []
+        for row in rows:
+            key = (row.pop('change_xid'), row['change_seq'])
+            changes.append((key, entidad, row, False))
+        return changes
+
+    def _read_tombstones(self, alias, cursor, horizon, limit):
+        rows = self._after(SyncTombstone.objects.using(alias), cursor, horizon).values_list(
+            'change_xid', 'change_seq', 'entidad', 'object_id'
+        )[:limit]
+        return [((xid, seq), entidad, object_id, True) for xid, seq, entidad, object_id in rows]
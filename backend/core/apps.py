@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import pre_save
+        from .infrastructure.sharding import assign_id
+        from .infrastructure.sql_stats import install
+
+        connection_created.connect(install, dispatch_uid='core_sql_stats')
+        pre_save.connect(assign_id, dispatch_uid='core_shard_ids')
@@ -2,10 +2,33 @@ from .client import Client
 from .credit import Credit
 from .payment_schedule import PaymentSchedule
 from .payment import Payment
+from .change_tracking import SyncTombstone
+from .outbox import OutboxEvent, OutboxCheckpoint
+from .credit_ledger import CreditLedgerEntry, CreditLedgerSnapshot
+from .collection_rollup import CollectionDailyRollup
+from .collection_worklist import CollectionWorklistEntry, CollectionWorklistState
+from .job import Job
+from .shard_bucket import ShardBucket
+from .portfolio_snapshot import PortfolioSnapshotRun
+from .client_features import ClientFeatures
+from .backfill import BackfillCheckpoint
 
 __all__ = [
     'Client',
     'Credit', 
     'PaymentSchedule',
-    'Payment'
+    'Payment',
+    'SyncTombstone',
+    'OutboxEvent',
+    'OutboxCheckpoint',
+    'CreditLedgerEntry',
+    'CreditLedgerSnapshot',
+    'CollectionDailyRollup',
+    'CollectionWorklistEntry',
+    'CollectionWorklistState',
+    'Job',
+    'ShardBucket',
+    'PortfolioSnapshotRun',
+    'ClientFeatures',
+    'BackfillCheckpoint'
 ]
@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class BackfillCheckpoint(models.Model):
+    """Progress of an online backfill on one database.
+
+    Lives in the database being backfilled: every batch advances ultimo_id
+    in the same transaction as its UPDATE, so a run stopped at any point
+    resumes after the last committed batch, and two runners of the same
+    backfill take turns on the row instead of repeating batches.
+    """
+
+    PENDING = 'pendiente'
+    RUNNING = 'en_proceso'
+    FILLED = 'rellenado'
+    COMPLETED = 'completado'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FILLED, 'Rows filled, constraints pending'),
+        (COMPLETED, 'Completed'),
+    ]
+
+    nombre = models.CharField(max_length=100, primary_key=True, help_text="Registered backfill name")
+    estado = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    ultimo_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Last primary key of the table already processed"
+    )
+    hasta_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Highest primary key when the run started (progress estimate)"
+    )
+    filas = models.BigIntegerField(default=0, help_text="Rows updated")
+    lotes = models.IntegerField(default=0, help_text="Batches committed")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core.backfill_checkpoints'
+        verbose_name = 'Backfill Checkpoint'
+        verbose_name_plural = 'Backfill Checkpoints'
+
+    def __str__(self):
+        return f"{self.nombre}: {self.estado} @ {self.ultimo_id}"
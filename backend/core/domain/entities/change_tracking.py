@@ -0,0 +1,68 @@
+from django.db import models
+
+
+class SyncTrackedModel(models.Model):
+    """Abstract base for entities exposed through the delta sync API.
+
+    change_xid/change_seq are stamped by a database trigger on every
+    insert or update (see migration 0004), so bulk updates and raw SQL
+    are tracked too. change_xid is the writing transaction id, which lets
+    the sync API skip rows of transactions that are still in flight.
+    """
+
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+    change_xid = models.BigIntegerField(
+        null=True,
+        editable=False,
+        help_text="Transaction that last wrote this row"
+    )
+    change_seq = models.BigIntegerField(
+        null=True,
+        editable=False,
+        help_text="Global change sequence of the last write"
+    )
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['change_xid', 'change_seq'], name='%(class)s_sync_idx'),
+        ]
+
+
+class SyncTombstone(models.Model):
+    """Deleted row marker written by the delete trigger of sync tracked tables"""
+
+    ENTITY_CHOICES = [
+        ('clientes', 'Clients'),
+        ('creditos', 'Credits'),
+        ('cronograma', 'Payment Schedules'),
+        ('pagos', 'Payments'),
+    ]
+
+    tombstone_id = models.BigAutoField(primary_key=True)
+    entidad = models.CharField(
+        max_length=20,
+        choices=ENTITY_CHOICES,
+        help_text="Entity of the deleted row"
+    )
+    object_id = models.BigIntegerField(
+        help_text="Primary key of the deleted row"
+    )
+    change_xid = models.BigIntegerField(
+        help_text="Transaction that deleted the row"
+    )
+    change_seq = models.BigIntegerField(
+        help_text="Global change sequence of the delete"
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'core.sync_tombstones'
+        verbose_name = 'Sync Tombstone'
+        verbose_name_plural = 'Sync Tombstones'
+        indexes = [
+            models.Index(fields=['change_xid', 'change_seq'], name='synctombstone_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entidad} #{self.object_id} deleted"
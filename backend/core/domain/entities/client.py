@@ -1,8 +1,9 @@
 from django.db import models
+from .change_tracking import SyncTrackedModel
 from ..repositories.client_manager import ClientManager
 
 
-class Client(models.Model):
+class Client(SyncTrackedModel):
     """Domain entity for Roda clients"""
     
     DOC_TYPE_CHOICES = [
@@ -36,9 +37,12 @@ class Client(models.Model):
     
     objects = ClientManager()
     
-    class Meta:
+    class Meta(SyncTrackedModel.Meta):
         db_table = 'core.clientes'
         unique_together = ['tipo_doc', 'num_doc']
+        indexes = SyncTrackedModel.Meta.indexes + [
+            models.Index(fields=['ciudad'], name='cliente_ciudad_idx'),
+        ]
         verbose_name = 'Client'
         verbose_name_plural = 'Clients'
     
@@ -0,0 +1,76 @@
+from django.db import models
+from django.utils import timezone
+from decimal import Decimal
+from ..repositories.sharded_manager import ShardedManager
+
+
+class ClientFeatures(models.Model):
+    """Repayment behaviour features of a client for risk and collections scoring.
+
+    Rows are written by core_client_features_refresh (migration 0014): the
+    batch job recomputes every client and a trigger on core.pagos recomputes
+    the clients whose payments change, so reading features never walks the
+    payment history. Installment lateness counts up to fecha_corte.
+    """
+
+    cliente = models.OneToOneField(
+        'Client',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='features'
+    )
+    fecha_corte = models.DateField(help_text="Date the open installments' days overdue count up to")
+    creditos = models.PositiveIntegerField(db_default=0, help_text="Credits of the client")
+    creditos_vigentes = models.PositiveIntegerField(db_default=0, help_text="Credits in estado vigente")
+    cuotas_exigibles = models.PositiveIntegerField(
+        db_default=0,
+        help_text="Installments due by fecha_corte or already paid"
+    )
+    cuotas_a_tiempo = models.PositiveIntegerField(
+        db_default=0,
+        help_text="Installments fully paid by their due date"
+    )
+    tasa_a_tiempo = models.DecimalField(
+        max_digits=5, decimal_places=4, null=True,
+        help_text="cuotas_a_tiempo / cuotas_exigibles"
+    )
+    cuotas_con_pago = models.PositiveIntegerField(db_default=0, help_text="Installments with at least one payment")
+    cuotas_pago_parcial = models.PositiveIntegerField(
+        db_default=0,
+        help_text="Installments paid in several payments or still partially paid"
+    )
+    ratio_pago_parcial = models.DecimalField(
+        max_digits=5, decimal_places=4, null=True,
+        help_text="cuotas_pago_parcial / cuotas_con_pago"
+    )
+    dias_mora_max = models.PositiveIntegerField(
+        db_default=0,
+        help_text="Most days late of any installment (paid late or still overdue)"
+    )
+    dias_mora_promedio = models.DecimalField(
+        max_digits=7, decimal_places=2, db_default=Decimal('0.00'),
+        help_text="Average days late over cuotas_exigibles"
+    )
+    dias_mora_actual = models.PositiveIntegerField(db_default=0, help_text="Days overdue of the oldest unpaid installment")
+    num_pagos = models.PositiveIntegerField(db_default=0, help_text="Payments of the client")
+    monto_pagado = models.DecimalField(max_digits=14, decimal_places=2, db_default=Decimal('0.00'))
+    fecha_ultimo_pago = models.DateTimeField(null=True, blank=True)
+    mix_medios = models.JSONField(default=dict, help_text="Share of the payments by medio")
+    updated_at = models.DateTimeField()
+
+    objects = ShardedManager()
+
+    class Meta:
+        db_table = 'core.client_features'
+        verbose_name = 'Client Features'
+        verbose_name_plural = 'Client Features'
+
+    def __str__(self):
+        return f"Features client {self.cliente_id} @ {self.fecha_corte}"
+
+    @property
+    def dias_desde_ultimo_pago(self):
+        if self.fecha_ultimo_pago is None:
+            return None
+        return (timezone.now() - self.fecha_ultimo_pago).days
@@ -0,0 +1,33 @@
+from django.db import models
+
+
+class CollectionDailyRollup(models.Model):
+    """Daily payment totals by payment method, product and city.
+
+    Kept up to date by a trigger on core.pagos (see migration 0008) and
+    rebuilt for a date range with rebuild_collection_rollups.
+    """
+
+    UNSPECIFIED = 'sin_especificar'
+
+    fecha = models.DateField(help_text="Payment date")
+    medio = models.CharField(max_length=20, help_text="Payment method")
+    producto = models.CharField(max_length=20, help_text="Financed product type")
+    ciudad = models.CharField(max_length=50, help_text="Client city")
+    num_pagos = models.IntegerField(default=0)
+    monto_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core.collection_daily_rollup'
+        verbose_name = 'Collection Daily Rollup'
+        verbose_name_plural = 'Collection Daily Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'medio', 'producto', 'ciudad'],
+                name='rollup_unique_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.medio}/{self.producto}/{self.ciudad}: {self.num_pagos}"
@@ -0,0 +1,48 @@
+from django.db import models
+
+
+class CollectionWorklistEntry(models.Model):
+    """Ranking key of one delinquent client in the collections worklist.
+
+    One row per client with overdue installments as of the state's
+    fecha_corte, on the client's shard. Rebuilt on the first page of each
+    day and refreshed, before every page, for the clients changed since
+    (see CollectionsWorklistService).
+    """
+
+    cliente_id = models.BigIntegerField(primary_key=True)
+    ciudad_clave = models.CharField(
+        max_length=50,
+        help_text="City lowercased and without accents (core_ciudad_clave)"
+    )
+    monto_vencido = models.DecimalField(max_digits=14, decimal_places=2)
+    cuotas_vencidas = models.PositiveIntegerField()
+    creditos_en_mora = models.PositiveIntegerField()
+    vencida_desde = models.DateField(help_text="Due date of the oldest overdue installment")
+    proximo_vencimiento = models.DateField(help_text="Next due date, date.max when there is none")
+
+    class Meta:
+        db_table = 'core.collection_worklist'
+        verbose_name = 'Collection Worklist Entry'
+        verbose_name_plural = 'Collection Worklist Entries'
+
+    def __str__(self):
+        return f"Cliente {self.cliente_id}: {self.monto_vencido}"
+
+
+class CollectionWorklistState(models.Model):
+    """Date and change position (sync stamps) the worklist rows of a shard are up to"""
+
+    estado_id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    fecha_corte = models.DateField(null=True, blank=True)
+    last_xid = models.BigIntegerField(default=0)
+    last_seq = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core.collection_worklist_estado'
+        verbose_name = 'Collection Worklist State'
+        verbose_name_plural = 'Collection Worklist State'
+
+    def __str__(self):
+        return f"{self.fecha_corte} @ {self.last_xid}-{self.last_seq}"
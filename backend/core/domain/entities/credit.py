@@ -1,10 +1,11 @@
 from django.db import models
+from .change_tracking import SyncTrackedModel
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from ..repositories.credit_manager import CreditManager
 
 
-class Credit(models.Model):
+class Credit(SyncTrackedModel):
     """Domain entity for e-bike/e-moped credits"""
     
     PRODUCT_CHOICES = [
@@ -17,6 +18,8 @@ class Credit(models.Model):
         ('cancelled', 'Cancelled'),
         ('written_off', 'Written Off'),
     ]
+    # Estados cerrados: con todas las cuotas pagadas el crédito se puede archivar
+    SETTLED_STATES = ('cancelado', 'castigado')
     
     credito_id = models.BigAutoField(primary_key=True)
     cliente = models.ForeignKey(
@@ -58,22 +61,115 @@ class Credit(models.Model):
         default='vigente',
         help_text="Current credit status"
     )
+    # Acumulados del cronograma y los pagos: los mantienen los triggers de
+    # core.payment_schedule y core.pagos (migración 0012)
+    cuotas_pagadas = models.PositiveIntegerField(
+        db_default=0,
+        editable=False,
+        help_text="Installments in estado pagada"
+    )
+    cuotas_pendientes = models.PositiveIntegerField(
+        db_default=0,
+        editable=False,
+        help_text="Installments in estado pendiente or parcial"
+    )
+    cuotas_vencidas = models.PositiveIntegerField(
+        db_default=0,
+        editable=False,
+        help_text="Installments in estado vencida"
+    )
+    num_pagos = models.PositiveIntegerField(
+        db_default=0,
+        editable=False,
+        help_text="Payments registered on the credit"
+    )
+    total_pagado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        db_default=Decimal('0.00'),
+        editable=False,
+        help_text="Sum of the payments"
+    )
+    saldo_pendiente = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        db_default=Decimal('0.00'),
+        editable=False,
+        help_text="Sum of the installment values minus total_pagado"
+    )
+    fecha_ultimo_pago = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Date of the latest payment"
+    )
+    clave_importacion = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Key of the CSV row the credit was imported from (import_credits skips it on a rerun)"
+    )
+
+    TOTALS_FIELDS = [
+        'cuotas_pagadas', 'cuotas_pendientes', 'cuotas_vencidas', 'num_pagos',
+        'total_pagado', 'saldo_pendiente', 'fecha_ultimo_pago',
+    ]
     
+    # El archivo ("core.creditos_archivo") y la vista "core.creditos_todos" llevan los mismos campos:
+    # una migración que los cambie termina con sync_archive (migración 0020)
     objects = CreditManager()
     
-    class Meta:
+    class Meta(SyncTrackedModel.Meta):
         db_table = 'core.creditos'
+        indexes = SyncTrackedModel.Meta.indexes + [
+            # Créditos cerrados, candidatos a archivo (ArchiveService)
+            models.Index(
+                fields=['credito_id'],
+                condition=models.Q(estado__in=['cancelado', 'castigado']),
+                name='credito_settled_idx'
+            ),
+        ]
+        constraints = [
+            # Una fila de CSV crea un solo crédito aunque la importación se repita
+            models.UniqueConstraint(
+                fields=['clave_importacion'],
+                condition=models.Q(clave_importacion__isnull=False),
+                name='credito_clave_importacion_uniq'
+            ),
+        ]
         verbose_name = 'Credit'
         verbose_name_plural = 'Credits'
     
     def __str__(self):
         return f"{self.producto} - {self.cliente.nombre} (${self.inversion:,.0f})"
     
+    def save(self, *args, **kwargs):
+        # Los acumulados se escriben solo desde los triggers: guardar una
+        # instancia leída antes de un pago no debe pisarlos
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.TOTALS_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def valor_cuota(self):
         """Calculates each installment value"""
         return round(self.inversion / self.cuotas_totales, -1)
     
+    @property
+    def cuotas_programadas(self):
+        """Installments in the schedule"""
+        return self.cuotas_pagadas + self.cuotas_pendientes + self.cuotas_vencidas
+
+    @property
+    def valor_programado(self):
+        """Sum of the installment values"""
+        return self.total_pagado + self.saldo_pendiente
+
     def is_active(self):
         """Checks if credit is active"""
         return self.estado == 'vigente'
@@ -0,0 +1,126 @@
+from django.db import models
+from ..repositories.credit_ledger_manager import CreditLedgerManager
+
+
+class CreditLedgerEntry(models.Model):
+    """Append-only movement of a credit with the running balances after it.
+
+    Disbursements and payments are appended by database triggers (see
+    migration 0006), installments as they fall due by update_credit_ledger.
+    Corrections are new entries, rows are never updated or deleted.
+    """
+
+    ENTRY_TYPE_CHOICES = [
+        ('desembolso', 'Disbursement'),
+        ('cuota_causada', 'Installment Due'),
+        ('pago', 'Payment'),
+        ('ajuste', 'Adjustment'),
+    ]
+
+    # Effect of each entry type on (saldo, saldo_exigible, total_pagado)
+    BALANCE_EFFECTS = {
+        'desembolso': (1, 0, 0),
+        'cuota_causada': (0, 1, 0),
+        'pago': (-1, -1, 1),
+        'ajuste': (1, 1, 0),
+    }
+
+    entry_id = models.BigAutoField(primary_key=True)
+    credito = models.ForeignKey(
+        'Credit',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='ledger',
+        help_text="Credit of the movement (kept if the credit is deleted)"
+    )
+    tipo = models.CharField(
+        max_length=20,
+        choices=ENTRY_TYPE_CHOICES,
+        help_text="Movement type"
+    )
+    monto = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        help_text="Movement amount, negative for reversals"
+    )
+    fecha = models.DateField(
+        help_text="Effective date"
+    )
+    schedule_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Related installment"
+    )
+    pago_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Related payment"
+    )
+    descripcion = models.CharField(max_length=200, blank=True, default='')
+    saldo = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        help_text="Outstanding principal after this movement"
+    )
+    saldo_exigible = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        help_text="Installments due and unpaid after this movement, negative when paid ahead"
+    )
+    total_pagado = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        help_text="Total paid after this movement"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CreditLedgerManager()
+
+    class Meta:
+        db_table = 'core.credit_ledger'
+        verbose_name = 'Credit Ledger Entry'
+        verbose_name_plural = 'Credit Ledger Entries'
+        indexes = [
+            models.Index(fields=['credito', '-entry_id'], name='ledger_credit_last_idx'),
+            models.Index(fields=['credito', 'fecha'], name='ledger_credit_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['schedule_id'],
+                condition=models.Q(tipo='cuota_causada'),
+                name='ledger_unique_installment_due'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} ${self.monto:,.0f} - credit {self.credito_id}"
+
+
+class CreditLedgerSnapshot(models.Model):
+    """Balances of a credit at the end of a day.
+
+    last_entry_id marks which entries are already included, so balances
+    after the snapshot only need the entries appended since.
+    """
+
+    credito = models.ForeignKey(
+        'Credit',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='ledger_snapshots'
+    )
+    fecha = models.DateField()
+    saldo = models.DecimalField(max_digits=14, decimal_places=2)
+    saldo_exigible = models.DecimalField(max_digits=14, decimal_places=2)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2)
+    last_entry_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'core.credit_ledger_snapshots'
+        unique_together = ['credito', 'fecha']
+        verbose_name = 'Credit Ledger Snapshot'
+        verbose_name_plural = 'Credit Ledger Snapshots'
+
+    def __str__(self):
+        return f"Credit {self.credito_id} @ {self.fecha}"
@@ -0,0 +1,84 @@
+from django.db import models
+
+
+class Job(models.Model):
+    """Background job queued in PostgreSQL and run by the run_jobs worker.
+
+    Workers claim pending jobs with SELECT ... FOR UPDATE SKIP LOCKED, so
+    several workers can poll the same table without blocking each other.
+    """
+
+    STATUS_CHOICES = [
+        ('pendiente', 'Pending'),
+        ('en_proceso', 'Running'),
+        ('completado', 'Completed'),
+        ('fallido', 'Failed'),
+        ('cancelado', 'Cancelled'),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(
+        max_length=50,
+        help_text="Registered task name"
+    )
+    params = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Task keyword arguments"
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendiente'
+    )
+    prioridad = models.SmallIntegerField(
+        default=0,
+        help_text="Higher runs first"
+    )
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(
+        help_text="Not run before this time (retry backoff)"
+    )
+    progreso = models.FloatField(
+        default=0,
+        help_text="Progress percentage"
+    )
+    mensaje = models.CharField(max_length=200, blank=True, default='')
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text="Worker running the job"
+    )
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last sign of life of the running job"
+    )
+    lease_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The running job goes back to the queue if its worker does not renew this lease"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'core.jobs'
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        indexes = [
+            models.Index(
+                fields=['-prioridad', 'run_after', 'job_id'],
+                condition=models.Q(estado='pendiente'),
+                name='job_queue_idx'
+            ),
+            models.Index(fields=['estado', 'lease_until'], name='job_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.job_id} ({self.estado})"
@@ -0,0 +1,69 @@
+from django.db import models
+
+
+class OutboxEvent(models.Model):
+    """Payment/installment event written in the same transaction as the change.
+
+    Rows are inserted by database triggers (see migration 0005) and shipped
+    downstream by the relay_outbox command.
+    """
+
+    EVENT_TYPE_CHOICES = [
+        ('pago.creado', 'Payment Created'),
+        ('pago.actualizado', 'Payment Updated'),
+        ('cuota.estado_cambiado', 'Installment State Changed'),
+    ]
+
+    event_id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(
+        max_length=40,
+        choices=EVENT_TYPE_CHOICES,
+        help_text="Event type"
+    )
+    agregado = models.CharField(
+        max_length=20,
+        help_text="Aggregate the event belongs to (pago, cuota)"
+    )
+    agregado_id = models.BigIntegerField(
+        help_text="Primary key of the aggregate"
+    )
+    payload = models.JSONField(
+        help_text="Row state after the change"
+    )
+    change_xid = models.BigIntegerField(
+        help_text="Transaction that produced the event"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'core.outbox_events'
+        verbose_name = 'Outbox Event'
+        verbose_name_plural = 'Outbox Events'
+        indexes = [
+            models.Index(fields=['change_xid', 'event_id'], name='outbox_relay_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.agregado_id}"
+
+
+class OutboxCheckpoint(models.Model):
+    """Relay position and counters for one downstream sink"""
+
+    sink = models.CharField(
+        max_length=50,
+        primary_key=True,
+        help_text="Sink name, one checkpoint per consumer"
+    )
+    last_xid = models.BigIntegerField(default=0)
+    last_event_id = models.BigIntegerField(default=0)
+    relayed_total = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core.outbox_checkpoints'
+        verbose_name = 'Outbox Checkpoint'
+        verbose_name_plural = 'Outbox Checkpoints'
+
+    def __str__(self):
+        return f"{self.sink} @ {self.last_xid}-{self.last_event_id}"
@@ -1,8 +1,10 @@
 from django.db import models
+from .change_tracking import SyncTrackedModel
 from decimal import Decimal
+from ..repositories.payment_manager import PaymentManager
 
 
-class Payment(models.Model):
+class Payment(SyncTrackedModel):
     """Domain entity for payments made"""
     
     PAYMENT_METHOD_CHOICES = [
@@ -18,9 +20,7 @@ class Payment(models.Model):
         'Credit',
         on_delete=models.CASCADE,
         related_name='pagos',
-        help_text="Credit this payment contributes to",
-        null=True,  # se establece NOT NULL en migración posterior al backfill
-        blank=True
+        help_text="Credit this payment contributes to"
     )
     schedule = models.ForeignKey(
         'PaymentSchedule',
@@ -43,9 +43,27 @@ class Payment(models.Model):
         null=True,
         help_text="Payment method used"
     )
+    referencia = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        help_text="Settlement reference of the payment channel (reconciliation files)"
+    )
+    
+    # El archivo ("core.pagos_archivo") y la vista "core.pagos_todos" llevan los mismos campos:
+    # una migración que los cambie termina con sync_archive (migración 0020)
+    objects = PaymentManager()
     
-    class Meta:
+    class Meta(SyncTrackedModel.Meta):
         db_table = 'core.pagos'
+        constraints = [
+            # Una misma liquidación no se registra dos veces
+            models.UniqueConstraint(
+                fields=['medio', 'referencia'],
+                condition=models.Q(referencia__isnull=False),
+                name='pago_medio_referencia_uniq'
+            ),
+        ]
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
     
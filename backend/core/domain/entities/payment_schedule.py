@@ -1,10 +1,12 @@
 from django.db import models
+from .change_tracking import SyncTrackedModel
 from django.utils import timezone
+from django.utils.functional import cached_property
 from decimal import Decimal
 from ..repositories.payment_schedule_manager import PaymentScheduleManager
 
 
-class PaymentSchedule(models.Model):
+class PaymentSchedule(SyncTrackedModel):
     """Domain entity for payment schedule"""
     
     STATUS_CHOICES = [
@@ -39,30 +41,61 @@ class PaymentSchedule(models.Model):
         help_text="Current installment status"
     )
     
+    # El archivo ("core.payment_schedule_archivo") y la vista "core.payment_schedule_todos" llevan los mismos campos:
+    # una migración que los cambie termina con sync_archive (migración 0020)
     objects = PaymentScheduleManager()
     
-    class Meta:
+    class Meta(SyncTrackedModel.Meta):
         db_table = 'core.payment_schedule'
         unique_together = ['credito', 'num_cuota']
+        indexes = SyncTrackedModel.Meta.indexes + [
+            # Open installments per credit by due date (collections worklist)
+            models.Index(
+                fields=['credito', 'fecha_vencimiento'],
+                condition=models.Q(estado__in=['pendiente', 'parcial', 'vencida']),
+                name='schedule_open_due_idx'
+            ),
+        ]
         verbose_name = 'Payment Schedule'
         verbose_name_plural = 'Payment Schedules'
     
     def __str__(self):
         return f"Installment {self.num_cuota} - {self.credito.cliente.nombre}"
     
-    @property
+    # Valores derivados memoizados por instancia; refresh_from_db los descarta
+    # junto con las anotaciones de saldo, que ya no estarían al día
+    MEMOIZED_PROPERTIES = ('monto_pagado', 'saldo_pendiente', 'esta_vencida', 'dias_mora')
+    BALANCE_ANNOTATIONS = ('amount_paid', 'pending_balance')
+
+    def refresh_from_db(self, *args, **kwargs):
+        for name in self.MEMOIZED_PROPERTIES + self.BALANCE_ANNOTATIONS:
+            self.__dict__.pop(name, None)
+        super().refresh_from_db(*args, **kwargs)
+
+    @cached_property
     def monto_pagado(self):
-        """Calculates total amount paid in this installment"""
+        """Total amount paid in this installment.
+
+        Uses the amount_paid annotation (PaymentScheduleManager.with_payments)
+        or the prefetched pagos when the instance has them, and aggregates
+        the payments otherwise.
+        """
+        if 'amount_paid' in self.__dict__:
+            return self.amount_paid if self.amount_paid is not None else Decimal('0.00')
+        if 'pagos' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum((pago.monto for pago in self.pagos.all()), Decimal('0.00'))
         return self.pagos.aggregate(
             total=models.Sum('monto')
         )['total'] or Decimal('0.00')
     
-    @property
+    @cached_property
     def saldo_pendiente(self):
-        """Calculates pending balance of the installment"""
+        """Pending balance of the installment (the pending_balance annotation when present)"""
+        if self.__dict__.get('pending_balance') is not None:
+            return self.pending_balance
         return self.valor_cuota - self.monto_pagado
     
-    @property
+    @cached_property
     def esta_vencida(self):
         """Checks if installment is overdue"""
         return (
@@ -70,7 +103,7 @@ class PaymentSchedule(models.Model):
             self.saldo_pendiente > Decimal('0.00')
         )
     
-    @property
+    @cached_property
     def dias_mora(self):
         """Calculates overdue days"""
         if self.esta_vencida:
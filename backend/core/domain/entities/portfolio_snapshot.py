@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class PortfolioSnapshotRun(models.Model):
+    """One daily snapshot of the open installments of a shard.
+
+    The installment rows live in core.installment_snapshots, a table
+    partitioned by month (see migration 0013 and PortfolioSnapshotService):
+    the first run of each month stores every open installment (keyframe)
+    and later runs only the installments whose state, balance or due date
+    changed, so a day is rebuilt from its month's partition alone.
+    """
+
+    fecha = models.DateField(primary_key=True, help_text="Snapshot date")
+    keyframe = models.BooleanField(
+        default=False,
+        help_text="Whether every open installment was written (first run of the month)"
+    )
+    filas = models.IntegerField(default=0, help_text="Installment rows written")
+    cuotas_abiertas = models.IntegerField(default=0, help_text="Open installments at the snapshot")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'core.portfolio_snapshot_runs'
+        verbose_name = 'Portfolio Snapshot Run'
+        verbose_name_plural = 'Portfolio Snapshot Runs'
+
+    def __str__(self):
+        return f"{self.fecha}: {self.filas} filas ({'keyframe' if self.keyframe else 'cambios'})"
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class ShardBucket(models.Model):
+    """Directory entry: the shard database that holds a client hash bucket.
+
+    Lives on the default database. Buckets without a row use the default
+    assignment (bucket modulo number of shards); rebalance_shards writes a
+    row when it moves a bucket and marks it 'moviendo' while copying, which
+    rejects writes to the bucket.
+    """
+
+    ACTIVE = 'activo'
+    MOVING = 'moviendo'
+    STATUS_CHOICES = [
+        (ACTIVE, 'Active'),
+        (MOVING, 'Moving'),
+    ]
+
+    bucket = models.IntegerField(primary_key=True)
+    shard = models.CharField(
+        max_length=50,
+        help_text="Database alias of the shard"
+    )
+    estado = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=ACTIVE
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'core.shard_buckets'
+        verbose_name = 'Shard Bucket'
+        verbose_name_plural = 'Shard Buckets'
+
+    def __str__(self):
+        return f"bucket {self.bucket} -> {self.shard} ({self.estado})"
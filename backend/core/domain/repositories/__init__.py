@@ -1,9 +1,15 @@
 from .client_manager import ClientManager
 from .credit_manager import CreditManager
 from .payment_schedule_manager import PaymentScheduleManager
+from .credit_ledger_manager import CreditLedgerManager
+from .payment_manager import PaymentManager
+from .sharded_manager import ShardedManager
 
 __all__ = [
     'ClientManager',
     'CreditManager',
-    'PaymentScheduleManager'
+    'PaymentScheduleManager',
+    'CreditLedgerManager',
+    'PaymentManager',
+    'ShardedManager'
 ]
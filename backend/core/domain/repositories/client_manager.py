@@ -1,8 +1,10 @@
 from django.db import models
 from django.db.models import Sum
+from ...infrastructure import sharding
+from .sharded_manager import ShardedManager
 
 
-class ClientManager(models.Manager):
+class ClientManager(ShardedManager):
     """Custom manager for client queries"""
     
     def get_queryset(self):
@@ -29,5 +31,11 @@ class ClientManager(models.Manager):
     def search_by_document(self, doc_type, doc_number):
         return self.filter(tipo_doc=doc_type, num_doc=doc_number)
 
+    def for_document(self, doc_type, doc_number):
+        """Client by document, queried on the shard of its hash bucket"""
+        return self.on_shard(sharding.shard_for_document(doc_type, doc_number)).filter(
+            tipo_doc=doc_type, num_doc=doc_number
+        )
+
     def search_by_name(self, name):
         return self.filter(nombre__icontains=name)
@@ -0,0 +1,62 @@
+from django.db import models
+from django.db.models import Sum, Case, When, F, Q
+from decimal import Decimal
+from ...infrastructure import sharding
+
+
+class CreditLedgerManager(models.Manager):
+    """Custom manager for credit ledger queries.
+
+    Ledger rows live in the shard of their credit; entry_id is local to each
+    database, so rows are reached through their credit id.
+    """
+
+    BALANCE_FIELDS = ('saldo', 'saldo_exigible', 'total_pagado')
+
+    def on_shard(self, alias):
+        return self.db_manager(alias)
+
+    def for_credit(self, credit_id):
+        """Entries of a credit, on its shard"""
+        manager = self if self._db else self.on_shard(sharding.shard_for_id(credit_id))
+        return manager.filter(credito_id=credit_id)
+
+    def latest(self, credit_id):
+        """Last entry of a credit, which carries its current balances"""
+        return self.for_credit(credit_id).order_by('-entry_id').first()
+
+    def latest_by_credit(self, credit_ids):
+        """Last entry of each credit, from the shards of the credits"""
+        by_shard = {}
+        for credit_id in credit_ids:
+            by_shard.setdefault(sharding.shard_for_id(credit_id), []).append(credit_id)
+        partials = sharding.scatter(
+            lambda alias: list(
+                self.on_shard(alias).filter(
+                    credito_id__in=by_shard[alias]
+                ).order_by('credito_id', '-entry_id').distinct('credito_id')
+            ),
+            aliases=list(by_shard)
+        ) if by_shard else []
+        return [entry for entries in partials for entry in entries]
+
+    def effects_until(self, credit_id, fecha, snapshot=None):
+        """Balance change of entries effective until `fecha` not included in `snapshot`"""
+        queryset = self.for_credit(credit_id).filter(fecha__lte=fecha)
+        if snapshot is not None:
+            queryset = queryset.filter(
+                Q(entry_id__gt=snapshot.last_entry_id) | Q(fecha__gt=snapshot.fecha)
+            )
+        totals = queryset.aggregate(**self._effect_sums())
+        return {name: totals[name] or Decimal('0.00') for name in self.BALANCE_FIELDS}
+
+    def _effect_sums(self):
+        sums = {}
+        for position, name in enumerate(self.BALANCE_FIELDS):
+            whens = [
+                When(tipo=tipo, then=F('monto') * factors[position])
+                for tipo, factors in self.model.BALANCE_EFFECTS.items()
+                if factors[position]
+            ]
+            sums[name] = Sum(Case(*whens, default=Decimal('0.00'), output_field=models.DecimalField()))
+        return sums
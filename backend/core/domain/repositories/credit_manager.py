@@ -1,9 +1,12 @@
-from django.db import models
+from django.db import connections
 from django.db.models import Sum
+from .sharded_manager import ShardedManager
 
 
-class CreditManager(models.Manager):
+class CreditManager(ShardedManager):
     """Custom manager for credit queries"""
+
+    archive_table = 'core.creditos_archivo'
     
     def get_queryset(self):
         return super().get_queryset().select_related('cliente')
@@ -27,3 +30,13 @@ class CreditManager(models.Manager):
         return self.filter(
             fecha_desembolso__range=[start_date, end_date]
         )
+
+    def refresh_totals(self, start_id, end_id):
+        """Recompute the totals of credit ids in [start_id, end_id] from installments and payments.
+
+        The triggers keep them up to date; this repairs drift and returns
+        how many credits were corrected.
+        """
+        with connections[self.db].cursor() as cursor:
+            cursor.execute("SELECT core_credit_totals_refresh(%s, %s)", [start_id, end_id])
+            return cursor.fetchone()[0]
@@ -0,0 +1,26 @@
+from ...infrastructure import sharding
+from .sharded_manager import ShardedManager
+
+
+class PaymentManager(ShardedManager):
+    """Custom manager for payment queries"""
+
+    client_lookup = 'credito__cliente_id'
+    archive_table = 'core.pagos_archivo'
+
+    def by_schedule(self, schedule_id):
+        return self.on_shard(sharding.shard_for_id(schedule_id)).filter(schedule_id=schedule_id)
+
+    def attach_archived(self, alias, rows):
+        """Archived payments get their archived installment and its credit"""
+        from ..entities.payment_schedule import PaymentSchedule
+
+        schedules = {
+            schedule.pk: schedule
+            for schedule in PaymentSchedule.objects.archived(alias, 'schedule_id', [pago.schedule_id for pago in rows])
+        }
+        for pago in rows:
+            schedule = schedules.get(pago.schedule_id)
+            if schedule is not None:
+                pago.schedule = schedule
+                pago.credito = schedule.credito
@@ -1,14 +1,47 @@
-from django.db import models
+from django.db import models, connections
 from django.db.models import Sum, F, ExpressionWrapper, fields
 from django.utils import timezone
 from decimal import Decimal
+from .sharded_manager import ShardedManager
 
 
-class PaymentScheduleManager(models.Manager):
+class PaymentScheduleManager(ShardedManager):
     """Custom manager for payment schedule queries"""
+
+    client_lookup = 'credito__cliente_id'
+    archive_table = 'core.payment_schedule_archivo'
     
     def get_queryset(self):
-        return super().get_queryset().select_related('credito__cliente').prefetch_related('pagos')
+        # Import lazily to avoid circulars
+        from ..entities.payment import Payment
+        # Los pagos se serializan con su crédito: se une en la misma precarga
+        pagos = models.Prefetch('pagos', queryset=Payment.objects.select_related('credito'))
+        return super().get_queryset().select_related('credito__cliente').prefetch_related(pagos)
+
+    def attach_archived(self, alias, rows):
+        """Archived installments get their archived credit and payments, as get_queryset preloads them"""
+        from ..entities.credit import Credit
+        from ..entities.payment import Payment
+
+        credits = {
+            credit.pk: credit
+            for credit in Credit.objects.archived(alias, 'credito_id', [schedule.credito_id for schedule in rows])
+        }
+        pagos = {}
+        for pago in Payment.objects.archived(alias, 'schedule_id', [schedule.pk for schedule in rows], related=False):
+            pagos.setdefault(pago.schedule_id, []).append(pago)
+        for schedule in rows:
+            if schedule.credito_id in credits:
+                schedule.credito = credits[schedule.credito_id]
+            # Mismo caché que deja prefetch_related: schedule.pagos.all() no consulta la tabla activa
+            cached = Payment.objects.db_manager(alias).none()
+            cached._result_cache = pagos.get(schedule.pk, [])
+            cached._prefetch_done = True
+            schedule._prefetched_objects_cache = {'pagos': cached}
+            for pago in cached._result_cache:
+                pago.schedule = schedule
+                if schedule.credito_id in credits:
+                    pago.credito = schedule.credito
 
     def with_payments(self):
         return self.annotate(
@@ -27,6 +60,36 @@ class PaymentScheduleManager(models.Manager):
             pending_balance__gt=Decimal('0.00')
         )
 
+    def recalculate_states(self, start_id, end_id, today=None):
+        """Recompute estado from payments for schedule ids in [start_id, end_id]; returns rows changed"""
+        today = today or timezone.now().date()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE "{self.model._meta.db_table}" s
+                SET estado = calculado.estado
+                FROM (
+                    SELECT s.schedule_id,
+                        CASE
+                            WHEN COALESCE(p.monto, 0) >= s.valor_cuota THEN 'pagada'
+                            WHEN s.fecha_vencimiento < %(hoy)s THEN 'vencida'
+                            WHEN COALESCE(p.monto, 0) > 0 THEN 'parcial'
+                            ELSE 'pendiente'
+                        END AS estado
+                    FROM "{self.model._meta.db_table}" s
+                    LEFT JOIN LATERAL (
+                        SELECT SUM(pg.monto) AS monto FROM "core.pagos" pg
+                        WHERE pg.schedule_id = s.schedule_id
+                    ) p ON true
+                    WHERE s.schedule_id BETWEEN %(desde)s AND %(hasta)s
+                ) calculado
+                WHERE s.schedule_id = calculado.schedule_id
+                  AND s.estado IS DISTINCT FROM calculado.estado
+                """,
+                {'hoy': today, 'desde': start_id, 'hasta': end_id}
+            )
+            return cursor.rowcount
+
     def by_client(self, client_id):
         return self.filter(credito__cliente_id=client_id).order_by('credito__credito_id', 'num_cuota')
 
@@ -38,7 +101,10 @@ class PaymentScheduleManager(models.Manager):
             schedule = self.with_balance().get(pk=schedule_id)
         except self.model.DoesNotExist:
             return None
+        return self.overdue_interest(schedule, overdue_rate)
 
+    def overdue_interest(self, schedule, overdue_rate=Decimal('0.02')):
+        """Overdue interest of a loaded installment (no queries when it comes from with_balance)"""
         if schedule.esta_vencida:
             days = schedule.dias_mora
             overdue_interest = schedule.saldo_pendiente * (overdue_rate / Decimal('365')) * days
@@ -0,0 +1,234 @@
+import functools
+import heapq
+from django.db import models
+from ...infrastructure import sharding
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet of a sharded model.
+
+    get() by primary key on a queryset bound to no shard runs on the shard of
+    the id, so DRF's get_object and PrimaryKeyRelatedField need no hint;
+    across_shards() turns a list query into one read from every shard.
+    """
+
+    def get(self, *args, **kwargs):
+        if self._db is None and sharding.enabled() and not args:
+            object_id = kwargs.get('pk', kwargs.get(self.model._meta.pk.attname))
+            if object_id is not None:
+                return self.using(sharding.shard_for_id(object_id)).get(**kwargs)
+        return super().get(*args, **kwargs)
+
+    def across_shards(self):
+        """This query on every shard, merged in its ordering (itself when bound to a shard or unsharded)"""
+        if self._db is not None or not sharding.enabled():
+            return self
+        return ScatteredQuerySet(self)
+
+
+class ScatteredQuerySet:
+    """A list query read from every shard and merged by its ordering.
+
+    Implements what list views and paginators use: count(), slicing,
+    iteration, get() and chaining with filter, exclude and order_by. A slice
+    [a:b] reads the first b rows of each shard and merges them, so deep
+    pages cost more than the first ones; cursor-paginated endpoints should
+    scatter their own keyset queries instead.
+    """
+
+    ordered = True
+
+    def __init__(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        pk = queryset.model._meta.pk.name
+        # La llave primaria desempata: las páginas no se solapan entre shards
+        if not {pk, f'-{pk}', 'pk', '-pk'} & set(ordering):
+            ordering.append(pk)
+        self.queryset = queryset.order_by(*ordering)
+        self.model = queryset.model
+        self.ordering = [
+            (pk if name.lstrip('-') == 'pk' else name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self._result_cache = None
+
+    def _chain(self, queryset):
+        return ScatteredQuerySet(queryset)
+
+    def all(self):
+        return self._chain(self.queryset.all())
+
+    def filter(self, *args, **kwargs):
+        return self._chain(self.queryset.filter(*args, **kwargs))
+
+    def exclude(self, *args, **kwargs):
+        return self._chain(self.queryset.exclude(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self._chain(self.queryset.order_by(*fields))
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        return sum(sharding.scatter(lambda alias: self.queryset.using(alias).count()))
+
+    def exists(self):
+        return any(sharding.scatter(lambda alias: self.queryset.using(alias).exists()))
+
+    def get(self, *args, **kwargs):
+        if not args and ('pk' in kwargs or self.model._meta.pk.attname in kwargs):
+            # Por id: solo el shard de la fila
+            return self.queryset.get(**kwargs)
+        queryset = self.queryset.filter(*args, **kwargs)
+        rows = [row for rows in sharding.scatter(lambda alias: list(queryset.using(alias)[:2])) for row in rows]
+        if not rows:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned(f"get() returned more than one {self.model._meta.object_name}")
+        return rows[0]
+
+    def _fetch(self, stop=None):
+        """Rows of every shard up to `stop` each, merged"""
+        partials = sharding.scatter(
+            lambda alias: list(self.queryset.using(alias)[:stop] if stop is not None else self.queryset.using(alias))
+        )
+        return list(heapq.merge(*partials, key=functools.cmp_to_key(self._compare)))
+
+    def _compare(self, left, right):
+        for name, descending in self.ordering:
+            a, b = self._value(left, name), self._value(right, name)
+            if a == b:
+                continue
+            # NULL al final en orden ascendente, como PostgreSQL
+            if a is None or b is None:
+                result = 1 if a is None else -1
+            else:
+                result = -1 if a < b else 1
+            return -result if descending else result
+        return 0
+
+    def _value(self, row, name):
+        for part in name.split('__'):
+            row = getattr(row, part) if row is not None else None
+        return row
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            if k.step not in (None, 1):
+                raise ValueError("Stepped slices are not supported across shards")
+            start, stop = k.start or 0, k.stop
+            if self._result_cache is not None:
+                return self._result_cache[start:stop]
+            return self._fetch(stop)[start:stop]
+        rows = self[k:k + 1]
+        if not rows:
+            raise IndexError('ScatteredQuerySet index out of range')
+        return rows[0]
+
+    def __iter__(self):
+        if self._result_cache is None:
+            self._result_cache = self._fetch()
+        return iter(self._result_cache)
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    """Base manager for models sharded by client (see core.infrastructure.sharding).
+
+    With sharding enabled, queries must name their shard: use for_client,
+    by_id or on_shard to reach one, and scatter or across_shards for
+    portfolio-wide queries (get by primary key routes itself). With sharding
+    disabled all of them resolve to the default database.
+
+    Models with an archive_table (rows moved out by ArchiveService) read
+    through to it by id with get_or_archived.
+    """
+
+    # Lookup del cliente dueño de la fila
+    client_lookup = 'cliente_id'
+    # Tabla de archivo del modelo en cada shard (migración 0016); None si no se archiva
+    archive_table = None
+
+    def on_shard(self, alias):
+        """This manager bound to a shard database"""
+        return self.db_manager(alias)
+
+    def for_client(self, client_id):
+        return self.on_shard(sharding.shard_for_client(client_id)).filter(**{self.client_lookup: client_id})
+
+    def by_id(self, object_id):
+        """Queryset on the shard of a row, filtered by its primary key"""
+        return self.on_shard(sharding.shard_for_id(object_id)).filter(pk=object_id)
+
+    def get_or_archived(self, object_id):
+        """Row by primary key from its shard, or from the archive once it was archived; DoesNotExist otherwise"""
+        try:
+            return self.by_id(object_id).get()
+        except self.model.DoesNotExist:
+            instance = self.archived_by_id(object_id)
+            if instance is None:
+                raise
+            return instance
+
+    def archived_by_id(self, object_id):
+        """Archived row by primary key, or None"""
+        if self.archive_table is None:
+            return None
+        object_id = int(object_id)
+        rows = self.archived(sharding.shard_for_id(object_id), self.model._meta.pk.column, [object_id])
+        return rows[0] if rows else None
+
+    def archived(self, alias, column, values, related=True):
+        """Archived rows of shard `alias` whose `column` is in `values`.
+
+        Instances are read-only (the hot table no longer has them) and carry
+        archivado_at; with related, the archived rows they point to are
+        attached by attach_archived so serializers do not hit the hot tables.
+        """
+        values = sorted(set(values))
+        if self.archive_table is None or not values:
+            return []
+        pk = self.model._meta.pk.column
+        # Sin los prefetch de get_queryset: leerían las tablas activas
+        rows = list(self.on_shard(alias).prefetch_related(None).raw(
+            f'SELECT * FROM "{self.archive_table}" WHERE "{column}" = ANY(%s) ORDER BY "{pk}"', [values]
+        ))
+        if related and rows:
+            self.attach_archived(alias, rows)
+        return rows
+
+    def attach_archived(self, alias, rows):
+        """Hook: attach the archived relations of archived rows"""
+
+    def scatter(self, build):
+        """build(manager) evaluated on every shard in parallel; list of results in shard order"""
+        return sharding.scatter(lambda alias: build(self.on_shard(alias)))
+
+    def scatter_list(self, build=None):
+        """Rows of every shard concatenated"""
+        build = build or (lambda manager: manager.all())
+        return [row for rows in self.scatter(lambda manager: list(build(manager))) for row in rows]
+
+    def create(self, **kwargs):
+        if not sharding.enabled() or self._db:
+            return super().create(**kwargs)
+        instance = self.model(**kwargs)
+        instance.save(force_insert=True, using=sharding.shard_for_instance(instance, write=True))
+        return instance
+
+    def bulk_create(self, objs, **kwargs):
+        """Insert each object in its shard, with sharded ids allocated there"""
+        if not sharding.enabled():
+            return super().bulk_create(objs, **kwargs)
+        objs = list(objs)
+        if self._db:
+            sharding.assign_ids(self._db, objs)
+            return super().bulk_create(objs, **kwargs)
+        by_shard = {}
+        for instance in objs:
+            by_shard.setdefault(sharding.shard_for_instance(instance, write=True), []).append(instance)
+        for alias, group in by_shard.items():
+            sharding.assign_ids(alias, group)
+            self.on_shard(alias).bulk_create(group, **kwargs)
+        return objs
@@ -0,0 +1,24 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def get_snapshot_xmin(using=DEFAULT_DB_ALIAS):
+    """Oldest transaction id still in flight.
+
+    Every transaction below it has finished, so rows stamped with a lower
+    xid are already visible and no more will appear. Transaction ids are
+    local to each database: pass the alias of the shard being read.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return cursor.fetchone()[0]
+
+
+def skip_triggers(cursor):
+    """Keep the core triggers from firing until the current transaction ends.
+
+    For rows that are moved rather than written (archive, bucket moves): the
+    triggers check the core.moviendo setting (migration 0019), which any
+    user may set, unlike session_replication_role. Foreign keys are still
+    checked, at commit.
+    """
+    cursor.execute("SET LOCAL core.moviendo = 'on'")
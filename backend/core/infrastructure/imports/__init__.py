@@ -0,0 +1,6 @@
+"""
+Bulk CSV imports loaded through a staging table and COPY.
+
+Import processes import this package before Django is set up (see pool.py),
+so loaders are imported from their modules, not from here.
+"""
@@ -0,0 +1,220 @@
+"""
+Credit CSV parsing, validation and loading.
+
+The file is read in byte ranges aligned to line starts so that several
+processes can stream the same file. Each batch of valid rows is copied into
+a temporary staging table and merged with three set-based statements:
+new clients (deduplicated on tipo_doc + num_doc), credits and their schedules.
+Each credit stores a key of its row (document and credit values), so
+running the same file again skips the rows already loaded instead of
+duplicating their credits.
+
+With sharding enabled a batch is split by the shard of each client's
+document and merged on every shard in its own transaction, with ids drawn
+from the shard's id sequence in the client's bucket.
+"""
+import csv
+import io
+import os
+from collections import defaultdict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from ...domain.entities import Client, Credit
+from .. import sharding
+
+CLIENT_COLUMNS = ['tipo_doc', 'num_doc', 'nombre', 'ciudad']
+CREDIT_COLUMNS = ['producto', 'inversion', 'cuotas_totales', 'tea', 'fecha_desembolso', 'fecha_inicio_pago']
+COLUMNS = CLIENT_COLUMNS + CREDIT_COLUMNS
+OPTIONAL_COLUMNS = {'ciudad'}
+
+# Días entre cuotas, igual que el cronograma de los datos de muestra
+INSTALLMENT_DAYS = 30
+
+STAGING_TABLE = 'credit_import_staging'
+
+
+def read_header(path):
+    """Column positions of the header row and the offset where data starts"""
+    with open(path, 'rb') as source:
+        line = source.readline()
+        start = source.tell()
+    names = [name.strip().lower() for name in next(csv.reader([line.decode('utf-8-sig')]))]
+    missing = [column for column in COLUMNS if column not in names and column not in OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+    return {column: names.index(column) for column in COLUMNS if column in names}, start
+
+
+def split_ranges(path, start, parts):
+    """Split the data section into at most `parts` byte ranges"""
+    size = os.path.getsize(path)
+    step = max((size - start) // max(parts, 1), 1)
+    bounds = list(range(start, size, step)) + [size]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def iter_lines(path, start, end):
+    """Yield (offset, line) for each non-blank line that starts inside [start, end).
+
+    A range that begins mid-line skips to the next line: that line belongs to
+    the previous range. Records may not contain embedded line breaks.
+    """
+    with open(path, 'rb') as source:
+        source.seek(start)
+        if start > 0:
+            source.seek(start - 1)
+            if source.read(1) != b'\n':
+                source.readline()
+        while source.tell() < end:
+            offset = source.tell()
+            line = source.readline()
+            if not line:
+                break
+            line = line.rstrip(b'\r\n')
+            if line.strip():
+                yield offset, line
+
+
+def parse_row(header, line):
+    """Values of a raw line by column name; raises ValueError if it is not valid UTF-8 or CSV"""
+    try:
+        fields = next(csv.reader([line.decode('utf-8')]))
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Invalid UTF-8 at byte {e.start}")
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV line: {e}")
+    return {
+        column: fields[index].strip() if index < len(fields) else ''
+        for column, index in header.items()
+    }
+
+
+def _fields():
+    fields = {name: Client._meta.get_field(name) for name in CLIENT_COLUMNS}
+    fields.update({name: Credit._meta.get_field(name) for name in CREDIT_COLUMNS})
+    return fields
+
+
+class CreditCsvLoader:
+    """Validates rows and loads them in batches on the shard of each client"""
+
+    def __init__(self):
+        self.fields = _fields()
+
+    def clean(self, values):
+        """Row values converted with the model field constraints; raises ValueError"""
+        cleaned = {}
+        errors = []
+        for name, field in self.fields.items():
+            raw = values.get(name, '')
+            if raw == '' and name in OPTIONAL_COLUMNS:
+                cleaned[name] = None
+                continue
+            try:
+                cleaned[name] = field.clean(raw, None)
+            except ValidationError as e:
+                errors.append(f"{name}: {' '.join(e.messages)}")
+        if errors:
+            raise ValueError('; '.join(errors))
+        return cleaned
+
+    def load(self, rows):
+        """Copy a batch of (offset, cleaned) rows and merge it on the shards of its clients; returns the counts"""
+        groups = defaultdict(list)
+        for offset, row in rows:
+            groups[sharding.shard_for_document(row['tipo_doc'], row['num_doc'], write=True)].append((offset, row))
+        totals = {'clientes_nuevos': 0, 'creditos': 0, 'cuotas': 0, 'repetidos': 0}
+        for alias, group in groups.items():
+            for key, value in self._merge(alias, group).items():
+                totals[key] += value
+        return totals
+
+    def _merge(self, alias, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for offset, row in rows:
+            bucket = sharding.bucket_for_document(row['tipo_doc'], row['num_doc'])
+            writer.writerow([offset, bucket] + [row[name] for name in COLUMNS])
+        buffer.seek(0)
+
+        # Con sharding los ids salen de la secuencia del shard, en el bucket del cliente
+        if sharding.enabled():
+            ids = f"nextval('{sharding.ID_SEQUENCE}') * {settings.SHARD_BUCKETS} + "
+            client_id = ('cliente_id, ', f"{ids}bucket, ")
+            credit_id = ('credito_id, ', f"{ids}c.cliente_id % {settings.SHARD_BUCKETS}, ")
+            schedule_id = ('schedule_id, ', f"{ids}cr.credito_id % {settings.SHARD_BUCKETS}, ")
+        else:
+            client_id = credit_id = schedule_id = ('', '')
+
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            self._create_staging(cursor)
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} (posicion, bucket, {', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            # Orden fijo por documento: procesos en paralelo toman los mismos bloqueos en el mismo orden
+            cursor.execute(f"""
+                INSERT INTO "core.clientes" ({client_id[0]}tipo_doc, num_doc, nombre, ciudad, created_at, updated_at)
+                SELECT DISTINCT ON (tipo_doc, num_doc) {client_id[1]}tipo_doc, num_doc, nombre, ciudad, now(), now()
+                FROM {STAGING_TABLE}
+                ORDER BY tipo_doc, num_doc, posicion
+                ON CONFLICT (tipo_doc, num_doc) DO NOTHING
+            """)
+            clientes = cursor.rowcount
+            cursor.execute(f"""
+                WITH creditos AS (
+                    INSERT INTO "core.creditos" (
+                        {credit_id[0]}cliente_id, producto, inversion, cuotas_totales, tea,
+                        fecha_desembolso, fecha_inicio_pago, estado, clave_importacion, updated_at
+                    )
+                    SELECT {credit_id[1]}c.cliente_id, s.producto, s.inversion, s.cuotas_totales, s.tea,
+                           s.fecha_desembolso, s.fecha_inicio_pago, 'vigente', s.clave, now()
+                    FROM (
+                        SELECT *, md5(concat_ws(
+                            '|', tipo_doc, num_doc, producto, inversion, cuotas_totales, tea,
+                            fecha_desembolso, fecha_inicio_pago
+                        )) AS clave
+                        FROM {STAGING_TABLE}
+                    ) s
+                    JOIN "core.clientes" c ON c.tipo_doc = s.tipo_doc AND c.num_doc = s.num_doc
+                    -- Filas ya importadas (en esta u otra ejecución), también si su crédito se archivó
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM "{Credit.objects.archive_table}" a WHERE a.clave_importacion = s.clave
+                    )
+                    ORDER BY s.posicion
+                    ON CONFLICT (clave_importacion) WHERE clave_importacion IS NOT NULL DO NOTHING
+                    RETURNING credito_id, inversion, cuotas_totales, fecha_inicio_pago
+                ), cuotas AS (
+                    INSERT INTO "core.payment_schedule" (
+                        {schedule_id[0]}credito_id, num_cuota, fecha_vencimiento, valor_cuota, estado, updated_at
+                    )
+                    SELECT {schedule_id[1]}cr.credito_id, n, cr.fecha_inicio_pago + {INSTALLMENT_DAYS} * (n - 1),
+                           round(cr.inversion / cr.cuotas_totales, -1), 'pendiente', now()
+                    FROM creditos cr
+                    CROSS JOIN LATERAL generate_series(1, cr.cuotas_totales) AS n
+                    RETURNING 1
+                )
+                SELECT (SELECT count(*) FROM creditos), (SELECT count(*) FROM cuotas)
+            """)
+            creditos, cuotas = cursor.fetchone()
+        return {'clientes_nuevos': clientes, 'creditos': creditos, 'cuotas': cuotas, 'repetidos': len(rows) - creditos}
+
+    def _create_staging(self, cursor):
+        # Tabla temporal de la conexión: se crea una vez y se vacía en cada commit
+        cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                posicion bigint NOT NULL,
+                bucket integer NOT NULL,
+                tipo_doc varchar(2) NOT NULL,
+                num_doc varchar(20) NOT NULL,
+                nombre varchar(100) NOT NULL,
+                ciudad varchar(50),
+                producto varchar(20) NOT NULL,
+                inversion numeric(12, 2) NOT NULL,
+                cuotas_totales integer NOT NULL,
+                tea numeric(8, 6) NOT NULL,
+                fecha_desembolso date NOT NULL,
+                fecha_inicio_pago date NOT NULL
+            ) ON COMMIT DELETE ROWS
+        """)
@@ -0,0 +1,41 @@
+"""
+Entry points of CSV import processes.
+
+Pool processes are started with spawn and import this module before Django
+is configured, so everything touching models is imported inside functions.
+"""
+
+
+def setup_worker():
+    import django
+    django.setup()
+
+
+def import_credit_range(path, header, start, end, batch_rows):
+    """Validate and load the rows of one byte range in batches.
+
+    Returns the loaded counts, the rows read and the rejected rows as
+    (offset, error) pairs. A row that cannot be decoded or validated is
+    rejected on its own; the rest of the range is still loaded.
+    """
+    from .credit_csv import CreditCsvLoader, iter_lines, parse_row
+
+    loader = CreditCsvLoader()
+    totals = {'filas': 0, 'clientes_nuevos': 0, 'creditos': 0, 'cuotas': 0, 'repetidos': 0}
+    rejected = []
+    batch = []
+    for offset, line in iter_lines(path, start, end):
+        totals['filas'] += 1
+        try:
+            batch.append((offset, loader.clean(parse_row(header, line))))
+        except ValueError as e:
+            rejected.append((offset, str(e)))
+            continue
+        if len(batch) >= batch_rows:
+            for key, value in loader.load(batch).items():
+                totals[key] += value
+            batch = []
+    if batch:
+        for key, value in loader.load(batch).items():
+            totals[key] += value
+    return totals, rejected
@@ -0,0 +1,130 @@
+"""
+Settlement file matching for link, transfer and card payments.
+
+Open installments are loaded once into hash maps keyed by client document,
+credit and pending amount, so each file row is matched with dictionary
+lookups instead of queries. A matched installment is consumed from the
+index, which makes repeated amounts of the same credit fall on the next
+installment due.
+"""
+from collections import defaultdict, deque
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from ...domain.entities import Payment, PaymentSchedule
+from .. import sharding
+
+OPEN_STATES = ['pendiente', 'parcial', 'vencida']
+CENTS = Decimal('0.01')
+
+
+class UnmatchedRow(Exception):
+    """A file row that cannot be applied; motivo goes to the exceptions report"""
+
+    def __init__(self, motivo, detalle=''):
+        super().__init__(detalle or motivo)
+        self.motivo = motivo
+        self.detalle = detalle
+
+
+def parse_amount(value):
+    try:
+        monto = Decimal(str(value).strip()).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        raise UnmatchedRow('invalida', f"monto inválido: {value!r}")
+    if monto <= 0:
+        raise UnmatchedRow('invalida', f"monto debe ser positivo: {value!r}")
+    return monto
+
+
+def parse_payment_datetime(value):
+    value = (value or '').strip()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value) if value else None
+        if day is None:
+            raise UnmatchedRow('invalida', f"fecha_pago inválida: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class ReconciliationIndex:
+    """In-memory index of open installments and already registered references"""
+
+    def __init__(self, medios, chunk_size=20000):
+        self.by_credit = defaultdict(deque)
+        self.by_client = defaultdict(dict)
+        self.credit_owner = {}
+        self.references = set()
+        self._load_installments(chunk_size)
+        self._load_references(medios, chunk_size)
+
+    def _load_installments(self, chunk_size):
+        # Cada crédito está entero en su shard: sus cuotas llegan en orden de vencimiento
+        for installments in sharding.scatter(lambda alias: self._installments(alias, chunk_size)):
+            for schedule_id, credito_id, tipo_doc, num_doc, pendiente in installments:
+                monto = pendiente.quantize(CENTS)
+                self.by_credit[(tipo_doc, num_doc, credito_id, monto)].append(schedule_id)
+                self.by_client[(tipo_doc, num_doc, monto)][credito_id] = True
+                self.credit_owner[credito_id] = (tipo_doc, num_doc)
+
+    def _installments(self, alias, chunk_size):
+        installments = PaymentSchedule.objects.on_shard(alias).with_balance().select_related(
+            None
+        ).prefetch_related(None).filter(
+            estado__in=OPEN_STATES,
+            credito__estado='vigente',
+            pending_balance__gt=0
+        ).order_by('credito_id', 'fecha_vencimiento', 'num_cuota').values_list(
+            'schedule_id', 'credito_id', 'credito__cliente__tipo_doc',
+            'credito__cliente__num_doc', 'pending_balance'
+        )
+        return list(installments.iterator(chunk_size=chunk_size))
+
+    def _load_references(self, medios, chunk_size):
+        for references in sharding.scatter(lambda alias: list(
+            Payment.objects.on_shard(alias).filter(
+                medio__in=medios, referencia__isnull=False
+            ).values_list('medio', 'referencia').iterator(chunk_size=chunk_size)
+        )):
+            self.references.update(references)
+
+    def __len__(self):
+        return sum(len(schedules) for schedules in self.by_credit.values())
+
+    def match(self, medio, referencia, tipo_doc, num_doc, monto, credito_id=None):
+        """Installment for a file row as (schedule_id, credito_id); raises UnmatchedRow"""
+        if (medio, referencia) in self.references:
+            raise UnmatchedRow('duplicado', f"referencia {referencia} ya registrada")
+
+        if credito_id is not None:
+            owner = self.credit_owner.get(credito_id)
+            if owner is not None and owner != (tipo_doc, num_doc):
+                raise UnmatchedRow('credito_no_coincide', f"el crédito {credito_id} no es de {tipo_doc} {num_doc}")
+            candidates = [credito_id]
+        else:
+            candidates = list(self.by_client.get((tipo_doc, num_doc, monto), ()))
+
+        candidates = [
+            candidate for candidate in candidates
+            if self.by_credit.get((tipo_doc, num_doc, candidate, monto))
+        ]
+        if not candidates:
+            raise UnmatchedRow('sin_coincidencia', f"sin cuota abierta de {monto} para {tipo_doc} {num_doc}")
+        if len(candidates) > 1:
+            raise UnmatchedRow(
+                'ambiguo',
+                f"créditos con cuota de {monto}: {', '.join(str(c) for c in candidates)}"
+            )
+
+        credito_id = candidates[0]
+        key = (tipo_doc, num_doc, credito_id, monto)
+        schedule_id = self.by_credit[key].popleft()
+        if not self.by_credit[key]:
+            del self.by_credit[key]
+            self.by_client[(tipo_doc, num_doc, monto)].pop(credito_id, None)
+        self.references.add((medio, referencia))
+        return schedule_id, credito_id
@@ -0,0 +1,16 @@
+from django.utils.module_loading import import_string
+from .sinks import OutboxSink, FileSink, SocketSink, SINKS
+
+
+def get_sink(name: str, **options):
+    """Builds a sink by short name ('file', 'socket') or dotted class path"""
+    sink_class = SINKS.get(name) or import_string(name)
+    return sink_class(**options)
+
+
+__all__ = [
+    'OutboxSink',
+    'FileSink',
+    'SocketSink',
+    'get_sink'
+]
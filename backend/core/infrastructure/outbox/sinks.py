@@ -0,0 +1,66 @@
+"""
+Destinations for relayed outbox events.
+
+A sink receives a list of event dicts and must either deliver all of them or
+raise; the relay only advances its checkpoint after send() returns, so a
+failed batch is sent again (at-least-once, consumers dedupe on event_id).
+"""
+import json
+import socket
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OutboxSink:
+    """Base class for outbox sinks"""
+
+    name = None
+
+    def send(self, events):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def encode(self, events):
+        """Newline-delimited JSON, one event per line"""
+        return ''.join(
+            json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+            for event in events
+        ).encode('utf-8')
+
+
+class FileSink(OutboxSink):
+    """Appends events to a local JSON lines file"""
+
+    name = 'file'
+
+    def __init__(self, path='outbox_events.jsonl', **kwargs):
+        self.file = open(path, 'ab')
+
+    def send(self, events):
+        self.file.write(self.encode(events))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink(OutboxSink):
+    """Streams events as JSON lines over a TCP socket"""
+
+    name = 'socket'
+
+    def __init__(self, host='127.0.0.1', port=9000, timeout=10, **kwargs):
+        self.sock = socket.create_connection((host, int(port)), timeout=timeout)
+
+    def send(self, events):
+        self.sock.sendall(self.encode(events))
+
+    def close(self):
+        self.sock.close()
+
+
+SINKS = {
+    FileSink.name: FileSink,
+    SocketSink.name: SocketSink,
+}
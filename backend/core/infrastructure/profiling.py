@@ -0,0 +1,203 @@
+"""
+Request profiling: cProfile plus SQL timings, stored on disk.
+
+A request is profiled when a staff user (or a caller holding
+PROFILING_TOKEN) sends the X-Profile header or the _profile query flag,
+or when it falls in the PROFILING_SAMPLE_RATE sample. Each profile is a
+pstats dump (<id>.prof, readable with snakeviz or pstats) next to a JSON
+file with the request metadata, the slowest functions and the SQL run.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+_active = threading.local()
+
+
+class ProfileStore:
+    """Profiles on disk under PROFILING_DIR, newest first"""
+
+    def __init__(self, directory=None):
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return self._directory or settings.PROFILING_DIR
+
+    def save(self, profiler, metadata):
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}_{uuid.uuid4().hex[:8]}"
+        metadata = dict(metadata, id=profile_id)
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        with open(os.path.join(self.directory, f"{profile_id}.json"), 'w', encoding='utf-8') as output:
+            json.dump(metadata, output, default=str)
+        self._prune()
+        return profile_id
+
+    def list(self, limit=100):
+        names = sorted(
+            (name for name in os.listdir(self.directory) if name.endswith('.json')),
+            reverse=True
+        ) if os.path.isdir(self.directory) else []
+        profiles = []
+        for name in names[:limit]:
+            metadata = self.get(name[:-5])
+            if metadata:
+                metadata.pop('funciones', None)
+                metadata.pop('sql', None)
+                profiles.append(metadata)
+        return profiles
+
+    def get(self, profile_id):
+        path = self.path(profile_id, 'json')
+        if not path:
+            return None
+        with open(path, encoding='utf-8') as source:
+            return json.load(source)
+
+    def path(self, profile_id, extension='prof'):
+        """File of a profile, or None; the id is checked so it cannot leave the directory"""
+        if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{extension}")
+        return path if os.path.exists(path) else None
+
+    def text(self, profile_id, sort='cumulative', limit=80):
+        """pstats report of a profile as text"""
+        path = self.path(profile_id)
+        if not path:
+            return None
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def _prune(self):
+        profiles = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith('.json'))
+        excess = len(profiles) - settings.PROFILING_MAX_PROFILES
+        for profile_id in profiles[:max(excess, 0)]:
+            for extension in ('json', 'prof'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{profile_id}.{extension}"))
+                except FileNotFoundError:
+                    pass
+
+
+profile_store = ProfileStore()
+
+
+class _SqlRecorder:
+    """Database execute wrapper collecting statement timings"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+
+def _top_functions(profiler, limit):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'funcion': f"{os.path.basename(filename)}:{line}({function})",
+            'llamadas': calls,
+            'tiempo_propio_ms': round(total * 1000, 2),
+            'tiempo_acumulado_ms': round(cumulative * 1000, 2),
+        })
+    rows.sort(key=lambda row: row['tiempo_acumulado_ms'], reverse=True)
+    return rows[:limit]
+
+
+def _sql_summary(queries, limit):
+    grouped = {}
+    for sql, duration in queries:
+        entry = grouped.setdefault(sql, {'sql': sql, 'veces': 0, 'tiempo_ms': 0.0})
+        entry['veces'] += 1
+        entry['tiempo_ms'] += duration
+    top = sorted(grouped.values(), key=lambda entry: entry['tiempo_ms'], reverse=True)[:limit]
+    for entry in top:
+        entry['tiempo_ms'] = round(entry['tiempo_ms'], 2)
+    return top
+
+
+class RequestProfilingMiddleware:
+    """Profiles flagged or sampled requests and stores them in profile_store"""
+
+    HEADER = 'HTTP_X_PROFILE'
+    QUERY_FLAG = '_profile'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        # Un solo profiler por hilo: las peticiones anidadas no se perfilan
+        if trigger is None or getattr(_active, 'profiling', False):
+            return self.get_response(request)
+
+        recorder = _SqlRecorder()
+        profiler = cProfile.Profile()
+        _active.profiling = True
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            _active.profiling = False
+        duration = (time.perf_counter() - started) * 1000
+
+        user = getattr(request, 'user', None)
+        profile_id = profile_store.save(profiler, {
+            'fecha': timezone.now().isoformat(),
+            'metodo': request.method,
+            'ruta': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'estado': response.status_code,
+            'duracion_ms': round(duration, 2),
+            'origen': trigger,
+            'usuario': user.get_username() if user is not None and user.is_authenticated else None,
+            'sql_consultas': len(recorder.queries),
+            'sql_ms': round(sum(duration for _, duration in recorder.queries), 2),
+            'funciones': _top_functions(profiler, settings.PROFILING_TOP_FUNCTIONS),
+            'sql': _sql_summary(recorder.queries, settings.PROFILING_TOP_FUNCTIONS),
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    def _trigger(self, request):
+        flag = request.META.get(self.HEADER) or request.GET.get(self.QUERY_FLAG)
+        if flag and self._allowed(request, flag):
+            return 'solicitud'
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate > 0 and random.random() < rate:
+            return 'muestreo'
+        return None
+
+    def _allowed(self, request, flag):
+        token = settings.PROFILING_TOKEN
+        if token and flag == token:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
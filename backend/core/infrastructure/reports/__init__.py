@@ -0,0 +1,6 @@
+"""
+Server-side reports (cronograma, pagos, estados de cuenta) in Excel and PDF.
+
+Report processes import this package before Django is set up (see pool.py),
+so definitions and writers are imported from their modules, not from here.
+"""
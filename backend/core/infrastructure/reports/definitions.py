@@ -0,0 +1,238 @@
+"""
+Report definitions: which rows a report covers and how a range of them
+becomes one or more documents.
+
+Reports are split into units (credits or clients) so that ranges of units
+can be rendered in parallel; build() gets one range and returns a list of
+(file stem, document) pairs.
+
+Units are read from every shard; a range is built on the shards of its
+units, which hold their whole client (credits, installments and payments).
+"""
+from collections import defaultdict
+from django.utils import timezone
+from ...domain.entities import Client, Credit, PaymentSchedule, Payment
+from .. import sharding
+
+
+def _subtitle():
+    return f"Reporte generado el {timezone.now():%Y-%m-%d %H:%M} UTC"
+
+
+def _scatter_ids(query):
+    """Sorted ids of query(alias) over every shard"""
+    return sorted(unit_id for ids in sharding.scatter(lambda alias: list(query(alias))) for unit_id in ids)
+
+
+def _by_shard(ids, query):
+    """Rows of query(alias, ids) on the shard of each group of unit ids"""
+    groups = defaultdict(list)
+    for unit_id in ids:
+        groups[sharding.shard_for_id(unit_id)].append(unit_id)
+    if not groups:
+        return []
+    partials = sharding.scatter(lambda alias: list(query(alias, groups[alias])), aliases=list(groups))
+    return [row for rows in partials for row in rows]
+
+
+class ScheduleReport:
+    """Installments of the filtered credits with paid amount and balance"""
+
+    name = 'cronograma'
+    title = 'Cronograma de Pagos'
+    unit = 'credito'
+    models = [Client, Credit, PaymentSchedule, Payment]
+    headers = [
+        'Crédito ID', 'Cliente', 'N° Cuota', 'Producto', 'Fecha Vencimiento',
+        'Valor Cuota', 'Pagado', 'Saldo', 'Estado'
+    ]
+    money_columns = [5, 6, 7]
+
+    def unit_ids(self, filtros):
+        return _scatter_ids(lambda alias: self._credits(alias, filtros))
+
+    def _credits(self, alias, filtros):
+        credits = Credit.objects.on_shard(alias).select_related(None).order_by('credito_id')
+        if filtros.get('cliente_id'):
+            credits = credits.filter(cliente_id=filtros['cliente_id'])
+        if filtros.get('producto'):
+            credits = credits.filter(producto=filtros['producto'])
+        if filtros.get('estado_credito'):
+            credits = credits.filter(estado=filtros['estado_credito'])
+        return credits.values_list('credito_id', flat=True)
+
+    def build(self, ids, filtros):
+        rows = _by_shard(ids, lambda alias, ids: self._rows(alias, ids, filtros))
+        rows.sort(key=lambda row: (row[0], row[2]))
+        return [(self.name, self._document(rows))]
+
+    def _rows(self, alias, ids, filtros):
+        schedules = PaymentSchedule.objects.on_shard(alias).with_balance().select_related(
+            None
+        ).prefetch_related(None).filter(credito_id__in=ids)
+        if filtros.get('estado'):
+            schedules = schedules.filter(estado=filtros['estado'])
+        return schedules.order_by('credito_id', 'num_cuota').values_list(
+            'credito_id', 'credito__cliente__nombre', 'num_cuota', 'credito__producto',
+            'fecha_vencimiento', 'valor_cuota', 'amount_paid', 'pending_balance', 'estado'
+        )
+
+    def _document(self, rows):
+        return {
+            'title': self.title,
+            'subtitle': _subtitle(),
+            'sections': [{
+                'name': self.title,
+                'headers': self.headers,
+                'money_columns': self.money_columns,
+                'rows': rows,
+            }],
+        }
+
+
+class PaymentsReport(ScheduleReport):
+    """Payments of the filtered credits"""
+
+    name = 'pagos'
+    title = 'Reporte de Pagos'
+    headers = ['Pago ID', 'Crédito ID', 'Cliente', 'N° Cuota', 'Fecha Pago', 'Monto', 'Medio']
+    money_columns = [5]
+
+    def build(self, ids, filtros):
+        rows = _by_shard(ids, lambda alias, ids: self._rows(alias, ids, filtros))
+        rows.sort(key=lambda row: (row[1], row[4], row[0]))
+        return [(self.name, self._document(rows))]
+
+    def _rows(self, alias, ids, filtros):
+        payments = Payment.objects.on_shard(alias).select_related(None).filter(schedule__credito_id__in=ids)
+        if filtros.get('desde'):
+            payments = payments.filter(fecha_pago__date__gte=filtros['desde'])
+        if filtros.get('hasta'):
+            payments = payments.filter(fecha_pago__date__lte=filtros['hasta'])
+        if filtros.get('medio'):
+            payments = payments.filter(medio=filtros['medio'])
+        return payments.order_by('schedule__credito_id', 'fecha_pago', 'pago_id').values_list(
+            'pago_id', 'schedule__credito_id', 'schedule__credito__cliente__nombre',
+            'schedule__num_cuota', 'fecha_pago', 'monto', 'medio'
+        )
+
+
+class ClientStatementReport:
+    """One statement per client: credits with balances, installments and payments"""
+
+    name = 'estado_cuenta'
+    title = 'Estado de Cuenta'
+    unit = 'cliente'
+    models = [Client, Credit, PaymentSchedule, Payment]
+
+    def unit_ids(self, filtros):
+        return _scatter_ids(lambda alias: self._clients(alias, filtros))
+
+    def _clients(self, alias, filtros):
+        clients = Client.objects.on_shard(alias).order_by('cliente_id')
+        if filtros.get('cliente_id'):
+            clients = clients.filter(cliente_id=filtros['cliente_id'])
+        if filtros.get('ciudad'):
+            clients = clients.filter(ciudad=filtros['ciudad'])
+        return clients.values_list('cliente_id', flat=True)
+
+    def build(self, ids, filtros):
+        # Cuatro consultas por shard del rango de clientes, sin importar cuántos sean;
+        # cada cliente está entero en su shard, así que sus filas ya vienen ordenadas
+        parts = _by_shard(ids, lambda alias, ids: [self._load(alias, ids)])
+        clients = sorted((client for part in parts for client in part[0]), key=lambda client: client.cliente_id)
+        credits, schedules, payments = defaultdict(list), defaultdict(list), defaultdict(list)
+        for _, part_credits, part_schedules, part_payments in parts:
+            credits.update(part_credits)
+            schedules.update(part_schedules)
+            payments.update(part_payments)
+
+        return [
+            (f"{self.name}_{client.tipo_doc}{client.num_doc}",
+             self._document(client, credits[client.cliente_id],
+                            schedules[client.cliente_id], payments[client.cliente_id]))
+            for client in clients
+        ]
+
+    def _load(self, alias, ids):
+        clients = list(Client.objects.on_shard(alias).filter(cliente_id__in=ids))
+        credits = defaultdict(list)
+        for credit in Credit.objects.on_shard(alias).select_related(None).filter(
+            cliente_id__in=ids
+        ).order_by('credito_id'):
+            credits[credit.cliente_id].append(credit)
+        schedules = defaultdict(list)
+        for schedule in PaymentSchedule.objects.on_shard(alias).with_balance().select_related(
+            None
+        ).prefetch_related(None).filter(credito__cliente_id__in=ids).order_by('credito_id', 'num_cuota').values(
+            'credito__cliente_id', 'credito_id', 'num_cuota', 'fecha_vencimiento',
+            'valor_cuota', 'amount_paid', 'pending_balance', 'estado'
+        ):
+            schedules[schedule['credito__cliente_id']].append(schedule)
+        payments = defaultdict(list)
+        for payment in Payment.objects.on_shard(alias).select_related(None).filter(
+            schedule__credito__cliente_id__in=ids
+        ).order_by('fecha_pago', 'pago_id').values_list(
+            'schedule__credito__cliente_id', 'fecha_pago', 'schedule__credito_id',
+            'schedule__num_cuota', 'monto', 'medio'
+        ):
+            payments[payment[0]].append(payment[1:])
+        return clients, credits, schedules, payments
+
+    def _document(self, client, credits, schedules, payments):
+        paid_by_credit = defaultdict(int)
+        pending_by_credit = defaultdict(int)
+        for schedule in schedules:
+            paid_by_credit[schedule['credito_id']] += schedule['amount_paid']
+            pending_by_credit[schedule['credito_id']] += schedule['pending_balance']
+        return {
+            'title': f"{self.title} - {client.nombre}",
+            'subtitle': _subtitle(),
+            'info': [
+                f"Documento: {client.tipo_doc} {client.num_doc}",
+                f"Ciudad: {client.ciudad or '-'}",
+            ],
+            'sections': [
+                {
+                    'name': 'Créditos',
+                    'headers': ['Crédito ID', 'Producto', 'Inversión', 'Cuotas', 'Desembolso',
+                                'Estado', 'Pagado', 'Saldo Cuotas'],
+                    'money_columns': [2, 6, 7],
+                    'rows': [
+                        (c.credito_id, c.producto, c.inversion, c.cuotas_totales, c.fecha_desembolso,
+                         c.estado, paid_by_credit[c.credito_id], pending_by_credit[c.credito_id])
+                        for c in credits
+                    ],
+                },
+                {
+                    'name': 'Cuotas',
+                    'headers': ['Crédito ID', 'N° Cuota', 'Vencimiento', 'Valor Cuota', 'Pagado',
+                                'Saldo', 'Estado'],
+                    'money_columns': [3, 4, 5],
+                    'rows': [
+                        (s['credito_id'], s['num_cuota'], s['fecha_vencimiento'], s['valor_cuota'],
+                         s['amount_paid'], s['pending_balance'], s['estado'])
+                        for s in schedules
+                    ],
+                },
+                {
+                    'name': 'Pagos',
+                    'headers': ['Fecha', 'Crédito ID', 'N° Cuota', 'Monto', 'Medio'],
+                    'money_columns': [3],
+                    'rows': payments,
+                },
+            ],
+        }
+
+
+REPORTS = {
+    report.name: report
+    for report in [ScheduleReport(), PaymentsReport(), ClientStatementReport()]
+}
+
+
+def get_report(name: str):
+    try:
+        return REPORTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown report: {name}. Available: {', '.join(REPORTS)}")
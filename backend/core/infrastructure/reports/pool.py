@@ -0,0 +1,25 @@
+"""
+Entry points of report rendering processes.
+
+Pool processes are started with spawn and import this module before Django
+is configured, so everything touching models is imported inside functions.
+"""
+import os
+
+
+def setup_worker():
+    import django
+    django.setup()
+
+
+def render_part(report_name, file_format, filtros, ids, output_dir, part):
+    """Render one range of units; returns the paths written"""
+    from .definitions import REPORTS
+    from .renderers import WRITERS
+
+    paths = []
+    for stem, document in REPORTS[report_name].build(ids, filtros):
+        path = os.path.join(output_dir, f"{part:04d}_{stem}.{file_format}")
+        WRITERS[file_format](path, document)
+        paths.append(path)
+    return paths
@@ -0,0 +1,128 @@
+"""
+Excel and PDF writers for report documents.
+
+A document is a dict with a title, subtitle, optional info lines and a list
+of sections, each one a table (name, headers, rows). Numbers stay numeric in
+Excel and are formatted as pesos in PDF.
+"""
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import LongTable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, TableStyle
+
+RODA_YELLOW = 'EBFF00'
+RODA_BLACK = '0C0D0D'
+RODA_GRAY = '6B7280'
+
+
+def _format_cell(value, money):
+    if value is None:
+        return ''
+    if money and isinstance(value, (int, float, Decimal)):
+        return f"${value:,.0f}".replace(',', '.')
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _excel_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel no maneja zonas horarias: se escribe en UTC
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def write_xlsx(path, document):
+    """Write the document as a workbook with one sheet per section"""
+    workbook = Workbook(write_only=True)
+    header_font = Font(bold=True, color=RODA_BLACK)
+    header_fill = PatternFill('solid', fgColor=RODA_YELLOW)
+
+    for section in document['sections']:
+        sheet = workbook.create_sheet(section['name'][:31])
+        money = set(section.get('money_columns', []))
+        for index in range(len(section['headers'])):
+            sheet.column_dimensions[get_column_letter(index + 1)].width = 18 if index in money else 15
+
+        sheet.append([document['title']])
+        sheet.append([document.get('subtitle', '')])
+        for line in document.get('info', []):
+            sheet.append([line])
+        sheet.append([])
+
+        header_row = []
+        for header in section['headers']:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            header_row.append(cell)
+        sheet.append(header_row)
+
+        for row in section['rows']:
+            sheet.append([_excel_value(value) for value in row])
+    workbook.save(path)
+
+
+def write_pdf(path, document):
+    """Write the document as a landscape A4 PDF, one table per section"""
+    styles = getSampleStyleSheet()
+    story = [
+        Paragraph(escape(document['title']), styles['Title']),
+        Paragraph(escape(document.get('subtitle', '')), styles['Normal']),
+    ]
+    for line in document.get('info', []):
+        story.append(Paragraph(escape(line), styles['Normal']))
+    story.append(Spacer(1, 6 * mm))
+
+    for position, section in enumerate(document['sections']):
+        if position and section.get('page_break'):
+            story.append(PageBreak())
+        story.append(Paragraph(escape(section['name']), styles['Heading2']))
+        money = set(section.get('money_columns', []))
+        data = [section['headers']] + [
+            [_format_cell(value, index in money) for index, value in enumerate(row)]
+            for row in section['rows']
+        ]
+        if len(data) == 1:
+            story.append(Paragraph('Sin registros', styles['Normal']))
+            continue
+        table = LongTable(data, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(f'#{RODA_YELLOW}')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor(f'#{RODA_BLACK}')),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')]),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor(f'#{RODA_GRAY}')),
+        ] + [('ALIGN', (index, 1), (index, -1), 'RIGHT') for index in money]))
+        story.append(table)
+        story.append(Spacer(1, 6 * mm))
+
+    SimpleDocTemplate(
+        path,
+        pagesize=landscape(A4),
+        leftMargin=12 * mm,
+        rightMargin=12 * mm,
+        topMargin=12 * mm,
+        bottomMargin=12 * mm,
+        title=document['title'],
+    ).build(story)
+
+
+WRITERS = {
+    'xlsx': write_xlsx,
+    'pdf': write_pdf,
+}
+
@@ -1,11 +1,31 @@
 from .client_serializers import (
     ClientSerializer,
     ClientDashboardSerializer,
-    ClientSearchSerializer
+    ClientSearchSerializer,
+    Client360Serializer,
+    Credit360Serializer,
+    Installment360Serializer
 )
 from .credit_serializers import (
     CreditSerializer,
-    CreditSummarySerializer
+    CreditSummarySerializer,
+    CreditLedgerEntrySerializer,
+    CreditBalanceSerializer
+)
+from .dynamic_fields import (
+    DynamicFieldsMixin,
+    FieldSelection
+)
+from .job_serializers import (
+    JobSerializer,
+    JobCreateSerializer,
+    ReportRequestSerializer
+)
+from .loaders import (
+    DataLoader,
+    RequestLoaders,
+    BatchedListSerializer,
+    BatchedSerializerMixin
 )
 from .payment_serializers import (
     PaymentSerializer,
@@ -18,10 +38,24 @@ __all__ = [
     'ClientSerializer',
     'ClientDashboardSerializer',
     'ClientSearchSerializer',
+    'Client360Serializer',
+    'Credit360Serializer',
+    'Installment360Serializer',
     'CreditSerializer',
     'CreditSummarySerializer',
+    'CreditLedgerEntrySerializer',
+    'CreditBalanceSerializer',
     'PaymentSerializer',
     'PaymentScheduleSerializer',
     'PaymentSummarySerializer',
-    'OverdueInterestSerializer'
+    'OverdueInterestSerializer',
+    'JobSerializer',
+    'JobCreateSerializer',
+    'ReportRequestSerializer',
+    'DynamicFieldsMixin',
+    'FieldSelection',
+    'DataLoader',
+    'RequestLoaders',
+    'BatchedListSerializer',
+    'BatchedSerializerMixin'
 ]
@@ -1,13 +1,36 @@
+from decimal import Decimal
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from ...domain.entities import Client
+from .. import sharding
+from .credit_serializers import CreditSerializer
+from .dynamic_fields import DynamicFieldsMixin
+from .loaders import BatchedListSerializer, BatchedSerializerMixin
+from .payment_serializers import PaymentScheduleSerializer
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class UniqueDocumentValidator(UniqueTogetherValidator):
+    """tipo_doc + num_doc uniqueness checked on the shard the document hashes to"""
+
+    def __init__(self):
+        super().__init__(queryset=Client.objects.all(), fields=('tipo_doc', 'num_doc'))
+
+    def filter_queryset(self, attrs, queryset, serializer):
+        instance = getattr(serializer, 'instance', None)
+        tipo_doc = attrs.get('tipo_doc', getattr(instance, 'tipo_doc', None))
+        num_doc = attrs.get('num_doc', getattr(instance, 'num_doc', None))
+        queryset = queryset.using(sharding.shard_for_document(tipo_doc, num_doc))
+        return super().filter_queryset(attrs, queryset, serializer)
+
+
+class ClientSerializer(BatchedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Client entity"""
     
     class Meta:
         model = Client
-        fields = '__all__'
+        exclude = ['change_xid', 'change_seq']
+        list_serializer_class = BatchedListSerializer
+        validators = [UniqueDocumentValidator()]
 
 
 class ClientSearchSerializer(serializers.Serializer):
@@ -33,17 +56,116 @@ class ClientDashboardSerializer(ClientSerializer):
             'cliente_id', 'tipo_doc', 'num_doc', 'nombre', 'ciudad', 'created_at',
             'total_credits', 'total_investment', 'active_credits', 'overdue_payments'
         ]
+        expandable_fields = ['total_credits', 'total_investment', 'active_credits', 'overdue_payments']
+        list_serializer_class = BatchedListSerializer
+
+    def prime(self, instances):
+        # Los créditos de todos los clientes de la lista, archivados incluidos, en una consulta por tabla
+        if self.renders('total_credits', 'total_investment', 'active_credits', 'overdue_payments'):
+            self.loaders.attach_many(instances, 'creditos', self.loaders.credit_history_by_client, back='cliente')
     
     def get_total_credits(self, obj):
-        return obj.creditos.count()
+        return len(obj.creditos.all())
     
     def get_total_investment(self, obj):
         return sum(credit.inversion for credit in obj.creditos.all())
     
     def get_active_credits(self, obj):
-        return obj.creditos.filter(estado='vigente').count()
+        return sum(1 for credit in obj.creditos.all() if credit.estado == 'vigente')
     
     def get_overdue_payments(self, obj):
-        return obj.creditos.filter(
-            payment_schedules__estado='vencida'
-        ).distinct().count()
+        # Acumulado del crédito: cuotas en estado vencida
+        return sum(1 for credit in obj.creditos.all() if credit.cuotas_vencidas > 0)
+
+
+class Installment360Serializer(PaymentScheduleSerializer):
+    """Installment of a 360 credit, with balances computed from its loaded payments"""
+
+    # El crédito es el padre en la vista 360
+    credit_info = None
+    amount_paid = serializers.DecimalField(source='monto_pagado', max_digits=12, decimal_places=2, read_only=True)
+    pending_balance = serializers.DecimalField(
+        source='saldo_pendiente', max_digits=12, decimal_places=2, read_only=True
+    )
+    days_overdue = serializers.IntegerField(source='dias_mora', read_only=True)
+    is_overdue = serializers.BooleanField(source='esta_vencida', read_only=True)
+
+    class Meta(PaymentScheduleSerializer.Meta):
+        fields = [name for name in PaymentScheduleSerializer.Meta.fields if name not in ('credito', 'credit_info')]
+        expandable_fields = ['payments']
+        # En la vista 360 los pagos van por defecto
+        expand_only_fields = []
+
+    def prime(self, instances):
+        # Los saldos se calculan con los pagos: se cargan aunque no se rendericen
+        self.prime_nested('payments', self.loaders.attach_many(
+            instances, 'pagos', self.loaders.payments_by_schedule, back='schedule'
+        ))
+
+
+class Credit360Serializer(CreditSerializer):
+    """Credit with its installments (and their payments) for the client 360 view"""
+
+    cronograma = Installment360Serializer(source='payment_schedules', many=True, read_only=True)
+    archivado = serializers.SerializerMethodField()
+
+    class Meta(CreditSerializer.Meta):
+        fields = CreditSerializer.Meta.fields + ['archivado', 'cronograma']
+        expandable_fields = CreditSerializer.Meta.expandable_fields + ['cronograma']
+
+    def prime(self, instances):
+        super().prime(instances)
+        if self.renders('cronograma'):
+            self.prime_nested('cronograma', self.loaders.attach_many(
+                instances, 'payment_schedules', self.loaders.schedules_by_credit, back='credito'
+            ))
+
+    def get_archivado(self, obj):
+        # Las filas leídas del archivo traen archivado_at
+        return 'archivado_at' in obj.__dict__
+
+
+class Client360Serializer(ClientSerializer):
+    """Client with its credits, their installments and payments, for the client 360 view.
+
+    Every level is resolved through the request loaders: one query for the
+    credits, one for all their installments and one for all their payments,
+    plus one for the archived credits (and, when there are any, one for their
+    installments and one for their payments).
+    """
+
+    creditos = Credit360Serializer(many=True, read_only=True)
+    resumen = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Client
+        fields = ['cliente_id', 'tipo_doc', 'num_doc', 'nombre', 'ciudad', 'created_at', 'resumen', 'creditos']
+        expandable_fields = ['resumen', 'creditos']
+        list_serializer_class = BatchedListSerializer
+
+    def prime(self, instances):
+        if self.renders('creditos', 'resumen'):
+            self.prime_nested('creditos', self.loaders.attach_many(
+                instances, 'creditos', self.loaders.credit_history_by_client, back='cliente'
+            ))
+
+    def get_resumen(self, obj):
+        # Desde los acumulados de los créditos ya cargados: no consulta cuotas
+        creditos = obj.creditos.all()
+        pagado = sum((credit.total_pagado for credit in creditos), Decimal('0.00'))
+        programado = sum((credit.valor_programado for credit in creditos), Decimal('0.00'))
+        return {
+            'creditos': len(creditos),
+            'creditos_vigentes': sum(1 for credit in creditos if credit.estado == 'vigente'),
+            'inversion_total': float(sum((credit.inversion for credit in creditos), Decimal('0.00'))),
+            'cuotas_pagadas': sum(credit.cuotas_pagadas for credit in creditos),
+            'cuotas_pendientes': sum(credit.cuotas_pendientes for credit in creditos),
+            'cuotas_vencidas': sum(credit.cuotas_vencidas for credit in creditos),
+            'monto_pagado': float(pagado),
+            'monto_pendiente': max(float(sum((credit.saldo_pendiente for credit in creditos), Decimal('0.00'))), 0),
+            'porcentaje_pagado': float(pagado / programado * 100) if programado > 0 else 0,
+            'ultima_fecha_pago': max(
+                (credit.fecha_ultimo_pago for credit in creditos if credit.fecha_ultimo_pago), default=None
+            ),
+            'estado_general': 'en_mora' if any(credit.cuotas_vencidas for credit in creditos) else 'al_dia',
+        }
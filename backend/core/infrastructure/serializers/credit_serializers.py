@@ -1,8 +1,10 @@
 from rest_framework import serializers
-from ...domain.entities import Credit
+from ...domain.entities import Credit, CreditLedgerEntry
+from .dynamic_fields import DynamicFieldsMixin
+from .loaders import BatchedListSerializer, BatchedSerializerMixin
 
 
-class CreditSerializer(serializers.ModelSerializer):
+class CreditSerializer(BatchedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Credit entity"""
     
     client_name = serializers.CharField(source='cliente.nombre', read_only=True)
@@ -16,40 +18,54 @@ class CreditSerializer(serializers.ModelSerializer):
             'cuotas_totales', 'tea', 'fecha_desembolso', 
             'fecha_inicio_pago', 'estado', 'installment_value', 'resumen'
         ]
+        expandable_fields = ['resumen']
+        list_serializer_class = BatchedListSerializer
+
+    def prime(self, instances):
+        if self.renders('client_name'):
+            self.loaders.attach(instances, 'cliente', self.loaders.clients)
 
     def get_resumen(self, obj):
-        # Import lazily to avoid circulars
-        from ...domain.entities import PaymentSchedule, Payment
-        schedules = PaymentSchedule.objects.filter(credito=obj)
-        total_schedules = schedules.count()
-        # Conteos por estado
-        pagadas = schedules.filter(estado='pagada').count()
-        vencidas = schedules.filter(estado='vencida').count()
-        pendientes = schedules.filter(estado__in=['pendiente', 'parcial']).count()
-        # Monto
-        monto_pagado = float(sum(s.monto_pagado for s in schedules))
-        monto_total = float(sum(s.valor_cuota for s in schedules))
-        monto_pendiente = max(monto_total - monto_pagado, 0)
-        # Pagos asociados y última fecha de pago
-        pagos_qs = Payment.objects.filter(schedule__credito=obj)
-        pagos_asociados = pagos_qs.count()
-        ultimo_pago = pagos_qs.order_by('-fecha_pago').first()
-        porcentaje_pagado = (monto_pagado / monto_total * 100) if monto_total > 0 else 0
-        # Cuotas restantes conforme a las totales del crédito
-        cuotas_restantes = max(obj.cuotas_totales - pagadas, 0)
+        # Acumulados mantenidos en el crédito: no consulta cuotas ni pagos
+        monto_pagado = float(obj.total_pagado)
+        monto_total = float(obj.valor_programado)
         return {
-            'cuotas_pagadas': pagadas,
-            'cuotas_pendientes': pendientes,
-            'cuotas_vencidas': vencidas,
-            'cuotas_restantes': cuotas_restantes,
+            'cuotas_pagadas': obj.cuotas_pagadas,
+            'cuotas_pendientes': obj.cuotas_pendientes,
+            'cuotas_vencidas': obj.cuotas_vencidas,
+            # Cuotas restantes conforme a las totales del crédito
+            'cuotas_restantes': max(obj.cuotas_totales - obj.cuotas_pagadas, 0),
             'monto_pagado': monto_pagado,
-            'monto_pendiente': monto_pendiente,
-            'porcentaje_pagado': porcentaje_pagado,
-            'pagos_asociados': pagos_asociados,
-            'ultima_fecha_pago': ultimo_pago.fecha_pago if ultimo_pago else None,
+            'monto_pendiente': max(float(obj.saldo_pendiente), 0),
+            'porcentaje_pagado': (monto_pagado / monto_total * 100) if monto_total > 0 else 0,
+            'pagos_asociados': obj.num_pagos,
+            'ultima_fecha_pago': obj.fecha_ultimo_pago,
         }
 
 
+class CreditLedgerEntrySerializer(serializers.ModelSerializer):
+    """Serializer for credit ledger entries"""
+
+    class Meta:
+        model = CreditLedgerEntry
+        fields = [
+            'entry_id', 'credito', 'tipo', 'monto', 'fecha', 'schedule_id',
+            'pago_id', 'descripcion', 'saldo', 'saldo_exigible', 'total_pagado',
+            'created_at'
+        ]
+        read_only_fields = fields
+
+
+class CreditBalanceSerializer(serializers.Serializer):
+    """Serializer for ledger balances of a credit"""
+
+    credito_id = serializers.IntegerField()
+    fecha = serializers.DateField()
+    saldo = serializers.DecimalField(max_digits=14, decimal_places=2)
+    saldo_exigible = serializers.DecimalField(max_digits=14, decimal_places=2)
+    total_pagado = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
 class CreditSummarySerializer(serializers.Serializer):
     """Serializer for credit financial summary"""
     
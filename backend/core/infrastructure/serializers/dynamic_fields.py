@@ -0,0 +1,129 @@
+"""
+Sparse fieldsets for API serializers.
+
+Query parameters (comma separated, dotted paths address nested serializers):
+- fields:  render only these fields, e.g. ``?fields=schedule_id,credit_info.producto``
+- exclude: drop these fields, e.g. ``?exclude=payments,credit_info.resumen``
+- expand:  when present, fields listed in ``Meta.expandable_fields`` are only
+  rendered if named here, e.g. ``?expand=credit_info``. Without it every
+  field renders as before.
+
+Fields listed in ``Meta.expand_only_fields`` are opt-in: they render only
+when named in expand (or fields), e.g. ``?expand=payments``, so adding one
+leaves the default payload unchanged.
+
+Fields are pruned before serialization, so method fields and nested
+serializers that were not requested never run their queries.
+"""
+
+
+def _parse_paths(raw):
+    """Turns 'a,b.c,b.d' into {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in (raw or '').split(','):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def _get_node(tree, path):
+    node = tree
+    for part in path:
+        if part not in node:
+            return None
+        node = node[part]
+    return node
+
+
+class FieldSelection:
+    """Parsed fields/exclude/expand selection for one request"""
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, fields=None, exclude=None, expand=None):
+        self.fields = _parse_paths(fields)
+        self.exclude = _parse_paths(exclude)
+        self.expand = None if expand is None else _parse_paths(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        # Solo lecturas: podar campos en escrituras rompería la validación
+        if request is None or request.method not in cls.SAFE_METHODS:
+            return cls()
+        params = request.query_params
+        return cls(params.get('fields'), params.get('exclude'), params.get('expand'))
+
+    @property
+    def is_empty(self):
+        return not self.fields and not self.exclude and self.expand is None
+
+    def allows(self, path, name, expandable=False, expand_only=False):
+        """Whether field `name` of the serializer found at `path` is rendered"""
+        requested = _get_node(self.fields, path)
+        if requested and name not in requested:
+            return False
+
+        excluded = _get_node(self.exclude, path)
+        if excluded and name in excluded and not excluded[name]:
+            return False
+
+        if expand_only or (expandable and self.expand is not None):
+            expanded = _get_node(self.expand or {}, path) or {}
+            if name not in expanded and not (requested and name in requested):
+                return False
+        return True
+
+    def includes(self, dotted_path, serializer_class):
+        """Checks a dotted field path against a serializer class.
+
+        Lets views decide which relations to select/prefetch before
+        the serializer is instantiated.
+        """
+        path = []
+        for name in dotted_path.split('.'):
+            meta = getattr(serializer_class, 'Meta', None)
+            expandable = name in getattr(meta, 'expandable_fields', ())
+            expand_only = name in getattr(meta, 'expand_only_fields', ())
+            if not self.allows(path, name, expandable, expand_only):
+                return False
+            field = getattr(serializer_class, '_declared_fields', {}).get(name)
+            serializer_class = type(getattr(field, 'child', field))
+            path.append(name)
+        return True
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin that prunes fields according to the request's FieldSelection"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.get_field_selection()
+        expand_only = getattr(self.Meta, 'expand_only_fields', ())
+        if selection.is_empty and not expand_only:
+            return fields
+
+        path = self._get_field_path()
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+        for name in list(fields):
+            if not selection.allows(path, name, name in expandable, name in expand_only):
+                fields.pop(name)
+        return fields
+
+    def get_field_selection(self):
+        """Parses the selection once per root serializer and shares it via context"""
+        context = self.context
+        if 'field_selection' not in context:
+            context['field_selection'] = FieldSelection.from_request(context.get('request'))
+        return context['field_selection']
+
+    def _get_field_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+from ...domain.entities import Job
+from ..reports.definitions import REPORTS
+from ..reports.renderers import WRITERS
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status"""
+
+    class Meta:
+        model = Job
+        fields = [
+            'job_id', 'tipo', 'params', 'estado', 'prioridad', 'intentos',
+            'max_intentos', 'run_after', 'progreso', 'mensaje', 'resultado',
+            'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """Serializer for enqueuing a background job"""
+
+    tipo = serializers.CharField(max_length=50)
+    params = serializers.DictField(required=False, default=dict)
+    prioridad = serializers.IntegerField(required=False, default=0, min_value=-100, max_value=100)
+    max_intentos = serializers.IntegerField(required=False, default=3, min_value=1, max_value=10)
+
+
+class ReportRequestSerializer(serializers.Serializer):
+    """Serializer for requesting a server-side report"""
+
+    tipo = serializers.ChoiceField(choices=list(REPORTS))
+    formato = serializers.ChoiceField(choices=list(WRITERS), default='xlsx')
+    filtros = serializers.DictField(child=serializers.CharField(allow_blank=True), required=False, default=dict)
@@ -0,0 +1,263 @@
+"""
+Per-request dataloaders for nested API payloads.
+
+Nested serializers (client -> credits -> installments -> payments) resolve
+their relations through the loaders of the request instead of one query per
+object. A list serializer primes the loaders with every instance before
+rendering any, so the keys of a whole level are fetched together: one query
+per entity type (and shard), whatever the number of parents. Loading a level
+queues the keys of the next one, so a level spread over several nested lists
+(the installments of each credit) is still fetched in one batch.
+
+Loaded rows fill Django's own relation and prefetch caches, so serializer
+fields, ``obj.pagos.all()`` and model properties such as
+``PaymentSchedule.monto_pagado`` read them without querying. Results are
+cached for the rest of the request.
+
+``credit_history_by_client`` also reads the archive (archive_credits): one
+more query per shard for the archived credits, and the installments and
+payments of the archived ones come from the archive tables too.
+"""
+from collections import defaultdict
+from rest_framework import serializers
+from django.db import models
+from ...domain.entities import Client, Credit, Payment, PaymentSchedule
+from .. import sharding
+
+
+class DataLoader:
+    """Batches loads by key: queued keys are fetched together on the first load that misses the cache"""
+
+    def __init__(self, batch_load, many=False):
+        # batch_load(keys) -> {key: value}; with many, each value is a list
+        self.batch_load = batch_load
+        self.many = many
+        self.cache = {}
+        self.pending = set()
+        self.batches = 0
+
+    def prime(self, keys):
+        """Queue keys for the next batch without fetching them"""
+        self.pending.update(key for key in keys if key is not None and key not in self.cache)
+
+    def add(self, key, value):
+        """Cache a value already at hand (loaded by another loader)"""
+        self.cache.setdefault(key, value)
+        self.pending.discard(key)
+
+    def load(self, key):
+        if key not in self.cache:
+            self.pending.add(key)
+            self.dispatch()
+        return self.cache[key]
+
+    def load_many(self, keys):
+        keys = list(keys)
+        self.prime(keys)
+        return [self.load(key) for key in keys]
+
+    def dispatch(self):
+        keys, self.pending = sorted(self.pending), set()
+        if not keys:
+            return
+        self.batches += 1
+        found = self.batch_load(keys)
+        for key in keys:
+            self.cache[key] = found.get(key, [] if self.many else None)
+
+
+class RequestLoaders:
+    """The loaders of one request, keyed by cliente_id, credito_id and schedule_id"""
+
+    def __init__(self):
+        self.clients = DataLoader(self._clients)
+        self.credits = DataLoader(self._credits)
+        self.credits_by_client = DataLoader(self._credits_by_client, many=True)
+        self.credit_history_by_client = DataLoader(self._credit_history_by_client, many=True)
+        self.schedules = DataLoader(self._schedules)
+        self.schedules_by_credit = DataLoader(self._schedules_by_credit, many=True)
+        self.payments_by_schedule = DataLoader(self._payments_by_schedule, many=True)
+        # Ids archivados cargados: sus hijos se leen del archivo
+        self.archived_credits = set()
+        self.archived_schedules = set()
+
+    @classmethod
+    def for_request(cls, request):
+        """Loaders shared by every serializer of the request"""
+        if request is None:
+            return cls()
+        if not hasattr(request, '_loaders'):
+            request._loaders = cls()
+        return request._loaders
+
+    @classmethod
+    def from_context(cls, context):
+        if 'loaders' not in context:
+            context['loaders'] = cls.for_request(context.get('request'))
+        return context['loaders']
+
+    def attach(self, instances, field, loader):
+        """Fill the `field` foreign key cache of instances that lack it from `loader`; related objects or None"""
+        if not instances:
+            return []
+        descriptor = getattr(type(instances[0]), field)
+        missing = [obj for obj in instances if not descriptor.is_cached(obj)]
+        related = loader.load_many(getattr(obj, descriptor.field.attname) for obj in missing)
+        for obj, value in zip(missing, related):
+            if value is not None:
+                setattr(obj, field, value)
+        return [getattr(obj, field) if descriptor.is_cached(obj) else None for obj in instances]
+
+    def attach_many(self, instances, related_name, loader, back=None):
+        """Fill the `related_name` prefetch cache of instances that lack it from `loader`; all the children.
+
+        Children get `back` (their foreign key to the parent) set to it, as
+        prefetch_related does.
+        """
+        missing = [
+            obj for obj in instances
+            if related_name not in getattr(obj, '_prefetched_objects_cache', {})
+        ]
+        for obj, children in zip(missing, loader.load_many(obj.pk for obj in missing)):
+            cached = getattr(obj, related_name).none()
+            cached._result_cache = list(children)
+            cached._prefetch_done = True
+            obj.__dict__.setdefault('_prefetched_objects_cache', {})[related_name] = cached
+            if back:
+                for child in children:
+                    setattr(child, back, obj)
+        return [child for obj in instances for child in getattr(obj, related_name).all()]
+
+    def _fetch(self, keys, build):
+        """Rows of build(alias, keys) on the shard of each group of keys"""
+        if not keys:
+            return []
+        groups = defaultdict(list)
+        for key in keys:
+            groups[sharding.shard_for_id(key)].append(key)
+        partials = sharding.scatter(lambda alias: list(build(alias, groups[alias])), aliases=list(groups))
+        return [row for rows in partials for row in rows]
+
+    def _archived(self, manager, column, keys):
+        """Archived rows whose `column` is in keys, from the shard of each key"""
+        return self._fetch(keys, lambda alias, ids: manager.archived(alias, column, ids, related=False))
+
+    def _split(self, keys, archived):
+        """(hot keys, archived keys)"""
+        return [key for key in keys if key not in archived], [key for key in keys if key in archived]
+
+    def _group(self, rows, key):
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[getattr(row, key)].append(row)
+        return grouped
+
+    def _clients(self, keys):
+        rows = self._fetch(keys, lambda alias, ids: Client.objects.on_shard(alias).filter(cliente_id__in=ids))
+        return {client.cliente_id: client for client in rows}
+
+    def _credits(self, keys):
+        rows = self._fetch(
+            keys, lambda alias, ids: Credit.objects.on_shard(alias).select_related(None).filter(credito_id__in=ids)
+        )
+        self._loaded_credits(rows)
+        return {credit.credito_id: credit for credit in rows}
+
+    def _credits_by_client(self, keys):
+        rows = self._fetch(
+            keys,
+            lambda alias, ids: Credit.objects.on_shard(alias).select_related(None).filter(
+                cliente_id__in=ids
+            ).order_by('credito_id')
+        )
+        for credit in rows:
+            self.credits.add(credit.credito_id, credit)
+        self._loaded_credits(rows)
+        return self._group(rows, 'cliente_id')
+
+    def _credit_history_by_client(self, keys):
+        hot = self.credits_by_client.load_many(keys)
+        archived = self._archived(Credit.objects, 'cliente_id', keys)
+        for credit in archived:
+            self.archived_credits.add(credit.credito_id)
+            self.credits.add(credit.credito_id, credit)
+        self._loaded_credits(archived)
+        rows = sorted([credit for credits in hot for credit in credits] + archived, key=lambda credit: credit.credito_id)
+        return self._group(rows, 'cliente_id')
+
+    def _loaded_credits(self, rows):
+        # Sus cuotas se piden juntas si algún crédito las necesita
+        self.schedules_by_credit.prime(credit.credito_id for credit in rows)
+
+    def _schedules(self, keys):
+        rows = self._fetch(
+            keys,
+            lambda alias, ids: PaymentSchedule.objects.on_shard(alias).select_related(None).prefetch_related(
+                None
+            ).filter(schedule_id__in=ids)
+        )
+        self.payments_by_schedule.prime(schedule.schedule_id for schedule in rows)
+        return {schedule.schedule_id: schedule for schedule in rows}
+
+    def _schedules_by_credit(self, keys):
+        hot, archived = self._split(keys, self.archived_credits)
+        rows = self._fetch(
+            hot,
+            lambda alias, ids: PaymentSchedule.objects.on_shard(alias).select_related(None).prefetch_related(
+                None
+            ).filter(credito_id__in=ids).order_by('credito_id', 'num_cuota')
+        )
+        archived = self._archived(PaymentSchedule.objects, 'credito_id', archived)
+        self.archived_schedules.update(schedule.schedule_id for schedule in archived)
+        rows += sorted(archived, key=lambda schedule: (schedule.credito_id, schedule.num_cuota))
+        for schedule in rows:
+            self.schedules.add(schedule.schedule_id, schedule)
+        self.payments_by_schedule.prime(schedule.schedule_id for schedule in rows)
+        return self._group(rows, 'credito_id')
+
+    def _payments_by_schedule(self, keys):
+        hot, archived = self._split(keys, self.archived_schedules)
+        rows = self._fetch(
+            hot,
+            lambda alias, ids: Payment.objects.on_shard(alias).filter(schedule_id__in=ids).order_by('pago_id')
+        )
+        return self._group(rows + self._archived(Payment.objects, 'schedule_id', archived), 'schedule_id')
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    """List serializer that lets its child prime the request loaders with every item before rendering"""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        self.child.prime(items)
+        return super().to_representation(items)
+
+
+class BatchedSerializerMixin:
+    """Serializer mixin for relations resolved through the request loaders.
+
+    Subclasses implement prime(instances) for the fields they render and set
+    Meta.list_serializer_class = BatchedListSerializer; a single instance is
+    primed on its own, which is a no-op once a parent list primed it.
+    """
+
+    @property
+    def loaders(self):
+        return RequestLoaders.from_context(self.context)
+
+    def prime(self, instances):
+        """Load the relations the rendered fields read, for all instances at once"""
+
+    def prime_nested(self, name, instances):
+        """Prime the serializer of nested field `name` with the related instances of every parent"""
+        field = self.fields.get(name)
+        if field is not None:
+            getattr(field, 'child', field).prime([obj for obj in instances if obj is not None])
+
+    def renders(self, *names):
+        """Whether any of these fields survives the request's field selection"""
+        return any(name in self.fields for name in names)
+
+    def to_representation(self, instance):
+        self.prime([instance])
+        return super().to_representation(instance)
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from ...domain.entities import Payment, PaymentSchedule
 from .credit_serializers import CreditSerializer
+from .dynamic_fields import DynamicFieldsMixin
+from .loaders import BatchedListSerializer, BatchedSerializerMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(BatchedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Payment entity"""
     
     cuota_info = serializers.SerializerMethodField()
@@ -11,8 +13,17 @@ class PaymentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Payment
-        fields = '__all__'
+        exclude = ['change_xid', 'change_seq']
         read_only_fields = ('pago_id',)
+        expandable_fields = ['cuota_info', 'credito_info']
+        list_serializer_class = BatchedListSerializer
+
+    def prime(self, instances):
+        if self.renders('cuota_info'):
+            schedules = self.loaders.attach(instances, 'schedule', self.loaders.schedules)
+            self.loaders.attach([schedule for schedule in schedules if schedule], 'credito', self.loaders.credits)
+        if self.renders('credito_info'):
+            self.loaders.attach([pago for pago in instances if pago.credito_id], 'credito', self.loaders.credits)
 
     def get_cuota_info(self, obj):
         """Información resumida de la cuota y crédito asociado para UI"""
@@ -39,11 +50,11 @@ class PaymentSerializer(serializers.ModelSerializer):
         }
 
 
-class PaymentScheduleSerializer(serializers.ModelSerializer):
+class PaymentScheduleSerializer(BatchedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for PaymentSchedule entity"""
     
     credit_info = CreditSerializer(source='credito', read_only=True)
-    payments = PaymentSerializer(many=True, read_only=True)
+    payments = PaymentSerializer(source='pagos', many=True, read_only=True)
     amount_paid = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     pending_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     days_overdue = serializers.IntegerField(read_only=True)
@@ -57,6 +68,19 @@ class PaymentScheduleSerializer(serializers.ModelSerializer):
             'pending_balance', 'days_overdue', 'is_overdue', 'payments'
         ]
         read_only_fields = ('schedule_id', 'estado', 'amount_paid', 'pending_balance', 'days_overdue', 'is_overdue')
+        expandable_fields = ['credit_info', 'payments']
+        # Solo con ?expand=payments: sin él la respuesta queda como antes
+        expand_only_fields = ['payments']
+        list_serializer_class = BatchedListSerializer
+
+    def prime(self, instances):
+        if self.renders('credit_info'):
+            self.prime_nested('credit_info', self.loaders.attach(instances, 'credito', self.loaders.credits))
+        if self.renders('payments'):
+            self.prime_nested(
+                'payments',
+                self.loaders.attach_many(instances, 'pagos', self.loaders.payments_by_schedule, back='schedule')
+            )
 
 
 class PaymentSummarySerializer(serializers.Serializer):
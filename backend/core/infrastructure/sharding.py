@@ -0,0 +1,272 @@
+"""
+Horizontal sharding of clients and their credits by cliente_id hash.
+
+Clients are spread over SHARD_BUCKETS hash buckets and each bucket lives in
+one of the SHARDS databases; the bucket to shard assignment is the directory
+table ShardBucket on the default database (cached for SHARD_MAP_TTL
+seconds), so rebalancing moves whole buckets. A client's credits,
+installments, payments and ledger rows live in the client's shard.
+
+Ids of sharded rows are allocated as seq * SHARD_BUCKETS + bucket, where the
+bucket of a new client is the hash of its document and every child row
+inherits the bucket of its client. Any id therefore routes to its shard
+(bucket = id % SHARD_BUCKETS), and cliente_id % SHARD_BUCKETS is the client's
+hash bucket. seq comes from core_shard_id_seq, which every shard increments
+by SHARD_SLOTS from a different start, so ids stay unique across shards and
+survive a move.
+
+Tables filled by triggers and per-shard jobs (rollups, outbox, tombstones,
+snapshots, backfill checkpoints) exist in every shard and hold that shard's
+rows only. With sharding enabled, a query on a sharded or per-shard model
+that names no shard raises UnroutedQuery instead of quietly reading the
+default database: every path has to go through by_id, for_client, on_shard
+or scatter.
+
+With SHARDS empty every helper resolves to the default database and the app
+behaves as a single-node deployment.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ID_SEQUENCE = 'core_shard_id_seq'
+
+# Campos de los que se obtiene el bucket de una fila, en orden de preferencia
+ROUTING_FIELDS = {
+    'client': ['cliente_id'],
+    'credit': ['credito_id', 'cliente_id'],
+    'paymentschedule': ['schedule_id', 'credito_id'],
+    'payment': ['pago_id', 'credito_id', 'schedule_id'],
+    'creditledgerentry': ['credito_id'],
+    'creditledgersnapshot': ['credito_id'],
+    'clientfeatures': ['cliente_id'],
+}
+# Modelos cuyo id se asigna con core_shard_id_seq
+ID_MODELS = {'client', 'credit', 'paymentschedule', 'payment'}
+# Tablas locales de cada shard: las llenan sus triggers y trabajos, no se enrutan por id
+LOCAL_MODELS = {
+    'collectiondailyrollup', 'outboxevent', 'outboxcheckpoint', 'synctombstone',
+    'portfoliosnapshotrun', 'backfillcheckpoint',
+}
+
+
+class ShardUnavailable(Exception):
+    """The bucket is being moved between shards and does not accept writes"""
+
+
+class UnroutedQuery(Exception):
+    """A query on a sharded model that names no shard: it would only see the default database"""
+
+
+def enabled():
+    return bool(settings.SHARDS)
+
+
+def shards():
+    return list(settings.SHARDS) if enabled() else [DEFAULT_DB_ALIAS]
+
+
+def bucket_for_document(tipo_doc, num_doc):
+    """Hash bucket of a client identified by its document"""
+    digest = hashlib.md5(f"{tipo_doc}:{num_doc}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % settings.SHARD_BUCKETS
+
+
+def bucket_of(object_id):
+    return int(object_id) % settings.SHARD_BUCKETS
+
+
+def default_shard(bucket):
+    """Shard of a bucket that has no directory row yet"""
+    return settings.SHARDS[bucket % len(settings.SHARDS)]
+
+
+class ShardMap:
+    """Bucket to shard directory, reloaded from ShardBucket every SHARD_MAP_TTL seconds"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.moving = set()
+        self.loaded_at = None
+
+    def _load(self):
+        from ..models import ShardBucket
+
+        rows = ShardBucket.objects.using(DEFAULT_DB_ALIAS).values_list('bucket', 'shard', 'estado')
+        self.buckets = {bucket: shard for bucket, shard, _ in rows}
+        self.moving = {bucket for bucket, _, estado in rows if estado == ShardBucket.MOVING}
+        self.loaded_at = time.monotonic()
+
+    def _fresh(self):
+        with self.lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= settings.SHARD_MAP_TTL:
+                self._load()
+
+    def refresh(self):
+        with self.lock:
+            self._load()
+
+    def shard(self, bucket):
+        self._fresh()
+        return self.buckets.get(bucket) or default_shard(bucket)
+
+    def writable_shard(self, bucket):
+        self._fresh()
+        if bucket in self.moving:
+            raise ShardUnavailable(f"Bucket {bucket} is being moved between shards, retry shortly")
+        return self.buckets.get(bucket) or default_shard(bucket)
+
+    def assignment(self):
+        """Shard of every bucket"""
+        self._fresh()
+        return {bucket: self.buckets.get(bucket) or default_shard(bucket) for bucket in range(settings.SHARD_BUCKETS)}
+
+
+shard_map = ShardMap()
+
+
+def shard_for_id(object_id, write=False):
+    """Shard holding the row with this sharded id (any of the sharded models)"""
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    bucket = bucket_of(object_id)
+    return shard_map.writable_shard(bucket) if write else shard_map.shard(bucket)
+
+
+shard_for_client = shard_for_id
+
+
+def shard_for_document(tipo_doc, num_doc, write=False):
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    bucket = bucket_for_document(tipo_doc, num_doc)
+    return shard_map.writable_shard(bucket) if write else shard_map.shard(bucket)
+
+
+def bucket_for_instance(instance):
+    """Bucket of a model instance, from its id or the id of its parent"""
+    for field in ROUTING_FIELDS[instance._meta.model_name]:
+        value = getattr(instance, field, None)
+        if value is not None:
+            return bucket_of(value)
+    if instance._meta.model_name == 'client' and instance.num_doc:
+        return bucket_for_document(instance.tipo_doc, instance.num_doc)
+    raise ValueError(f"Cannot route {instance._meta.object_name} without its parent id")
+
+
+def shard_for_instance(instance, write=False):
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    bucket = bucket_for_instance(instance)
+    return shard_map.writable_shard(bucket) if write else shard_map.shard(bucket)
+
+
+def allocate_ids(alias, bucket, count=1):
+    """`count` new sharded ids in `bucket`, drawn from the sequence of shard `alias`"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f"SELECT nextval('{ID_SEQUENCE}') FROM generate_series(1, %s)", [count])
+        return [seq * settings.SHARD_BUCKETS + bucket for seq, in cursor.fetchall()]
+
+
+def assign_ids(alias, instances):
+    """Give every instance without pk a sharded id allocated in `alias`"""
+    pending = {}
+    for instance in instances:
+        if instance.pk is None:
+            pending.setdefault(bucket_for_instance(instance), []).append(instance)
+    for bucket, group in pending.items():
+        for instance, object_id in zip(group, allocate_ids(alias, bucket, len(group))):
+            instance.pk = object_id
+
+
+def assign_id(sender, instance, raw=False, using=None, **kwargs):
+    """pre_save receiver: sharded id for new rows of sharded models"""
+    if raw or not enabled() or instance.pk is not None or sender._meta.model_name not in ID_MODELS:
+        return
+    if sender._meta.app_label != 'core':
+        return
+    assign_ids(using or shard_for_instance(instance, write=True), [instance])
+
+
+def scatter(func, aliases=None):
+    """Run func(alias) on every shard in parallel; results in shard order"""
+    aliases = aliases or shards()
+    if len(aliases) == 1:
+        return [func(aliases[0])]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            # Cada hilo abre sus propias conexiones
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(len(aliases), settings.SHARD_SCATTER_THREADS)) as pool:
+        return list(pool.map(run, aliases))
+
+
+def setup_shard(alias):
+    """Configure the id sequence of a shard: start at its slot, step SHARD_SLOTS; returns the slot"""
+    slot = settings.SHARDS.index(alias)
+    if slot >= settings.SHARD_SLOTS:
+        raise ValueError(f"Shard {alias} is in slot {slot}; SHARD_SLOTS allows {settings.SHARD_SLOTS}")
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT increment_by, last_value FROM pg_sequences WHERE sequencename = %s", [ID_SEQUENCE])
+        increment, last_value = cursor.fetchone()
+        if last_value is None:
+            cursor.execute(
+                f"ALTER SEQUENCE {ID_SEQUENCE} INCREMENT BY %s MINVALUE 1 START WITH %s RESTART WITH %s",
+                [settings.SHARD_SLOTS, slot + 1, slot + 1]
+            )
+        elif increment != settings.SHARD_SLOTS or (last_value - 1) % settings.SHARD_SLOTS != slot:
+            raise ValueError(f"Sequence {ID_SEQUENCE} of shard {alias} is already used with another slot")
+    return slot
+
+
+class ShardRouter:
+    """Routes sharded models by instance; unsharded models use default.
+
+    Queries on sharded and per-shard models without an instance to route by
+    raise UnroutedQuery (see the module docstring).
+    """
+
+    def _route(self, model, hints, write):
+        if not enabled() or model._meta.app_label != 'core':
+            return None
+        name = model._meta.model_name
+        if name not in ROUTING_FIELDS and name not in LOCAL_MODELS:
+            return None
+        # La instancia puede ser la del padre (client.creditos): comparte el bucket
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and (not write or name in LOCAL_MODELS):
+            return instance._state.db
+        if name in ROUTING_FIELDS and instance is not None and instance._meta.model_name in ROUTING_FIELDS:
+            try:
+                return shard_for_instance(instance, write)
+            except ValueError:
+                pass
+        raise UnroutedQuery(
+            f"Query on {model._meta.object_name} without a shard: "
+            f"use by_id, for_client, on_shard or scatter"
+        )
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints, write=False)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not enabled():
+            return None
+        db1, db2 = obj1._state.db, obj2._state.db
+        if db1 and db2:
+            return db1 == db2
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,233 @@
+"""
+In-process SQL fingerprint statistics and slow-query log.
+
+Every statement run through a Django connection is normalized into a
+fingerprint (literals and IN lists collapsed) and counted with its total and
+max time and the views that ran it. Each process keeps at most
+SQL_STATS_MAX_FINGERPRINTS entries (least recently seen are evicted) and
+periodically writes them to SQL_STATS_DIR, one file per process, so that
+the stats of every gunicorn worker, job worker and command can be merged
+when read. Statements slower than SQL_SLOW_QUERY_MS go to the
+'core.sql.slow' logger.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger('core.sql.slow')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+_current = threading.local()
+
+
+def fingerprint(sql):
+    """Statement shape with literals, placeholders and value lists collapsed"""
+    normalized = _STRING.sub('?', sql)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _IN_LIST.sub('(...)', normalized)
+    normalized = _VALUES_LIST.sub(r'\1', normalized)
+    return _SPACES.sub(' ', normalized).strip()
+
+
+def set_current_view(name):
+    _current.view = name
+
+
+def current_view():
+    return getattr(_current, 'view', None) or 'fuera_de_peticion'
+
+
+class SqlStatsCollector:
+    """Per-process fingerprint table; installed as a connection execute wrapper"""
+
+    MAX_VIEWS = 10
+    FINGERPRINT_CACHE = 2000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = OrderedDict()
+        self._normalized = OrderedDict()
+        self._last_flush = time.monotonic()
+        self._dirty = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, (time.perf_counter() - started) * 1000)
+
+    def record(self, sql, duration_ms):
+        view = current_view()
+        with self.lock:
+            key, shape = self._fingerprint(sql)
+            entry = self.stats.pop(key, None) or {
+                'fingerprint': key, 'sql': shape, 'veces': 0,
+                'total_ms': 0.0, 'max_ms': 0.0, 'vistas': {},
+            }
+            entry['veces'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            vistas = entry['vistas']
+            if view in vistas or len(vistas) < self.MAX_VIEWS:
+                vistas[view] = vistas.get(view, 0) + 1
+            self.stats[key] = entry
+            while len(self.stats) > settings.SQL_STATS_MAX_FINGERPRINTS:
+                self.stats.popitem(last=False)
+            self._dirty = True
+            flush = time.monotonic() - self._last_flush >= settings.SQL_STATS_FLUSH_SECONDS
+
+        if duration_ms >= settings.SQL_SLOW_QUERY_MS:
+            logger.warning(
+                "%.1f ms [%s] %s: %s", duration_ms, key, view, sql[:2000]
+            )
+        if flush:
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error("No se pudo guardar las estadísticas SQL: %s", e)
+
+    def snapshot(self):
+        with self.lock:
+            return [dict(entry, vistas=dict(entry['vistas'])) for entry in self.stats.values()]
+
+    def flush(self):
+        """Write this process' table to SQL_STATS_DIR"""
+        with self.lock:
+            self._last_flush = time.monotonic()
+            if not self._dirty:
+                return
+            self._dirty = False
+        directory = settings.SQL_STATS_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{socket.gethostname()}_{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as output:
+            json.dump({'pid': os.getpid(), 'actualizado': time.time(), 'fingerprints': self.snapshot()}, output)
+        os.replace(temporary, path)
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self._dirty = False
+
+    def _fingerprint(self, sql):
+        cached = self._normalized.get(sql)
+        if cached is None:
+            shape = fingerprint(sql)
+            cached = (hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12], shape)
+            self._normalized[sql] = cached
+            if len(self._normalized) > self.FINGERPRINT_CACHE:
+                self._normalized.popitem(last=False)
+        return cached
+
+
+collector = SqlStatsCollector()
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: wrap every new connection with the collector"""
+    if settings.SQL_STATS_ENABLED and collector not in connection.execute_wrappers:
+        connection.execute_wrappers.append(collector)
+
+
+def _flush_at_exit():
+    try:
+        collector.flush()
+    except OSError:
+        pass
+
+
+atexit.register(_flush_at_exit)
+
+
+def top(limit=20, order='total_ms', directory=None):
+    """Fingerprints of every process merged, sorted by `order` (total_ms, veces, max_ms, media_ms)"""
+    if order not in ('total_ms', 'veces', 'max_ms', 'media_ms'):
+        raise ValueError(f"Invalid order: {order}. Use total_ms, veces, max_ms or media_ms")
+    directory = directory or settings.SQL_STATS_DIR
+    merged = {}
+    sources = [collector.snapshot()]
+    own = f"{socket.gethostname()}_{os.getpid()}.json"
+    expired = time.time() - settings.SQL_STATS_MAX_AGE_HOURS * 3600
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                # Procesos que ya no escriben (workers reiniciados, comandos terminados)
+                if os.path.getmtime(path) < expired:
+                    os.remove(path)
+                    continue
+                with open(path, encoding='utf-8') as source:
+                    sources.append(json.load(source)['fingerprints'])
+            except (OSError, ValueError, KeyError):
+                continue
+    for entries in sources:
+        for entry in entries:
+            current = merged.get(entry['fingerprint'])
+            if current is None:
+                merged[entry['fingerprint']] = dict(entry, vistas=dict(entry['vistas']))
+                continue
+            current['veces'] += entry['veces']
+            current['total_ms'] += entry['total_ms']
+            current['max_ms'] = max(current['max_ms'], entry['max_ms'])
+            for view, count in entry['vistas'].items():
+                current['vistas'][view] = current['vistas'].get(view, 0) + count
+
+    rows = list(merged.values())
+    for row in rows:
+        row['media_ms'] = row['total_ms'] / row['veces'] if row['veces'] else 0.0
+        for field in ('total_ms', 'max_ms', 'media_ms'):
+            row[field] = round(row[field], 2)
+    rows.sort(key=lambda row: row[order], reverse=True)
+    return rows[:limit]
+
+
+def reset(directory=None):
+    """Clear this process' table and every stored process file"""
+    collector.reset()
+    directory = directory or settings.SQL_STATS_DIR
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(directory, name))
+
+
+class SqlViewMiddleware:
+    """Tags the statements of a request with the view that runs them"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            set_current_view(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        name = match.view_name if match else None
+        actions = getattr(view_func, 'actions', None)
+        if actions:
+            # ViewSets: la misma ruta atiende varias acciones según el método
+            name = f"{name}:{actions.get(request.method.lower(), request.method.lower())}"
+        set_current_view(name or getattr(view_func, '__qualname__', None))
+        return None
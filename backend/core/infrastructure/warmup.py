@@ -0,0 +1,188 @@
+"""
+Worker warm-up: import and initialize the app before gunicorn forks.
+
+preload() imports the URLconf, views, serializers and service singletons,
+resolves the DRF settings and loads the translation catalogs, so that forked
+workers inherit them instead of paying for them on their first requests.
+prime() then runs the primers listed in WARMUP_PRIMERS; each one sends real
+requests through the WSGI handler, which exercises the lazy code paths and
+brings the rows of the day (route clients, dashboard rollups) into the
+database cache.
+"""
+import importlib
+import time
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PRIMERS = {}
+
+PRELOAD_MODULES = [
+    'rest_framework.views',
+    'rest_framework.viewsets',
+    'rest_framework.serializers',
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'core.models',
+    'core.serializers',
+    'core.services',
+    'core.application.jobs',
+    'core.views',
+]
+
+
+def primer(name):
+    """Register a function as a warm-up primer under `name`"""
+    def register(func):
+        PRIMERS[name] = func
+        return func
+    return register
+
+
+def _timed(steps, name, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    steps.append({'paso': name, 'ms': round((time.perf_counter() - started) * 1000, 2)})
+    return result
+
+
+def _load_urls():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # reverse_dict construye las tablas de reverse() de todo el URLconf
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def _load_rest_framework():
+    from rest_framework.settings import api_settings
+
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_PAGINATION_CLASS', 'DEFAULT_CONTENT_NEGOTIATION_CLASS'):
+        getattr(api_settings, name)
+
+
+def _load_translations():
+    from django.utils import translation
+
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('Not found.')
+
+
+def preload():
+    """Import and initialize everything a request needs; returns the timed steps"""
+    steps = []
+    for module in PRELOAD_MODULES:
+        _timed(steps, f"import {module}", importlib.import_module, module)
+    _timed(steps, 'urls', _load_urls)
+    _timed(steps, 'rest_framework', _load_rest_framework)
+    _timed(steps, 'traducciones', _load_translations)
+    return steps
+
+
+class InProcessRequests:
+    """Requests sent to the app in-process, timed and counted"""
+
+    def __init__(self):
+        from django.test import Client
+
+        self.client = Client(HTTP_HOST=_host(), raise_request_exception=False)
+        self.count = 0
+        self.errors = 0
+        self.first_ms = None
+
+    def get(self, path, params=None):
+        return self._send(self.client.get, path, params)
+
+    def post(self, path, data):
+        return self._send(self.client.post, path, data, 'application/json')
+
+    def _send(self, method, path, data, content_type=None):
+        started = time.perf_counter()
+        kwargs = {'content_type': content_type} if content_type else {}
+        response = method(path, data, **kwargs)
+        duration = (time.perf_counter() - started) * 1000
+        if self.first_ms is None:
+            self.first_ms = round(duration, 2)
+        self.count += 1
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+@primer('endpoints')
+def prime_endpoints(requests):
+    """First page of every list endpoint"""
+    for path in settings.WARMUP_URLS:
+        requests.get(path)
+
+
+@primer('ruta_hoy')
+def prime_route(requests):
+    """Rider screens and offline manifest for the clients with installments due today"""
+    from ..models import PaymentSchedule
+
+    hoy = timezone.localdate()
+    clientes = PaymentSchedule.objects.scatter_list(
+        lambda schedules: schedules.select_related(None).prefetch_related(None).filter(
+            fecha_vencimiento=hoy,
+            estado__in=['pendiente', 'parcial'],
+            credito__estado='vigente'
+        ).values_list('credito__cliente_id', 'credito__cliente__tipo_doc', 'credito__cliente__num_doc')
+        .distinct()[:settings.WARMUP_ROUTE_CLIENTS]
+    )[:settings.WARMUP_ROUTE_CLIENTS]
+    for cliente_id, tipo_doc, num_doc in clientes:
+        requests.get('/api/clientes/buscar_por_cedula/', {'tipo_doc': tipo_doc, 'num_doc': num_doc})
+        requests.get('/api/repartidor/estado_pago/', {'cliente_id': cliente_id})
+        requests.get('/api/repartidor/cronograma_resumido/', {'cliente_id': cliente_id})
+    if clientes:
+        requests.post('/api/repartidor/manifiesto_ruta/', {'cliente_ids': [row[0] for row in clientes]})
+
+
+@primer('recaudo')
+def prime_dashboards(requests):
+    """Collection dashboards over the default 30-day range"""
+    requests.get('/api/recaudo/serie/')
+    requests.get('/api/recaudo/serie/', {'intervalo': 'semana', 'agrupar': 'medio'})
+    requests.get('/api/recaudo/totales/')
+
+
+def prime(names=None):
+    """Run the primers in `names` (WARMUP_PRIMERS by default); returns their timings"""
+    names = settings.WARMUP_PRIMERS if names is None else names
+    unknown = [name for name in names if name not in PRIMERS]
+    if unknown:
+        raise ValueError(f"Unknown primer: {', '.join(unknown)}. Available: {', '.join(sorted(PRIMERS))}")
+    results = []
+    for name in names:
+        requests = InProcessRequests()
+        started = time.perf_counter()
+        PRIMERS[name](requests)
+        results.append({
+            'primer': name,
+            'peticiones': requests.count,
+            'errores': requests.errors,
+            'primera_ms': requests.first_ms,
+            'ms': round((time.perf_counter() - started) * 1000, 2),
+        })
+    return results
+
+
+def warm_up(primers=None):
+    """preload() plus prime(); closes the connections so none is shared after a fork"""
+    started = time.perf_counter()
+    try:
+        report = {'preload': preload(), 'primers': prime(primers)}
+    finally:
+        connections.close_all()
+    report['total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return report
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+import time
+
+from core.models import Credito
+from core.services import archive_service
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los créditos cancelados o castigados, con todas sus cuotas pagadas y sin pagos en '
+        'ARCHIVE_AFTER_DAYS días, con sus cuotas y pagos a las tablas de archivo de su shard. '
+        'Las consultas por id siguen encontrándolos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Créditos por lote (por defecto ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--dias', type=int, help='Antigüedad mínima del último pago (por defecto ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--minutos', type=float, help='Detenerse después de N minutos; la próxima ejecución continúa')
+        parser.add_argument('--simular', action='store_true', help='Solo contar los créditos a archivar por shard')
+        parser.add_argument('--restaurar', type=int, metavar='CREDITO_ID', help='Devolver un crédito archivado a las tablas activas')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            if options['restaurar']:
+                moved = archive_service.restore(options['restaurar'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"♻️ Crédito {options['restaurar']} restaurado: {moved['cuotas']} cuotas, {moved['pagos']} pagos"
+                ))
+                return
+
+            if options['simular']:
+                archivados = archive_service.archived()
+                for alias, count in archive_service.candidates(options['dias']).items():
+                    self.stdout.write(f"🔍 {alias}: {count} créditos para archivar ({archivados[alias]} ya archivados)")
+                return
+
+            results = archive_service.archive(
+                batch_size=options['lote'],
+                older_than_days=options['dias'],
+                max_seconds=options['minutos'] * 60 if options['minutos'] else None,
+                progress=self._progress,
+            )
+        except (Credito.DoesNotExist, ValueError, OperationalError) as e:
+            raise CommandError(str(e))
+
+        for alias, total in results.items():
+            self.stdout.write(
+                f"📦 {alias}: {total['creditos']} créditos, {total['cuotas']} cuotas y {total['pagos']} pagos "
+                f"archivados en {total['lotes']} lotes"
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(total['creditos'] for total in results.values())} créditos archivados en {elapsed:.2f}s"
+        ))
+
+    def _progress(self, alias, total):
+        if total['lotes'] % 10 == 0:
+            self.stdout.write(f"  {alias}: {total['creditos']} créditos, lote {total['lotes']}")
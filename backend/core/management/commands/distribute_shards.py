@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.infrastructure import sharding
+from core.services import shard_service
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los clientes de la base default (datos anteriores al sharding) con sus créditos, cuotas, '
+        'pagos, archivo, ledger y features a su shard, con ids nuevos en su bucket. Ejecutar con la '
+        'aplicación detenida, después de init_shards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, help='Clientes por lote (por defecto 1000)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(moved):
+            self.stdout.write(f"  {sum(moved.values())} clientes movidos")
+
+        try:
+            moved = shard_service.distribute_default(options['lote'], progress=progress)
+        except (ValueError, sharding.ShardUnavailable) as e:
+            raise CommandError(str(e))
+
+        for alias, count in sorted(moved.items()):
+            self.stdout.write(f"📦 {alias}: {count} clientes")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(moved.values())} clientes distribuidos en {elapsed:.2f}s; los ids cambiaron: "
+            f"los dispositivos deben sincronizar desde cero. Ejecute update_credit_ledger para los snapshots"
+        ))
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+
+from core.application.services.credit_import_service import CreditImportService
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes, créditos y cronogramas desde un CSV grande usando COPY y procesos en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV de créditos')
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=settings.IMPORTS_PROCESSES,
+            help='Procesos que leen y cargan rangos del archivo en paralelo',
+        )
+        parser.add_argument(
+            '--filas-por-lote',
+            type=int,
+            default=CreditImportService.BATCH_ROWS,
+            help='Filas por COPY y transacción',
+        )
+        parser.add_argument('--errores', help='Ruta del CSV de filas rechazadas (por defecto <archivo>.errores.csv)')
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(options['archivo']):
+            raise CommandError(f"No existe el archivo {options['archivo']}")
+        if options['procesos'] < 1:
+            raise CommandError('--procesos debe ser mayor a 0')
+
+        started = time.monotonic()
+        try:
+            resultado = CreditImportService().import_file(
+                options['archivo'],
+                processes=options['procesos'],
+                batch_rows=options['filas_por_lote'],
+                errors_path=options['errores'],
+                progress=lambda porcentaje, mensaje: self.stdout.write(f"📥 {porcentaje:.0f}% - {mensaje}"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {resultado['creditos']} créditos, {resultado['cuotas']} cuotas y "
+                f"{resultado['clientes_nuevos']} clientes nuevos de {resultado['filas']} filas "
+                f"en {time.monotonic() - started:.2f}s"
+            )
+        )
+        if resultado['repetidos']:
+            self.stdout.write(f"🔁 {resultado['repetidos']} filas ya importadas antes, omitidas")
+        if resultado['rechazadas']:
+            self.stdout.write(
+                self.style.WARNING(f"⚠️ {resultado['rechazadas']} filas rechazadas: {resultado['errores']}")
+            )
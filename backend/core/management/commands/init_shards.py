@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import shard_service
+
+
+class Command(BaseCommand):
+    help = 'Migra las bases de DB_SHARDS, configura sus secuencias de ids y llena el directorio de buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sin-migrar', action='store_true', help='No ejecutar migrate en cada base')
+
+    def handle(self, *args, **options):
+        def progress(alias, slot):
+            detalle = f"slot {slot}" if slot is not None else 'directorio'
+            self.stdout.write(f"🗄️ {alias}: {detalle}")
+
+        try:
+            shard_service.init_shards(migrate=not options['sin_migrar'], progress=progress)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for alias, buckets in shard_service.distribution().items():
+            self.stdout.write(f"   {alias}: {buckets} de {settings.SHARD_BUCKETS} buckets")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(settings.SHARDS)} shards listos"))
@@ -32,11 +32,9 @@ class Command(BaseCommand):
         )
 
     def clear_data(self):
-        """Limpia todos los datos existentes"""
-        Pago.objects.all().delete()
-        PaymentSchedule.objects.all().delete()
-        Credito.objects.all().delete()
-        Cliente.objects.all().delete()
+        """Limpia todos los datos existentes (en todos los shards)"""
+        for model in (Pago, PaymentSchedule, Credito, Cliente):
+            model.objects.scatter(lambda manager: manager.all().delete())
         self.stdout.write('🧹 Datos existentes eliminados')
 
     def load_clients(self):
@@ -55,7 +53,7 @@ class Command(BaseCommand):
 
     def load_credits(self):
         """Carga créditos de muestra"""
-        clientes = list(Cliente.objects.all())
+        clientes = Cliente.objects.scatter_list()
         productos = ['e-bike', 'e-moped']
         
         for cliente in clientes:
@@ -76,7 +74,7 @@ class Command(BaseCommand):
 
     def load_payment_schedules(self):
         """Carga cronograma de pagos"""
-        creditos = Credito.objects.all()
+        creditos = Credito.objects.scatter_list()
         
         for credito in creditos:
             valor_cuota = round(float(credito.inversion / credito.cuotas_totales), -1)
@@ -97,7 +95,7 @@ class Command(BaseCommand):
 
     def load_payments(self):
         """Carga pagos de muestra"""
-        schedules = PaymentSchedule.objects.all()
+        schedules = PaymentSchedule.objects.scatter_list()
         medios = ['app', 'efectivo', 'link']
         
         for schedule in schedules:
@@ -132,7 +130,7 @@ class Command(BaseCommand):
 
     def update_payment_states(self):
         """Actualiza estados de cuotas basado en pagos"""
-        schedules = PaymentSchedule.objects.all()
+        schedules = PaymentSchedule.objects.scatter_list()
         
         for schedule in schedules:
             monto_pagado = sum(pago.monto for pago in schedule.pagos.all())
@@ -0,0 +1,293 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+import http.client
+import json
+import random
+import threading
+import time
+
+from core.models import Cliente, Credito, PaymentSchedule
+
+
+def _percentile(values, percentile):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(percentile / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+class Recorder:
+    """Latencias y errores por endpoint de un escalón de carga"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.codes = defaultdict(Counter)
+        self.errors = Counter()
+        self.waits = []
+
+    def request(self, name, status, latency_ms):
+        with self.lock:
+            self.latencies[name].append(latency_ms)
+            self.codes[name][status] += 1
+            if status == 0 or status >= 400:
+                self.errors[name] += 1
+
+    def wait(self, wait_ms):
+        with self.lock:
+            self.waits.append(wait_ms)
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            endpoints[name] = {
+                'peticiones': len(values),
+                'errores': self.errors[name],
+                'tasa_error': self.errors[name] / len(values),
+                'codigos': {str(code): count for code, count in sorted(self.codes[name].items())},
+                'p50_ms': _percentile(values, 50),
+                'p90_ms': _percentile(values, 90),
+                'p95_ms': _percentile(values, 95),
+                'p99_ms': _percentile(values, 99),
+                'max_ms': max(values),
+            }
+        every = [value for values in self.latencies.values() for value in values]
+        total = len(every)
+        errors = sum(self.errors.values())
+        return {
+            'peticiones': total,
+            'rps': total / elapsed if elapsed else 0.0,
+            'tasa_error': errors / total if total else 0.0,
+            'p50_ms': _percentile(every, 50),
+            'p95_ms': _percentile(every, 95),
+            'p99_ms': _percentile(every, 99),
+            'espera_p95_ms': _percentile(self.waits, 95),
+            'endpoints': endpoints,
+        }
+
+
+class Client:
+    """HTTP keep-alive por hilo contra el servidor bajo prueba"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            connection = factory(self.host, self.port, timeout=self.timeout)
+            self.local.connection = connection
+        return connection
+
+    def call(self, recorder, name, method, path, params=None, body=None):
+        """Ejecuta una petición, la registra y devuelve (status, json o None)"""
+        url = f"{self.prefix}{path}" + (f"?{urlencode(params)}" if params else '')
+        headers = {'Accept': 'application/json'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        started = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request(method, url, body=payload, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.local.connection = None
+            recorder.request(name, 0, (time.perf_counter() - started) * 1000)
+            return 0, None
+        recorder.request(name, status, (time.perf_counter() - started) * 1000)
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+
+class Scenarios:
+    """Sesiones de repartidor y de back-office sobre los datos de load_sample_data"""
+
+    BACKOFFICE_WEIGHTS = [('creditos_lista', 85), ('crear_pago', 12), ('exportar_pagos', 3)]
+
+    def __init__(self, client, read_only, page_size=20):
+        self.client = client
+        self.read_only = read_only
+        self.page_size = page_size
+        # Muestras de cada shard
+        self.clients = Cliente.objects.scatter_list(
+            lambda clientes: clientes.order_by('?').values_list('tipo_doc', 'num_doc', 'cliente_id')[:10000]
+        )
+        if not self.clients:
+            raise CommandError('No hay clientes: ejecute primero load_sample_data')
+        self.pages = max(sum(Credito.objects.scatter(lambda creditos: creditos.count())) // page_size, 1)
+        # Cuotas con saldo suficiente para abonos pequeños
+        self.schedules = PaymentSchedule.objects.scatter_list(
+            lambda cuotas: cuotas.select_related(None).prefetch_related(None)
+            .annotate(pagado=Coalesce(Sum('pagos__monto'), Value(Decimal('0'))))
+            .filter(estado__in=['pendiente', 'parcial', 'vencida'], valor_cuota__gte=F('pagado') + Decimal('100000'))
+            .order_by('?').values_list('schedule_id', flat=True)[:10000]
+        )
+        operations = [
+            (name, weight) for name, weight in self.BACKOFFICE_WEIGHTS
+            if not read_only or name == 'creditos_lista'
+        ]
+        self.operations = [name for name, _ in operations]
+        self.weights = [weight for _, weight in operations]
+
+    def rider(self, recorder):
+        """Búsqueda por cédula, estado de pago y cronograma resumido del mismo cliente"""
+        tipo_doc, num_doc, cliente_id = random.choice(self.clients)
+        status, data = self.client.call(
+            recorder, 'buscar_por_cedula', 'GET', '/api/clientes/buscar_por_cedula/',
+            {'tipo_doc': tipo_doc, 'num_doc': num_doc}
+        )
+        if status == 200 and data and data.get('cliente'):
+            cliente_id = data['cliente'].get('cliente_id', cliente_id)
+        self.client.call(recorder, 'estado_pago', 'GET', '/api/repartidor/estado_pago/', {'cliente_id': cliente_id})
+        self.client.call(
+            recorder, 'cronograma_resumido', 'GET', '/api/repartidor/cronograma_resumido/', {'cliente_id': cliente_id}
+        )
+
+    def backoffice(self, recorder):
+        """Listado paginado de créditos, registro de pagos y exportaciones"""
+        operation = random.choices(self.operations, self.weights)[0]
+        if operation == 'crear_pago' and self.schedules:
+            self.client.call(
+                recorder, 'crear_pago', 'POST', '/api/pagos/',
+                body={'schedule': random.choice(self.schedules), 'monto': '1000', 'medio': 'app'}
+            )
+        elif operation == 'exportar_pagos':
+            self.client.call(recorder, 'exportar_pagos', 'POST', '/api/pagos/exportar/', body={'medio': 'app'})
+        else:
+            self.client.call(
+                recorder, 'creditos_lista', 'GET', '/api/creditos/',
+                {'page': random.randint(1, self.pages), 'page_size': self.page_size}
+            )
+
+
+class Command(BaseCommand):
+    help = 'Genera carga de repartidores y back-office contra un servidor y reporta throughput, percentiles y errores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='URL base del servidor bajo prueba')
+        parser.add_argument('--rider-rps', type=float, default=5.0, help='Sesiones de repartidor por segundo')
+        parser.add_argument('--backoffice-rps', type=float, default=1.0, help='Operaciones de back-office por segundo')
+        parser.add_argument('--duracion', type=float, default=30.0, help='Segundos por escalón')
+        parser.add_argument(
+            '--rampa',
+            default='1',
+            help='Multiplicadores de las tasas por escalón, p. ej. 1,2,4,8 para buscar el punto de saturación',
+        )
+        parser.add_argument('--concurrencia', type=int, default=50, help='Sesiones simultáneas máximas')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Timeout por petición en segundos')
+        parser.add_argument('--solo-lectura', action='store_true', help='Sin pagos ni exportaciones')
+        parser.add_argument('--p95-max', type=float, default=1000.0, help='p95 (ms) a partir del cual se considera saturado')
+        parser.add_argument('--error-max', type=float, default=0.01, help='Tasa de error a partir de la cual se considera saturado')
+        parser.add_argument('--json', help='Archivo donde guardar el resultado en JSON')
+        parser.add_argument('--seed', type=int, help='Semilla para repetir la misma secuencia')
+
+    def handle(self, *args, **options):
+        try:
+            steps = [float(step) for step in options['rampa'].split(',') if step.strip()]
+        except ValueError:
+            raise CommandError('--rampa debe ser una lista de números separados por coma')
+        if not steps or any(step <= 0 for step in steps):
+            raise CommandError('--rampa debe tener multiplicadores positivos')
+        if options['rider_rps'] <= 0 and options['backoffice_rps'] <= 0:
+            raise CommandError('Defina --rider-rps o --backoffice-rps mayor a 0')
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+
+        scenarios = Scenarios(Client(options['url'], options['timeout']), options['solo_lectura'])
+        self.stdout.write(
+            f"🎯 {options['url']}: {len(scenarios.clients)} clientes, {scenarios.pages} páginas de créditos, "
+            f"{len(scenarios.schedules)} cuotas para pagos"
+        )
+
+        results = []
+        saturation = None
+        for step in steps:
+            rates = {
+                'repartidor': options['rider_rps'] * step,
+                'backoffice': options['backoffice_rps'] * step,
+            }
+            summary = self._run_step(scenarios, rates, options['duracion'], options['concurrencia'])
+            summary['multiplicador'] = step
+            summary['tasas'] = rates
+            results.append(summary)
+            self._print_step(summary)
+
+            expected = rates['repartidor'] * 3 + rates['backoffice']
+            saturated = (
+                summary['rps'] < expected * 0.9
+                or summary['p95_ms'] > options['p95_max']
+                or summary['tasa_error'] > options['error_max']
+            )
+            if saturated and saturation is None:
+                saturation = step
+                self.stdout.write(self.style.WARNING(f"⚠️ Saturación en el escalón x{step:g}"))
+
+        if saturation is None:
+            self.stdout.write(self.style.SUCCESS('✅ Sin saturación en los escalones probados'))
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump({'escalones': results, 'saturacion': saturation}, output, indent=2)
+            self.stdout.write(f"💾 Resultado guardado en {options['json']}")
+
+    def _run_step(self, scenarios, rates, duration, concurrency):
+        """Llegadas de Poisson por mezcla durante `duration`; mide también la espera por falta de hilos"""
+        recorder = Recorder()
+        sessions = {'repartidor': scenarios.rider, 'backoffice': scenarios.backoffice}
+        started = time.perf_counter()
+        next_arrival = {
+            mix: started + random.expovariate(rate) for mix, rate in rates.items() if rate > 0
+        }
+        pool = ThreadPoolExecutor(max_workers=concurrency)
+
+        def run(session, scheduled):
+            recorder.wait((time.perf_counter() - scheduled) * 1000)
+            session(recorder)
+
+        while True:
+            mix, scheduled = min(next_arrival.items(), key=lambda item: item[1])
+            if scheduled - started >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, sessions[mix], scheduled)
+            next_arrival[mix] = scheduled + random.expovariate(rates[mix])
+
+        # Las sesiones que no alcanzaron a empezar no cuentan: solo alargarían el escalón
+        pool.shutdown(wait=True, cancel_futures=True)
+        return recorder.summary(time.perf_counter() - started)
+
+    def _print_step(self, summary):
+        rates = summary['tasas']
+        self.stdout.write(
+            f"\n📈 x{summary['multiplicador']:g} (repartidor {rates['repartidor']:.1f}/s, "
+            f"back-office {rates['backoffice']:.1f}/s): {summary['peticiones']} peticiones, "
+            f"{summary['rps']:.1f} req/s, error {summary['tasa_error']:.2%}, "
+            f"p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms, p99 {summary['p99_ms']:.0f} ms, "
+            f"espera p95 {summary['espera_p95_ms']:.0f} ms"
+        )
+        for name, endpoint in summary['endpoints'].items():
+            self.stdout.write(
+                f"   {name:<22} {endpoint['peticiones']:>6}  err {endpoint['tasa_error']:>6.2%}  "
+                f"p50 {endpoint['p50_ms']:>7.1f}  p90 {endpoint['p90_ms']:>7.1f}  "
+                f"p95 {endpoint['p95_ms']:>7.1f}  p99 {endpoint['p99_ms']:>7.1f}  max {endpoint['max_ms']:>7.1f} ms"
+            )
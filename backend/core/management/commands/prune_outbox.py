@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.application.services.outbox_relay_service import OutboxRelayService
+
+
+class Command(BaseCommand):
+    help = 'Borra los eventos del outbox que todos los consumidores ya enviaron (según sus checkpoints)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retener-horas',
+            type=float,
+            default=settings.OUTBOX_RETENTION_HOURS,
+            help='Conservar los eventos enviados de las últimas N horas (por defecto OUTBOX_RETENTION_HOURS)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OutboxRelayService.PRUNE_BATCH_SIZE,
+            help='Eventos borrados por transacción',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            borrados = OutboxRelayService().prune(options['retener_horas'], options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        for alias, eventos in borrados.items():
+            self.stdout.write(f"🗑️  {alias}: {eventos} eventos borrados")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {sum(borrados.values())} eventos borrados en {time.monotonic() - started:.2f}s"
+            )
+        )
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import report_service
+
+
+class Command(BaseCommand):
+    help = 'Borra de REPORTS_DIR los reportes en caché sin uso reciente y los menos usados sobre el tope de espacio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-horas',
+            type=float,
+            default=settings.REPORTS_MAX_AGE_HOURS,
+            help='Borrar los reportes sin descargas ni solicitudes en N horas (por defecto REPORTS_MAX_AGE_HOURS)',
+        )
+        parser.add_argument(
+            '--max-mb',
+            type=float,
+            help='Tope de la caché en MB (por defecto REPORTS_MAX_BYTES)',
+        )
+
+    def handle(self, *args, **options):
+        max_bytes = None if options['max_mb'] is None else int(options['max_mb'] * 1024 * 1024)
+        try:
+            result = report_service.prune(options['max_horas'], max_bytes)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {result['archivos']} reportes borrados ({result['bytes'] / 1024 / 1024:.1f} MB liberados)"
+            )
+        )
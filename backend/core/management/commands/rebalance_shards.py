@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.infrastructure import sharding
+from core.services import shard_service
+
+
+class Command(BaseCommand):
+    help = 'Mueve clientes entre shards (por bucket de hash) o equilibra los buckets entre todos los shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', help='cliente_id separados por coma: se mueve el bucket de cada uno')
+        parser.add_argument('--buckets', help='Buckets separados por coma')
+        parser.add_argument('--hacia', help='Shard destino de --clientes/--buckets')
+        parser.add_argument(
+            '--equilibrar',
+            action='store_true',
+            help='Reparte los buckets por igual entre DB_SHARDS (p. ej. después de agregar un shard)',
+        )
+        parser.add_argument('--max-buckets', type=int, help='Máximo de buckets a mover en esta ejecución')
+        parser.add_argument('--espera', type=float, help='Segundos de espera entre pasos (por defecto SHARD_MAP_TTL + 1)')
+        parser.add_argument('--simular', action='store_true', help='Solo muestra el plan')
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('Sharding deshabilitado: defina DB_SHARDS')
+        moves = self._plan(options)
+        if not moves:
+            self.stdout.write(self.style.SUCCESS('✅ Nada que mover'))
+            return
+
+        for bucket, source, target in moves:
+            clientes = shard_service.clients_in_bucket(bucket)
+            self.stdout.write(f"📦 bucket {bucket}: {source} → {target} ({clientes} clientes)")
+        if options['simular']:
+            return
+
+        for position, (bucket, source, target) in enumerate(moves, 1):
+            try:
+                copied = shard_service.move_bucket(bucket, target, options['espera'])
+            except (ValueError, sharding.ShardUnavailable) as e:
+                raise CommandError(str(e))
+            filas = ', '.join(f"{table} {count}" for table, count in copied.items())
+            self.stdout.write(f"   [{position}/{len(moves)}] bucket {bucket} en {target}: {filas}")
+
+        for alias, buckets in shard_service.distribution().items():
+            self.stdout.write(f"   {alias}: {buckets} de {settings.SHARD_BUCKETS} buckets")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(moves)} buckets movidos"))
+
+    def _plan(self, options):
+        if options['equilibrar']:
+            return shard_service.plan_balance(options['max_buckets'])
+        if not options['hacia'] or not (options['clientes'] or options['buckets']):
+            raise CommandError('Use --equilibrar, o --clientes/--buckets con --hacia')
+        if options['hacia'] not in settings.SHARDS:
+            raise CommandError(f"Shard desconocido: {options['hacia']}. Disponibles: {', '.join(settings.SHARDS)}")
+        try:
+            buckets = {sharding.bucket_of(value) for value in self._list(options['clientes'])}
+            buckets |= {int(value) for value in self._list(options['buckets'])}
+        except ValueError:
+            raise CommandError('--clientes y --buckets deben ser enteros separados por coma')
+        sharding.shard_map.refresh()
+        moves = [
+            (bucket, sharding.shard_map.shard(bucket), options['hacia'])
+            for bucket in sorted(buckets)
+            if sharding.shard_map.shard(bucket) != options['hacia']
+        ]
+        return moves[:options['max_buckets']] if options['max_buckets'] else moves
+
+    def _list(self, value):
+        return [item.strip() for item in (value or '').split(',') if item.strip()]
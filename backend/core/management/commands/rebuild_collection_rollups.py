@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime, timedelta
+import time
+
+from core.application.services.collection_rollup_service import CollectionRollupService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los acumulados diarios de recaudo (medio, producto, ciudad) para un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha inicial YYYY-MM-DD')
+        parser.add_argument('--hasta', help='Fecha final YYYY-MM-DD (por defecto igual a --desde)')
+        parser.add_argument(
+            '--dias-por-lote',
+            type=int,
+            default=31,
+            help='Días recalculados por transacción',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            hasta = datetime.strptime(options['hasta'] or options['desde'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        if hasta < desde:
+            raise CommandError('--hasta debe ser posterior a --desde')
+        if options['dias_por_lote'] < 1:
+            raise CommandError('--dias-por-lote debe ser mayor a 0')
+
+        rollups = CollectionRollupService()
+        started = time.monotonic()
+        total = 0
+        # Lotes cortos para no bloquear los triggers de pagos mucho tiempo
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=options['dias_por_lote'] - 1), hasta)
+            buckets = rollups.rebuild(inicio, fin)
+            total += buckets
+            self.stdout.write(f"📊 {inicio} a {fin}: {buckets} acumulados")
+            inicio = fin + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {total} acumulados recalculados en {time.monotonic() - started:.2f}s")
+        )
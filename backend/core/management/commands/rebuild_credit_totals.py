@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.infrastructure import sharding
+from core.models import Credit
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula desde cuotas y pagos los acumulados de cada crédito '
+        '(cuotas por estado, pagos, total pagado, saldo y último pago) y corrige los desfasados'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--credito', type=int, help='Recalcular solo este crédito')
+        parser.add_argument(
+            '--creditos-por-lote',
+            type=int,
+            default=5000,
+            help='Créditos recalculados por transacción',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['creditos_por_lote']
+        if batch_size < 1:
+            raise CommandError('--creditos-por-lote debe ser mayor a 0')
+
+        started = time.monotonic()
+        if options['credito']:
+            credito_id = options['credito']
+            corregidos = Credit.objects.on_shard(sharding.shard_for_id(credito_id)).refresh_totals(
+                credito_id, credito_id
+            )
+            self.stdout.write(self.style.SUCCESS(f"✅ Crédito {credito_id}: {corregidos} corregido(s)"))
+            return
+
+        total = 0
+        for alias in sharding.shards():
+            credits = Credit.objects.on_shard(alias).select_related(None).order_by('credito_id')
+            revisados = corregidos = 0
+            start = credits.values_list('credito_id', flat=True).first()
+            # Lotes cortos: cada uno bloquea sus créditos y los pagos de esos créditos esperan
+            while start is not None:
+                ids = list(credits.filter(credito_id__gte=start).values_list('credito_id', flat=True)[:batch_size + 1])
+                end = ids[batch_size - 1] if len(ids) > batch_size else ids[-1]
+                corregidos += Credit.objects.on_shard(alias).refresh_totals(start, end)
+                revisados += min(len(ids), batch_size)
+                start = ids[batch_size] if len(ids) > batch_size else None
+            self.stdout.write(f"📊 {alias}: {revisados} créditos revisados, {corregidos} corregidos")
+            total += corregidos
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {total} créditos corregidos en {time.monotonic() - started:.2f}s")
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+
+from core.application.services.reconciliation_service import ReconciliationService
+
+
+class Command(BaseCommand):
+    help = 'Concilia un archivo de liquidación (link, transfer, card) contra las cuotas abiertas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV de liquidación')
+        parser.add_argument(
+            '--medio',
+            choices=ReconciliationService.MEDIOS,
+            help='Medio de las filas que no traen la columna medio',
+        )
+        parser.add_argument(
+            '--filas-por-lote',
+            type=int,
+            default=ReconciliationService.BATCH_ROWS,
+            help='Pagos insertados por transacción',
+        )
+        parser.add_argument('--excepciones', help='Ruta del reporte de excepciones (por defecto <archivo>.excepciones.csv)')
+
+    def handle(self, *args, **options):
+        if not os.path.isfile(options['archivo']):
+            raise CommandError(f"No existe el archivo {options['archivo']}")
+        if options['filas_por_lote'] < 1:
+            raise CommandError('--filas-por-lote debe ser mayor a 0')
+
+        started = time.monotonic()
+        try:
+            resultado = ReconciliationService().reconcile_file(
+                options['archivo'],
+                options['medio'],
+                batch_rows=options['filas_por_lote'],
+                exceptions_path=options['excepciones'],
+                progress=lambda porcentaje, mensaje: self.stdout.write(f"🔎 {mensaje}"),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {resultado['conciliados']} de {resultado['filas']} filas conciliadas "
+                f"(${resultado['monto_conciliado']:,.0f}) en {time.monotonic() - started:.2f}s"
+            )
+        )
+        if resultado['excepciones']:
+            detalle = ', '.join(f"{motivo}: {total}" for motivo, total in sorted(resultado['motivos'].items()))
+            self.stdout.write(
+                self.style.WARNING(f"⚠️ {resultado['excepciones']} excepciones ({detalle}): {resultado['reporte']}")
+            )
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+import time
+
+from core.application.services.client_feature_service import ClientFeatureService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las features de pago por cliente (mora, pagos parciales, puntualidad, medios de pago)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de corte YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument(
+            '--cliente',
+            type=int,
+            action='append',
+            help='Recalcular solo este cliente (se puede repetir)',
+        )
+        parser.add_argument(
+            '--clientes-por-lote',
+            type=int,
+            default=ClientFeatureService.DEFAULT_CHUNK,
+            help='Clientes recalculados por sentencia y transacción',
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+        if options['clientes_por_lote'] < 1:
+            raise CommandError('--clientes-por-lote debe ser positivo')
+
+        started = time.monotonic()
+        escritos = ClientFeatureService().refresh(
+            options['cliente'], fecha, options['clientes_por_lote'],
+            progress=lambda alias, written: self.stdout.write(f"  {alias}: {written} clientes")
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Features de {escritos} clientes recalculadas en {time.monotonic() - started:.2f}s"
+            )
+        )
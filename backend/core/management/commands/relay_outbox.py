@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+
+from core.application.services.outbox_relay_service import OutboxRelayService
+from core.infrastructure.outbox import get_sink
+
+
+class Command(BaseCommand):
+    help = 'Envía los eventos del outbox de pagos a un destino (archivo, socket o clase propia)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sink',
+            default='file',
+            help="Destino: 'file', 'socket' o ruta a una clase OutboxSink",
+        )
+        parser.add_argument('--path', default='outbox_events.jsonl', help='Archivo para el sink file')
+        parser.add_argument('--host', default='127.0.0.1', help='Host para el sink socket')
+        parser.add_argument('--port', type=int, default=9000, help='Puerto para el sink socket')
+        parser.add_argument(
+            '--consumer',
+            help='Nombre del checkpoint (por defecto el del sink)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OutboxRelayService.DEFAULT_BATCH_SIZE,
+            help='Eventos por lote',
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Seguir esperando eventos nuevos en lugar de terminar',
+        )
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre sondeos con --follow')
+        parser.add_argument('--max-batches', type=int, help='Detenerse después de N lotes')
+
+    def handle(self, *args, **options):
+        try:
+            sink = get_sink(
+                options['sink'],
+                path=options['path'],
+                host=options['host'],
+                port=options['port']
+            )
+        except (ImportError, OSError) as e:
+            raise CommandError(f"No se pudo abrir el sink {options['sink']}: {e}")
+
+        consumer = options['consumer'] or options['sink']
+        relay = OutboxRelayService()
+        total_events, batches = 0, 0
+        started = time.monotonic()
+
+        try:
+            while options['max_batches'] is None or batches < options['max_batches']:
+                metrics = relay.relay_batch(sink, consumer, options['batch_size'])
+                if metrics['events'] == 0:
+                    if not options['follow']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                batches += 1
+                total_events += metrics['events']
+                rate = metrics['events'] / metrics['seconds'] if metrics['seconds'] else 0
+                self.stdout.write(
+                    f"📤 Lote {batches}: {metrics['events']} eventos en "
+                    f"{metrics['seconds']:.3f}s ({rate:,.0f} ev/s), "
+                    f"último event_id={metrics['last_event_id']}"
+                )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.close()
+
+        elapsed = time.monotonic() - started
+        rate = total_events / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {total_events} eventos en {batches} lotes, {elapsed:.2f}s "
+                f"({rate:,.0f} ev/s); pendientes: {relay.pending_count(consumer)}"
+            )
+        )
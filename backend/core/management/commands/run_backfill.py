@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+import time
+
+from core.services import backfill_service
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta un backfill en línea: actualiza por lotes de clave primaria con pausas y checkpoint '
+        '(se reanuda donde quedó) y luego valida las restricciones NOT VALID sin bloquear la tabla. '
+        'Sin nombre lista los backfills y su estado'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('nombre', nargs='?', help='Backfill a ejecutar')
+        parser.add_argument('--lote', type=int, help='Máximo de filas por lote (por defecto BACKFILL_BATCH_SIZE)')
+        parser.add_argument('--pausa', type=float, help='Segundos entre lotes (por defecto BACKFILL_PAUSE_SECONDS)')
+        parser.add_argument('--minutos', type=float, help='Detenerse después de N minutos; la próxima ejecución continúa')
+        parser.add_argument('--shard', action='append', help='Ejecutar solo en este shard (se puede repetir)')
+        parser.add_argument(
+            '--sin-validar',
+            action='store_true',
+            help='Solo rellenar filas; las restricciones quedan para una ejecución posterior',
+        )
+        parser.add_argument('--reiniciar', action='store_true', help='Descartar el checkpoint y empezar de cero')
+
+    def handle(self, *args, **options):
+        if not options['nombre']:
+            self._list()
+            return
+
+        nombre = options['nombre']
+        started = time.monotonic()
+        try:
+            if options['reiniciar']:
+                borrados = backfill_service.reset(nombre, options['shard'])
+                self.stdout.write(f"🔄 {borrados} checkpoint(s) descartados")
+            results = backfill_service.run(
+                nombre,
+                aliases=options['shard'],
+                batch_size=options['lote'],
+                pause=options['pausa'],
+                max_seconds=options['minutos'] * 60 if options['minutos'] else None,
+                validate=not options['sin_validar'],
+                progress=self._progress,
+            )
+        except (ValueError, OperationalError) as e:
+            raise CommandError(str(e))
+
+        for alias, result in results.items():
+            self.stdout.write(
+                f"📊 {alias}: {result['estado']}, {result['filas']} filas en {result['lotes']} lotes "
+                f"(último id {result['ultimo_id']})"
+            )
+        pendientes = [alias for alias, result in results.items() if result['estado'] != 'completado']
+        elapsed = time.monotonic() - started
+        if pendientes:
+            self.stdout.write(self.style.WARNING(
+                f"⏸️ {nombre} sin terminar en {', '.join(pendientes)} ({elapsed:.2f}s); vuelva a ejecutar para continuar"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {nombre} completado en {elapsed:.2f}s"))
+
+    def _progress(self, alias, checkpoint, lote):
+        if lote is None:
+            self.stdout.write(f"  {alias}: restricciones validadas")
+        elif checkpoint.estado == 'rellenado':
+            self.stdout.write(f"  {alias}: {checkpoint.filas} filas rellenadas, validando restricciones")
+        elif checkpoint.lotes % 10 == 0:
+            avance = f" ({checkpoint.ultimo_id / checkpoint.hasta_id:.0%})" if checkpoint.hasta_id else ''
+            self.stdout.write(f"  {alias}: {checkpoint.filas} filas, id {checkpoint.ultimo_id}{avance}, lote {lote}")
+
+    def _list(self):
+        checkpoints = {}
+        for row in backfill_service.status():
+            checkpoints.setdefault(row['nombre'], []).append(row)
+        for nombre, descripcion in backfill_service.available():
+            self.stdout.write(f"📦 {nombre}: {descripcion}")
+            for row in checkpoints.get(nombre, []):
+                self.stdout.write(
+                    f"   {row['base']}: {row['estado']}, {row['filas']} filas, último id {row['ultimo_id']}"
+                )
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import socket
+import time
+
+
+# Los procesos del pool se crean con spawn: importan este módulo sin Django
+# configurado, por eso los modelos se importan dentro de las funciones.
+def _setup_worker():
+    import django
+    django.setup()
+
+
+def _run_job(job_id):
+    from core.application.services.job_service import JobService
+    return job_id, JobService().run(job_id)
+
+
+def _pool(procesos):
+    # spawn: los procesos hijos no heredan la conexión a la base de datos del padre
+    return ProcessPoolExecutor(
+        max_workers=procesos,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_setup_worker
+    )
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos en cola (core.jobs) en un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=settings.JOBS_WORKER_PROCESSES,
+            help='Trabajos en paralelo',
+        )
+        parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre sondeos de la cola')
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Terminar cuando la cola quede vacía',
+        )
+
+    def handle(self, *args, **options):
+        from core.application.services.job_service import JobService
+
+        jobs = JobService()
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        procesos = max(1, options['procesos'])
+        running = {}
+        last_lease_check = 0
+        # Arriendos renovados varias veces antes de vencer
+        lease_interval = settings.JOBS_LEASE_SECONDS / 3
+        self.stdout.write(f"⚙️  Worker {worker} con {procesos} procesos")
+
+        pool = _pool(procesos)
+        try:
+            while True:
+                if time.monotonic() - last_lease_check > lease_interval:
+                    # Los trabajos de este worker siguen vivos aunque la tarea no reporte progreso
+                    jobs.renew(worker, [job.job_id for job in running.values()])
+                    requeued = jobs.requeue_stale()
+                    if requeued:
+                        self.stdout.write(f"♻️  {requeued} trabajos con el arriendo vencido devueltos a la cola")
+                    last_lease_check = time.monotonic()
+
+                while len(running) < procesos:
+                    job = jobs.claim(worker)
+                    if job is None:
+                        break
+                    self.stdout.write(f"▶️  {job} (intento {job.intentos}/{job.max_intentos})")
+                    try:
+                        running[pool.submit(_run_job, job.job_id)] = job
+                    except BrokenProcessPool as e:
+                        self.stdout.write(f"⚠️  {job.tipo} #{job.job_id}: error del proceso: {jobs.release(job, e)}")
+                        pool = self._rebuild(pool, procesos, jobs, running)
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                finished = [self._finish(jobs, future, running.pop(future)) for future in done]
+                if not all(finished):
+                    pool = self._rebuild(pool, procesos, jobs, running)
+        except KeyboardInterrupt:
+            self.stdout.write('Deteniendo worker...')
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Worker {worker} detenido"))
+
+    def _finish(self, jobs, future, job):
+        """Report a finished future; False when its process died and broke the pool"""
+        try:
+            _, outcome = future.result()
+        except BrokenProcessPool as e:
+            # Un proceso murió (OOM, segfault): el trabajo vuelve a la cola sin esperar su arriendo
+            self.stdout.write(f"⚠️  {job.tipo} #{job.job_id}: error del proceso: {jobs.release(job, e)}")
+            return False
+        except Exception as e:
+            outcome = f"error del proceso: {e}"
+        self.stdout.write(f"{'✅' if outcome == 'completado' else '⚠️ '} {job.tipo} #{job.job_id}: {outcome}")
+        return True
+
+    def _rebuild(self, pool, procesos, jobs, running):
+        # Los demás trabajos del pool roto terminan con él
+        for future in wait(running).done:
+            self._finish(jobs, future, running.pop(future))
+        pool.shutdown(wait=False, cancel_futures=True)
+        self.stdout.write("♻️  Pool de procesos roto: se crea uno nuevo")
+        return _pool(procesos)
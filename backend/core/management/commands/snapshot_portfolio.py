@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+import time
+
+from core.application.services.portfolio_snapshot_service import PortfolioSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Guarda el snapshot diario de cuotas abiertas (estado y saldo) para roll rates y tendencia de mora'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha del snapshot YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument(
+            '--retener-meses',
+            type=int,
+            help='Borrar las particiones mensuales anteriores a los últimos N meses',
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        snapshots = PortfolioSnapshotService()
+        started = time.monotonic()
+        try:
+            result = snapshots.take(fecha)
+        except ValueError as e:
+            raise CommandError(str(e))
+        tipo = 'keyframe' if result['keyframe'] else 'cambios'
+        self.stdout.write(
+            f"📸 Snapshot {result['fecha']} ({tipo}): {result['filas']} filas escritas, "
+            f"{result['cuotas_abiertas']} cuotas abiertas"
+        )
+
+        if options['retener_meses']:
+            try:
+                borradas = snapshots.purge(options['retener_meses'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"🗑️  {borradas} particiones antiguas borradas")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Snapshot guardado en {time.monotonic() - started:.2f}s")
+        )
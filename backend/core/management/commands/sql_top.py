@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+
+from core.infrastructure import sql_stats
+
+
+class Command(BaseCommand):
+    help = 'Muestra los fingerprints SQL más costosos de todos los procesos (web, worker, comandos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=20, help='Cantidad de fingerprints a mostrar')
+        parser.add_argument(
+            '--orden',
+            default='total_ms',
+            choices=['total_ms', 'veces', 'max_ms', 'media_ms'],
+            help='Criterio de orden',
+        )
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Borra las estadísticas guardadas (los procesos activos siguen acumulando las suyas)',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            sql_stats.reset()
+            self.stdout.write(self.style.SUCCESS('🧹 Estadísticas SQL borradas'))
+            return
+        if options['limite'] < 1:
+            raise CommandError('--limite debe ser mayor a 0')
+
+        rows = sql_stats.top(options['limite'], options['orden'])
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2, ensure_ascii=False))
+            return
+        if not rows:
+            self.stdout.write('Sin estadísticas SQL registradas')
+            return
+        for position, row in enumerate(rows, 1):
+            vistas = ', '.join(
+                f"{vista} ({veces})"
+                for vista, veces in sorted(row['vistas'].items(), key=lambda item: item[1], reverse=True)[:3]
+            )
+            self.stdout.write(
+                f"{position:>3}. [{row['fingerprint']}] {row['veces']} veces, total {row['total_ms']:.1f} ms, "
+                f"media {row['media_ms']:.2f} ms, máx {row['max_ms']:.1f} ms"
+            )
+            self.stdout.write(f"     {vistas}")
+            self.stdout.write(f"     {row['sql'][:300]}")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+import time
+
+from core.application.services.credit_ledger_service import CreditLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Causa en el ledger las cuotas vencidas y guarda el snapshot diario de saldos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de corte YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument(
+            '--sin-snapshot',
+            action='store_true',
+            help='Solo causar cuotas, sin guardar snapshot',
+        )
+
+    def handle(self, *args, **options):
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = datetime.strptime(options['fecha'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha inválido. Use YYYY-MM-DD')
+
+        ledger = CreditLedgerService()
+        started = time.monotonic()
+        causadas = ledger.accrue_installments(fecha)
+        self.stdout.write(f"📒 {causadas} cuotas causadas en el ledger")
+
+        if not options['sin_snapshot']:
+            snapshots = ledger.take_snapshots(fecha)
+            self.stdout.write(f"📸 {snapshots} snapshots de saldo guardados")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Ledger actualizado en {time.monotonic() - started:.2f}s")
+        )
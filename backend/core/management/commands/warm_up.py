@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from core.infrastructure import warmup
+
+
+class Command(BaseCommand):
+    help = 'Precalienta la aplicación (imports y primers) y mide la latencia de arranque en frío'
+    # Los checks importan el URLconf y las vistas: la sonda en frío no sería fría
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--primers',
+            help=f"Primers separados por coma (por defecto WARMUP_PRIMERS; disponibles: {', '.join(sorted(warmup.PRIMERS))})",
+        )
+        parser.add_argument(
+            '--medir',
+            action='store_true',
+            help='Compara un proceso nuevo sin precalentar contra uno precalentado',
+        )
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+        # Uso interno de --medir: proceso nuevo que mide sus primeras peticiones
+        parser.add_argument('--sonda', action='store_true', help=argparse.SUPPRESS)
+        parser.add_argument('--precalentar', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        primers = None
+        if options['primers'] is not None:
+            primers = [name.strip() for name in options['primers'].split(',') if name.strip()]
+
+        try:
+            if options['sonda']:
+                self.stdout.write(json.dumps(self._probe(primers if options['precalentar'] else False)))
+                return
+            if options['medir']:
+                result = {'frio': self._spawn(primers, False), 'precalentado': self._spawn(primers, True)}
+            else:
+                result = warmup.warm_up(primers)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
+        elif options['medir']:
+            self._print_comparison(result)
+        else:
+            self._print_report(result)
+
+    def _probe(self, primers):
+        """First and second latency of each probe URL in this (new) process"""
+        started = time.perf_counter()
+        report = warmup.warm_up(primers) if primers is not False else None
+        ready_ms = (time.perf_counter() - started) * 1000
+        requests = warmup.InProcessRequests()
+        urls = {}
+        for path in settings.WARMUP_URLS + ['/api/recaudo/serie/']:
+            timings = []
+            for _ in range(2):
+                call = time.perf_counter()
+                requests.get(path)
+                timings.append(round((time.perf_counter() - call) * 1000, 2))
+            urls[path] = {'primera_ms': timings[0], 'segunda_ms': timings[1]}
+        return {'precalentamiento_ms': round(ready_ms, 2), 'reporte': report, 'urls': urls, 'errores': requests.errors}
+
+    def _spawn(self, primers, warm):
+        command = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'warm_up', '--sonda']
+        if warm:
+            command.append('--precalentar')
+        if primers is not None:
+            command += ['--primers', ','.join(primers)]
+        started = time.perf_counter()
+        completed = subprocess.run(command, capture_output=True, text=True)
+        total_ms = (time.perf_counter() - started) * 1000
+        if completed.returncode != 0:
+            raise CommandError(f"La sonda terminó con código {completed.returncode}: {completed.stderr[-2000:]}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result['proceso_ms'] = round(total_ms, 2)
+        return result
+
+    def _print_report(self, report):
+        for step in report['preload']:
+            self.stdout.write(f"   {step['paso']:<40} {step['ms']:>9.1f} ms")
+        for result in report['primers']:
+            self.stdout.write(
+                f"🔥 {result['primer']}: {result['peticiones']} peticiones, {result['errores']} errores, "
+                f"primera {result['primera_ms'] or 0:.1f} ms, total {result['ms']:.0f} ms"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ Precalentamiento en {report['total_ms']:.0f} ms"))
+
+    def _print_comparison(self, result):
+        cold, warm = result['frio'], result['precalentado']
+        self.stdout.write(
+            f"Proceso completo: frío {cold['proceso_ms']:.0f} ms, "
+            f"precalentado {warm['proceso_ms']:.0f} ms (precalentamiento {warm['precalentamiento_ms']:.0f} ms)"
+        )
+        self.stdout.write(f"{'URL':<28} {'frío 1ª':>10} {'frío 2ª':>10} {'precal. 1ª':>11} {'precal. 2ª':>11}")
+        for path, timings in cold['urls'].items():
+            warmed = warm['urls'][path]
+            self.stdout.write(
+                f"{path:<28} {timings['primera_ms']:>10.1f} {timings['segunda_ms']:>10.1f} "
+                f"{warmed['primera_ms']:>11.1f} {warmed['segunda_ms']:>11.1f}"
+            )
+        cold_first = sum(timings['primera_ms'] for timings in cold['urls'].values())
+        warm_first = sum(timings['primera_ms'] for timings in warm['urls'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Primeras peticiones: {cold_first:.0f} ms en frío, {warm_first:.0f} ms precalentado"
+        ))
+        if cold['errores'] or warm['errores']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Errores en las sondas: frío {cold['errores']}, precalentado {warm['errores']}"
+            ))
@@ -7,7 +7,8 @@ This file maintains backward compatibility while using the new modular structure
 from .domain.repositories import (
     ClientManager,
     CreditManager,
-    PaymentScheduleManager
+    PaymentScheduleManager,
+    CreditLedgerManager
 )
 
 # Maintain backward compatibility with old names
@@ -18,6 +19,7 @@ __all__ = [
     'ClientManager',
     'CreditManager',
     'PaymentScheduleManager',
+    'CreditLedgerManager',
     # Backward compatibility
     'ClienteManager',
     'CreditoManager'
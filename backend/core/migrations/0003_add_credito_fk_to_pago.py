@@ -3,11 +3,13 @@ from django.db import migrations, models
 
 def backfill_credito(apps, schema_editor):
     Pago = apps.get_model('core', 'Payment')
-    for pago in Pago.objects.all().iterator():
+    # La base que se migra (con sharding, cada shard)
+    db_alias = schema_editor.connection.alias
+    for pago in Pago.objects.using(db_alias).all().iterator():
         if getattr(pago, 'credito_id', None) is None and getattr(pago, 'schedule_id', None) is not None:
             # Derivar el crédito desde la cuota
             pago.credito_id = pago.schedule.credito_id
-            pago.save(update_fields=['credito_id'])
+            pago.save(update_fields=['credito_id'], using=db_alias)
 
 
 class Migration(migrations.Migration):
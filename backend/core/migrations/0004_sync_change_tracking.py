@@ -0,0 +1,173 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:28
+
+from django.db import migrations, models
+
+
+# Tablas seguidas por la API de sincronización: (tabla, entidad, llave primaria)
+SYNC_TABLES = [
+    ('core.clientes', 'clientes', 'cliente_id'),
+    ('core.creditos', 'creditos', 'credito_id'),
+    ('core.payment_schedule', 'cronograma', 'schedule_id'),
+    ('core.pagos', 'pagos', 'pago_id'),
+]
+
+FUNCTIONS_SQL = """
+CREATE SEQUENCE IF NOT EXISTS core_sync_change_seq;
+
+CREATE OR REPLACE FUNCTION core_sync_stamp() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id()::text::bigint;
+    NEW.change_seq := nextval('core_sync_change_seq');
+    NEW.updated_at := now();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_sync_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "core.sync_tombstones" (entidad, object_id, change_xid, change_seq, deleted_at)
+    VALUES (
+        TG_ARGV[0],
+        (to_jsonb(OLD) ->> TG_ARGV[1])::bigint,
+        pg_current_xact_id()::text::bigint,
+        nextval('core_sync_change_seq'),
+        now()
+    );
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_FUNCTIONS_SQL = """
+DROP FUNCTION IF EXISTS core_sync_tombstone();
+DROP FUNCTION IF EXISTS core_sync_stamp();
+DROP SEQUENCE IF EXISTS core_sync_change_seq;
+"""
+
+
+def triggers_sql(table, entidad, pk):
+    # El UPDATE final marca las filas existentes para la primera sincronización
+    return f"""
+    CREATE TRIGGER sync_stamp BEFORE INSERT OR UPDATE ON "{table}"
+        FOR EACH ROW EXECUTE FUNCTION core_sync_stamp();
+    CREATE TRIGGER sync_tombstone AFTER DELETE ON "{table}"
+        FOR EACH ROW EXECUTE FUNCTION core_sync_tombstone('{entidad}', '{pk}');
+    UPDATE "{table}" SET change_seq = NULL;
+    """
+
+
+def drop_triggers_sql(table, entidad, pk):
+    return f"""
+    DROP TRIGGER IF EXISTS sync_tombstone ON "{table}";
+    DROP TRIGGER IF EXISTS sync_stamp ON "{table}";
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_add_credito_fk_to_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('tombstone_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entidad', models.CharField(choices=[('clientes', 'Clients'), ('creditos', 'Credits'), ('cronograma', 'Payment Schedules'), ('pagos', 'Payments')], help_text='Entity of the deleted row', max_length=20)),
+                ('object_id', models.BigIntegerField(help_text='Primary key of the deleted row')),
+                ('change_xid', models.BigIntegerField(help_text='Transaction that deleted the row')),
+                ('change_seq', models.BigIntegerField(help_text='Global change sequence of the delete')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Sync Tombstone',
+                'verbose_name_plural': 'Sync Tombstones',
+                'db_table': 'core.sync_tombstones',
+            },
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, help_text='Global change sequence of the last write', null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, help_text='Transaction that last wrote this row', null=True),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, help_text='Global change sequence of the last write', null=True),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, help_text='Transaction that last wrote this row', null=True),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, help_text='Global change sequence of the last write', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, help_text='Transaction that last wrote this row', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='change_seq',
+            field=models.BigIntegerField(editable=False, help_text='Global change sequence of the last write', null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='change_xid',
+            field=models.BigIntegerField(editable=False, help_text='Transaction that last wrote this row', null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['change_xid', 'change_seq'], name='client_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='credit',
+            index=models.Index(fields=['change_xid', 'change_seq'], name='credit_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['change_xid', 'change_seq'], name='payment_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(fields=['change_xid', 'change_seq'], name='paymentschedule_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['change_xid', 'change_seq'], name='synctombstone_sync_idx'),
+        ),
+        migrations.RunSQL(FUNCTIONS_SQL, DROP_FUNCTIONS_SQL),
+    ] + [
+        migrations.RunSQL(triggers_sql(*table), drop_triggers_sql(*table))
+        for table in SYNC_TABLES
+    ]
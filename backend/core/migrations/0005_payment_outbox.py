@@ -0,0 +1,101 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+# Los eventos se escriben con triggers para quedar en la misma transacción
+# que el cambio, incluso con queryset.update() o SQL directo.
+OUTBOX_SQL = """
+CREATE OR REPLACE FUNCTION core_outbox_pago() RETURNS trigger AS $$
+DECLARE
+    nuevo jsonb := to_jsonb(NEW) - 'change_xid' - 'change_seq' - 'updated_at';
+BEGIN
+    IF TG_OP = 'UPDATE' AND nuevo = (to_jsonb(OLD) - 'change_xid' - 'change_seq' - 'updated_at') THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO "core.outbox_events" (tipo, agregado, agregado_id, payload, change_xid, created_at)
+    VALUES (
+        CASE TG_OP WHEN 'INSERT' THEN 'pago.creado' ELSE 'pago.actualizado' END,
+        'pago', NEW.pago_id, nuevo, pg_current_xact_id()::text::bigint, now()
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_outbox_cuota_estado() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO "core.outbox_events" (tipo, agregado, agregado_id, payload, change_xid, created_at)
+    VALUES (
+        'cuota.estado_cambiado', 'cuota', NEW.schedule_id,
+        jsonb_build_object(
+            'schedule_id', NEW.schedule_id,
+            'credito_id', NEW.credito_id,
+            'num_cuota', NEW.num_cuota,
+            'fecha_vencimiento', NEW.fecha_vencimiento,
+            'valor_cuota', NEW.valor_cuota,
+            'estado_anterior', OLD.estado,
+            'estado', NEW.estado
+        ),
+        pg_current_xact_id()::text::bigint, now()
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER outbox_pago AFTER INSERT OR UPDATE ON "core.pagos"
+    FOR EACH ROW EXECUTE FUNCTION core_outbox_pago();
+CREATE TRIGGER outbox_cuota_estado AFTER UPDATE OF estado ON "core.payment_schedule"
+    FOR EACH ROW WHEN (OLD.estado IS DISTINCT FROM NEW.estado)
+    EXECUTE FUNCTION core_outbox_cuota_estado();
+"""
+
+DROP_OUTBOX_SQL = """
+DROP TRIGGER IF EXISTS outbox_cuota_estado ON "core.payment_schedule";
+DROP TRIGGER IF EXISTS outbox_pago ON "core.pagos";
+DROP FUNCTION IF EXISTS core_outbox_cuota_estado();
+DROP FUNCTION IF EXISTS core_outbox_pago();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sync_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCheckpoint',
+            fields=[
+                ('sink', models.CharField(help_text='Sink name, one checkpoint per consumer', max_length=50, primary_key=True, serialize=False)),
+                ('last_xid', models.BigIntegerField(default=0)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('relayed_total', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Checkpoint',
+                'verbose_name_plural': 'Outbox Checkpoints',
+                'db_table': 'core.outbox_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('event_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('pago.creado', 'Payment Created'), ('pago.actualizado', 'Payment Updated'), ('cuota.estado_cambiado', 'Installment State Changed')], help_text='Event type', max_length=40)),
+                ('agregado', models.CharField(help_text='Aggregate the event belongs to (pago, cuota)', max_length=20)),
+                ('agregado_id', models.BigIntegerField(help_text='Primary key of the aggregate')),
+                ('payload', models.JSONField(help_text='Row state after the change')),
+                ('change_xid', models.BigIntegerField(help_text='Transaction that produced the event')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+                'db_table': 'core.outbox_events',
+                'indexes': [models.Index(fields=['change_xid', 'event_id'], name='outbox_relay_idx')],
+            },
+        ),
+        migrations.RunSQL(OUTBOX_SQL, DROP_OUTBOX_SQL),
+    ]
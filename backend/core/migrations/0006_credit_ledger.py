@@ -0,0 +1,238 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Efectos de cada tipo de asiento sobre (saldo, saldo_exigible, total_pagado),
+# los mismos de CreditLedgerEntry.BALANCE_EFFECTS.
+LEDGER_SQL = """
+CREATE OR REPLACE FUNCTION core_ledger_append(
+    p_credito bigint,
+    p_tipo text,
+    p_monto numeric,
+    p_fecha date,
+    p_schedule bigint DEFAULT NULL,
+    p_pago bigint DEFAULT NULL,
+    p_descripcion text DEFAULT ''
+) RETURNS bigint AS $$
+DECLARE
+    anterior record;
+    nuevo_id bigint;
+BEGIN
+    -- Serializa los asientos de cada crédito para que los saldos corridos no se crucen
+    PERFORM pg_advisory_xact_lock(hashtext('core.credit_ledger'), hashtext(p_credito::text));
+
+    IF p_tipo = 'cuota_causada' AND EXISTS (
+        SELECT 1 FROM "core.credit_ledger"
+        WHERE tipo = 'cuota_causada' AND schedule_id = p_schedule
+    ) THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT saldo, saldo_exigible, total_pagado INTO anterior
+    FROM "core.credit_ledger"
+    WHERE credito_id = p_credito
+    ORDER BY entry_id DESC
+    LIMIT 1;
+
+    INSERT INTO "core.credit_ledger" (
+        credito_id, tipo, monto, fecha, schedule_id, pago_id, descripcion,
+        saldo, saldo_exigible, total_pagado, created_at
+    )
+    VALUES (
+        p_credito, p_tipo, p_monto, p_fecha, p_schedule, p_pago, COALESCE(p_descripcion, ''),
+        COALESCE(anterior.saldo, 0)
+            + CASE p_tipo WHEN 'desembolso' THEN p_monto WHEN 'ajuste' THEN p_monto
+                          WHEN 'pago' THEN -p_monto ELSE 0 END,
+        COALESCE(anterior.saldo_exigible, 0)
+            + CASE p_tipo WHEN 'cuota_causada' THEN p_monto WHEN 'ajuste' THEN p_monto
+                          WHEN 'pago' THEN -p_monto ELSE 0 END,
+        COALESCE(anterior.total_pagado, 0)
+            + CASE p_tipo WHEN 'pago' THEN p_monto ELSE 0 END,
+        now()
+    )
+    RETURNING entry_id INTO nuevo_id;
+    RETURN nuevo_id;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_ledger_credito() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_ledger_append(
+            NEW.credito_id, 'desembolso', NEW.inversion, NEW.fecha_desembolso, NULL, NULL, 'Desembolso'
+        );
+    ELSE
+        PERFORM core_ledger_append(
+            NEW.credito_id, 'desembolso', NEW.inversion - OLD.inversion, CURRENT_DATE, NULL, NULL,
+            'Ajuste de inversión'
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- El crédito de un pago es el de su cuota, igual que en PaymentSchedule.monto_pagado
+CREATE OR REPLACE FUNCTION core_ledger_pago() RETURNS trigger AS $$
+DECLARE
+    credito_nuevo bigint;
+    credito_anterior bigint;
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT credito_id INTO credito_nuevo FROM "core.payment_schedule" WHERE schedule_id = NEW.schedule_id;
+        credito_nuevo := COALESCE(credito_nuevo, NEW.credito_id);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT credito_id INTO credito_anterior FROM "core.payment_schedule" WHERE schedule_id = OLD.schedule_id;
+        credito_anterior := COALESCE(credito_anterior, OLD.credito_id);
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        PERFORM core_ledger_append(
+            credito_nuevo, 'pago', NEW.monto, NEW.fecha_pago::date, NEW.schedule_id, NEW.pago_id,
+            COALESCE('Pago ' || NEW.medio, 'Pago')
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM core_ledger_append(
+            credito_anterior, 'pago', -OLD.monto, CURRENT_DATE, OLD.schedule_id, OLD.pago_id,
+            'Reverso de pago eliminado'
+        );
+    ELSIF OLD.schedule_id IS DISTINCT FROM NEW.schedule_id OR credito_anterior IS DISTINCT FROM credito_nuevo THEN
+        PERFORM core_ledger_append(
+            credito_anterior, 'pago', -OLD.monto, CURRENT_DATE, OLD.schedule_id, OLD.pago_id,
+            'Reverso por cambio de cuota'
+        );
+        PERFORM core_ledger_append(
+            credito_nuevo, 'pago', NEW.monto, CURRENT_DATE, NEW.schedule_id, NEW.pago_id,
+            'Pago reasignado'
+        );
+    ELSIF OLD.monto IS DISTINCT FROM NEW.monto THEN
+        PERFORM core_ledger_append(
+            credito_nuevo, 'pago', NEW.monto - OLD.monto, CURRENT_DATE, NEW.schedule_id, NEW.pago_id,
+            'Ajuste de monto del pago'
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_ledger_append_only() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'core.credit_ledger es de solo inserción, registre un ajuste';
+END
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial: mismos asientos que habrían generado los triggers, en bloque
+INSERT INTO "core.credit_ledger" (
+    credito_id, tipo, monto, fecha, schedule_id, pago_id, descripcion,
+    saldo, saldo_exigible, total_pagado, created_at
+)
+SELECT
+    credito_id, tipo, monto, fecha, schedule_id, pago_id, descripcion,
+    SUM(monto * efecto_saldo) OVER w,
+    SUM(monto * efecto_exigible) OVER w,
+    SUM(monto * efecto_pagado) OVER w,
+    now()
+FROM (
+    SELECT c.credito_id, 'desembolso' AS tipo, c.inversion AS monto, c.fecha_desembolso AS fecha,
+           NULL::bigint AS schedule_id, NULL::bigint AS pago_id, 'Desembolso' AS descripcion,
+           0 AS orden, c.credito_id AS ref, 1 AS efecto_saldo, 0 AS efecto_exigible, 0 AS efecto_pagado
+    FROM "core.creditos" c
+    UNION ALL
+    SELECT s.credito_id, 'cuota_causada', s.valor_cuota, s.fecha_vencimiento,
+           s.schedule_id, NULL, 'Cuota ' || s.num_cuota,
+           1, s.schedule_id, 0, 1, 0
+    FROM "core.payment_schedule" s
+    WHERE s.fecha_vencimiento <= CURRENT_DATE
+    UNION ALL
+    SELECT s.credito_id, 'pago', p.monto, p.fecha_pago::date,
+           p.schedule_id, p.pago_id, COALESCE('Pago ' || p.medio, 'Pago'),
+           2, p.pago_id, -1, -1, 1
+    FROM "core.pagos" p
+    JOIN "core.payment_schedule" s ON s.schedule_id = p.schedule_id
+) movimientos
+WINDOW w AS (PARTITION BY credito_id ORDER BY fecha, orden, ref ROWS UNBOUNDED PRECEDING)
+ORDER BY credito_id, fecha, orden, ref;
+
+CREATE TRIGGER ledger_credito AFTER INSERT ON "core.creditos"
+    FOR EACH ROW EXECUTE FUNCTION core_ledger_credito();
+CREATE TRIGGER ledger_credito_inversion AFTER UPDATE OF inversion ON "core.creditos"
+    FOR EACH ROW WHEN (OLD.inversion IS DISTINCT FROM NEW.inversion)
+    EXECUTE FUNCTION core_ledger_credito();
+CREATE TRIGGER ledger_pago AFTER INSERT OR UPDATE OR DELETE ON "core.pagos"
+    FOR EACH ROW EXECUTE FUNCTION core_ledger_pago();
+CREATE TRIGGER ledger_append_only BEFORE UPDATE OR DELETE ON "core.credit_ledger"
+    FOR EACH ROW EXECUTE FUNCTION core_ledger_append_only();
+"""
+
+DROP_LEDGER_SQL = """
+DROP TRIGGER IF EXISTS ledger_append_only ON "core.credit_ledger";
+DROP TRIGGER IF EXISTS ledger_pago ON "core.pagos";
+DROP TRIGGER IF EXISTS ledger_credito_inversion ON "core.creditos";
+DROP TRIGGER IF EXISTS ledger_credito ON "core.creditos";
+DROP FUNCTION IF EXISTS core_ledger_append_only();
+DROP FUNCTION IF EXISTS core_ledger_pago();
+DROP FUNCTION IF EXISTS core_ledger_credito();
+DROP FUNCTION IF EXISTS core_ledger_append(bigint, text, numeric, date, bigint, bigint, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_payment_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditLedgerSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('saldo_exigible', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('last_entry_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('credito', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_snapshots', to='core.credit')),
+            ],
+            options={
+                'verbose_name': 'Credit Ledger Snapshot',
+                'verbose_name_plural': 'Credit Ledger Snapshots',
+                'db_table': 'core.credit_ledger_snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='CreditLedgerEntry',
+            fields=[
+                ('entry_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('desembolso', 'Disbursement'), ('cuota_causada', 'Installment Due'), ('pago', 'Payment'), ('ajuste', 'Adjustment')], help_text='Movement type', max_length=20)),
+                ('monto', models.DecimalField(decimal_places=2, help_text='Movement amount, negative for reversals', max_digits=12)),
+                ('fecha', models.DateField(help_text='Effective date')),
+                ('schedule_id', models.BigIntegerField(blank=True, help_text='Related installment', null=True)),
+                ('pago_id', models.BigIntegerField(blank=True, help_text='Related payment', null=True)),
+                ('descripcion', models.CharField(blank=True, default='', max_length=200)),
+                ('saldo', models.DecimalField(decimal_places=2, help_text='Outstanding principal after this movement', max_digits=14)),
+                ('saldo_exigible', models.DecimalField(decimal_places=2, help_text='Installments due and unpaid after this movement, negative when paid ahead', max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, help_text='Total paid after this movement', max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('credito', models.ForeignKey(db_constraint=False, help_text='Credit of the movement (kept if the credit is deleted)', on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger', to='core.credit')),
+            ],
+            options={
+                'verbose_name': 'Credit Ledger Entry',
+                'verbose_name_plural': 'Credit Ledger Entries',
+                'db_table': 'core.credit_ledger',
+                'indexes': [models.Index(fields=['credito', '-entry_id'], name='ledger_credit_last_idx'), models.Index(fields=['credito', 'fecha'], name='ledger_credit_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='creditledgerentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('tipo', 'cuota_causada')), fields=('schedule_id',), name='ledger_unique_installment_due'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='creditledgersnapshot',
+            unique_together={('credito', 'fecha')},
+        ),
+        migrations.RunSQL(LEDGER_SQL, DROP_LEDGER_SQL),
+    ]
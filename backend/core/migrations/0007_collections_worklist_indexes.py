@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_credit_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['ciudad'], name='cliente_ciudad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentschedule',
+            index=models.Index(condition=models.Q(('estado__in', ['pendiente', 'parcial', 'vencida'])), fields=['credito', 'fecha_vencimiento'], name='schedule_open_due_idx'),
+        ),
+    ]
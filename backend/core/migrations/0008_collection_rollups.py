@@ -0,0 +1,101 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+# Los pagos suman en el balde de su fecha; una edición resta del balde anterior
+# y suma en el nuevo. Producto y ciudad salen del crédito de la cuota.
+ROLLUP_SQL = """
+CREATE OR REPLACE FUNCTION core_rollup_apply(
+    p_schedule bigint,
+    p_credito bigint,
+    p_fecha date,
+    p_medio text,
+    p_pagos integer,
+    p_monto numeric
+) RETURNS void AS $$
+BEGIN
+    INSERT INTO "core.collection_daily_rollup" (fecha, medio, producto, ciudad, num_pagos, monto_total, updated_at)
+    SELECT p_fecha, COALESCE(p_medio, 'sin_especificar'), cr.producto,
+           COALESCE(c.ciudad, 'sin_especificar'), p_pagos, p_monto, now()
+    FROM "core.creditos" cr
+    JOIN "core.clientes" c ON c.cliente_id = cr.cliente_id
+    WHERE cr.credito_id = COALESCE(
+        (SELECT credito_id FROM "core.payment_schedule" WHERE schedule_id = p_schedule),
+        p_credito
+    )
+    ON CONFLICT (fecha, medio, producto, ciudad) DO UPDATE SET
+        num_pagos = "core.collection_daily_rollup".num_pagos + EXCLUDED.num_pagos,
+        monto_total = "core.collection_daily_rollup".monto_total + EXCLUDED.monto_total,
+        updated_at = now();
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_rollup_pago() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM core_rollup_apply(
+            OLD.schedule_id, OLD.credito_id, OLD.fecha_pago::date, OLD.medio, -1, -OLD.monto
+        );
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM core_rollup_apply(
+            NEW.schedule_id, NEW.credito_id, NEW.fecha_pago::date, NEW.medio, 1, NEW.monto
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+INSERT INTO "core.collection_daily_rollup" (fecha, medio, producto, ciudad, num_pagos, monto_total, updated_at)
+SELECT p.fecha_pago::date, COALESCE(p.medio, 'sin_especificar'), cr.producto,
+       COALESCE(c.ciudad, 'sin_especificar'), COUNT(*), SUM(p.monto), now()
+FROM "core.pagos" p
+JOIN "core.payment_schedule" s ON s.schedule_id = p.schedule_id
+JOIN "core.creditos" cr ON cr.credito_id = s.credito_id
+JOIN "core.clientes" c ON c.cliente_id = cr.cliente_id
+GROUP BY 1, 2, 3, 4;
+
+CREATE TRIGGER rollup_pago
+    AFTER INSERT OR DELETE OR UPDATE OF fecha_pago, monto, medio, schedule_id, credito_id ON "core.pagos"
+    FOR EACH ROW EXECUTE FUNCTION core_rollup_pago();
+"""
+
+DROP_ROLLUP_SQL = """
+DROP TRIGGER IF EXISTS rollup_pago ON "core.pagos";
+DROP FUNCTION IF EXISTS core_rollup_pago();
+DROP FUNCTION IF EXISTS core_rollup_apply(bigint, bigint, date, text, integer, numeric);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_collections_worklist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Payment date')),
+                ('medio', models.CharField(help_text='Payment method', max_length=20)),
+                ('producto', models.CharField(help_text='Financed product type', max_length=20)),
+                ('ciudad', models.CharField(help_text='Client city', max_length=50)),
+                ('num_pagos', models.IntegerField(default=0)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Collection Daily Rollup',
+                'verbose_name_plural': 'Collection Daily Rollups',
+                'db_table': 'core.collection_daily_rollup',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='collectiondailyrollup',
+            constraint=models.UniqueConstraint(fields=('fecha', 'medio', 'producto', 'ciudad'), name='rollup_unique_bucket'),
+        ),
+        migrations.RunSQL(ROLLUP_SQL, DROP_ROLLUP_SQL),
+    ]
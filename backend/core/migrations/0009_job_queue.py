@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_collection_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('job_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(help_text='Registered task name', max_length=50)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Task keyword arguments')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pending'), ('en_proceso', 'Running'), ('completado', 'Completed'), ('fallido', 'Failed'), ('cancelado', 'Cancelled')], default='pendiente', max_length=20)),
+                ('prioridad', models.SmallIntegerField(default=0, help_text='Higher runs first')),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3)),
+                ('run_after', models.DateTimeField(help_text='Not run before this time (retry backoff)')),
+                ('progreso', models.FloatField(default=0, help_text='Progress percentage')),
+                ('mensaje', models.CharField(blank=True, default='', max_length=200)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', help_text='Worker running the job', max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Last sign of life of the running job', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'db_table': 'core.jobs',
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['-prioridad', 'run_after', 'job_id'], name='job_queue_idx'), models.Index(fields=['estado', 'heartbeat_at'], name='job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='referencia',
+            field=models.CharField(blank=True, help_text='Settlement reference of the payment channel (reconciliation files)', max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('referencia__isnull', False)), fields=('medio', 'referencia'), name='pago_medio_referencia_uniq'),
+        ),
+    ]
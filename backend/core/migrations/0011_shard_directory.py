@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_payment_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardBucket',
+            fields=[
+                ('bucket', models.IntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(help_text='Database alias of the shard', max_length=50)),
+                ('estado', models.CharField(choices=[('activo', 'Active'), ('moviendo', 'Moving')], default='activo', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Shard Bucket',
+                'verbose_name_plural': 'Shard Buckets',
+                'db_table': 'core.shard_buckets',
+            },
+        ),
+        # Ids de filas shardeadas: cada shard la reconfigura con su slot (init_shards)
+        migrations.RunSQL(
+            "CREATE SEQUENCE IF NOT EXISTS core_shard_id_seq",
+            "DROP SEQUENCE IF EXISTS core_shard_id_seq",
+        ),
+    ]
@@ -0,0 +1,218 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:14
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# Acumulados del crédito mantenidos por triggers de sentencia: cada INSERT,
+# UPDATE o DELETE de cuotas o pagos suma por crédito la diferencia entre las
+# filas nuevas (+1) y las viejas (-1) y actualiza cada crédito una sola vez,
+# así las cargas masivas (conciliación, importación, recalcular estados)
+# no actualizan el crédito por fila. Las tablas de transición solo existen
+# para el evento del trigger, por eso el origen se arma según TG_OP.
+TOTALS_SQL = """
+CREATE OR REPLACE FUNCTION core_credit_totals_cuota() RETURNS trigger AS $$
+DECLARE
+    origen text := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS signo, * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT -1 AS signo, * FROM old_rows'
+        ELSE 'SELECT -1 AS signo, * FROM old_rows UNION ALL SELECT 1 AS signo, * FROM new_rows'
+    END;
+BEGIN
+    EXECUTE format($sql$
+        UPDATE "core.creditos" cr SET
+            cuotas_pagadas = cr.cuotas_pagadas + d.pagadas,
+            cuotas_pendientes = cr.cuotas_pendientes + d.pendientes,
+            cuotas_vencidas = cr.cuotas_vencidas + d.vencidas,
+            saldo_pendiente = cr.saldo_pendiente + d.valor
+        FROM (
+            SELECT r.credito_id,
+                   SUM(r.signo * (r.estado = 'pagada')::int) AS pagadas,
+                   SUM(r.signo * (r.estado IN ('pendiente', 'parcial'))::int) AS pendientes,
+                   SUM(r.signo * (r.estado = 'vencida')::int) AS vencidas,
+                   SUM(r.signo * r.valor_cuota) AS valor
+            FROM (%s) r
+            GROUP BY r.credito_id
+        ) d
+        WHERE cr.credito_id = d.credito_id
+          AND (d.pagadas, d.pendientes, d.vencidas, d.valor) <> (0, 0, 0, 0)
+    $sql$, origen);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_credit_totals_pago() RETURNS trigger AS $$
+DECLARE
+    origen text := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT 1 AS signo, * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT -1 AS signo, * FROM old_rows'
+        ELSE 'SELECT -1 AS signo, * FROM old_rows UNION ALL SELECT 1 AS signo, * FROM new_rows'
+    END;
+BEGIN
+    -- Si sale algún pago la fecha del último se vuelve a leer de core.pagos
+    EXECUTE format($sql$
+        UPDATE "core.creditos" cr SET
+            num_pagos = cr.num_pagos + d.pagos,
+            total_pagado = cr.total_pagado + d.monto,
+            saldo_pendiente = cr.saldo_pendiente - d.monto,
+            fecha_ultimo_pago = CASE
+                WHEN d.ultimo_retirado IS NULL THEN GREATEST(cr.fecha_ultimo_pago, d.ultimo_nuevo)
+                ELSE (
+                    SELECT MAX(p.fecha_pago) FROM "core.pagos" p
+                    JOIN "core.payment_schedule" s ON s.schedule_id = p.schedule_id
+                    WHERE s.credito_id = cr.credito_id
+                )
+            END
+        FROM (
+            SELECT COALESCE(s.credito_id, r.credito_id) AS credito_id,
+                   SUM(r.signo) AS pagos,
+                   SUM(r.signo * r.monto) AS monto,
+                   MAX(r.fecha_pago) FILTER (WHERE r.signo > 0) AS ultimo_nuevo,
+                   MAX(r.fecha_pago) FILTER (WHERE r.signo < 0) AS ultimo_retirado
+            FROM (%s) r
+            LEFT JOIN "core.payment_schedule" s ON s.schedule_id = r.schedule_id
+            GROUP BY 1
+        ) d
+        WHERE cr.credito_id = d.credito_id
+          AND (d.pagos <> 0 OR d.monto <> 0 OR d.ultimo_nuevo IS DISTINCT FROM d.ultimo_retirado)
+    $sql$, origen);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Recalcula desde cero los créditos de un rango de ids; devuelve cuántos
+-- estaban desfasados. Bloquea primero los créditos para que los triggers
+-- de las transacciones en curso esperen y sumen sobre el valor recalculado.
+CREATE OR REPLACE FUNCTION core_credit_totals_refresh(p_desde bigint, p_hasta bigint) RETURNS integer AS $$
+DECLARE
+    corregidos integer;
+BEGIN
+    PERFORM 1 FROM "core.creditos" WHERE credito_id BETWEEN p_desde AND p_hasta
+    ORDER BY credito_id FOR UPDATE;
+    UPDATE "core.creditos" cr SET
+        cuotas_pagadas = d.pagadas,
+        cuotas_pendientes = d.pendientes,
+        cuotas_vencidas = d.vencidas,
+        num_pagos = d.pagos,
+        total_pagado = d.monto,
+        saldo_pendiente = d.valor - d.monto,
+        fecha_ultimo_pago = d.ultimo
+    FROM (
+        SELECT c.credito_id,
+               COALESCE(s.pagadas, 0) AS pagadas,
+               COALESCE(s.pendientes, 0) AS pendientes,
+               COALESCE(s.vencidas, 0) AS vencidas,
+               COALESCE(s.valor, 0) AS valor,
+               COALESCE(p.pagos, 0) AS pagos,
+               COALESCE(p.monto, 0) AS monto,
+               p.ultimo
+        FROM "core.creditos" c
+        LEFT JOIN (
+            SELECT credito_id,
+                   COUNT(*) FILTER (WHERE estado = 'pagada') AS pagadas,
+                   COUNT(*) FILTER (WHERE estado IN ('pendiente', 'parcial')) AS pendientes,
+                   COUNT(*) FILTER (WHERE estado = 'vencida') AS vencidas,
+                   SUM(valor_cuota) AS valor
+            FROM "core.payment_schedule"
+            WHERE credito_id BETWEEN p_desde AND p_hasta
+            GROUP BY credito_id
+        ) s ON s.credito_id = c.credito_id
+        LEFT JOIN (
+            SELECT s.credito_id, COUNT(*) AS pagos, SUM(p.monto) AS monto, MAX(p.fecha_pago) AS ultimo
+            FROM "core.pagos" p
+            JOIN "core.payment_schedule" s ON s.schedule_id = p.schedule_id
+            WHERE s.credito_id BETWEEN p_desde AND p_hasta
+            GROUP BY s.credito_id
+        ) p ON p.credito_id = c.credito_id
+        WHERE c.credito_id BETWEEN p_desde AND p_hasta
+    ) d
+    WHERE cr.credito_id = d.credito_id
+      AND (cr.cuotas_pagadas, cr.cuotas_pendientes, cr.cuotas_vencidas, cr.num_pagos,
+           cr.total_pagado, cr.saldo_pendiente, cr.fecha_ultimo_pago)
+          IS DISTINCT FROM
+          (d.pagadas, d.pendientes, d.vencidas, d.pagos, d.monto, d.valor - d.monto, d.ultimo);
+    GET DIAGNOSTICS corregidos = ROW_COUNT;
+    RETURN corregidos;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER credit_totals_cuota_insert AFTER INSERT ON "core.payment_schedule"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_cuota();
+CREATE TRIGGER credit_totals_cuota_update AFTER UPDATE ON "core.payment_schedule"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_cuota();
+CREATE TRIGGER credit_totals_cuota_delete AFTER DELETE ON "core.payment_schedule"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_cuota();
+
+CREATE TRIGGER credit_totals_pago_insert AFTER INSERT ON "core.pagos"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_pago();
+CREATE TRIGGER credit_totals_pago_update AFTER UPDATE ON "core.pagos"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_pago();
+CREATE TRIGGER credit_totals_pago_delete AFTER DELETE ON "core.pagos"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_credit_totals_pago();
+
+SELECT core_credit_totals_refresh(0, 9223372036854775807);
+"""
+
+DROP_TOTALS_SQL = """
+DROP TRIGGER IF EXISTS credit_totals_pago_delete ON "core.pagos";
+DROP TRIGGER IF EXISTS credit_totals_pago_update ON "core.pagos";
+DROP TRIGGER IF EXISTS credit_totals_pago_insert ON "core.pagos";
+DROP TRIGGER IF EXISTS credit_totals_cuota_delete ON "core.payment_schedule";
+DROP TRIGGER IF EXISTS credit_totals_cuota_update ON "core.payment_schedule";
+DROP TRIGGER IF EXISTS credit_totals_cuota_insert ON "core.payment_schedule";
+DROP FUNCTION IF EXISTS core_credit_totals_refresh(bigint, bigint);
+DROP FUNCTION IF EXISTS core_credit_totals_pago();
+DROP FUNCTION IF EXISTS core_credit_totals_cuota();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_shard_directory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credit',
+            name='cuotas_pagadas',
+            field=models.PositiveIntegerField(db_default=models.Value(0), editable=False, help_text='Installments in estado pagada'),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='cuotas_pendientes',
+            field=models.PositiveIntegerField(db_default=models.Value(0), editable=False, help_text='Installments in estado pendiente or parcial'),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='cuotas_vencidas',
+            field=models.PositiveIntegerField(db_default=models.Value(0), editable=False, help_text='Installments in estado vencida'),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='fecha_ultimo_pago',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Date of the latest payment', null=True),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='num_pagos',
+            field=models.PositiveIntegerField(db_default=models.Value(0), editable=False, help_text='Payments registered on the credit'),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='saldo_pendiente',
+            field=models.DecimalField(db_default=models.Value(Decimal('0.00')), decimal_places=2, editable=False, help_text='Sum of the installment values minus total_pagado', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='credit',
+            name='total_pagado',
+            field=models.DecimalField(db_default=models.Value(Decimal('0.00')), decimal_places=2, editable=False, help_text='Sum of the payments', max_digits=14),
+        ),
+        migrations.RunSQL(TOTALS_SQL, DROP_TOTALS_SQL),
+    ]
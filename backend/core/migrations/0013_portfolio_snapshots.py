@@ -0,0 +1,51 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:23
+
+from django.db import migrations, models
+
+
+# Estado diario de las cuotas abiertas, particionado por mes. Codificación
+# compacta: saldo en centavos (bigint), estado como smallint y sin días de
+# mora, que salen de fecha_vencimiento y la fecha consultada. Las
+# particiones mensuales las crea PortfolioSnapshotService al tomar el
+# primer snapshot del mes.
+SNAPSHOTS_SQL = """
+CREATE TABLE "core.installment_snapshots" (
+    schedule_id bigint NOT NULL,
+    credito_id bigint NOT NULL,
+    saldo_centavos bigint NOT NULL,
+    fecha date NOT NULL,
+    fecha_vencimiento date NOT NULL,
+    estado smallint NOT NULL,
+    PRIMARY KEY (schedule_id, fecha)
+) PARTITION BY RANGE (fecha);
+"""
+
+DROP_SNAPSHOTS_SQL = """
+DROP TABLE IF EXISTS "core.installment_snapshots";
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_credit_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshotRun',
+            fields=[
+                ('fecha', models.DateField(help_text='Snapshot date', primary_key=True, serialize=False)),
+                ('keyframe', models.BooleanField(default=False, help_text='Whether every open installment was written (first run of the month)')),
+                ('filas', models.IntegerField(default=0, help_text='Installment rows written')),
+                ('cuotas_abiertas', models.IntegerField(default=0, help_text='Open installments at the snapshot')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Portfolio Snapshot Run',
+                'verbose_name_plural': 'Portfolio Snapshot Runs',
+                'db_table': 'core.portfolio_snapshot_runs',
+            },
+        ),
+        migrations.RunSQL(SNAPSHOTS_SQL, DROP_SNAPSHOTS_SQL),
+    ]
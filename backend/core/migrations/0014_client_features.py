@@ -0,0 +1,201 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# Features por cliente: core_client_features_refresh recalcula en bloque los
+# clientes dados y el trigger de sentencia sobre pagos lo llama con los
+# clientes de las filas que cambiaron. Una cuota está pagada cuando sus
+# pagos cubren valor_cuota (no se depende del estado, que se actualiza
+# después del pago) y su atraso es el día del último pago menos el
+# vencimiento; las abiertas cuentan el atraso hasta p_fecha.
+FEATURES_SQL = """
+CREATE OR REPLACE FUNCTION core_client_features_refresh(p_clientes bigint[], p_fecha date) RETURNS integer AS $$
+DECLARE
+    escritos integer;
+BEGIN
+    -- Los pagos concurrentes del cliente esperan y recalculan sobre este resultado
+    PERFORM 1 FROM "core.client_features" WHERE cliente_id = ANY(p_clientes)
+    ORDER BY cliente_id FOR UPDATE;
+    WITH cuotas AS (
+        SELECT cr.cliente_id, cr.credito_id, cr.estado AS estado_credito,
+               s.schedule_id, s.fecha_vencimiento, s.valor_cuota
+        FROM "core.creditos" cr
+        JOIN "core.payment_schedule" s ON s.credito_id = cr.credito_id
+        WHERE cr.cliente_id = ANY(p_clientes)
+    ),
+    pagos_cuota AS (
+        SELECT p.schedule_id, COUNT(*) AS pagos, SUM(p.monto) AS monto, MAX(p.fecha_pago) AS ultimo
+        FROM "core.pagos" p
+        JOIN cuotas q ON q.schedule_id = p.schedule_id
+        GROUP BY p.schedule_id
+    ),
+    atrasos AS (
+        SELECT q.cliente_id, q.credito_id, q.estado_credito, q.fecha_vencimiento,
+               COALESCE(p.pagos, 0) AS pagos,
+               COALESCE(p.monto, 0) >= q.valor_cuota AS pagada,
+               p.ultimo
+        FROM cuotas q
+        LEFT JOIN pagos_cuota p ON p.schedule_id = q.schedule_id
+    ),
+    cuotas_cliente AS (
+        SELECT a.cliente_id,
+               COUNT(DISTINCT a.credito_id) AS creditos,
+               COUNT(DISTINCT a.credito_id) FILTER (WHERE a.estado_credito = 'vigente') AS creditos_vigentes,
+               COUNT(*) FILTER (WHERE a.exigible) AS exigibles,
+               COUNT(*) FILTER (WHERE a.pagada AND a.dias = 0) AS a_tiempo,
+               COUNT(*) FILTER (WHERE a.pagos > 0) AS con_pago,
+               COUNT(*) FILTER (WHERE a.pagos > 1 OR (a.pagos = 1 AND NOT a.pagada)) AS parciales,
+               COALESCE(MAX(a.dias) FILTER (WHERE a.exigible), 0) AS mora_max,
+               COALESCE(AVG(a.dias) FILTER (WHERE a.exigible), 0) AS mora_promedio,
+               COALESCE(MAX(a.dias) FILTER (WHERE NOT a.pagada), 0) AS mora_actual
+        FROM (
+            SELECT a.*,
+                   a.pagada OR a.fecha_vencimiento <= p_fecha AS exigible,
+                   CASE WHEN a.pagada THEN GREATEST(a.ultimo::date - a.fecha_vencimiento, 0)
+                        ELSE GREATEST(p_fecha - a.fecha_vencimiento, 0)
+                   END AS dias
+            FROM atrasos a
+        ) a
+        GROUP BY a.cliente_id
+    ),
+    pagos_medio AS (
+        SELECT q.cliente_id, COALESCE(p.medio, 'sin_medio') AS medio,
+               COUNT(*) AS pagos, SUM(p.monto) AS monto, MAX(p.fecha_pago) AS ultimo,
+               ROUND(COUNT(*)::numeric / SUM(COUNT(*)) OVER (PARTITION BY q.cliente_id), 4) AS participacion
+        FROM "core.pagos" p
+        JOIN cuotas q ON q.schedule_id = p.schedule_id
+        GROUP BY q.cliente_id, 2
+    ),
+    pagos_cliente AS (
+        SELECT cliente_id, SUM(pagos) AS pagos, SUM(monto) AS monto, MAX(ultimo) AS ultimo,
+               jsonb_object_agg(medio, participacion) AS medios
+        FROM pagos_medio
+        GROUP BY cliente_id
+    )
+    INSERT INTO "core.client_features" AS f (
+        cliente_id, fecha_corte, creditos, creditos_vigentes, cuotas_exigibles, cuotas_a_tiempo,
+        tasa_a_tiempo, cuotas_con_pago, cuotas_pago_parcial, ratio_pago_parcial, dias_mora_max,
+        dias_mora_promedio, dias_mora_actual, num_pagos, monto_pagado, fecha_ultimo_pago,
+        mix_medios, updated_at
+    )
+    SELECT c.cliente_id, p_fecha,
+           COALESCE(q.creditos, 0), COALESCE(q.creditos_vigentes, 0),
+           COALESCE(q.exigibles, 0), COALESCE(q.a_tiempo, 0),
+           ROUND(q.a_tiempo::numeric / NULLIF(q.exigibles, 0), 4),
+           COALESCE(q.con_pago, 0), COALESCE(q.parciales, 0),
+           ROUND(q.parciales::numeric / NULLIF(q.con_pago, 0), 4),
+           COALESCE(q.mora_max, 0), ROUND(COALESCE(q.mora_promedio, 0), 2), COALESCE(q.mora_actual, 0),
+           COALESCE(p.pagos, 0), COALESCE(p.monto, 0), p.ultimo,
+           COALESCE(p.medios, '{}'::jsonb), now()
+    FROM "core.clientes" c
+    LEFT JOIN cuotas_cliente q ON q.cliente_id = c.cliente_id
+    LEFT JOIN pagos_cliente p ON p.cliente_id = c.cliente_id
+    WHERE c.cliente_id = ANY(p_clientes)
+    ON CONFLICT (cliente_id) DO UPDATE SET
+        fecha_corte = EXCLUDED.fecha_corte,
+        creditos = EXCLUDED.creditos,
+        creditos_vigentes = EXCLUDED.creditos_vigentes,
+        cuotas_exigibles = EXCLUDED.cuotas_exigibles,
+        cuotas_a_tiempo = EXCLUDED.cuotas_a_tiempo,
+        tasa_a_tiempo = EXCLUDED.tasa_a_tiempo,
+        cuotas_con_pago = EXCLUDED.cuotas_con_pago,
+        cuotas_pago_parcial = EXCLUDED.cuotas_pago_parcial,
+        ratio_pago_parcial = EXCLUDED.ratio_pago_parcial,
+        dias_mora_max = EXCLUDED.dias_mora_max,
+        dias_mora_promedio = EXCLUDED.dias_mora_promedio,
+        dias_mora_actual = EXCLUDED.dias_mora_actual,
+        num_pagos = EXCLUDED.num_pagos,
+        monto_pagado = EXCLUDED.monto_pagado,
+        fecha_ultimo_pago = EXCLUDED.fecha_ultimo_pago,
+        mix_medios = EXCLUDED.mix_medios,
+        updated_at = EXCLUDED.updated_at;
+    GET DIAGNOSTICS escritos = ROW_COUNT;
+    RETURN escritos;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION core_client_features_pago() RETURNS trigger AS $$
+DECLARE
+    origen text := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT schedule_id FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT schedule_id FROM old_rows'
+        ELSE 'SELECT schedule_id FROM old_rows UNION SELECT schedule_id FROM new_rows'
+    END;
+    clientes bigint[];
+BEGIN
+    EXECUTE format($sql$
+        SELECT ARRAY(
+            SELECT DISTINCT cr.cliente_id
+            FROM (%s) r
+            JOIN "core.payment_schedule" s ON s.schedule_id = r.schedule_id
+            JOIN "core.creditos" cr ON cr.credito_id = s.credito_id
+            ORDER BY cr.cliente_id
+        )
+    $sql$, origen) INTO clientes;
+    IF cardinality(clientes) > 0 THEN
+        PERFORM core_client_features_refresh(clientes, CURRENT_DATE);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER client_features_pago_insert AFTER INSERT ON "core.pagos"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_client_features_pago();
+CREATE TRIGGER client_features_pago_update AFTER UPDATE ON "core.pagos"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_client_features_pago();
+CREATE TRIGGER client_features_pago_delete AFTER DELETE ON "core.pagos"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_client_features_pago();
+"""
+
+DROP_FEATURES_SQL = """
+DROP TRIGGER IF EXISTS client_features_pago_delete ON "core.pagos";
+DROP TRIGGER IF EXISTS client_features_pago_update ON "core.pagos";
+DROP TRIGGER IF EXISTS client_features_pago_insert ON "core.pagos";
+DROP FUNCTION IF EXISTS core_client_features_pago();
+DROP FUNCTION IF EXISTS core_client_features_refresh(bigint[], date);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_portfolio_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientFeatures',
+            fields=[
+                ('cliente', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='features', serialize=False, to='core.client')),
+                ('fecha_corte', models.DateField(help_text="Date the open installments' days overdue count up to")),
+                ('creditos', models.PositiveIntegerField(db_default=models.Value(0), help_text='Credits of the client')),
+                ('creditos_vigentes', models.PositiveIntegerField(db_default=models.Value(0), help_text='Credits in estado vigente')),
+                ('cuotas_exigibles', models.PositiveIntegerField(db_default=models.Value(0), help_text='Installments due by fecha_corte or already paid')),
+                ('cuotas_a_tiempo', models.PositiveIntegerField(db_default=models.Value(0), help_text='Installments fully paid by their due date')),
+                ('tasa_a_tiempo', models.DecimalField(decimal_places=4, help_text='cuotas_a_tiempo / cuotas_exigibles', max_digits=5, null=True)),
+                ('cuotas_con_pago', models.PositiveIntegerField(db_default=models.Value(0), help_text='Installments with at least one payment')),
+                ('cuotas_pago_parcial', models.PositiveIntegerField(db_default=models.Value(0), help_text='Installments paid in several payments or still partially paid')),
+                ('ratio_pago_parcial', models.DecimalField(decimal_places=4, help_text='cuotas_pago_parcial / cuotas_con_pago', max_digits=5, null=True)),
+                ('dias_mora_max', models.PositiveIntegerField(db_default=models.Value(0), help_text='Most days late of any installment (paid late or still overdue)')),
+                ('dias_mora_promedio', models.DecimalField(db_default=models.Value(Decimal('0.00')), decimal_places=2, help_text='Average days late over cuotas_exigibles', max_digits=7)),
+                ('dias_mora_actual', models.PositiveIntegerField(db_default=models.Value(0), help_text='Days overdue of the oldest unpaid installment')),
+                ('num_pagos', models.PositiveIntegerField(db_default=models.Value(0), help_text='Payments of the client')),
+                ('monto_pagado', models.DecimalField(db_default=models.Value(Decimal('0.00')), decimal_places=2, max_digits=14)),
+                ('fecha_ultimo_pago', models.DateTimeField(blank=True, null=True)),
+                ('mix_medios', models.JSONField(default=dict, help_text='Share of the payments by medio')),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Client Features',
+                'verbose_name_plural': 'Client Features',
+                'db_table': 'core.client_features',
+            },
+        ),
+        migrations.RunSQL(FEATURES_SQL, DROP_FEATURES_SQL),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_client_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillCheckpoint',
+            fields=[
+                ('nombre', models.CharField(help_text='Registered backfill name', max_length=100, primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pending'), ('en_proceso', 'Running'), ('rellenado', 'Rows filled, constraints pending'), ('completado', 'Completed')], default='pendiente', max_length=20)),
+                ('ultimo_id', models.BigIntegerField(blank=True, help_text='Last primary key of the table already processed', null=True)),
+                ('hasta_id', models.BigIntegerField(blank=True, help_text='Highest primary key when the run started (progress estimate)', null=True)),
+                ('filas', models.BigIntegerField(default=0, help_text='Rows updated')),
+                ('lotes', models.IntegerField(default=0, help_text='Batches committed')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Backfill Checkpoint',
+                'verbose_name_plural': 'Backfill Checkpoints',
+                'db_table': 'core.backfill_checkpoints',
+            },
+        ),
+    ]
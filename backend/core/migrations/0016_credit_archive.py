@@ -0,0 +1,93 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:48
+
+from importlib import import_module
+from django.db import migrations, models
+
+features = import_module('core.migrations.0014_client_features')
+
+CREDIT_COLUMNS = (
+    'credito_id, cliente_id, producto, inversion, cuotas_totales, tea, fecha_desembolso, fecha_inicio_pago, '
+    'estado, change_seq, change_xid, updated_at, cuotas_pagadas, cuotas_pendientes, cuotas_vencidas, '
+    'fecha_ultimo_pago, num_pagos, saldo_pendiente, total_pagado'
+)
+SCHEDULE_COLUMNS = (
+    'schedule_id, credito_id, num_cuota, fecha_vencimiento, valor_cuota, estado, change_seq, change_xid, updated_at'
+)
+PAYMENT_COLUMNS = (
+    'pago_id, credito_id, schedule_id, fecha_pago, monto, medio, change_seq, change_xid, updated_at, referencia'
+)
+
+# Tablas de archivo: mismas columnas que las activas (una migración que
+# agregue columnas a una activa las agrega también aquí) más archivado_at.
+# Sin FK ni triggers: ArchiveService mueve créditos completos con sus cuotas
+# y pagos. Las vistas *_todos unen activas y archivo para los cálculos que
+# recorren la historia completa (features de clientes, recaudo por día).
+ARCHIVE_SQL = f"""
+CREATE TABLE "core.creditos_archivo" (
+    LIKE "core.creditos",
+    archivado_at timestamp with time zone NOT NULL DEFAULT now(),
+    PRIMARY KEY (credito_id)
+) WITH (fillfactor = 100);
+CREATE INDEX creditos_archivo_cliente_idx ON "core.creditos_archivo" (cliente_id);
+
+CREATE TABLE "core.payment_schedule_archivo" (
+    LIKE "core.payment_schedule",
+    archivado_at timestamp with time zone NOT NULL DEFAULT now(),
+    PRIMARY KEY (schedule_id)
+) WITH (fillfactor = 100);
+CREATE INDEX payment_schedule_archivo_credito_idx ON "core.payment_schedule_archivo" (credito_id);
+
+CREATE TABLE "core.pagos_archivo" (
+    LIKE "core.pagos",
+    archivado_at timestamp with time zone NOT NULL DEFAULT now(),
+    PRIMARY KEY (pago_id)
+) WITH (fillfactor = 100);
+CREATE INDEX pagos_archivo_schedule_idx ON "core.pagos_archivo" (schedule_id);
+CREATE INDEX pagos_archivo_fecha_idx ON "core.pagos_archivo" (fecha_pago);
+
+CREATE VIEW "core.creditos_todos" AS
+    SELECT {CREDIT_COLUMNS} FROM "core.creditos"
+    UNION ALL
+    SELECT {CREDIT_COLUMNS} FROM "core.creditos_archivo";
+CREATE VIEW "core.payment_schedule_todos" AS
+    SELECT {SCHEDULE_COLUMNS} FROM "core.payment_schedule"
+    UNION ALL
+    SELECT {SCHEDULE_COLUMNS} FROM "core.payment_schedule_archivo";
+CREATE VIEW "core.pagos_todos" AS
+    SELECT {PAYMENT_COLUMNS} FROM "core.pagos"
+    UNION ALL
+    SELECT {PAYMENT_COLUMNS} FROM "core.pagos_archivo";
+"""
+
+DROP_ARCHIVE_SQL = """
+DROP VIEW IF EXISTS "core.pagos_todos";
+DROP VIEW IF EXISTS "core.payment_schedule_todos";
+DROP VIEW IF EXISTS "core.creditos_todos";
+DROP TABLE IF EXISTS "core.pagos_archivo";
+DROP TABLE IF EXISTS "core.payment_schedule_archivo";
+DROP TABLE IF EXISTS "core.creditos_archivo";
+"""
+
+# core_client_features_refresh de 0014 leyendo también los créditos archivados:
+# la historia de pago de un cliente no cambia al archivar
+REFRESH_SQL = features.FEATURES_SQL.split('CREATE OR REPLACE FUNCTION core_client_features_pago()')[0]
+ARCHIVE_REFRESH_SQL = REFRESH_SQL
+for table in ('core.creditos', 'core.payment_schedule', 'core.pagos'):
+    ARCHIVE_REFRESH_SQL = ARCHIVE_REFRESH_SQL.replace(f'"{table}" ', f'"{table}_todos" ')
+assert ARCHIVE_REFRESH_SQL.count('_todos"') == 4
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_backfill_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='credit',
+            index=models.Index(condition=models.Q(('estado__in', ['cancelado', 'castigado'])), fields=['credito_id'], name='credito_settled_idx'),
+        ),
+        migrations.RunSQL(ARCHIVE_SQL, DROP_ARCHIVE_SQL),
+        migrations.RunSQL(ARCHIVE_REFRESH_SQL, REFRESH_SQL),
+    ]
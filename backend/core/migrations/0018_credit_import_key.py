@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-19 19:33
+
+from django.db import migrations, models
+
+# La tabla de archivo lleva las mismas columnas que core.creditos (0016):
+# un crédito importado y archivado tampoco se vuelve a crear
+ARCHIVE_SQL = """
+ALTER TABLE "core.creditos_archivo" ADD COLUMN clave_importacion varchar(32);
+CREATE UNIQUE INDEX creditos_archivo_clave_importacion_idx ON "core.creditos_archivo" (clave_importacion)
+    WHERE clave_importacion IS NOT NULL;
+"""
+
+DROP_ARCHIVE_SQL = """
+ALTER TABLE "core.creditos_archivo" DROP COLUMN clave_importacion;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_credit_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credit',
+            name='clave_importacion',
+            field=models.CharField(blank=True, editable=False, help_text='Key of the CSV row the credit was imported from (import_credits skips it on a rerun)', max_length=32, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='credit',
+            constraint=models.UniqueConstraint(condition=models.Q(('clave_importacion__isnull', False)), fields=('clave_importacion',), name='credito_clave_importacion_uniq'),
+        ),
+        migrations.RunSQL(ARCHIVE_SQL, DROP_ARCHIVE_SQL),
+    ]
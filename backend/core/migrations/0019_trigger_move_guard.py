@@ -0,0 +1,70 @@
+# Generated by Django 5.0.1 on 2026-10-19 19:58
+
+import re
+from django.db import migrations
+
+# Mover filas (archivo, buckets entre shards, distribute_shards) no debe
+# disparar los triggers: ni asientos del ledger, ni acumulados, recaudo,
+# features, outbox o tombstones de sync. session_replication_role = replica
+# los apagaba pero exige superusuario; cada trigger de las tablas de core
+# pasa a comprobar core.moviendo, que cualquier usuario fija con SET LOCAL
+# (core.infrastructure.db.skip_triggers). Un trigger nuevo en estas tablas
+# debe llevar la misma condición.
+TABLES = ['"core.clientes"', '"core.creditos"', '"core.payment_schedule"', '"core.pagos"', '"core.credit_ledger"']
+GUARD = "current_setting('core.moviendo', true) IS DISTINCT FROM 'on'"
+# Como lo devuelve pg_get_triggerdef
+STORED_GUARD = r"\(current_setting\('core\.moviendo'::text, true\) IS DISTINCT FROM 'on'::text\)"
+
+
+def _triggers(cursor):
+    cursor.execute(
+        "SELECT tgname, tgrelid::regclass::text, pg_get_triggerdef(oid) FROM pg_trigger "
+        "WHERE NOT tgisinternal AND tgrelid = ANY(%s::regclass[]) ORDER BY tgrelid, tgname",
+        [TABLES]
+    )
+    return cursor.fetchall()
+
+
+def _recreate(schema_editor, rewrite):
+    with schema_editor.connection.cursor() as cursor:
+        for name, table, definition in _triggers(cursor):
+            new_definition = rewrite(definition)
+            if new_definition != definition:
+                cursor.execute(f'DROP TRIGGER "{name}" ON {table}')
+                cursor.execute(new_definition)
+
+
+def guard(definition):
+    if re.search(STORED_GUARD, definition):
+        return definition
+    if ' WHEN (' in definition:
+        return definition.replace(' WHEN (', f' WHEN ({GUARD} AND (', 1).replace(
+            ') EXECUTE FUNCTION ', ')) EXECUTE FUNCTION ', 1
+        )
+    return definition.replace(' EXECUTE FUNCTION ', f' WHEN ({GUARD}) EXECUTE FUNCTION ', 1)
+
+
+def unguard(definition):
+    definition = re.sub(rf' WHEN \({STORED_GUARD}\) EXECUTE FUNCTION ', ' EXECUTE FUNCTION ', definition)
+    return re.sub(
+        rf' WHEN \(\({STORED_GUARD} AND (\(.*\))\)\) EXECUTE FUNCTION ', r' WHEN (\1) EXECUTE FUNCTION ', definition
+    )
+
+
+def guard_triggers(apps, schema_editor):
+    _recreate(schema_editor, guard)
+
+
+def unguard_triggers(apps, schema_editor):
+    _recreate(schema_editor, unguard)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_credit_import_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(guard_triggers, unguard_triggers),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-19 20:07
+
+from django.db import migrations
+
+# Las tablas de archivo y las vistas *_todos de 0016 repiten las columnas de
+# créditos, cuotas y pagos. sync_archive las deriva del estado de los
+# modelos en la migración: agrega al archivo las columnas que le falten (con
+# el tipo de la tabla activa) y rehace las vistas con los campos del modelo.
+# Una migración que agregue o quite campos de estos modelos termina con
+#   archive = import_module('core.migrations.0020_archive_columns_from_models')
+#   migrations.RunPython(archive.sync_archive, archive.sync_archive)
+MODELS = ('Credit', 'PaymentSchedule', 'Payment')
+
+
+def _columns(cursor, table):
+    cursor.execute(
+        "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+        "WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+        [f'"{table}"']
+    )
+    return cursor.fetchall()
+
+
+def sync_archive(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for name in MODELS:
+            model = apps.get_model('core', name)
+            table = model._meta.db_table
+            archive, view = f'{table}_archivo', f'{table}_todos'
+            archived = {column for column, _ in _columns(cursor, archive)}
+            for column, column_type in _columns(cursor, table):
+                if column not in archived:
+                    cursor.execute(f'ALTER TABLE "{archive}" ADD COLUMN "{column}" {column_type}')
+            columns = ', '.join(f'"{field.column}"' for field in model._meta.concrete_fields)
+            cursor.execute(f'DROP VIEW IF EXISTS "{view}"')
+            cursor.execute(
+                f'CREATE VIEW "{view}" AS SELECT {columns} FROM "{table}" UNION ALL SELECT {columns} FROM "{archive}"'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_trigger_move_guard'),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_archive, sync_archive),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+# Los trabajos ya en proceso reciben el arriendo que les daba el heartbeat
+LEASE_SQL = """
+UPDATE "core.jobs" SET lease_until = heartbeat_at + interval '600 seconds'
+WHERE estado = 'en_proceso';
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_archive_columns_from_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, help_text='The running job goes back to the queue if its worker does not renew this lease', null=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='job',
+            name='job_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['estado', 'lease_until'], name='job_lease_idx'),
+        ),
+        migrations.RunSQL(LEASE_SQL, migrations.RunSQL.noop),
+    ]
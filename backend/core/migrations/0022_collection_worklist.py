@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-19 22:05
+
+from django.db import migrations, models
+
+# Clave de ciudad de la lista de cobranza: sin mayúsculas ni tildes, para
+# que ?ciudad=bogota encuentre Bogotá (unaccent no está en todas las bases).
+# Las páginas recorren el índice del orden de la lista desde el cursor.
+WORKLIST_SQL = """
+CREATE OR REPLACE FUNCTION core_ciudad_clave(ciudad text) RETURNS text AS $$
+    SELECT lower(translate(btrim(ciudad), 'ÁÀÂÄÉÈÊËÍÌÎÏÓÒÔÖÚÙÛÜÑáàâäéèêëíìîïóòôöúùûüñ',
+                                          'AAAAEEEEIIIIOOOOUUUUNaaaaeeeeiiiioooouuuun'))
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE INDEX collection_worklist_orden_idx ON "core.collection_worklist"
+    ((-monto_vencido), vencida_desde, proximo_vencimiento, cliente_id);
+CREATE INDEX collection_worklist_ciudad_idx ON "core.collection_worklist"
+    (ciudad_clave, (-monto_vencido), vencida_desde, proximo_vencimiento, cliente_id);
+
+INSERT INTO "core.collection_worklist_estado" (estado_id, last_xid, last_seq, updated_at) VALUES (1, 0, 0, now());
+"""
+
+DROP_WORKLIST_SQL = """
+DROP FUNCTION IF EXISTS core_ciudad_clave(text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_job_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionWorklistEntry',
+            fields=[
+                ('cliente_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('ciudad_clave', models.CharField(help_text='City lowercased and without accents (core_ciudad_clave)', max_length=50)),
+                ('monto_vencido', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('cuotas_vencidas', models.PositiveIntegerField()),
+                ('creditos_en_mora', models.PositiveIntegerField()),
+                ('vencida_desde', models.DateField(help_text='Due date of the oldest overdue installment')),
+                ('proximo_vencimiento', models.DateField(help_text='Next due date, date.max when there is none')),
+            ],
+            options={
+                'verbose_name': 'Collection Worklist Entry',
+                'verbose_name_plural': 'Collection Worklist Entries',
+                'db_table': 'core.collection_worklist',
+            },
+        ),
+        migrations.CreateModel(
+            name='CollectionWorklistState',
+            fields=[
+                ('estado_id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('fecha_corte', models.DateField(blank=True, null=True)),
+                ('last_xid', models.BigIntegerField(default=0)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Collection Worklist State',
+                'verbose_name_plural': 'Collection Worklist State',
+                'db_table': 'core.collection_worklist_estado',
+            },
+        ),
+        migrations.RunSQL(WORKLIST_SQL, DROP_WORKLIST_SQL),
+    ]
@@ -8,7 +8,20 @@ from .domain.entities import (
     Client,
     Credit,
     PaymentSchedule,
-    Payment
+    Payment,
+    SyncTombstone,
+    OutboxEvent,
+    OutboxCheckpoint,
+    CreditLedgerEntry,
+    CreditLedgerSnapshot,
+    CollectionDailyRollup,
+    CollectionWorklistEntry,
+    CollectionWorklistState,
+    Job,
+    ShardBucket,
+    PortfolioSnapshotRun,
+    ClientFeatures,
+    BackfillCheckpoint
 )
 
 # Maintain backward compatibility with old names
@@ -21,6 +34,19 @@ __all__ = [
     'Credit', 
     'PaymentSchedule',
     'Payment',
+    'SyncTombstone',
+    'OutboxEvent',
+    'OutboxCheckpoint',
+    'CreditLedgerEntry',
+    'CreditLedgerSnapshot',
+    'CollectionDailyRollup',
+    'CollectionWorklistEntry',
+    'CollectionWorklistState',
+    'Job',
+    'ShardBucket',
+    'PortfolioSnapshotRun',
+    'ClientFeatures',
+    'BackfillCheckpoint',
     # Backward compatibility
     'Cliente',
     'Credito',
@@ -8,12 +8,20 @@ from .infrastructure.serializers import (
     ClientSerializer,
     ClientDashboardSerializer,
     ClientSearchSerializer,
+    Client360Serializer,
     CreditSerializer,
     CreditSummarySerializer,
+    CreditLedgerEntrySerializer,
+    CreditBalanceSerializer,
     PaymentSerializer,
     PaymentScheduleSerializer,
     PaymentSummarySerializer,
-    OverdueInterestSerializer
+    OverdueInterestSerializer,
+    JobSerializer,
+    JobCreateSerializer,
+    ReportRequestSerializer,
+    FieldSelection,
+    RequestLoaders
 )
 
 # Create aliases for backward compatibility
@@ -30,12 +38,20 @@ __all__ = [
     'ClientSerializer',
     'ClientDashboardSerializer',
     'ClientSearchSerializer',
+    'Client360Serializer',
     'CreditSerializer',
     'CreditSummarySerializer',
+    'CreditLedgerEntrySerializer',
+    'CreditBalanceSerializer',
     'PaymentSerializer',
     'PaymentScheduleSerializer',
     'PaymentSummarySerializer',
     'OverdueInterestSerializer',
+    'JobSerializer',
+    'JobCreateSerializer',
+    'ReportRequestSerializer',
+    'FieldSelection',
+    'RequestLoaders',
     'PaymentScheduleSummarySerializer',
     'ClienteCronogramaSerializer',
     'PagoCreateSerializer',
@@ -7,11 +7,45 @@ This file maintains backward compatibility while using the new modular structure
 from .application.services.simple_client_service import SimpleClientService
 from .application.services.simple_credit_service import SimpleCreditService
 from .application.services.simple_payment_service import SimplePaymentService
+from .application.services.route_manifest_service import RouteManifestService
+from .application.services.sync_service import SyncService
+from .application.services.credit_ledger_service import CreditLedgerService
+from .application.services.collections_worklist_service import CollectionsWorklistService
+from .application.services.collection_rollup_service import CollectionRollupService
+from .application.services.job_service import JobService
+from .application.services.report_service import ReportService
+from .application.services.credit_import_service import CreditImportService
+from .application.services.reconciliation_service import ReconciliationService
+from .application.services.portfolio_service import PortfolioService
+from .application.services.shard_service import ShardService
+from .application.services.portfolio_snapshot_service import PortfolioSnapshotService
+from .application.services.payoff_quote_service import PayoffQuoteService
+from .application.services.offer_simulator_service import OfferSimulatorService
+from .application.services.client_feature_service import ClientFeatureService
+from .application.services.backfill_service import BackfillService
+from .application.services.archive_service import ArchiveService
 
 # Create service instances
 client_service = SimpleClientService()
 credit_service = SimpleCreditService()
 payment_service = SimplePaymentService()
+route_manifest_service = RouteManifestService()
+sync_service = SyncService()
+credit_ledger_service = CreditLedgerService()
+collections_worklist_service = CollectionsWorklistService()
+collection_rollup_service = CollectionRollupService()
+job_service = JobService()
+report_service = ReportService()
+credit_import_service = CreditImportService()
+reconciliation_service = ReconciliationService()
+portfolio_service = PortfolioService()
+shard_service = ShardService()
+portfolio_snapshot_service = PortfolioSnapshotService()
+payoff_quote_service = PayoffQuoteService()
+offer_simulator_service = OfferSimulatorService()
+client_feature_service = ClientFeatureService()
+backfill_service = BackfillService()
+archive_service = ArchiveService()
 
 # Legacy service classes for backward compatibility
 class PaymentScheduleService:
@@ -26,18 +60,23 @@ class PaymentScheduleService:
         return credit_service.get_credit_financial_resume(credito_id)
     
     @staticmethod
-    def get_cuotas_vencidas(cliente_id=None):
-        from .models import PaymentSchedule
-        if cliente_id:
-            return PaymentSchedule.objects.by_client(cliente_id).overdue()
-        return PaymentSchedule.objects.overdue()
+    def procesar_pago(schedule_id, monto, medio='app'):
+        return payment_service.create_payment(schedule_id, monto, medio)
+    
+    @staticmethod
+    def get_cuotas_vencidas(cliente_id=None, limit=None):
+        return portfolio_service.overdue_installments(cliente_id, limit)
+    
+    @staticmethod
+    def calcular_mora(cuota, tasa_mora=0.02):
+        return payment_service.overdue_interest(cuota, tasa_mora)['overdue_interest']
 
 class ClienteService:
     """Legacy service class for backward compatibility"""
     
     @staticmethod
     def get_clientes_con_mora():
-        return client_service.get_clients_with_overdue()
+        return portfolio_service.clients_with_overdue()
     
     @staticmethod
     def get_cliente_dashboard(cliente_id):
@@ -65,6 +104,23 @@ __all__ = [
     'client_service',
     'credit_service',
     'payment_service',
+    'route_manifest_service',
+    'sync_service',
+    'credit_ledger_service',
+    'collections_worklist_service',
+    'collection_rollup_service',
+    'job_service',
+    'report_service',
+    'credit_import_service',
+    'reconciliation_service',
+    'portfolio_service',
+    'shard_service',
+    'portfolio_snapshot_service',
+    'payoff_quote_service',
+    'offer_simulator_service',
+    'client_feature_service',
+    'backfill_service',
+    'archive_service',
     # Legacy compatibility
     'PaymentScheduleService',
     'ClienteService',
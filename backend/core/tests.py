@@ -1,3 +1,1062 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_UP
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from unittest import skipUnless
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from .models import (
+    BackfillCheckpoint, Cliente, ClientFeatures, CollectionDailyRollup, Credito, CreditLedgerEntry, Job, OutboxCheckpoint, OutboxEvent, Pago, PaymentSchedule, SyncTombstone
+)
+from .application.services.credit_import_service import CreditImportService
+from .application.services.offer_simulator_service import LRUCache
+from .application.services.outbox_relay_service import OutboxRelayService
+from .application.services.reconciliation_service import ReconciliationService
+from .infrastructure import sharding
+from .infrastructure.sharding import UnroutedQuery
+from .services import (
+    archive_service, backfill_service, client_feature_service, collection_rollup_service, job_service, payment_service, payoff_quote_service,
+    portfolio_service, portfolio_snapshot_service, report_service, shard_service, sync_service
+)
+
+# Las pruebas de un solo nodo corren en default aunque DB_SHARDS configure shards; ShardingTests cubre los shards
+sin_shards = override_settings(SHARDS=[])
+
+
+def crear_credito(num_doc='1000', valores=None, inversion=Decimal('1200000'), tea=Decimal('0.28'),
+                  dias_entre_cuotas=30, primera=None, cliente=None):
+    """Crédito vigente con su cronograma (por defecto 12 cuotas sin interés), de un cliente nuevo o del dado"""
+    cliente = cliente or Cliente.objects.create(
+        tipo_doc='CC', num_doc=num_doc, nombre=f'Cliente {num_doc}', ciudad='Bogotá'
+    )
+    valores = valores or [inversion / 12] * 12
+    primera = primera or date.today() + timedelta(days=dias_entre_cuotas)
+    credito = Credito.objects.create(
+        cliente=cliente, producto='e-bike', inversion=inversion, cuotas_totales=len(valores), tea=tea,
+        fecha_desembolso=date.today(), fecha_inicio_pago=primera
+    )
+    PaymentSchedule.objects.bulk_create([
+        PaymentSchedule(
+            credito=credito, num_cuota=num, valor_cuota=valor, estado='pendiente',
+            fecha_vencimiento=primera + timedelta(days=dias_entre_cuotas * (num - 1))
+        )
+        for num, valor in enumerate(valores, 1)
+    ])
+    return credito
+
+
+def pagar(cuota, monto, medio='cash'):
+    return Pago.objects.create(
+        credito_id=cuota.credito_id, schedule=cuota, fecha_pago=timezone.now(), monto=monto, medio=medio
+    )
+
+
+@sin_shards
+class ScheduleBalanceTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.credito = crear_credito()
+        self.cuota = PaymentSchedule.objects.filter(credito=self.credito, num_cuota=1).get()
+        pagar(self.cuota, Decimal('40000'))
+
+    def test_balance_properties_aggregate_once(self):
+        cuota = PaymentSchedule.objects.select_related(None).prefetch_related(None).get(pk=self.cuota.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cuota.monto_pagado, Decimal('40000'))
+            self.assertEqual(cuota.saldo_pendiente, Decimal('60000'))
+            self.assertFalse(cuota.esta_vencida)
+            self.assertEqual(cuota.dias_mora, 0)
+            self.assertEqual(cuota.monto_pagado, Decimal('40000'))
+
+    def test_balance_annotations_need_no_query(self):
+        cuota = PaymentSchedule.objects.with_balance().get(pk=self.cuota.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(cuota.monto_pagado, Decimal('40000'))
+            self.assertEqual(cuota.saldo_pendiente, Decimal('60000'))
+            self.assertEqual(cuota.dias_mora, 0)
+
+    def test_prefetched_payments_need_no_query(self):
+        cuota = PaymentSchedule.objects.prefetch_related('pagos').get(pk=self.cuota.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(cuota.saldo_pendiente, Decimal('60000'))
+
+    def test_refresh_from_db_drops_memoized_balances(self):
+        cuota = PaymentSchedule.objects.with_balance().get(pk=self.cuota.pk)
+        self.assertEqual(cuota.saldo_pendiente, Decimal('60000'))
+        pagar(cuota, Decimal('25000'))
+
+        cuota.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.assertEqual(cuota.monto_pagado, Decimal('65000'))
+            self.assertEqual(cuota.saldo_pendiente, Decimal('35000'))
+
+
+@sin_shards
+class ScheduleEndpointQueryTests(TestCase):
+    # Las vistas del cronograma usan monto_pagado/saldo_pendiente: consultas constantes por cliente
+    databases = '__all__'
+    ENDPOINTS = [
+        '/api/repartidor/cronograma_completo/?cliente_id={}',
+        '/api/repartidor/cronograma_resumido/?cliente_id={}',
+        '/api/cronograma/?cliente_id={}',
+        '/api/cronograma/?cliente_id={}&expand=payments',
+    ]
+
+    def cliente(self, num_doc, cuotas):
+        credito = crear_credito(num_doc, valores=[Decimal('100000')] * cuotas)
+        for cuota in PaymentSchedule.objects.filter(credito=credito):
+            pagar(cuota, Decimal('40000'))
+        return credito.cliente_id
+
+    def test_query_count_does_not_grow_with_the_installments(self):
+        uno, doce = self.cliente('8100', 1), self.cliente('8112', 12)
+        for endpoint in self.ENDPOINTS:
+            with self.subTest(endpoint=endpoint):
+                with CaptureQueriesContext(connection) as una_cuota:
+                    self.assertEqual(self.client.get(endpoint.format(uno)).status_code, 200)
+                with self.assertNumQueries(len(una_cuota)):
+                    response = self.client.get(endpoint.format(doce))
+                self.assertEqual(response.status_code, 200)
+
+        cronograma = self.client.get(self.ENDPOINTS[1].format(doce)).json()['cronograma']
+        self.assertEqual([cuota['saldo_pendiente'] for cuota in cronograma], [60000.0] * 12)
+
+
+@sin_shards
+class PaymentCreateTests(TestCase):
+    databases = '__all__'
+    # POST /api/pagos/ llamaba a un procesar_pago inexistente: todo pago respondía 500
+
+    def setUp(self):
+        self.credito = crear_credito('8000')
+        self.cuota = PaymentSchedule.objects.filter(credito=self.credito, num_cuota=1).get()
+
+    def pagar_api(self, monto, medio='cash', schedule=None):
+        return self.client.post(
+            '/api/pagos/', {'schedule': schedule or self.cuota.pk, 'monto': monto, 'medio': medio},
+            content_type='application/json'
+        )
+
+    def test_payment_is_created_and_updates_the_installment(self):
+        response = self.pagar_api('40000')
+        self.assertEqual(response.status_code, 201)
+        self.cuota.refresh_from_db()
+        self.assertEqual((self.cuota.estado, self.cuota.monto_pagado), ('parcial', Decimal('40000')))
+
+        self.assertEqual(self.pagar_api('60000').status_code, 201)
+        self.cuota.refresh_from_db()
+        self.assertEqual(self.cuota.estado, 'pagada')
+        self.credito.refresh_from_db()
+        self.assertEqual((self.credito.num_pagos, self.credito.total_pagado), (2, Decimal('100000')))
+
+    def test_invalid_payments_are_rejected(self):
+        for response in (
+            self.pagar_api('0'),
+            self.pagar_api('abc'),
+            self.pagar_api('1000', medio='cheque'),
+            self.pagar_api('1000', schedule=self.cuota.pk + 10 ** 6),
+        ):
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pago.objects.exists())
+
+    def test_payment_above_the_pending_balance_is_rejected(self):
+        self.assertEqual(self.pagar_api('70000').status_code, 201)
+
+        response = self.pagar_api('30000.01')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('30000.00', response.json()['error'])
+        self.cuota.refresh_from_db()
+        self.assertEqual((self.cuota.estado, self.cuota.monto_pagado), ('parcial', Decimal('70000')))
+        self.assertEqual(self.pagar_api('30000').status_code, 201)
+
+
+@sin_shards
+class OutboxPruneTests(TestCase):
+    databases = '__all__'
+    # Las filas del outbox nunca se borraban: la tabla crecía con cada pago
+
+    def setUp(self):
+        credito = crear_credito('8500')
+        for cuota in PaymentSchedule.objects.filter(credito=credito, num_cuota__lte=3).order_by('num_cuota'):
+            pagar(cuota, Decimal('10000'))
+        self.eventos = list(OutboxEvent.objects.order_by('change_xid', 'event_id'))
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(hours=48))
+
+    def checkpoint(self, sink, evento):
+        OutboxCheckpoint.objects.create(sink=sink, last_xid=evento.change_xid, last_event_id=evento.event_id)
+
+    def test_events_past_the_slowest_checkpoint_are_kept(self):
+        self.assertGreaterEqual(len(self.eventos), 3)
+        self.checkpoint('rapido', self.eventos[-1])
+        self.checkpoint('lento', self.eventos[1])
+
+        self.assertEqual(sum(OutboxRelayService().prune(24).values()), 2)
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by('change_xid', 'event_id')), self.eventos[2:]
+        )
+
+    def test_nothing_is_pruned_without_checkpoints_or_within_retention(self):
+        self.assertEqual(sum(OutboxRelayService().prune(24).values()), 0)
+        self.checkpoint('rapido', self.eventos[-1])
+        self.assertEqual(sum(OutboxRelayService().prune(72).values()), 0)
+        self.assertEqual(OutboxEvent.objects.count(), len(self.eventos))
+        with self.assertRaises(ValueError):
+            OutboxRelayService().prune(-1)
+
+
+@sin_shards
+class CreditTotalsTests(TestCase):
+    databases = '__all__'
+
+    def test_payments_update_totals_and_refresh_repairs_drift(self):
+        credito = crear_credito()
+        cuota = PaymentSchedule.objects.filter(credito=credito, num_cuota=1).get()
+        pagar(cuota, Decimal('100000'))
+        cuota.estado = 'pagada'
+        cuota.save()
+
+        credito.refresh_from_db()
+        self.assertEqual(credito.total_pagado, Decimal('100000'))
+        self.assertEqual(credito.saldo_pendiente, Decimal('1100000'))
+        self.assertEqual((credito.num_pagos, credito.cuotas_pagadas, credito.cuotas_pendientes), (1, 1, 11))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{Credito._meta.db_table}" SET total_pagado = 0, saldo_pendiente = inversion, '
+                f'num_pagos = 0 WHERE credito_id = %s', [credito.credito_id]
+            )
+        self.assertEqual(Credito.objects.refresh_totals(credito.credito_id, credito.credito_id), 1)
+        self.assertEqual(Credito.objects.refresh_totals(credito.credito_id, credito.credito_id), 0)
+        credito.refresh_from_db()
+        self.assertEqual((credito.total_pagado, credito.num_pagos), (Decimal('100000'), 1))
+
+
+@sin_shards
+class Client360Tests(TestCase):
+    databases = '__all__'
+
+    def test_client_360_loads_each_level_once(self):
+        creditos = [crear_credito('4000')]
+        cliente = creditos[0].cliente
+        for inversion in (Decimal('600000'), Decimal('2400000')):
+            credito = crear_credito('4000-' + str(inversion), inversion=inversion)
+            Credito.objects.filter(pk=credito.pk).update(cliente=cliente)
+            creditos.append(credito)
+        for credito in creditos:
+            for cuota in PaymentSchedule.objects.filter(credito=credito, num_cuota__lte=2):
+                pagar(cuota, Decimal('10000'))
+
+        # Cliente, créditos, créditos archivados, cuotas y pagos
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/clientes/{cliente.cliente_id}/360/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['creditos']), 3)
+        self.assertEqual(sum(len(credito['cronograma']) for credito in data['creditos']), 36)
+        self.assertEqual(
+            sum(len(cuota['payments']) for credito in data['creditos'] for cuota in credito['cronograma']), 6
+        )
+
+
+    def test_archived_credits_stay_in_the_360_view(self):
+        vigente = crear_credito('4100')
+        cliente = vigente.cliente
+        cancelado = crear_credito('4100-1', inversion=Decimal('600000'))
+        Credito.objects.filter(pk=cancelado.pk).update(cliente=cliente, estado='cancelado')
+        cuota = PaymentSchedule.objects.filter(credito=cancelado, num_cuota=1).get()
+        pagar(cuota, Decimal('50000'))
+        PaymentSchedule.objects.filter(credito=cancelado).update(estado='pagada')
+
+        archive_service.archive(older_than_days=0)
+
+        self.assertFalse(Credito.objects.filter(pk=cancelado.pk).exists())
+        with self.assertNumQueries(7):
+            response = self.client.get(f'/api/clientes/{cliente.cliente_id}/360/')
+        data = response.json()
+        self.assertEqual(data['resumen']['creditos'], 2)
+        self.assertEqual(data['resumen']['inversion_total'], 1800000.0)
+        archivado = next(credito for credito in data['creditos'] if credito['credito_id'] == cancelado.pk)
+        self.assertTrue(archivado['archivado'])
+        self.assertEqual(len(archivado['cronograma']), 12)
+        self.assertEqual(len(archivado['cronograma'][0]['payments']), 1)
+
+
+@sin_shards
+class ArchiveReadThroughTests(TestCase):
+    databases = '__all__'
+
+    def test_archived_credit_is_still_found_by_id(self):
+        credito = crear_credito('5000')
+        PaymentSchedule.objects.filter(credito=credito).update(estado='pagada')
+        Credito.objects.filter(pk=credito.pk).update(estado='cancelado')
+
+        asientos = CreditLedgerEntry.objects.on_shard('default').count()
+
+        moved = archive_service.archive(older_than_days=0)
+
+        self.assertEqual(moved['default']['creditos'], 1)
+        # Mover no es escribir: sin asientos ni tombstones nuevos
+        self.assertEqual(CreditLedgerEntry.objects.on_shard('default').count(), asientos)
+        self.assertFalse(SyncTombstone.objects.exists())
+        self.assertFalse(Credito.objects.filter(pk=credito.pk).exists())
+        archivado = Credito.objects.get_or_archived(credito.pk)
+        self.assertEqual(archivado.inversion, credito.inversion)
+        self.assertIsNotNone(archivado.archivado_at)
+
+        response = self.client.get(f'/api/creditos/{credito.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['archivado'])
+        response = self.client.get(f'/api/creditos/{credito.pk}/cronograma/')
+        self.assertEqual(response.status_code, 200)
+
+
+@sin_shards
+class PayoffQuoteTests(TestCase):
+    databases = '__all__'
+
+    def test_interest_free_installments_are_not_discounted(self):
+        credito = crear_credito()
+
+        quote = payoff_quote_service.quote(credito.credito_id)
+
+        self.assertEqual(quote['descuento_intereses'], Decimal('0'))
+        self.assertEqual(quote['total_pago'], credito.inversion)
+
+    def test_payoff_is_never_below_outstanding_principal(self):
+        # Cuota fija a la tea: el valor presente de las cuotas es el capital
+        inversion, tea = Decimal('1200000'), Decimal('0.28')
+        tasa = (Decimal(1) + tea) ** (Decimal(30) / Decimal(365)) - 1
+        cuota = (inversion * tasa / (1 - (1 + tasa) ** -12)).quantize(Decimal('0.01'), ROUND_UP)
+        con_interes = crear_credito('2000', [cuota] * 12, inversion=inversion, tea=tea)
+        sin_interes = crear_credito('3000', inversion=inversion, tea=tea)
+
+        for credito in (con_interes, sin_interes):
+            with self.subTest(credito=credito.credito_id):
+                credito.refresh_from_db()
+                quote = payoff_quote_service.quote(credito.credito_id)
+                self.assertGreaterEqual(quote['total_pago'], credito.inversion - credito.total_pagado)
+                self.assertLessEqual(quote['total_pago'], credito.saldo_pendiente)
+        self.assertGreater(payoff_quote_service.quote(con_interes.credito_id)['descuento_intereses'], 0)
+
+
+@sin_shards
+class ReconciliationTests(TestCase):
+    databases = '__all__'
+    # Conciliación de archivos de liquidación link/transfer/card contra las cuotas abiertas
+
+    def setUp(self):
+        self.credito = crear_credito('8700')
+        self.cuotas = list(PaymentSchedule.objects.filter(credito=self.credito).order_by('num_cuota'))
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def conciliar(self, filas, progress=None):
+        path = os.path.join(self.directorio.name, 'liquidacion.csv')
+        with open(path, 'w', encoding='utf-8') as archivo:
+            archivo.write('referencia,tipo_doc,num_doc,monto,fecha_pago,medio\n')
+            for referencia, num_doc, monto in filas:
+                archivo.write(f"{referencia},CC,{num_doc},{monto},2026-10-01,transfer\n")
+        resultado = ReconciliationService().reconcile_file(path, progress=progress)
+        excepciones = {}
+        if resultado['reporte']:
+            with open(resultado['reporte'], encoding='utf-8') as reporte:
+                for linea in list(reporte)[1:]:
+                    referencia, motivo = linea.split(',')[1:3]
+                    excepciones[referencia] = motivo
+        return resultado, excepciones
+
+    def test_rows_pay_the_next_installments_due_and_duplicates_are_reported(self):
+        resultado, excepciones = self.conciliar([
+            ('T-1', '8700', '100000'), ('T-2', '8700', '100000.00'), ('T-1', '8700', '100000'),
+            ('T-3', '8700', '55555'), ('T-4', '9999', '100000'),
+        ])
+
+        self.assertEqual((resultado['conciliados'], resultado['monto_conciliado']), (2, 200000.0))
+        self.assertEqual(excepciones, {'T-1': 'duplicado', 'T-3': 'sin_coincidencia', 'T-4': 'sin_coincidencia'})
+        pagos = Pago.objects.filter(medio='transfer').order_by('schedule__num_cuota')
+        self.assertEqual([(p.schedule_id, p.referencia) for p in pagos], [
+            (self.cuotas[0].pk, 'T-1'), (self.cuotas[1].pk, 'T-2')
+        ])
+        self.assertEqual(
+            list(PaymentSchedule.objects.filter(credito=self.credito).order_by('num_cuota').values_list('estado', flat=True)[:3]),
+            ['pagada', 'pagada', 'pendiente']
+        )
+        # Volver a cargar el archivo no registra nada dos veces
+        resultado, excepciones = self.conciliar([('T-1', '8700', '100000')])
+        self.assertEqual((resultado['conciliados'], excepciones), (0, {'T-1': 'duplicado'}))
+
+    def test_same_amount_on_two_credits_of_the_client_is_ambiguous(self):
+        crear_credito(cliente=self.credito.cliente)
+        resultado, excepciones = self.conciliar([('T-9', '8700', '100000')])
+        self.assertEqual((resultado['conciliados'], excepciones), (0, {'T-9': 'ambiguo'}))
+        self.assertFalse(Pago.objects.exists())
+
+    def test_installment_paid_in_part_after_the_index_is_read_is_not_overpaid(self):
+        def pago_concurrente(porcentaje, mensaje):
+            # POST /api/pagos/ entre la lectura del índice y la inserción del lote
+            if not Pago.objects.exists():
+                payment_service.create_payment(self.cuotas[0].pk, '40000', 'cash')
+
+        resultado, excepciones = self.conciliar([('T-5', '8700', '100000')], progress=pago_concurrente)
+
+        self.assertEqual((resultado['conciliados'], excepciones), (0, {'T-5': 'saldo_cambiado'}))
+        cuota = PaymentSchedule.objects.get(pk=self.cuotas[0].pk)
+        self.assertEqual((cuota.estado, cuota.monto_pagado), ('parcial', Decimal('40000')))
+        self.assertFalse(Pago.objects.filter(referencia='T-5').exists())
+
+
+@sin_shards
+class CollectionRollupTests(TestCase):
+    databases = '__all__'
+    # El trigger rollup_pago mantiene los acumulados; rebuild los recalcula desde core.pagos
+
+    def acumulados(self):
+        return {
+            (r.fecha, r.medio, r.producto, r.ciudad): (r.num_pagos, r.monto_total)
+            for r in CollectionDailyRollup.objects.exclude(num_pagos=0)
+        }
+
+    def test_trigger_matches_a_rebuild_after_insert_update_and_delete(self):
+        credito = crear_credito('9400')
+        cuotas = list(PaymentSchedule.objects.filter(credito=credito).order_by('num_cuota'))
+        lunes = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=3)
+        martes = lunes + timedelta(days=1)
+        uno = Pago.objects.create(schedule=cuotas[0], credito=credito, fecha_pago=lunes, monto=50000, medio='cash')
+        dos = Pago.objects.create(schedule=cuotas[1], credito=credito, fecha_pago=lunes, monto=30000, medio='cash')
+        tres = Pago.objects.create(schedule=cuotas[2], credito=credito, fecha_pago=martes, monto=20000, medio='transfer')
+
+        def balde(dia, medio):
+            return (dia.date(), medio, 'e-bike', 'Bogotá')
+
+        self.assertEqual(self.acumulados(), {
+            balde(lunes, 'cash'): (2, Decimal('80000')),
+            balde(martes, 'transfer'): (1, Decimal('20000')),
+        })
+
+        # Cambiar medio y fecha mueve el monto de un balde a otro
+        dos.medio, dos.fecha_pago = 'transfer', martes
+        dos.save()
+        Pago.objects.filter(pk=uno.pk).update(monto=Decimal('60000'))
+        tres.delete()
+        esperados = {
+            balde(lunes, 'cash'): (1, Decimal('60000')),
+            balde(martes, 'transfer'): (1, Decimal('30000')),
+        }
+        self.assertEqual(self.acumulados(), esperados)
+
+        collection_rollup_service.rebuild(lunes.date() - timedelta(days=1), martes.date() + timedelta(days=1))
+        self.assertEqual(self.acumulados(), esperados)
+        self.assertFalse(CollectionDailyRollup.objects.filter(num_pagos=0).exists())
+
+
+@sin_shards
+class PortfolioSnapshotTests(TestCase):
+    databases = '__all__'
+    # Tres snapshots: cierre de agosto (keyframe), 10 de septiembre (keyframe) y 20 de septiembre (cambios)
+    AGOSTO, SEP_10, SEP_20 = date(2026, 8, 31), date(2026, 9, 10), date(2026, 9, 20)
+
+    def filas(self, fecha):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT schedule_id, saldo_centavos, estado FROM "{portfolio_snapshot_service.TABLE}" '
+                'WHERE fecha = %s', [fecha]
+            )
+            return {schedule_id: (saldo, estado) for schedule_id, saldo, estado in cursor.fetchall()}
+
+    def cuota(self, credito, num=1):
+        return PaymentSchedule.objects.get(credito=credito, num_cuota=num)
+
+    def test_keyframes_deltas_and_roll_rate_across_months(self):
+        lejos = date(2030, 1, 15)
+        # La cuota 1 de A vence el 15 de agosto: 16 días de mora al cierre del mes
+        a = crear_credito('9500', dias_entre_cuotas=60, primera=date(2026, 8, 15))
+        b = crear_credito('9501', primera=lejos)
+        d = crear_credito('9503', primera=lejos)
+        agosto = portfolio_snapshot_service.take(self.AGOSTO)
+        self.assertEqual((agosto['keyframe'], agosto['filas'], agosto['cuotas_abiertas']), (True, 36, 36))
+
+        payment_service.create_payment(self.cuota(b).pk, '40000', 'cash')
+        c = crear_credito('9502', primera=lejos)
+        sep_10 = portfolio_snapshot_service.take(self.SEP_10)
+        # Primer snapshot del mes: todas las cuotas abiertas otra vez
+        self.assertEqual((sep_10['keyframe'], sep_10['filas'], sep_10['cuotas_abiertas']), (True, 48, 48))
+        self.assertEqual(self.filas(self.SEP_10)[self.cuota(b).pk], (6000000, portfolio_snapshot_service.ESTADOS['parcial']))
+
+        payment_service.create_payment(self.cuota(a).pk, '100000', 'cash')
+        payment_service.create_payment(self.cuota(c).pk, '10000', 'cash')
+        Credito.objects.filter(pk=d.pk).update(estado='cancelado')
+        sep_20 = portfolio_snapshot_service.take(self.SEP_20)
+        self.assertEqual((sep_20['keyframe'], sep_20['filas'], sep_20['cuotas_abiertas']), (False, 14, 35))
+        cerradas = {self.cuota(a).pk} | set(PaymentSchedule.objects.filter(credito=d).values_list('pk', flat=True))
+        self.assertEqual(self.filas(self.SEP_20), {
+            **{pk: (0, portfolio_snapshot_service.CERRADA) for pk in cerradas},
+            self.cuota(c).pk: (9000000, portfolio_snapshot_service.ESTADOS['parcial']),
+        })
+
+        agosto_matriz, septiembre = portfolio_snapshot_service.roll_rate(date(2026, 9, 1), meses=2)
+        # Agosto no tiene cierre de julio con qué compararse
+        self.assertEqual(agosto_matriz['filas'], [])
+        self.assertEqual((septiembre['desde'], septiembre['hasta']), (self.AGOSTO, self.SEP_20))
+        celdas = {
+            (fila['tramo'], hacia['tramo']): hacia['creditos']
+            for fila in septiembre['filas'] for hacia in fila['hacia'] if hacia['creditos']
+        }
+        self.assertEqual(celdas, {('1-30', 'al_dia'): 1, ('al_dia', 'al_dia'): 1, ('al_dia', 'cancelado'): 1,
+                                  ('nuevo', 'al_dia'): 1})
+        mora = next(fila for fila in septiembre['filas'] if fila['tramo'] == '1-30')
+        self.assertEqual(mora['saldo'], Decimal('1200000.00'))
+
+        # El estado al 20 sale del keyframe del 10 más los cambios
+        punto = portfolio_snapshot_service.trend(self.SEP_20, self.SEP_20)['serie'][0]
+        self.assertEqual(punto['creditos'], 3)
+        self.assertEqual(punto['saldo'], Decimal('3450000.00'))
+
+
+@sin_shards
+class ClientFeatureTests(TestCase):
+    databases = '__all__'
+    # Cuatro cuotas vencidas en 2024: a tiempo, tarde, parcial y sin pagar
+
+    def pago(self, cuota, monto, dia, medio):
+        return Pago(
+            credito_id=cuota.credito_id, schedule=cuota, monto=Decimal(monto), medio=medio,
+            fecha_pago=timezone.make_aware(datetime(dia.year, dia.month, dia.day, 12))
+        )
+
+    def features(self, cliente_id):
+        fila = ClientFeatures.objects.get(cliente_id=cliente_id)
+        return {campo: getattr(fila, campo) for campo in client_feature_service.FIELDS if campo != 'updated_at'}
+
+    def test_trigger_and_refresh_compute_the_same_features(self):
+        credito = crear_credito('9600', valores=[Decimal('100000')] * 4, primera=date(2024, 1, 10))
+        # Vencen el 10/01, 09/02, 10/03 y 09/04
+        cuotas = list(PaymentSchedule.objects.filter(credito=credito).order_by('num_cuota'))
+        self.pago(cuotas[0], 100000, date(2024, 1, 5), 'cash').save()
+        self.pago(cuotas[1], 100000, date(2024, 2, 19), 'transfer').save()
+        self.pago(cuotas[2], 30000, date(2024, 3, 10), 'cash').save()
+        app = self.pago(cuotas[2], 20000, date(2024, 3, 20), 'app')
+        app.save()
+
+        features = self.features(credito.cliente_id)
+        self.assertEqual(features['fecha_corte'], date.today())
+        self.assertEqual((features['cuotas_exigibles'], features['cuotas_a_tiempo']), (4, 1))
+        self.assertEqual(features['tasa_a_tiempo'], Decimal('0.2500'))
+        self.assertEqual((features['cuotas_con_pago'], features['cuotas_pago_parcial']), (3, 1))
+        self.assertEqual(features['ratio_pago_parcial'], Decimal('0.3333'))
+        self.assertEqual(features['mix_medios'], {'cash': 0.5, 'transfer': 0.25, 'app': 0.25})
+        self.assertEqual((features['num_pagos'], features['monto_pagado']), (4, Decimal('250000')))
+
+        # Un INSERT de varias filas dispara el trigger de sentencia una vez: la cuota 4 se paga a tiempo en dos partes
+        Pago.objects.bulk_create([
+            self.pago(cuotas[3], 50000, date(2024, 4, 1), 'cash'),
+            self.pago(cuotas[3], 50000, date(2024, 4, 9), 'cash'),
+        ])
+        app.delete()
+        features = self.features(credito.cliente_id)
+        self.assertEqual(features['tasa_a_tiempo'], Decimal('0.5000'))
+        self.assertEqual((features['cuotas_con_pago'], features['cuotas_pago_parcial']), (4, 2))
+        self.assertEqual(features['ratio_pago_parcial'], Decimal('0.5000'))
+        self.assertEqual(features['mix_medios'], {'cash': 0.8, 'transfer': 0.2})
+
+        # El lote recalcula lo mismo que el trigger
+        client_feature_service.refresh([credito.cliente_id])
+        self.assertEqual(self.features(credito.cliente_id), features)
+
+        # Al corte del 9 de mayo: la cuota 2 pagó con 10 días de atraso y la 3 sigue abierta desde el 10/03
+        client_feature_service.refresh([credito.cliente_id], fecha=date(2024, 5, 9))
+        features = self.features(credito.cliente_id)
+        self.assertEqual(features['fecha_corte'], date(2024, 5, 9))
+        self.assertEqual(features['dias_mora_max'], 60)
+        self.assertEqual(features['dias_mora_promedio'], Decimal('17.50'))
+        self.assertEqual(features['dias_mora_actual'], 60)
+
+
+@sin_shards
+class CreditImportTests(TransactionTestCase):
+    databases = '__all__'
+    # Cada lote se confirma en su propia transacción, como en producción
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'wb') as output:
+            output.write(b'tipo_doc,num_doc,nombre,ciudad,producto,inversion,cuotas_totales,tea,'
+                         b'fecha_desembolso,fecha_inicio_pago\n')
+            for num in range(6):
+                nombre = b'Jos\xe9' if num == 3 else 'José'.encode()
+                output.write(b'CC,70%d,%s,Cali,e-bike,1200000,12,0.28,2026-10-01,2026-11-01\n' % (num, nombre))
+        self.addCleanup(os.remove, self.path)
+        self.addCleanup(lambda: os.path.exists(self.path + '.errores.csv') and os.remove(self.path + '.errores.csv'))
+
+    def test_undecodable_row_is_rejected_alone_and_rerun_is_safe(self):
+        primera = CreditImportService().import_file(self.path, processes=1, batch_rows=2)
+        self.assertEqual((primera['creditos'], primera['rechazadas'], primera['repetidos']), (5, 1, 0))
+        with open(primera['errores'], encoding='utf-8') as errores:
+            self.assertIn('Invalid UTF-8', errores.read())
+
+        segunda = CreditImportService().import_file(self.path, processes=1, batch_rows=2)
+        self.assertEqual((segunda['creditos'], segunda['repetidos']), (0, 5))
+        self.assertEqual(Credito.objects.count(), 5)
+
+
+@sin_shards
+class SyncCursorTests(TransactionTestCase):
+    databases = '__all__'
+    # El horizonte es el xmin de la instantánea: los datos deben estar confirmados
+
+    def recorrer(self, cursor=None, limit=500):
+        """Todas las páginas desde el cursor: (páginas, cursor final)"""
+        paginas = []
+        while True:
+            pagina = sync_service.get_changes(cursor, limit)
+            paginas.append(pagina)
+            cursor = pagina['cursor']
+            if not pagina['has_more']:
+                return paginas, cursor
+
+    def ids(self, paginas, entidad, clave='cambios', campo='schedule_id'):
+        if clave == 'eliminados':
+            return [pk for pagina in paginas for pk in pagina[clave][entidad]]
+        return [fila[campo] for pagina in paginas for fila in pagina[clave][entidad]]
+
+    def test_update_and_delete_after_the_cursor(self):
+        credito = crear_credito('9100')
+        cuota = PaymentSchedule.objects.filter(credito=credito, num_cuota=1).get()
+        pago = pagar(cuota, Decimal('50000'))
+        _, cursor = self.recorrer()
+        antes = Cliente.objects.get(pk=credito.cliente_id)
+
+        with transaction.atomic():
+            with connection.cursor() as sql:
+                sql.execute("SELECT txid_current()")
+                xid = sql.fetchone()[0]
+            Cliente.objects.filter(pk=credito.cliente_id).update(nombre='Cliente renombrado')
+        pago_id = pago.pk
+        pago.delete()
+
+        despues = Cliente.objects.get(pk=credito.cliente_id)
+        self.assertEqual(despues.change_xid, xid)
+        self.assertGreater(despues.change_seq, antes.change_seq)
+        lapida = SyncTombstone.objects.get(entidad='pagos', object_id=pago_id)
+        self.assertGreater((lapida.change_xid, lapida.change_seq), (xid, despues.change_seq))
+
+        paginas, final = self.recorrer(cursor)
+        self.assertEqual([c['nombre'] for c in paginas[0]['cambios']['clientes']], ['Cliente renombrado'])
+        self.assertEqual(self.ids(paginas, 'pagos', 'eliminados'), [pago_id])
+        self.assertEqual(self.ids(paginas, 'pagos', campo='pago_id'), [])
+        self.assertEqual(self.ids(paginas, 'cronograma'), [])
+        # Sin cambios nuevos el cursor no retrocede ni repite
+        vacia = sync_service.get_changes(final)
+        self.assertFalse(any(vacia['cambios'].values()) or any(vacia['eliminados'].values()))
+
+    def test_rows_of_an_open_transaction_wait_behind_the_horizon(self):
+        _, cursor = self.recorrer()
+        escrito, confirmar = threading.Event(), threading.Event()
+
+        def escribir():
+            try:
+                with transaction.atomic():
+                    crear_credito('9200')
+                    escrito.set()
+                    confirmar.wait(10)
+            finally:
+                escrito.set()
+                connection.close()
+
+        hilo = threading.Thread(target=escribir)
+        hilo.start()
+        self.assertTrue(escrito.wait(10))
+        crear_credito('9201')
+        pendiente = sync_service.get_changes(cursor)
+        # El crédito confirmado después queda detrás del horizonte hasta que el otro confirme
+        self.assertEqual(pendiente['cambios']['clientes'], [])
+        confirmar.set()
+        hilo.join()
+
+        paginas, _ = self.recorrer(pendiente['cursor'])
+        self.assertCountEqual(
+            [c['num_doc'] for pagina in paginas for c in pagina['cambios']['clientes']], ['9200', '9201']
+        )
+        self.assertEqual(len(self.ids(paginas, 'cronograma')), 24)
+
+    def test_paging_across_a_page_boundary(self):
+        credito = crear_credito('9300')
+        cuotas = {c.pk: c for c in PaymentSchedule.objects.filter(credito=credito)}
+        primera = sync_service.get_changes(None, 5)
+        self.assertTrue(primera['has_more'])
+        entregadas = [c['schedule_id'] for c in primera['cambios']['cronograma']]
+        self.assertTrue(entregadas)
+        # Una fila ya entregada que cambia vuelve a salir, con su nuevo valor, detrás del cursor
+        PaymentSchedule.objects.filter(pk=entregadas[0]).update(estado='vencida')
+
+        paginas, _ = self.recorrer(primera['cursor'], 5)
+        paginas.insert(0, primera)
+        for pagina in paginas:
+            self.assertLessEqual(sum(map(len, pagina['cambios'].values())), 5)
+        vistas = self.ids(paginas, 'cronograma')
+        self.assertEqual(sorted(set(vistas)), sorted(cuotas))
+        self.assertEqual(vistas.count(entregadas[0]), 2)
+        ultima = [c for c in paginas[-1]['cambios']['cronograma'] if c['schedule_id'] == entregadas[0]]
+        self.assertEqual(ultima[0]['estado'], 'vencida')
+        self.assertEqual(self.ids(paginas, 'creditos', campo='credito_id'), [credito.pk])
+
+
+@sin_shards
+class PaymentCreditBackfillTests(TestCase):
+    databases = '__all__'
+    # pago_credito: Pago.credito_id por lotes y después FK y NOT NULL sin recorrer la tabla con bloqueo
+
+    def setUp(self):
+        cuotas = PaymentSchedule.objects.filter(credito=crear_credito('8800'))
+        Pago.objects.bulk_create([
+            Pago(credito_id=cuota.credito_id, schedule=cuota, fecha_pago=timezone.now(), monto=Decimal('10'), medio='cash')
+            for cuota in cuotas for _ in range(20)
+        ])
+        with connection.cursor() as cursor:
+            # Las FK diferidas del bulk_create se comprueban ya: ALTER TABLE no admite eventos pendientes
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = '\"core.pagos\"'::regclass AND contype = 'f' "
+                "AND conkey = ARRAY[(SELECT attnum FROM pg_attribute WHERE attrelid = conrelid AND attname = 'credito_id')]"
+            )
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE "core.pagos" DROP CONSTRAINT "{constraint}"')
+            cursor.execute('ALTER TABLE "core.pagos" ALTER COLUMN credito_id DROP NOT NULL')
+            cursor.execute('UPDATE "core.pagos" SET credito_id = NULL')
+
+    def test_fills_by_batches_resuming_from_the_checkpoint_then_constrains(self):
+        # Una corrida cortada después del primer lote
+        parcial = backfill_service.run('pago_credito', batch_size=100, pause=0, max_seconds=0.001)['default']
+        self.assertEqual((parcial['estado'], parcial['filas'], parcial['lotes']), ('en_proceso', 100, 1))
+        self.assertEqual(Pago.objects.filter(credito__isnull=True).count(), 140)
+
+        with CaptureQueriesContext(connection) as queries:
+            final = backfill_service.run('pago_credito', batch_size=100, pause=0)['default']
+        self.assertEqual((final['estado'], final['filas']), ('completado', 240))
+        self.assertFalse(Pago.objects.filter(credito__isnull=True).exists())
+        self.assertEqual(BackfillCheckpoint.objects.get(nombre='pago_credito').estado, 'completado')
+
+        ddl = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('ALTER TABLE "core.pagos"')
+        ]
+        self.assertEqual([sql.split('" ', 1)[1].split(' "')[0] for sql in ddl], [
+            'ADD CONSTRAINT', 'VALIDATE CONSTRAINT', 'ADD CONSTRAINT', 'VALIDATE CONSTRAINT',
+            'ALTER COLUMN', 'DROP CONSTRAINT',
+        ])
+        self.assertIn('FOREIGN KEY ("credito_id")', ddl[0])
+        self.assertTrue(ddl[0].endswith('NOT VALID') and ddl[2].endswith('NOT VALID'))
+        self.assertIn('SET NOT NULL', ddl[4])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT attnotnull FROM pg_attribute WHERE attrelid = '\"core.pagos\"'::regclass AND attname = 'credito_id'"
+            )
+            self.assertTrue(cursor.fetchone()[0])
+            cursor.execute(
+                "SELECT convalidated FROM pg_constraint WHERE conname = 'core.pagos_credito_id_fk'"
+            )
+            self.assertEqual(cursor.fetchall(), [(True,)])
+
+
+@sin_shards
+class JobQueueTests(TestCase):
+    databases = '__all__'
+
+    def test_params_are_checked_against_the_task_when_queued(self):
+        response = self.client.post(
+            '/api/jobs/', {'tipo': 'recalcular_recaudo', 'params': {'hasta': '2026-10-01'}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('desde', response.json()['error'])
+        response = self.client.post(
+            '/api/jobs/', {'tipo': 'actualizar_ledger', 'params': {'dia': '2026-10-01'}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_type_error_fails_without_retry(self):
+        job = Job.objects.create(tipo='actualizar_ledger', params={'dia': '2026-10-01'}, run_after=timezone.now())
+        job = job_service.claim('prueba')
+
+        self.assertEqual(job_service.run(job.job_id), 'fallido')
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), ('fallido', 1))
+
+    def test_only_expired_leases_are_requeued(self):
+        vivo = job_service.enqueue('actualizar_ledger')
+        caido = job_service.enqueue('actualizar_ledger')
+        for _ in range(2):
+            job_service.claim('prueba')
+        # Sin progreso durante más que el arriendo, pero el worker lo renueva
+        atras = timezone.now() - timedelta(hours=1)
+        Job.objects.update(heartbeat_at=atras, lease_until=atras)
+        self.assertEqual(job_service.renew('prueba', [vivo.job_id]), 1)
+
+        self.assertEqual(job_service.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=vivo.pk).estado, 'en_proceso')
+        self.assertEqual(Job.objects.get(pk=caido.pk).estado, 'pendiente')
+
+    def test_job_of_a_dead_process_is_released_until_out_of_attempts(self):
+        job = job_service.enqueue('actualizar_ledger', max_intentos=2)
+        for esperado in ('reintento', 'fallido'):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            reclamado = job_service.claim('prueba')
+            self.assertEqual(job_service.release(reclamado, RuntimeError('proceso muerto')), esperado)
+        job.refresh_from_db()
+        self.assertEqual((job.estado, job.intentos), ('fallido', 2))
+        self.assertIn('proceso muerto', job.error)
+
+
+@sin_shards
+class ReportCachePruneTests(TestCase):
+    databases = '__all__'
+    # REPORTS_DIR crecía sin límite: cada versión de los datos dejaba su reporte
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(REPORTS_DIR=self.directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def reporte(self, clave, tamano, horas):
+        os.makedirs(os.path.join(self.directorio.name, clave[:2]), exist_ok=True)
+        path = os.path.join(self.directorio.name, clave[:2], f"{clave}.xlsx")
+        with open(path, 'wb') as archivo:
+            archivo.write(b'x' * tamano)
+        usado = time.time() - horas * 3600
+        os.utime(path, (usado, usado))
+        return clave
+
+    def test_unused_and_least_recently_used_reports_are_evicted(self):
+        viejo = self.reporte('aa01', 100, horas=200)
+        menos_usado = self.reporte('ab01', 100, horas=3)
+        usado = self.reporte('ac01', 100, horas=2)
+        reciente = self.reporte('ad01', 100, horas=1)
+        # Una descarga lo vuelve el más reciente
+        self.assertIsNotNone(report_service.find(usado))
+
+        self.assertEqual(report_service.prune(168, 250), {'archivos': 2, 'bytes': 200})
+        self.assertEqual(
+            [clave for clave in (viejo, menos_usado, usado, reciente) if report_service.find(clave)],
+            [usado, reciente]
+        )
+
+    def test_newest_report_is_kept_and_renders_in_progress_are_left_alone(self):
+        self.reporte('ba01', 100, horas=0)
+        os.makedirs(os.path.join(self.directorio.name, 'ba01abcdef12_tmp'))
+        self.assertEqual(report_service.prune(168, 10), {'archivos': 0, 'bytes': 0})
+        self.assertIsNotNone(report_service.find('ba01'))
+        self.assertEqual(report_service.prune(0, 10), {'archivos': 1, 'bytes': 100})
+        self.assertTrue(os.path.isdir(os.path.join(self.directorio.name, 'ba01abcdef12_tmp')))
+
+
+@sin_shards
+class CollectionsWorklistTests(TestCase):
+    databases = '__all__'
+
+    def test_pages_follow_the_ranking_and_cities_ignore_case_and_accents(self):
+        hace_meses = date.today() - timedelta(days=90)
+        for num, ciudad in enumerate(['Bogotá', 'bogota', 'Cali']):
+            credito = crear_credito(f'6{num}00', inversion=Decimal(1200000 * (num + 1)), primera=hace_meses)
+            Cliente.objects.filter(pk=credito.cliente_id).update(ciudad=ciudad)
+
+        primera = self.client.get('/api/clientes/lista_cobranza/?ciudad=BOGOTÁ&limit=1').json()
+        segunda = self.client.get(f'/api/clientes/lista_cobranza/?ciudad=BOGOTÁ&limit=1&cursor={primera["cursor"]}').json()
+
+        self.assertTrue(primera['has_more'])
+        self.assertFalse(segunda['has_more'])
+        self.assertEqual([c['ciudad'] for c in primera['clientes'] + segunda['clientes']], ['bogota', 'Bogotá'])
+        self.assertGreater(primera['clientes'][0]['monto_vencido'], segunda['clientes'][0]['monto_vencido'])
+        self.assertEqual(primera['clientes'][0]['cuotas_vencidas'], 3)
+
+
+@sin_shards
+class OfferSimulatorTests(TestCase):
+    databases = '__all__'
+
+    def test_fractional_term_is_rejected(self):
+        response = self.client.get('/api/simulador/?inversion=2000000&cuotas=12.7')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/simulador/?inversion=2000000&cuotas=12.0')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['plazos'], [12])
+
+    def test_response_cache_is_bounded_by_bytes(self):
+        cache = LRUCache(10, max_bytes=100)
+        cache.put('a', b'x' * 60)
+        cache.put('b', b'x' * 30)
+        cache.put('c', b'x' * 30)
+        cache.put('grande', b'x' * 101)
+        self.assertEqual(list(cache.entries), ['b', 'c'])
+        self.assertEqual(cache.bytes, 60)
+
+
+@sin_shards
+class DynamicFieldsTests(TestCase):
+    databases = '__all__'
+
+    def test_payments_render_only_when_expanded(self):
+        credito = crear_credito('9000')
+        cuota = PaymentSchedule.objects.filter(credito=credito, num_cuota=1).get()
+        pagar(cuota, Decimal('10000'))
+
+        por_defecto = self.client.get(f'/api/cronograma/{cuota.pk}/').json()
+        expandido = self.client.get(f'/api/cronograma/{cuota.pk}/?expand=payments').json()
+
+        self.assertNotIn('payments', por_defecto)
+        self.assertIn('credit_info', por_defecto)
+        self.assertEqual(len(expandido['payments']), 1)
+        self.assertNotIn('credit_info', expandido)
+        lista = self.client.get(f'/api/cronograma/?credito_id={credito.pk}&expand=payments,credit_info').json()
+        self.assertEqual(sum(len(c['payments']) for c in lista['results']), 1)
+
+
+@sin_shards
+class RouteManifestTests(TestCase):
+    databases = '__all__'
+
+    def test_single_document_is_not_split_into_characters(self):
+        credito = crear_credito('12345')
+
+        response = self.client.post(
+            '/api/repartidor/manifiesto_ruta/', {'num_docs': '12345'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([c['cliente_id'] for c in data['clientes']], [credito.cliente_id])
+        self.assertEqual(data['no_encontrados']['num_docs'], [])
+
+        response = self.client.post(
+            '/api/repartidor/manifiesto_ruta/', {'num_docs': {'doc': '12345'}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(len(settings.SHARDS) >= 2, 'requiere DB_SHARDS con al menos dos shards')
+class ShardingTests(TransactionTestCase):
+    # scatter abre una conexión por hilo: los datos deben estar confirmados
+    databases = '__all__'
+
+    def setUp(self):
+        shard_service.init_shards(migrate=False)
+        self.addCleanup(sharding.shard_map.refresh)
+        # Un documento por shard
+        self.documentos = {}
+        for numero in range(1, 200):
+            num_doc = f'77{numero:04d}'
+            shard = sharding.shard_for_document('CC', num_doc)
+            self.documentos.setdefault(shard, num_doc)
+            if len(self.documentos) == len(settings.SHARDS):
+                break
+
+    def assert_en_shard(self, manager, pk, alias, bucket):
+        self.assertEqual(sharding.bucket_of(pk), bucket)
+        for shard in settings.SHARDS:
+            self.assertEqual(manager.on_shard(shard).filter(pk=pk).exists(), shard == alias)
+
+    def test_rows_live_on_the_shard_of_their_client_bucket(self):
+        creditos = {alias: crear_credito(num_doc) for alias, num_doc in self.documentos.items()}
+        for alias, credito in creditos.items():
+            bucket = sharding.bucket_for_document('CC', self.documentos[alias])
+            cuotas = list(PaymentSchedule.objects.for_client(credito.cliente_id).order_by('num_cuota'))
+            pago = pagar(cuotas[0], Decimal('100000'))
+            self.assert_en_shard(Cliente.objects, credito.cliente_id, alias, bucket)
+            self.assert_en_shard(Credito.objects, credito.pk, alias, bucket)
+            self.assert_en_shard(Pago.objects, pago.pk, alias, bucket)
+            self.assertEqual(len(cuotas), 12)
+            for cuota in cuotas:
+                self.assert_en_shard(PaymentSchedule.objects, cuota.pk, alias, bucket)
+            # get por id se enruta solo
+            self.assertEqual(Credito.objects.get(pk=credito.pk)._state.db, alias)
+
+        with self.assertRaises(UnroutedQuery):
+            Credito.objects.filter(estado='vigente').count()
+        resumen = portfolio_service.summary()
+        self.assertEqual((resumen['shards'], resumen['clientes']), (len(settings.SHARDS), len(creditos)))
+        self.assertEqual(resumen['creditos']['vigente']['cantidad'], len(creditos))
+        self.assertEqual(sum(estado['cantidad'] for estado in resumen['cuotas'].values()), 12 * len(creditos))
+        self.assertEqual(resumen['pagos'], {'cantidad': len(creditos), 'monto': Decimal('100000') * len(creditos)})
+        self.assertEqual(Credito.objects.across_shards().count(), len(creditos))
+
+    def test_moved_bucket_stays_readable_and_writable(self):
+        origen, num_doc = next(iter(self.documentos.items()))
+        destino = next(alias for alias in settings.SHARDS if alias != origen)
+        bucket = sharding.bucket_for_document('CC', num_doc)
+        credito = crear_credito(num_doc)
+        cuotas = list(PaymentSchedule.objects.for_client(credito.cliente_id).order_by('num_cuota'))
+        pagar(cuotas[0], Decimal('100000'))
+
+        shard_service.move_bucket(bucket, destino, wait=0)
+
+        self.assertEqual(sharding.shard_for_id(credito.pk), destino)
+        self.assert_en_shard(Cliente.objects, credito.cliente_id, destino, bucket)
+        self.assert_en_shard(Credito.objects, credito.pk, destino, bucket)
+        self.assertEqual(PaymentSchedule.objects.for_client(credito.cliente_id).count(), 12)
+        self.assertEqual(Pago.objects.for_client(credito.cliente_id).count(), 1)
+        self.assertEqual(Cliente.objects.for_document('CC', num_doc).get().pk, credito.cliente_id)
+        pago = payment_service.create_payment(cuotas[1].pk, '100000', 'cash')
+        self.assertEqual(pago._state.db, destino)
+        self.assertEqual(PaymentSchedule.objects.by_id(cuotas[1].pk).get().estado, 'pagada')
+
+    def test_distribute_moves_default_clients_to_their_shards_with_new_ids(self):
+        num_doc = next(iter(self.documentos.values()))
+        # Datos de antes del sharding, en la base default
+        cliente = Cliente.objects.on_shard('default').create(
+            tipo_doc='CC', num_doc=num_doc, nombre='Cliente previo', ciudad='Cali'
+        )
+        credito = Credito.objects.on_shard('default').create(
+            cliente_id=cliente.pk, producto='e-bike', inversion=Decimal('1200000'), cuotas_totales=12,
+            tea=Decimal('0.28'), fecha_desembolso=date.today(), fecha_inicio_pago=date.today()
+        )
+        PaymentSchedule.objects.on_shard('default').bulk_create([
+            PaymentSchedule(
+                credito_id=credito.pk, num_cuota=num, valor_cuota=Decimal('100000'), estado='pendiente',
+                fecha_vencimiento=date.today() + timedelta(days=30 * num)
+            )
+            for num in range(1, 13)
+        ])
+
+        movidos = shard_service.distribute_default()
+
+        shard = sharding.shard_for_document('CC', num_doc)
+        self.assertEqual(movidos, {shard: 1})
+        self.assertFalse(Cliente.objects.on_shard('default').exists())
+        nuevo = Cliente.objects.for_document('CC', num_doc).get()
+        self.assert_en_shard(Cliente.objects, nuevo.pk, shard, sharding.bucket_for_document('CC', num_doc))
+        self.assertEqual(PaymentSchedule.objects.for_client(nuevo.pk).count(), 12)
+
+    def test_sync_pages_across_the_cursor_of_each_shard(self):
+        creditos = {alias: crear_credito(num_doc) for alias, num_doc in self.documentos.items()}
+        cuotas = {cuota.pk for cuota in PaymentSchedule.objects.across_shards()}
+        self.assertEqual(len(cuotas), 12 * len(creditos))
+
+        cursor, vistas, paginas = None, [], 0
+        while True:
+            pagina = sync_service.get_changes(cursor, 5)
+            self.assertLessEqual(sum(map(len, pagina['cambios'].values())), 5)
+            vistas += [c['schedule_id'] for c in pagina['cambios']['cronograma']]
+            cursor, paginas = pagina['cursor'], paginas + 1
+            if not pagina['has_more']:
+                break
+        self.assertGreater(paginas, 2)
+        self.assertEqual(sorted(vistas), sorted(cuotas))
+        self.assertEqual(sorted(sync_service.parse_cursor(cursor)), sorted(settings.SHARDS))
+
+        # Un borrado en un shard sale solo con el cursor de ese shard, los demás no repiten
+        alias, credito = next(iter(creditos.items()))
+        pago = pagar(PaymentSchedule.objects.for_client(credito.cliente_id).get(num_cuota=1), Decimal('1000'))
+        pago_id = pago.pk
+        pago.delete()
+        cambios = sync_service.get_changes(cursor)
+        self.assertEqual(cambios['eliminados']['pagos'], [pago_id])
+        self.assertEqual(cambios['cambios']['cronograma'], [])
+        self.assertFalse(cambios['has_more'])
@@ -4,7 +4,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ClienteViewSet, CreditoViewSet, 
     PaymentScheduleViewSet, PagoViewSet,
-    RepartidorCronogramaViewSet
+    RepartidorCronogramaViewSet, SyncViewSet, RecaudoViewSet, JobViewSet,
+    ReportViewSet, ProfileViewSet, MoraViewSet, SimuladorViewSet
 )
 
 # Router para ViewSets
@@ -14,6 +15,13 @@ router.register(r'creditos', CreditoViewSet)
 router.register(r'cronograma', PaymentScheduleViewSet)
 router.register(r'pagos', PagoViewSet)
 router.register(r'repartidor', RepartidorCronogramaViewSet, basename='repartidor')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'recaudo', RecaudoViewSet, basename='recaudo')
+router.register(r'mora', MoraViewSet, basename='mora')
+router.register(r'simulador', SimuladorViewSet, basename='simulador')
+router.register(r'jobs', JobViewSet, basename='jobs')
+router.register(r'reportes', ReportViewSet, basename='reportes')
+router.register(r'perfiles', ProfileViewSet, basename='perfiles')
 
 urlpatterns = [
     path('api/', include(router.urls)),
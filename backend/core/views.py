@@ -1,25 +1,81 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.renderers import JSONRenderer
+from django.http import HttpResponse, FileResponse, Http404
+from django.conf import settings
+from rest_framework.reverse import reverse
+import os
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.utils.text import compress_string
+from django.db.models import Q, Prefetch, Sum, Count
 from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from django.utils.dateparse import parse_date
 
-from .models import Cliente, Credito, PaymentSchedule, Pago
+from .models import Cliente, Credito, PaymentSchedule, Pago, CreditLedgerEntry, Job
 from .serializers import (
     ClienteSerializer, CreditoSerializer, PaymentScheduleSerializer,
     PaymentScheduleSummarySerializer, ClienteCronogramaSerializer,
-    PagoCreateSerializer
+    PagoCreateSerializer, FieldSelection, CreditLedgerEntrySerializer,
+    CreditBalanceSerializer, JobSerializer, JobCreateSerializer,
+    ReportRequestSerializer, Client360Serializer, RequestLoaders
 )
 from .services import (
-    PaymentScheduleService, CreditoService, ClienteService
+    PaymentScheduleService, CreditoService, ClienteService,
+    route_manifest_service, sync_service, credit_ledger_service,
+    collections_worklist_service, collection_rollup_service, job_service,
+    report_service, credit_import_service, reconciliation_service, portfolio_service,
+    portfolio_snapshot_service, payoff_quote_service, offer_simulator_service,
+    client_feature_service
 )
+from .infrastructure.profiling import profile_store
+from .infrastructure import sql_stats, sharding
 from .pagination import (
     CustomPageNumberPagination, SmallResultsPagination, LargeResultsPagination
 )
 
 
+
+def job_accepted(request, job):
+    """Respuesta 202 para un trabajo encolado, con la URL para consultar su estado"""
+    url = reverse('jobs-detail', args=[job.job_id], request=request)
+    data = JobSerializer(job).data
+    data['url'] = url
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+
+class ArchivedRetrieveMixin:
+    """Detalle que sigue encontrando la fila después de archivarla (archive_credits)"""
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+            instance = self.queryset.model.objects.archived_by_id(pk) if str(pk).isdigit() else None
+            if instance is None:
+                raise
+            data = self.get_serializer(instance).data
+            data['archivado'] = True
+            return Response(data)
+
+class ShardedListMixin:
+    """Listados filtrados por cliente, crédito o cuota: se leen solo del shard de ese id"""
+
+    shard_params = ('cliente_id', 'credito_id', 'schedule_id')
+
+    def shard_manager(self, manager):
+        """Manager en el shard del id filtrado; sin filtro, el de todos los shards (across_shards)"""
+        for param in self.shard_params:
+            value = self.request.query_params.get(param)
+            if value and value.isdigit():
+                return manager.on_shard(sharding.shard_for_id(value))
+        return manager
+
+
 class ClienteViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de clientes"""
     
@@ -52,7 +108,8 @@ class ClienteViewSet(viewsets.ModelViewSet):
         if ciudad:
             queryset = queryset.filter(ciudad__icontains=ciudad)
         
-        return queryset.order_by('nombre')
+        # Con sharding se lee de todos los shards y se mezcla por nombre
+        return queryset.order_by('nombre').across_shards()
     
     def get_serializer_class(self):
         """Retorna el serializer apropiado según la acción"""
@@ -82,13 +139,35 @@ class ClienteViewSet(viewsets.ModelViewSet):
         """Obtiene resumen completo de un cliente"""
         try:
             resumen = ClienteService.get_resumen_cliente(pk)
-            return Response(resumen)
+            return Response({
+                'cliente': ClienteSerializer(resumen['cliente']).data,
+                'resumen': resumen['resumen']
+            })
         except ValueError as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=True, methods=['get'], url_path='360')
+    def vista_360(self, request, pk=None):
+        """Cliente con sus créditos, cuotas y pagos para el dashboard (/api/clientes/{id}/360/)
+
+        Cada nivel se carga con los dataloaders de la petición: una consulta
+        para el cliente, una para sus créditos, una para todas sus cuotas y
+        una para todos sus pagos, sin importar cuántos créditos tenga. Los
+        créditos archivados también aparecen (archivado: true): una consulta
+        más al archivo, y otras dos para sus cuotas y pagos si los hay.
+        Acepta ?fields, ?exclude y ?expand (p. ej. ?exclude=creditos.cronograma.payments).
+        """
+        cliente = RequestLoaders.for_request(request).clients.load(int(pk)) if str(pk).isdigit() else None
+        if cliente is None:
+            return Response(
+                {'error': f'Cliente {pk} no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(Client360Serializer(cliente, context=self.get_serializer_context()).data)
+    
     @action(detail=False, methods=['get'])
     def con_mora(self, request):
         """Obtiene clientes con cuotas en mora"""
@@ -96,6 +175,70 @@ class ClienteViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(clientes, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def lista_cobranza(self, request):
+        """Clientes en mora por ciudad, priorizados para asignar cobradores
+        
+        /api/clientes/lista_cobranza/?ciudad=Bogotá&ciudad=Cali&limit=50&cursor=<cursor>
+        (también ?ciudad=Bogotá,Cali; sin distinguir mayúsculas ni tildes).
+        Orden: monto vencido, días de mora y próximo vencimiento; repetir con
+        el cursor devuelto mientras has_more.
+        """
+        ciudades = [
+            ciudad
+            for valor in request.query_params.getlist('ciudad')
+            for ciudad in valor.split(',')
+        ]
+        try:
+            lista = collections_worklist_service.get_worklist(
+                ciudades,
+                request.query_params.get('cursor'),
+                request.query_params.get('limit', collections_worklist_service.DEFAULT_LIMIT)
+            )
+            return Response(lista)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['get'])
+    def features(self, request):
+        """Features de pago por cliente para scoring, en bloque
+        
+        /api/clientes/features/?limit=1000&cursor=<cursor> recorre toda la
+        cartera por cliente_id; repetir con el cursor devuelto mientras
+        has_more. ?cliente_ids=1,2,3 devuelve solo esos clientes.
+        """
+        cliente_ids = [
+            cliente_id
+            for valor in request.query_params.getlist('cliente_ids')
+            for cliente_id in valor.split(',') if cliente_id
+        ]
+        try:
+            return Response(client_feature_service.read(
+                request.query_params.get('cursor'),
+                request.query_params.get('limit', client_feature_service.DEFAULT_LIMIT),
+                cliente_ids or None
+            ))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['post'])
+    def recalcular_features(self, request):
+        """Encola el recálculo de las features (todos los clientes o cliente_ids) y responde 202"""
+        cliente_ids = request.data.get('cliente_ids')
+        if cliente_ids is not None and not isinstance(cliente_ids, list):
+            return Response(
+                {'error': 'cliente_ids debe ser una lista'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = job_service.enqueue('calcular_features_clientes', {'cliente_ids': cliente_ids})
+        return job_accepted(request, job)
+    
     @action(detail=False, methods=['get'])
     def buscar_por_cedula(self, request):
         """Busca cliente por número de cédula"""
@@ -109,10 +252,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            cliente = Cliente.objects.get(
-                tipo_doc=tipo_doc,
-                num_doc=num_doc
-            )
+            cliente = Cliente.objects.for_document(tipo_doc, num_doc).get()
             
             # Obtener cronograma completo del cliente
             cronograma_data = PaymentScheduleService.get_cliente_cronograma(cliente.cliente_id)
@@ -149,10 +289,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            cliente = Cliente.objects.get(
-                tipo_doc=tipo_doc,
-                num_doc=num_doc
-            )
+            cliente = Cliente.objects.for_document(tipo_doc, num_doc).get()
             
             serializer = ClienteSerializer(cliente)
             return Response(serializer.data)
@@ -169,7 +306,7 @@ class ClienteViewSet(viewsets.ModelViewSet):
             )
 
 
-class CreditoViewSet(viewsets.ModelViewSet):
+class CreditoViewSet(ArchivedRetrieveMixin, viewsets.ModelViewSet):
     """ViewSet para gestión de créditos"""
     
     queryset = Credito.objects.all()
@@ -179,10 +316,19 @@ class CreditoViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filtra créditos según parámetros"""
-        queryset = Credito.objects.select_related('cliente').all()
+        cliente_id = self.request.query_params.get('cliente_id')
+        if cliente_id and cliente_id.isdigit():
+            # Los créditos de un cliente están en su shard
+            queryset = Credito.objects.on_shard(sharding.shard_for_client(cliente_id)).select_related(None)
+        else:
+            queryset = Credito.objects.select_related(None)
+        
+        # Solo unir cliente si se va a serializar su nombre
+        selection = FieldSelection.from_request(self.request)
+        if selection.includes('client_name', self.get_serializer_class()):
+            queryset = queryset.select_related('cliente')
         
         # Filtrar por cliente
-        cliente_id = self.request.query_params.get('cliente_id')
         if cliente_id:
             queryset = queryset.filter(cliente_id=cliente_id)
         
@@ -196,7 +342,8 @@ class CreditoViewSet(viewsets.ModelViewSet):
         if estado:
             queryset = queryset.filter(estado=estado)
         
-        return queryset
+        # Sin cliente_id se leen todos los shards
+        return queryset.across_shards()
     
     @action(detail=True, methods=['get'])
     def cronograma(self, request, pk=None):
@@ -230,6 +377,116 @@ class CreditoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=True, methods=['get'])
+    def saldo(self, request, pk=None):
+        """Saldos del crédito desde el ledger, a hoy o a ?fecha=YYYY-MM-DD"""
+        credito = self._credito_o_archivado(pk)
+        fecha = request.query_params.get('fecha') or None
+        if fecha:
+            try:
+                fecha = parse_date(fecha)
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                return Response(
+                    {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        saldo = credit_ledger_service.get_balance(credito.credito_id, fecha)
+        return Response(CreditBalanceSerializer(saldo).data)
+
+    def _credito_o_archivado(self, pk):
+        """Crédito activo o archivado (su ledger se conserva al archivar)"""
+        if not str(pk).isdigit():
+            raise Http404
+        try:
+            return Credito.objects.get_or_archived(int(pk))
+        except Credito.DoesNotExist:
+            raise Http404
+
+    def _cotizacion_params(self, params):
+        fecha = params.get('fecha') or None
+        if fecha:
+            try:
+                fecha = parse_date(fecha)
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+        return fecha, params.get('tasa_mora') or '0.02'
+
+    @action(detail=True, methods=['get'])
+    def pago_total(self, request, pk=None):
+        """Cotización para cancelar el crédito: ?fecha=YYYY-MM-DD&tasa_mora=0.02
+        
+        Cuotas vencidas más interés de mora y cuotas por vencer descontadas a la TEA.
+        """
+        try:
+            fecha, tasa_mora = self._cotizacion_params(request.query_params)
+            return Response(payoff_quote_service.quote(pk, fecha, tasa_mora))
+        except Credito.DoesNotExist as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    @action(detail=False, methods=['post'])
+    def cotizar_pago_total(self, request):
+        """Cotizaciones de pago total en lote para campañas de cancelación anticipada
+        
+        Cuerpo: fecha, tasa_mora y creditos (lista de ids) o filtros producto,
+        ciudad y limit. Con exportar=true cotiza toda la cartera filtrada en
+        segundo plano (CSV) y responde 202.
+        """
+        try:
+            fecha, tasa_mora = self._cotizacion_params(request.data)
+            if request.data.get('exportar'):
+                filtros = {
+                    campo: request.data[campo]
+                    for campo in ['producto', 'ciudad']
+                    if request.data.get(campo)
+                }
+                filtros.update(fecha=fecha.isoformat() if fecha else None, tasa_mora=str(tasa_mora))
+                job = job_service.enqueue('cotizar_pago_total', filtros)
+                return job_accepted(request, job)
+            limit = request.data.get('limit') or payoff_quote_service.MAX_BATCH
+            if not str(limit).isdigit() or not 0 < int(limit) <= payoff_quote_service.MAX_BATCH:
+                raise ValueError(f'limit debe estar entre 1 y {payoff_quote_service.MAX_BATCH}')
+            cotizaciones = payoff_quote_service.quote_batch(
+                fecha, tasa_mora,
+                credit_ids=request.data.get('creditos'),
+                producto=request.data.get('producto') or None,
+                ciudad=request.data.get('ciudad') or None,
+                limit=int(limit)
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'creditos': len(cotizaciones),
+            'total_pago': sum((c['total_pago'] for c in cotizaciones), Decimal('0.00')),
+            'descuento_intereses': sum((c['descuento_intereses'] for c in cotizaciones), Decimal('0.00')),
+            'cotizaciones': cotizaciones,
+        })
+
+    @action(detail=True, methods=['get'])
+    def movimientos(self, request, pk=None):
+        """Asientos del ledger del crédito, del más reciente al más antiguo"""
+        credito = self._credito_o_archivado(pk)
+        queryset = CreditLedgerEntry.objects.for_credit(credito.credito_id).order_by('-entry_id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = CreditLedgerEntrySerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(CreditLedgerEntrySerializer(queryset, many=True).data)
+
     @action(detail=False, methods=['get'])
     def resumen(self, request):
         """Resumen agregado de créditos del cliente incluyendo pagos.
@@ -252,21 +509,31 @@ class CreditoViewSet(viewsets.ModelViewSet):
                 {'error': 'Parámetro cliente_id es requerido'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not cliente_id.isdigit():
+            return Response(
+                {'error': 'cliente_id debe ser un entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Créditos del cliente
-        qs = Credito.objects.filter(cliente_id=cliente_id)
-        total_creditos = qs.count()
-        creditos_vigentes = qs.filter(estado='vigente').count()
-        creditos_cancelados = qs.filter(estado='cancelado').count()
-        creditos_castigados = qs.filter(estado='castigado').count()
-        inversion_total = float(sum(c.inversion for c in qs))
-        inversion_vigente = float(sum(c.inversion for c in qs.filter(estado='vigente')))
-
-        # Totales pagados/pedientes desde cronograma
-        schedules = PaymentSchedule.objects.filter(credito__cliente_id=cliente_id)
-        monto_pagado_total = float(sum(s.monto_pagado for s in schedules))
-        monto_total_cuotas = float(sum(s.valor_cuota for s in schedules))
-        monto_pendiente_total = max(monto_total_cuotas - monto_pagado_total, 0)
+        # Créditos del cliente, sumando los acumulados de cada uno
+        totales = Credito.objects.for_client(cliente_id).select_related(None).aggregate(
+            total_creditos=Count('credito_id'),
+            creditos_vigentes=Count('credito_id', filter=Q(estado='vigente')),
+            creditos_cancelados=Count('credito_id', filter=Q(estado='cancelado')),
+            creditos_castigados=Count('credito_id', filter=Q(estado='castigado')),
+            inversion_total=Sum('inversion', default=0),
+            inversion_vigente=Sum('inversion', filter=Q(estado='vigente'), default=0),
+            monto_pagado_total=Sum('total_pagado', default=0),
+            saldo_pendiente=Sum('saldo_pendiente', default=0),
+        )
+        total_creditos = totales['total_creditos']
+        creditos_vigentes = totales['creditos_vigentes']
+        creditos_cancelados = totales['creditos_cancelados']
+        creditos_castigados = totales['creditos_castigados']
+        inversion_total = float(totales['inversion_total'])
+        inversion_vigente = float(totales['inversion_vigente'])
+        monto_pagado_total = float(totales['monto_pagado_total'])
+        monto_pendiente_total = max(float(totales['saldo_pendiente']), 0)
 
         return Response({
             'total_creditos': total_creditos,
@@ -279,8 +546,37 @@ class CreditoViewSet(viewsets.ModelViewSet):
             'monto_pendiente_total': monto_pendiente_total,
         })
 
+    @action(detail=False, methods=['get'])
+    def cartera(self, request):
+        """Resumen de la cartera completa (clientes, créditos, cuotas y pagos) sumando todos los shards"""
+        return Response(portfolio_service.summary())
 
-class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """Carga masiva desde un CSV (campo multipart "archivo"); responde 202 con el trabajo
+        
+        Columnas: tipo_doc, num_doc, nombre, ciudad, producto, inversion,
+        cuotas_totales, tea, fecha_desembolso, fecha_inicio_pago.
+        """
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response(
+                {'error': 'Archivo CSV requerido en el campo archivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            path = credit_import_service.store_upload(archivo)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Sin reintentos: los lotes ya confirmados se duplicarían
+        job = job_service.enqueue('importar_creditos', {'archivo': os.path.basename(path)}, max_intentos=1)
+        return job_accepted(request, job)
+
+
+class PaymentScheduleViewSet(ShardedListMixin, ArchivedRetrieveMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet para consulta de cronograma de pagos"""
     
     queryset = PaymentSchedule.objects.all()
@@ -290,9 +586,17 @@ class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """Filtra cronograma según parámetros"""
-        queryset = PaymentSchedule.objects.select_related(
-            'credito', 'credito__cliente'
-        ).prefetch_related('pagos').all()
+        queryset = self.shard_manager(PaymentSchedule.objects).select_related(None).prefetch_related(None)
+        
+        # Relaciones según los campos solicitados (?fields, ?exclude, ?expand)
+        selection = FieldSelection.from_request(self.request)
+        serializer_class = self.get_serializer_class()
+        if selection.includes('credit_info', serializer_class):
+            queryset = queryset.select_related('credito__cliente')
+        if selection.includes('payments', serializer_class):
+            queryset = queryset.prefetch_related(
+                Prefetch('pagos', queryset=Pago.objects.select_related('credito'))
+            )
         
         # Filtrar por cliente
         cliente_id = self.request.query_params.get('cliente_id')
@@ -305,7 +609,7 @@ class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(credito_id=credito_id)
         
         # Ordenar por fecha de vencimiento por defecto
-        return queryset.order_by('fecha_vencimiento')
+        return queryset.order_by('fecha_vencimiento').across_shards()
         
         # Filtrar por estado
         estado = self.request.query_params.get('estado')
@@ -321,15 +625,24 @@ class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
         if fecha_hasta:
             queryset = queryset.filter(fecha_vencimiento__lte=fecha_hasta)
         
-        return queryset.order_by('fecha_vencimiento')
+        return queryset.order_by('fecha_vencimiento').across_shards()
+
     
     @action(detail=False, methods=['get'])
     def vencidas(self, request):
-        """Obtiene cuotas vencidas"""
+        """Obtiene cuotas vencidas de todos los shards por fecha de vencimiento (?limit= opcional)"""
         cliente_id = request.query_params.get('cliente_id')
-        cuotas = PaymentScheduleService.get_cuotas_vencidas(cliente_id)
+        limit = request.query_params.get('limit')
+        if limit is not None and not limit.isdigit():
+            return Response(
+                {'error': 'limit debe ser un entero positivo'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        cuotas = PaymentScheduleService.get_cuotas_vencidas(cliente_id, int(limit) if limit else None)
         
-        serializer = PaymentScheduleSummarySerializer(cuotas, many=True)
+        serializer = PaymentScheduleSummarySerializer(
+            cuotas, many=True, context=self.get_serializer_context()
+        )
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -352,7 +665,10 @@ class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
     def calcular_mora(self, request, pk=None):
         """Calcula el monto de mora para una cuota"""
         try:
-            cuota = get_object_or_404(PaymentSchedule, pk=pk)
+            # Saldo anotado y pagos precargados: las propiedades de la cuota no consultan
+            cuota = get_object_or_404(
+                PaymentSchedule.objects.on_shard(sharding.shard_for_id(pk)).with_balance(), pk=pk
+            )
             tasa_mora = float(request.query_params.get('tasa_mora', 0.02))
             
             monto_mora = PaymentScheduleService.calcular_mora(
@@ -373,7 +689,7 @@ class PaymentScheduleViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
-class PagoViewSet(viewsets.ModelViewSet):
+class PagoViewSet(ShardedListMixin, ArchivedRetrieveMixin, viewsets.ModelViewSet):
     """ViewSet para gestión de pagos"""
     
     queryset = Pago.objects.all()
@@ -388,9 +704,15 @@ class PagoViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filtra pagos según parámetros"""
-        queryset = Pago.objects.select_related(
-            'schedule', 'schedule__credito', 'schedule__credito__cliente'
-        ).all()
+        queryset = self.shard_manager(Pago.objects).all()
+        
+        # Relaciones según los campos solicitados (?fields, ?exclude, ?expand)
+        selection = FieldSelection.from_request(self.request)
+        serializer_class = self.get_serializer_class()
+        if selection.includes('cuota_info', serializer_class):
+            queryset = queryset.select_related('schedule__credito')
+        if selection.includes('credito_info', serializer_class):
+            queryset = queryset.select_related('credito')
         
         # Filtrar por cliente
         cliente_id = self.request.query_params.get('cliente_id')
@@ -407,7 +729,7 @@ class PagoViewSet(viewsets.ModelViewSet):
         if schedule_id:
             queryset = queryset.filter(schedule_id=schedule_id)
         
-        return queryset.order_by('-fecha_pago')
+        return queryset.order_by('-fecha_pago').across_shards()
     
     def create(self, request, *args, **kwargs):
         """Crea un nuevo pago"""
@@ -428,12 +750,55 @@ class PagoViewSet(viewsets.ModelViewSet):
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except sharding.ShardUnavailable as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except Exception as e:
             return Response(
                 {'error': f'Error interno: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def exportar(self, request):
+        """Encola la exportación CSV de pagos y responde 202 con el trabajo
+        
+        Filtros opcionales en el cuerpo: cliente_id, desde, hasta, medio.
+        """
+        filtros = {
+            campo: request.data[campo]
+            for campo in ['cliente_id', 'desde', 'hasta', 'medio']
+            if request.data.get(campo)
+        }
+        job = job_service.enqueue('exportar_pagos', filtros)
+        return job_accepted(request, job)
+    
+    @action(detail=False, methods=['post'])
+    def conciliar(self, request):
+        """Concilia un archivo de liquidación (link, transfer, card) y responde 202 con el trabajo
+        
+        Campo multipart "archivo" con columnas referencia, tipo_doc, num_doc,
+        monto, fecha_pago y opcionalmente credito_id y medio; "medio" aplica
+        a las filas sin medio.
+        """
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response(
+                {'error': 'Archivo CSV requerido en el campo archivo'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        medio = request.data.get('medio') or None
+        if medio and medio not in reconciliation_service.MEDIOS:
+            return Response(
+                {'error': f"Medio no conciliable: {medio}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        path = reconciliation_service.store_upload(archivo)
+        job = job_service.enqueue('conciliar_pagos', {'archivo': os.path.basename(path), 'medio': medio})
+        return job_accepted(request, job)
+    
     @action(detail=False, methods=['get'])
     def resumen_por_cliente(self, request):
         """Obtiene resumen de pagos por cliente"""
@@ -445,28 +810,34 @@ class PagoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            pagos = self.get_queryset().filter(
-                schedule__credito__cliente_id=cliente_id
+        if not cliente_id.isdigit():
+            return Response(
+                {'error': 'cliente_id debe ser un entero'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
+        
+        try:
+            # Los pagos del cliente están en su shard
+            pagos = Pago.objects.for_client(cliente_id).order_by('-fecha_pago')
             
+            totales = pagos.aggregate(total=Count('pago_id'), monto=Sum('monto'))
             resumen = {
-                'total_pagos': pagos.count(),
-                'monto_total_pagado': sum(p.monto for p in pagos),
+                'total_pagos': totales['total'],
+                'monto_total_pagado': totales['monto'] or 0,
                 'pagos_por_medio': {},
                 'ultimo_pago': None
             }
             
-            # Agrupar por medio de pago
-            for pago in pagos:
-                medio = pago.medio or 'sin_especificar'
-                if medio not in resumen['pagos_por_medio']:
-                    resumen['pagos_por_medio'][medio] = {
-                        'cantidad': 0,
-                        'monto_total': 0
-                    }
-                resumen['pagos_por_medio'][medio]['cantidad'] += 1
-                resumen['pagos_por_medio'][medio]['monto_total'] += float(pago.monto)
+            # Agrupar por medio de pago en la base de datos
+            por_medio = pagos.order_by().values('medio').annotate(
+                cantidad=Count('pago_id'), monto_total=Sum('monto')
+            )
+            for grupo in por_medio:
+                medio = grupo['medio'] or 'sin_especificar'
+                resumen['pagos_por_medio'][medio] = {
+                    'cantidad': grupo['cantidad'],
+                    'monto_total': float(grupo['monto_total'])
+                }
             
             # Último pago
             if pagos.exists():
@@ -504,31 +875,32 @@ class RepartidorCronogramaViewSet(viewsets.ViewSet):
         
         try:
             # Obtener cliente
-            cliente = get_object_or_404(Cliente, cliente_id=cliente_id)
+            cliente = get_object_or_404(Cliente.objects.by_id(cliente_id))
             
-            # Obtener todos los créditos del cliente
-            creditos = Credito.objects.filter(cliente_id=cliente_id, estado='vigente')
+            # Créditos vigentes y todas sus cuotas y pagos: una consulta por tipo de entidad
+            loaders = RequestLoaders.for_request(request)
+            loaders.clients.add(cliente.cliente_id, cliente)
+            creditos = [
+                credito for credito in loaders.credits_by_client.load(cliente.cliente_id)
+                if credito.estado == 'vigente'
+            ]
+            cuotas = loaders.attach_many(creditos, 'payment_schedules', loaders.schedules_by_credit, back='credito')
             
             cronograma_completo = []
-            
-            for credito in creditos:
-                # Obtener cronograma del crédito
-                cuotas = PaymentSchedule.objects.filter(
-                    credito=credito
-                ).order_by('num_cuota')
-                
+            # Sin la petición en el contexto: ?fields/?expand no recortan el cronograma
+            serializer = PaymentScheduleSerializer(cuotas, many=True, context={'loaders': loaders})
+            for cuota, cuota_data in zip(cuotas, serializer.data):
                 # Agregar información del crédito a cada cuota
-                for cuota in cuotas:
-                    cuota_data = PaymentScheduleSerializer(cuota).data
-                    cuota_data['credito_info'] = {
-                        'credito_id': credito.credito_id,
-                        'producto': credito.producto,
-                        'inversion': float(credito.inversion),
-                        'cuotas_totales': credito.cuotas_totales,
-                        'fecha_desembolso': credito.fecha_desembolso,
-                        'cliente_nombre': cliente.nombre
-                    }
-                    cronograma_completo.append(cuota_data)
+                credito = cuota.credito
+                cuota_data['credito_info'] = {
+                    'credito_id': credito.credito_id,
+                    'producto': credito.producto,
+                    'inversion': float(credito.inversion),
+                    'cuotas_totales': credito.cuotas_totales,
+                    'fecha_desembolso': credito.fecha_desembolso,
+                    'cliente_nombre': cliente.nombre
+                }
+                cronograma_completo.append(cuota_data)
             
             # Ordenar por fecha de vencimiento
             cronograma_completo.sort(key=lambda x: x['fecha_vencimiento'])
@@ -570,9 +942,8 @@ class RepartidorCronogramaViewSet(viewsets.ViewSet):
             )
         
         try:
-            # Obtener todas las cuotas del cliente
-            cuotas = PaymentSchedule.objects.filter(
-                credito__cliente_id=cliente_id,
+            # Obtener todas las cuotas del cliente (en su shard)
+            cuotas = PaymentSchedule.objects.for_client(cliente_id).filter(
                 credito__estado='vigente'
             ).order_by('fecha_vencimiento')
             
@@ -628,11 +999,10 @@ class RepartidorCronogramaViewSet(viewsets.ViewSet):
         
         try:
             # Obtener cliente
-            cliente = get_object_or_404(Cliente, cliente_id=cliente_id)
+            cliente = get_object_or_404(Cliente.objects.by_id(cliente_id))
             
             # Obtener todas las cuotas del cliente ordenadas por fecha
-            cuotas = PaymentSchedule.objects.filter(
-                credito__cliente_id=cliente_id,
+            cuotas = PaymentSchedule.objects.for_client(cliente_id).filter(
                 credito__estado='vigente'
             ).select_related('credito').order_by('fecha_vencimiento')
             
@@ -681,6 +1051,34 @@ class RepartidorCronogramaViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def manifiesto_ruta(self, request):
+        """Paquete offline con los clientes de la ruta del día.
+
+        Body: {"tipo_doc": "CC", "num_docs": [...], "cliente_ids": [...]}
+        Se comprime con gzip cuando el cliente lo acepta.
+        """
+        try:
+            manifiesto = route_manifest_service.build_manifest(
+                request.data.get('tipo_doc', 'CC'),
+                request.data.get('num_docs'),
+                request.data.get('cliente_ids')
+            )
+        except (ValueError, TypeError) as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        content = JSONRenderer().render(manifiesto)
+        response = HttpResponse(content_type='application/json')
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            content = compress_string(content)
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response.content = content
+        return response
+    
     def _calcular_resumen_repartidor(self, cronograma):
         """Calcula resumen específico para el repartidor"""
         from decimal import Decimal
@@ -705,4 +1103,370 @@ class RepartidorCronogramaViewSet(viewsets.ViewSet):
             'monto_pagado': monto_pagado,
             'monto_pendiente': monto_pendiente,
             'porcentaje_pagado': (monto_pagado / total_monto * 100) if total_monto > 0 else 0
-        }
\ No newline at end of file
+        }
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """Sincronización incremental para la app móvil y el dashboard"""
+    permission_classes = [AllowAny]
+    
+    def list(self, request):
+        """Cambios posteriores al cursor: /api/sync/?since=<cursor>&limit=500
+        
+        Repetir con el cursor devuelto mientras has_more sea verdadero.
+        """
+        try:
+            cambios = sync_service.get_changes(
+                request.query_params.get('since'),
+                request.query_params.get('limit', sync_service.DEFAULT_LIMIT)
+            )
+            return Response(cambios)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class RecaudoViewSet(viewsets.ViewSet):
+    """Series de recaudo para el dashboard, leídas de los acumulados diarios"""
+    permission_classes = [AllowAny]
+    
+    def _rango(self, request):
+        hoy = timezone.now().date()
+        hasta = request.query_params.get('hasta')
+        desde = request.query_params.get('desde')
+        hasta = parse_date(hasta) if hasta else hoy
+        desde = parse_date(desde) if desde else hasta - timedelta(days=29)
+        if desde is None or hasta is None:
+            raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+        if hasta < desde:
+            raise ValueError('hasta debe ser posterior a desde')
+        return desde, hasta
+    
+    def _lista(self, request, nombre):
+        return [
+            valor
+            for parametro in request.query_params.getlist(nombre)
+            for valor in parametro.split(',') if valor
+        ]
+    
+    def _filtros(self, request):
+        return {
+            dimension: self._lista(request, dimension)
+            for dimension in collection_rollup_service.DIMENSIONS
+        }
+    
+    @action(detail=False, methods=['get'])
+    def serie(self, request):
+        """Pagos y monto por período: /api/recaudo/serie/?desde=&hasta=&intervalo=dia|semana|mes
+        
+        agrupar=medio,producto,ciudad separa la serie; medio, producto y ciudad filtran.
+        """
+        try:
+            desde, hasta = self._rango(request)
+            serie = collection_rollup_service.get_series(
+                desde, hasta,
+                request.query_params.get('intervalo', 'dia'),
+                self._lista(request, 'agrupar'),
+                self._filtros(request)
+            )
+            return Response(serie)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['post'])
+    def recalcular(self, request):
+        """Encola la reconstrucción de los acumulados del rango y responde 202"""
+        try:
+            desde, hasta = self._rango(request)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = job_service.enqueue(
+            'recalcular_recaudo', {'desde': desde.isoformat(), 'hasta': hasta.isoformat()}
+        )
+        return job_accepted(request, job)
+    
+    @action(detail=False, methods=['get'])
+    def totales(self, request):
+        """Totales del rango, generales y por medio, producto y ciudad"""
+        try:
+            desde, hasta = self._rango(request)
+            return Response(
+                collection_rollup_service.get_totals(desde, hasta, self._filtros(request))
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class MoraViewSet(viewsets.ViewSet):
+    """Roll rates y tendencia de mora, leídos de los snapshots diarios de cuotas"""
+    permission_classes = [AllowAny]
+    
+    def list(self, request):
+        """Fechas con snapshot: filas escritas y cuotas abiertas de cada una"""
+        return Response(portfolio_snapshot_service.runs())
+    
+    @action(detail=False, methods=['get'])
+    def roll_rate(self, request):
+        """Matrices de transición entre tramos: /api/mora/roll_rate/?mes=YYYY-MM&meses=1
+        
+        Compara el último snapshot del mes con el cierre del mes anterior.
+        """
+        mes = request.query_params.get('mes')
+        fecha = parse_date(f"{mes}-01") if mes else timezone.now().date()
+        meses = request.query_params.get('meses', '1')
+        if fecha is None or not meses.isdigit():
+            return Response(
+                {'error': 'Parámetros inválidos. Use mes=YYYY-MM y meses numérico'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            return Response(portfolio_snapshot_service.roll_rate(fecha, int(meses)))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['get'])
+    def tendencia(self, request):
+        """Créditos y saldo por tramo de mora: /api/mora/tendencia/?desde=&hasta=&intervalo=dia|semana|mes"""
+        try:
+            hoy = timezone.now().date()
+            hasta = request.query_params.get('hasta')
+            desde = request.query_params.get('desde')
+            hasta = parse_date(hasta) if hasta else hoy
+            desde = parse_date(desde) if desde else hasta - timedelta(days=89)
+            if desde is None or hasta is None:
+                raise ValueError('Formato de fecha inválido. Use YYYY-MM-DD')
+            if hasta < desde:
+                raise ValueError('hasta debe ser posterior a desde')
+            return Response(portfolio_snapshot_service.trend(
+                desde, hasta, request.query_params.get('intervalo', 'dia')
+            ))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    @action(detail=False, methods=['post'])
+    def snapshot(self, request):
+        """Encola el snapshot de cuotas abiertas del día (o de fecha) y responde 202"""
+        fecha = request.data.get('fecha')
+        if fecha and parse_date(fecha) is None:
+            return Response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = job_service.enqueue('snapshot_cartera', {'fecha': fecha})
+        return job_accepted(request, job)
+
+
+class SimuladorViewSet(viewsets.ViewSet):
+    """Simulador de ofertas de crédito para ventas"""
+    permission_classes = [AllowAny]
+    
+    def _valores(self, request, nombre):
+        """Valores separados por coma; desde:hasta:paso agrega un rango"""
+        valores = []
+        for parametro in request.query_params.getlist(nombre):
+            for valor in parametro.split(','):
+                if ':' not in valor:
+                    if valor:
+                        valores.append(valor)
+                    continue
+                try:
+                    desde, hasta, paso = (Decimal(parte) for parte in valor.split(':'))
+                except (ValueError, ArithmeticError):
+                    raise ValueError(f'Rango inválido en {nombre}: {valor}. Use desde:hasta:paso')
+                if paso <= 0 or hasta < desde:
+                    raise ValueError(f'Rango inválido en {nombre}: {valor}')
+                if (hasta - desde) / paso >= settings.SIMULATOR_MAX_OFFERS:
+                    raise ValueError(f'Rango demasiado grande en {nombre}: {valor}')
+                while desde <= hasta:
+                    valores.append(desde)
+                    desde += paso
+        return valores
+    
+    def list(self, request):
+        """Grilla de ofertas: /api/simulador/?producto=e-bike&inversion=2000000:5000000:500000&cuotas=6,12,24&tea=0.28
+        
+        valor_cuota, total_pagado y costo_financiero van indexados
+        [inversion][tea][cuotas]; cuotas y tea tienen valores por defecto.
+        """
+        try:
+            inversiones = self._valores(request, 'inversion')
+            if not inversiones:
+                raise ValueError('inversion es requerido')
+            content = offer_simulator_service.simulate_json(
+                request.query_params.get('producto', 'e-bike'),
+                inversiones,
+                self._valores(request, 'cuotas'),
+                self._valores(request, 'tea')
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return HttpResponse(content, content_type='application/json')
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Trabajos en segundo plano: encolar, consultar estado y progreso, cancelar"""
+    
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [AllowAny]
+    pagination_class = CustomPageNumberPagination
+    
+    def get_queryset(self):
+        queryset = Job.objects.order_by('-job_id')
+        for campo in ['estado', 'tipo']:
+            valor = self.request.query_params.get(campo)
+            if valor:
+                queryset = queryset.filter(**{campo: valor})
+        return queryset
+    
+    def create(self, request):
+        """Encola un trabajo: {"tipo": ..., "params": {...}, "prioridad": 0, "max_intentos": 3}"""
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            job = job_service.enqueue(**serializer.validated_data)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return job_accepted(request, job)
+    
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        """Cancela un trabajo pendiente o en proceso"""
+        job = self.get_object()
+        try:
+            job_service.cancel(job.job_id)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_409_CONFLICT
+            )
+        job.refresh_from_db()
+        return Response(JobSerializer(job).data)
+    
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        """Descarga el archivo generado por un trabajo completado"""
+        job = self.get_object()
+        archivo = (job.resultado or {}).get('archivo') if job.estado == 'completado' else None
+        path = os.path.join(settings.JOBS_OUTPUT_DIR, os.path.basename(archivo)) if archivo else None
+        if not path or not os.path.exists(path):
+            raise Http404('El trabajo no tiene un archivo disponible')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=archivo)
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """Reportes Excel/PDF generados en el servidor y descargados por clave"""
+    
+    permission_classes = [AllowAny]
+    
+    def create(self, request):
+        """Solicita un reporte: {"tipo": "cronograma|pagos|estado_cuenta", "formato": "xlsx|pdf", "filtros": {...}}
+        
+        Si los datos no cambiaron desde la última generación responde 200 con la
+        URL de descarga; si no, encola la generación y responde 202.
+        """
+        serializer = ReportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            solicitud = report_service.request_report(**serializer.validated_data)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        url = reverse('reportes-detail', args=[solicitud['clave']], request=request)
+        if solicitud['job'] is not None:
+            response = job_accepted(request, solicitud['job'])
+            response.data['descarga'] = url
+            return response
+        return Response({'estado': 'listo', 'clave': solicitud['clave'], 'descarga': url})
+    
+    def retrieve(self, request, pk=None):
+        """Descarga el reporte generado con esa clave"""
+        path = report_service.find(pk)
+        if not path:
+            raise Http404('El reporte no existe o aún se está generando')
+        _, extension = os.path.splitext(path)
+        try:
+            archivo = open(path, 'rb')
+        except FileNotFoundError:
+            # Podado entre la búsqueda y la apertura
+            raise Http404('El reporte no existe o aún se está generando')
+        return FileResponse(archivo, as_attachment=True, filename=f"reporte_{pk[:12]}{extension}")
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """Perfiles de peticiones guardados por el middleware de profiling (solo staff)"""
+    
+    permission_classes = [IsAdminUser]
+    
+    def list(self, request):
+        """Perfiles más recientes primero: /api/perfiles/?limit=100&ruta=/api/creditos/"""
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+        except ValueError:
+            return Response(
+                {'error': 'limit debe ser un entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        perfiles = profile_store.list(limit)
+        ruta = request.query_params.get('ruta')
+        if ruta:
+            perfiles = [perfil for perfil in perfiles if perfil['ruta'].startswith(ruta)]
+        return Response(perfiles)
+    
+    @action(detail=False, methods=['get'])
+    def sql(self, request):
+        """Top de fingerprints SQL de todos los procesos: ?limit=20&orden=total_ms|veces|max_ms|media_ms"""
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 500)
+            return Response(sql_stats.top(limit, request.query_params.get('orden', 'total_ms')))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    def retrieve(self, request, pk=None):
+        """Metadatos del perfil con las funciones más costosas y el SQL ejecutado"""
+        perfil = profile_store.get(pk)
+        if perfil is None:
+            raise Http404('Perfil no encontrado')
+        return Response(perfil)
+    
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        """Archivo pstats (.prof) del perfil; ?formato=txt devuelve el reporte en texto"""
+        if request.query_params.get('formato') == 'txt':
+            orden = request.query_params.get('orden')
+            texto = profile_store.text(pk, orden if orden in ('cumulative', 'tottime', 'calls') else 'cumulative')
+            if texto is None:
+                raise Http404('Perfil no encontrado')
+            return HttpResponse(texto, content_type='text/plain; charset=utf-8')
+        path = profile_store.path(pk)
+        if not path:
+            raise Http404('Perfil no encontrado')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))